@@ -0,0 +1,95 @@
+"""
+Index des produits boostés, partagé par tout le processus.
+
+Remplace les requêtes sur ProductBoostRequest (B2C) et c2c.ProductBoost (C2C)
+faites plusieurs fois par listing. L'index contient des ensembles figés
+d'ids de produits au boost actif ; il est mis en cache via
+project.context_cache et reconstruit :
+- à l'enregistrement / suppression d'un boost (signaux, accounts/signals.py
+  et c2c/signals.py) ;
+- à la prochaine frontière de temps : début d'un boost programmé ou fin d'un
+  boost actif (valid_until) ;
+- au plus tard après MAX_AGE secondes (changements faits par update()).
+"""
+from datetime import timedelta
+
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from project.context_cache import get_or_build, invalidate
+
+CACHE_NAMESPACE = 'boost_index'
+MAX_AGE = 600
+
+
+class BoostIndex:
+    """Ids des produits boostés à un instant donné, valable jusqu'à valid_until."""
+
+    def __init__(self, b2c_until, b2c_paid, c2c_until, valid_until):
+        # {product_id: fin du boost}
+        self.b2c_until = b2c_until
+        self.c2c_until = c2c_until
+        self.b2c = frozenset(b2c_until)
+        self.b2c_paid = frozenset(b2c_paid)
+        self.c2c = frozenset(c2c_until)
+        self.valid_until = valid_until
+
+    def is_expired(self, now=None):
+        return (now or timezone.now()) >= self.valid_until
+
+
+def _active(queryset, now, *fields):
+    """Boosts actifs maintenant : lignes (product_id, end_date, *fields)."""
+    return list(queryset.filter(start_date__lte=now, end_date__gte=now).values_list(
+        'product_id', 'end_date', *fields).order_by())
+
+
+def _until(rows):
+    """{product_id: fin la plus lointaine}"""
+    until = {}
+    for product_id, end_date, *_rest in rows:
+        if product_id not in until or end_date > until[product_id]:
+            until[product_id] = end_date
+    return until
+
+
+def _next_boundary(queryset, now):
+    """Prochain instant où l'ensemble des boosts actifs change."""
+    bounds = queryset.aggregate(
+        next_start=Min('start_date', filter=Q(start_date__gt=now)),
+        next_end=Min('end_date', filter=Q(end_date__gte=now)),
+    )
+    candidates = []
+    if bounds['next_start']:
+        candidates.append(bounds['next_start'])
+    if bounds['next_end']:
+        # end_date est inclusive : le boost sort juste après
+        candidates.append(bounds['next_end'] + timedelta(microseconds=1))
+    return candidates
+
+
+def build_boost_index(now=None):
+    """Construit l'index (quatre requêtes agrégées au total)."""
+    from c2c.models import ProductBoost
+    from .models import ProductBoostRequest
+
+    now = now or timezone.now()
+    b2c_qs = ProductBoostRequest.objects.filter(status=ProductBoostRequest.ACTIVE)
+    c2c_qs = ProductBoost.objects.filter(status=ProductBoost.ACTIVE)
+
+    b2c_rows = _active(b2c_qs, now, 'payment_status')
+    c2c_rows = _active(c2c_qs, now)
+    b2c_paid = {product_id for product_id, _end, paid in b2c_rows if paid}
+
+    boundaries = _next_boundary(b2c_qs, now) + _next_boundary(c2c_qs, now)
+    valid_until = min(boundaries + [now + timedelta(seconds=MAX_AGE)])
+    return BoostIndex(_until(b2c_rows), b2c_paid, _until(c2c_rows), valid_until)
+
+
+def get_boost_index():
+    """Index courant ; reconstruit si une frontière de temps est franchie."""
+    index = get_or_build(CACHE_NAMESPACE, build_boost_index)
+    if index.is_expired():
+        invalidate(CACHE_NAMESPACE)
+        index = get_or_build(CACHE_NAMESPACE, build_boost_index)
+    return index
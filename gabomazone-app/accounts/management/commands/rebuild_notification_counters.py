@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from accounts.models import UserNotificationCounter
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs de notifications du header (UserNotificationCounter)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help="ID d'utilisateur à recalculer (répétable). Par défaut : tous.")
+
+    def handle(self, *args, **options):
+        user_ids = options.get('user_ids')
+        if not user_ids:
+            user_ids = User.objects.values_list('id', flat=True).iterator()
+
+        count = 0
+        for user_id in user_ids:
+            UserNotificationCounter.refresh_for_users(user_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'{count} compteur(s) de notifications recalculé(s).'))
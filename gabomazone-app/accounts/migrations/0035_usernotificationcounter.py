@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0034_b2cproductconversation_b2cproductmessage'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserNotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('unread_c2c_messages', models.PositiveIntegerField(default=0, verbose_name='Messages C2C non lus')),
+                ('unread_b2c_messages', models.PositiveIntegerField(default=0, verbose_name='Messages B2C non lus')),
+                ('unread_order_notifications', models.PositiveIntegerField(default=0, verbose_name='Commandes non lues')),
+                ('unnotified_purchase_intents', models.PositiveIntegerField(default=0, verbose_name="Intentions d'achat non notifiées")),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date de mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Compteur de notifications',
+                'verbose_name_plural': 'Compteurs de notifications',
+            },
+        ),
+    ]
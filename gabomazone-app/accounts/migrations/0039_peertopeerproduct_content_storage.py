@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:33
+
+import products.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0038_peertopeerproduct_related_ids'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='peertopeerproduct',
+            name='additional_image_1',
+            field=models.ImageField(blank=True, max_length=500, null=True, storage=products.storage.content_storage, upload_to='peer_to_peer/imgs/', verbose_name='Image supplémentaire 1'),
+        ),
+        migrations.AlterField(
+            model_name='peertopeerproduct',
+            name='additional_image_2',
+            field=models.ImageField(blank=True, max_length=500, null=True, storage=products.storage.content_storage, upload_to='peer_to_peer/imgs/', verbose_name='Image supplémentaire 2'),
+        ),
+        migrations.AlterField(
+            model_name='peertopeerproduct',
+            name='additional_image_3',
+            field=models.ImageField(blank=True, max_length=500, null=True, storage=products.storage.content_storage, upload_to='peer_to_peer/imgs/', verbose_name='Image supplémentaire 3'),
+        ),
+        migrations.AlterField(
+            model_name='peertopeerproduct',
+            name='additional_image_4',
+            field=models.ImageField(blank=True, max_length=500, null=True, storage=products.storage.content_storage, upload_to='peer_to_peer/imgs/', verbose_name='Image supplémentaire 4'),
+        ),
+        migrations.AlterField(
+            model_name='peertopeerproduct',
+            name='product_image',
+            field=models.ImageField(default='peer_to_peer/product.jpg', max_length=500, storage=products.storage.content_storage, upload_to='peer_to_peer/imgs/', verbose_name='Image du produit'),
+        ),
+    ]
@@ -5,6 +5,7 @@ from PIL import Image
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 from .utils import code_generator, create_shortcode
+from products.storage import content_storage
 import random
 import string
 
@@ -97,7 +98,7 @@ class PeerToPeerProduct(models.Model):
     product_name = models.CharField(max_length=150, verbose_name=_("Nom du produit"))
     product_description = models.TextField(verbose_name=_("Description"))
     product_image = models.ImageField(
-        upload_to='peer_to_peer/imgs/', default='peer_to_peer/product.jpg', max_length=500, verbose_name=_("Image du produit"))
+        upload_to='peer_to_peer/imgs/', storage=content_storage, default='peer_to_peer/product.jpg', max_length=500, verbose_name=_("Image du produit"))
     
     # Catégories
     product_supercategory = models.ForeignKey(
@@ -115,13 +116,13 @@ class PeerToPeerProduct(models.Model):
     
     # Images supplémentaires
     additional_image_1 = models.ImageField(
-        upload_to='peer_to_peer/imgs/', blank=True, null=True, max_length=500, verbose_name=_("Image supplémentaire 1"))
+        upload_to='peer_to_peer/imgs/', storage=content_storage, blank=True, null=True, max_length=500, verbose_name=_("Image supplémentaire 1"))
     additional_image_2 = models.ImageField(
-        upload_to='peer_to_peer/imgs/', blank=True, null=True, max_length=500, verbose_name=_("Image supplémentaire 2"))
+        upload_to='peer_to_peer/imgs/', storage=content_storage, blank=True, null=True, max_length=500, verbose_name=_("Image supplémentaire 2"))
     additional_image_3 = models.ImageField(
-        upload_to='peer_to_peer/imgs/', blank=True, null=True, max_length=500, verbose_name=_("Image supplémentaire 3"))
+        upload_to='peer_to_peer/imgs/', storage=content_storage, blank=True, null=True, max_length=500, verbose_name=_("Image supplémentaire 3"))
     additional_image_4 = models.ImageField(
-        upload_to='peer_to_peer/imgs/', blank=True, null=True, max_length=500, verbose_name=_("Image supplémentaire 4"))
+        upload_to='peer_to_peer/imgs/', storage=content_storage, blank=True, null=True, max_length=500, verbose_name=_("Image supplémentaire 4"))
     
     # Statut
     PENDING = 'PENDING'
@@ -179,6 +180,14 @@ class PeerToPeerProduct(models.Model):
     
     # Compteur de vues
     view_count = models.PositiveIntegerField(default=0, verbose_name=_("Nombre de vues"))
+    # Compteur de favoris, maintenu par products/likes.py
+    like_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("Nombre de favoris"))
+    # Manifeste JSON des images de la carte, maintenu par products/image_manifest.py
+    image_manifest = models.TextField(blank=True, default='', editable=False, verbose_name=_("Manifeste d'images"))
+    # Ids des articles similaires classés, calculés par products/related.py
+    related_ids = models.JSONField(default=list, blank=True, editable=False, verbose_name=_("Articles similaires"))
+
+    CARD_IMAGE_FIELDS = ('product_image', 'additional_image_1', 'additional_image_2', 'additional_image_3')
     
     class Meta:
         ordering = ('-date',)
@@ -536,6 +545,96 @@ class B2CProductMessage(models.Model):
         return f"B2C msg {self.sender.username} - {self.created_at}"
 
 
+
+class UserNotificationCounter(models.Model):
+    """
+    Compteurs dénormalisés des badges du header (une ligne par utilisateur).
+    Recalculés par les signaux des messages, notifications et intentions d'achat
+    (voir accounts/signals.py) et par la commande rebuild_notification_counters.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='notification_counter', verbose_name=_("Utilisateur"))
+    unread_c2c_messages = models.PositiveIntegerField(default=0, verbose_name=_("Messages C2C non lus"))
+    unread_b2c_messages = models.PositiveIntegerField(default=0, verbose_name=_("Messages B2C non lus"))
+    unread_order_notifications = models.PositiveIntegerField(default=0, verbose_name=_("Commandes non lues"))
+    unnotified_purchase_intents = models.PositiveIntegerField(default=0, verbose_name=_("Intentions d'achat non notifiées"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Date de mise à jour"))
+
+    class Meta:
+        verbose_name = _("Compteur de notifications")
+        verbose_name_plural = _("Compteurs de notifications")
+
+    def __str__(self):
+        return f"Compteurs - {self.user_id}"
+
+    @property
+    def unread_orders(self):
+        return self.unread_order_notifications + self.unnotified_purchase_intents
+
+    @property
+    def total_notifications(self):
+        return self.unread_c2c_messages + self.unread_orders
+
+    @classmethod
+    def compute_for_user(cls, user_id):
+        """Calcule les compteurs par agrégats (un COUNT par compteur)."""
+        from django.db.models import F, Q
+        from c2c.models import PurchaseIntent
+
+        unread_c2c = ProductMessage.objects.filter(is_read=False).filter(
+            Q(conversation__seller_id=user_id, conversation__is_archived_by_seller=False,
+              sender=F('conversation__buyer'))
+            | Q(conversation__buyer_id=user_id, conversation__is_archived_by_buyer=False,
+                sender=F('conversation__seller'))
+        ).count()
+
+        # Messagerie B2C : badge uniquement côté vendeur pro admis
+        unread_b2c = 0
+        if Profile.objects.filter(user_id=user_id, status='vendor', admission=True).exists():
+            unread_b2c = B2CProductMessage.objects.filter(
+                is_read=False,
+                conversation__vendor_id=user_id,
+                sender=F('conversation__customer'),
+            ).count()
+
+        unread_orders = PeerToPeerOrderNotification.objects.filter(
+            seller_id=user_id, is_read=False).count()
+
+        unnotified_intents = PurchaseIntent.objects.filter(
+            seller_id=user_id,
+            seller_notified=False,
+            status__in=[
+                PurchaseIntent.PENDING,
+                PurchaseIntent.AWAITING_AVAILABILITY,
+                PurchaseIntent.NEGOTIATING,
+            ],
+        ).count()
+
+        return {
+            'unread_c2c_messages': unread_c2c,
+            'unread_b2c_messages': unread_b2c,
+            'unread_order_notifications': unread_orders,
+            'unnotified_purchase_intents': unnotified_intents,
+        }
+
+    @classmethod
+    def refresh_for_users(cls, *user_ids):
+        """Recalcule et enregistre les compteurs des utilisateurs donnés."""
+        for user_id in {uid for uid in user_ids if uid}:
+            cls.objects.update_or_create(
+                user_id=user_id, defaults=cls.compute_for_user(user_id))
+
+    @classmethod
+    def get_for_user(cls, user):
+        """Retourne la ligne de compteurs de l'utilisateur (créée si absente)."""
+        counter = cls.objects.filter(user=user).first()
+        if counter is None:
+            counter, _created = cls.objects.get_or_create(
+                user=user, defaults=cls.compute_for_user(user.pk))
+        return counter
+
+
 def create_profile(sender, **kwargs):
     if kwargs['created'] and not kwargs.get('raw', False):
         user_profile = Profile.objects.create(
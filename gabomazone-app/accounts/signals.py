@@ -1,11 +1,21 @@
 """
 Signaux Django pour créer automatiquement des notifications admin
+et tenir à jour les compteurs de notifications des utilisateurs
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.urls import reverse
 from django.core.exceptions import ObjectDoesNotExist
+from project.context_cache import invalidate_on
+from project.page_cache import invalidate_page_on
+from project.schema_registry import table_exists
+from products.image_manifest import track_image_manifest
+from products.image_pipeline import track_image_pipeline
+from products.likes import track_likes
+from products.storage import track_blobs
+from .boost_index import CACHE_NAMESPACE as BOOST_INDEX_NAMESPACE
+from .models import PeerToPeerProduct, PeerToPeerProductFavorite, ProductBoostRequest
 
 
 # Import direct pour éviter les problèmes de chargement
@@ -13,9 +23,8 @@ def get_admin_notification_model():
     """Récupère le modèle AdminNotification de manière sécurisée"""
     try:
         from .models import AdminNotification
-        # Vérifier si la table existe
-        from django.db import connection
-        if 'accounts_adminnotification' in connection.introspection.table_names():
+        # Vérifier si la table existe (registre chargé une fois par processus)
+        if table_exists('accounts_adminnotification'):
             return AdminNotification
     except Exception:
         pass
@@ -182,3 +191,97 @@ def notify_admin_on_b2c_product_published(sender, instance, created, **kwargs):
         logger = logging.getLogger(__name__)
         logger.error(f"Erreur notification admin produit B2C: {e}", exc_info=True)
 
+
+
+# ---------------------------------------------------------------------------
+# Compteurs dénormalisés des badges du header (UserNotificationCounter)
+# ---------------------------------------------------------------------------
+
+def _refresh_notification_counters(*user_ids):
+    """Recalcule les compteurs des utilisateurs concernés sans bloquer l'écriture."""
+    try:
+        if not table_exists('accounts_usernotificationcounter'):
+            return
+        from .models import UserNotificationCounter
+        UserNotificationCounter.refresh_for_users(*user_ids)
+    except Exception as e:
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.error(f"Erreur mise à jour des compteurs de notifications {user_ids}: {e}", exc_info=True)
+
+
+@receiver([post_save, post_delete], sender='accounts.ProductMessage')
+def refresh_counters_on_c2c_message(sender, instance, **kwargs):
+    """Nouveau message, lecture ou suppression dans une conversation C2C."""
+    if kwargs.get('raw', False):
+        return
+    try:
+        conversation = instance.conversation
+    except ObjectDoesNotExist:
+        return
+    _refresh_notification_counters(conversation.seller_id, conversation.buyer_id)
+
+
+@receiver([post_save, post_delete], sender='accounts.ProductConversation')
+def refresh_counters_on_c2c_conversation(sender, instance, **kwargs):
+    """Archivage / désarchivage ou suppression d'une conversation C2C."""
+    if kwargs.get('raw', False) or kwargs.get('created', False):
+        return
+    _refresh_notification_counters(instance.seller_id, instance.buyer_id)
+
+
+@receiver([post_save, post_delete], sender='accounts.B2CProductMessage')
+def refresh_counters_on_b2c_message(sender, instance, **kwargs):
+    """Nouveau message, lecture ou suppression dans une conversation B2C (côté vendeur)."""
+    if kwargs.get('raw', False):
+        return
+    try:
+        conversation = instance.conversation
+    except ObjectDoesNotExist:
+        return
+    _refresh_notification_counters(conversation.vendor_id)
+
+
+@receiver([post_save, post_delete], sender='accounts.PeerToPeerOrderNotification')
+def refresh_counters_on_order_notification(sender, instance, **kwargs):
+    """Notification de commande C2C créée, lue ou supprimée."""
+    if kwargs.get('raw', False):
+        return
+    _refresh_notification_counters(instance.seller_id)
+
+
+@receiver([post_save, post_delete], sender='c2c.PurchaseIntent')
+def refresh_counters_on_purchase_intent(sender, instance, **kwargs):
+    """Intention d'achat créée, notifiée, changée de statut ou supprimée."""
+    if kwargs.get('raw', False):
+        return
+    _refresh_notification_counters(instance.seller_id)
+
+
+@receiver(post_save, sender='accounts.Profile')
+def refresh_counters_on_profile(sender, instance, created, **kwargs):
+    """Le badge B2C dépend du statut vendeur / de l'admission du profil."""
+    if kwargs.get('raw', False) or created:
+        return
+    _refresh_notification_counters(instance.user_id)
+
+
+# Index des produits boostés (accounts/boost_index.py) : reconstruit après le commit de chaque changement de boost B2C
+invalidate_on(BOOST_INDEX_NAMESPACE, ProductBoostRequest)
+
+# PeerToPeerProduct.like_count suit les créations / suppressions de favoris
+track_likes(PeerToPeerProductFavorite)
+
+# Manifeste d'images des cartes C2C recalculé à l'enregistrement
+track_image_manifest(PeerToPeerProduct)
+
+# Déclinaisons card / detail / zoom des images C2C, hors requête
+_C2C_IMAGE_FIELDS = ('product_image', 'additional_image_1', 'additional_image_2',
+                     'additional_image_3', 'additional_image_4')
+track_image_pipeline(PeerToPeerProduct, _C2C_IMAGE_FIELDS)
+
+# Références des blobs d'images (stockage adressé par contenu, products/storage.py)
+track_blobs(PeerToPeerProduct, _C2C_IMAGE_FIELDS)
+
+# Page détail en cache (anonymes) périmée quand l'article change
+invalidate_page_on(PeerToPeerProduct)
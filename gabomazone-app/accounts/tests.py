@@ -1,3 +1,143 @@
+from datetime import timedelta
+from io import StringIO
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from c2c.models import ProductBoost, PurchaseIntent
+from products.models import Product
+from project import context_cache
+from .boost_index import build_boost_index, get_boost_index
+from .models import (PeerToPeerProduct, ProductBoostRequest, ProductConversation,
+                     ProductMessage, UserNotificationCounter)
+
+
+class UserNotificationCounterTests(TestCase):
+
+    def setUp(self):
+        self.seller = User.objects.create_user('vendeur', 'vendeur@example.com', 'secret')
+        self.buyer = User.objects.create_user('acheteur', 'acheteur@example.com', 'secret')
+        self.product = PeerToPeerProduct.objects.create(
+            seller=self.seller, product_name='Vélo', product_description='Bon vélo',
+            PRDPrice=50000, seller_phone='074000000', seller_address='Akanda',
+            seller_city='Libreville', status=PeerToPeerProduct.APPROVED)
+        self.conversation = ProductConversation.objects.create(
+            product=self.product, seller=self.seller, buyer=self.buyer)
+
+    def counter(self, user):
+        return UserNotificationCounter.objects.get(user=user)
+
+    def test_message_updates_recipient_counter(self):
+        ProductMessage.objects.create(conversation=self.conversation, sender=self.buyer, message='Dispo ?')
+        self.assertEqual(self.counter(self.seller).unread_c2c_messages, 1)
+        self.assertEqual(self.counter(self.buyer).unread_c2c_messages, 0)
+
+    def test_bulk_mark_read_resets_counter(self):
+        ProductMessage.objects.create(conversation=self.conversation, sender=self.buyer, message='Dispo ?')
+        self.client.force_login(self.seller)
+        self.client.post(reverse('accounts:mark-conversation-read', args=[self.conversation.id]))
+        self.assertEqual(self.counter(self.seller).unread_c2c_messages, 0)
+
+    def test_archived_conversation_is_not_counted(self):
+        ProductMessage.objects.create(conversation=self.conversation, sender=self.buyer, message='Dispo ?')
+        self.conversation.archive_for_user(self.seller)
+        self.assertEqual(self.counter(self.seller).unread_c2c_messages, 0)
+
+    def test_purchase_intent_counts_as_unread_order(self):
+        intent = PurchaseIntent.objects.create(
+            product=self.product, buyer=self.buyer, seller=self.seller,
+            initial_price=Decimal('50000'))
+        self.assertEqual(self.counter(self.seller).unread_orders, 1)
+        intent.seller_notified = True
+        intent.save(update_fields=['seller_notified'])
+        self.assertEqual(self.counter(self.seller).unread_orders, 0)
+
+    def test_header_reads_single_counter_row(self):
+        ProductMessage.objects.create(conversation=self.conversation, sender=self.buyer, message='Dispo ?')
+        self.client.force_login(self.seller)
+        response = self.client.get(reverse('home:index'))
+        self.assertEqual(response.context['unread_messages_count'], 1)
+        self.assertEqual(response.context['total_notifications_count'], 1)
+
+    def test_rebuild_command_repairs_counters(self):
+        ProductMessage.objects.create(conversation=self.conversation, sender=self.buyer, message='Dispo ?')
+        UserNotificationCounter.objects.filter(user=self.seller).update(unread_c2c_messages=42)
+        call_command('rebuild_notification_counters', stdout=StringIO())
+        self.assertEqual(self.counter(self.seller).unread_c2c_messages, 1)
+
+
+class BoostIndexTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        context_cache.clear_local()
+        self.now = timezone.now()
+        self.seller = User.objects.create_user('vendeur', 'vendeur@example.com', 'secret')
+        self.product = Product.objects.create(
+            product_name='Montre', product_description='Montre', PRDPrice=10000)
+        self.article = PeerToPeerProduct.objects.create(
+            seller=self.seller, product_name='Vélo', product_description='Bon vélo',
+            PRDPrice=50000, seller_phone='074000000', seller_address='Akanda',
+            seller_city='Libreville', status=PeerToPeerProduct.APPROVED)
+        self.request = ProductBoostRequest.objects.create(
+            vendor=self.seller.profile, product=self.product, status=ProductBoostRequest.ACTIVE,
+            payment_status=True, start_date=self.now - timedelta(days=1),
+            end_date=self.now + timedelta(days=2))
+        self.boost = ProductBoost.objects.create(
+            product=self.article, buyer=self.seller, duration=ProductBoost.BOOST_24H,
+            start_date=self.now - timedelta(hours=1), end_date=self.now + timedelta(hours=23),
+            price=Decimal('1000'))
+
+    def test_index_contains_active_boosts(self):
+        index = get_boost_index()
+        self.assertEqual(index.b2c, {self.product.id})
+        self.assertEqual(index.b2c_paid, {self.product.id})
+        self.assertEqual(index.c2c, {self.article.id})
+        self.assertEqual(index.c2c_until[self.article.id], self.boost.end_date)
+
+    def test_valid_until_is_next_boundary(self):
+        later = self.now + timedelta(minutes=5)
+        ProductBoostRequest.objects.create(
+            vendor=self.seller.profile, product=self.product, status=ProductBoostRequest.ACTIVE,
+            start_date=later, end_date=later + timedelta(days=1))
+        self.assertEqual(build_boost_index(self.now).valid_until, later)
+        end = self.now + timedelta(minutes=2)
+        ProductBoost.objects.filter(pk=self.boost.pk).update(end_date=end)
+        self.assertEqual(build_boost_index(self.now).valid_until, end + timedelta(microseconds=1))
+        self.assertFalse(build_boost_index(end + timedelta(seconds=1)).c2c)
+
+    def test_save_invalidates_index(self):
+        self.assertIn(self.product.id, get_boost_index().b2c)
+        self.request.status = ProductBoostRequest.EXPIRED
+        with self.captureOnCommitCallbacks(execute=True):
+            self.request.save()
+        self.assertNotIn(self.product.id, get_boost_index().b2c)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.boost.delete()
+        self.assertFalse(get_boost_index().c2c)
+
+    def test_rolled_back_change_keeps_index(self):
+        get_boost_index()
+        try:
+            with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+                self.request.status = ProductBoostRequest.EXPIRED
+                self.request.save()
+                self.boost.delete()
+                # Lecture concurrente pendant la transaction : l'index n'est pas reconstruit
+                self.assertIn(self.product.id, get_boost_index().b2c)
+                raise ValueError
+        except ValueError:
+            pass
+        index = get_boost_index()
+        self.assertEqual((index.b2c, index.c2c), ({self.product.id}, {self.article.id}))
 
-# Create your tests here.
+    def test_warm_index_costs_no_query(self):
+        get_boost_index()
+        with self.assertNumQueries(0):
+            self.assertIn(self.article.id, get_boost_index().c2c)
@@ -30,6 +30,10 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
 from django.urls import reverse
+from project.cursor_pagination import CursorPaginator, InvalidCursor, cached_count
+from project.page_cache import anonymous_page_cache
+from products.related import related_items
+from products.view_counts import record_cached_view, record_view
 
 logger = logging.getLogger(__name__)
 
@@ -144,10 +148,10 @@ def _find_user_for_login(identifier):
 
 
 def _table_exists(table_name):
-    """Vérifie si une table existe (SQLite, PostgreSQL, etc.)."""
-    from django.db import connection
+    """Vérifie si une table existe (SQLite, PostgreSQL, etc.) via le registre des tables."""
+    from project.schema_registry import table_exists
     try:
-        return table_name in connection.introspection.table_names()
+        return table_exists(table_name)
     except Exception:
         return False
 
@@ -522,40 +526,26 @@ def change_password(request):
 
 class MyOrdersJsonListView(LoginRequiredMixin, View):
     """JSON endpoint returning the authenticated user's finished orders."""
+    PAGE_SIZE = 10
 
     def get(self, *args, **kwargs):
-        """Return paginated finished orders as JSON."""
-        num_products = self.request.GET.get("num_products", "10")
-        try:
-            upper = int(num_products)
-        except (ValueError, TypeError):
-            upper = 10
-        lower = upper - 10
-        
-        # Debug: vérifier toutes les commandes
-        all_orders = Order.objects.filter(is_finished=True)
-        logger.info(f"Total orders with is_finished=True: {all_orders.count()}")
-        
-        # Filtrer par utilisateur
-        user_orders = Order.objects.filter(user=self.request.user, is_finished=True)
-        email_orders = Order.objects.filter(email_client=self.request.user.email, is_finished=True)
-        
-        logger.info(f"Orders for user {self.request.user.id} ({self.request.user.email}): {user_orders.count()}")
-        logger.info(f"Orders for email {self.request.user.email}: {email_orders.count()}")
-        
+        """Return cursor-paginated finished orders as JSON."""
+        cursor = self.request.GET.get("cursor")
         orders_queryset = Order.objects.filter(
             Q(user=self.request.user) | Q(email_client=self.request.user.email),
             is_finished=True
-        ).order_by("-order_date")[lower:upper]
-        
-        logger.info(f"Final queryset count: {orders_queryset.count()}")
+        )
+        try:
+            page = CursorPaginator(orders_queryset, ["-order_date"], self.PAGE_SIZE).page(cursor)
+        except InvalidCursor:
+            return JsonResponse({'error': 'Curseur invalide.'}, status=400)
         
         # Convertir en liste de dictionnaires avec les champs nécessaires
         from orders.models import OrderDetails
         from payments.models import SingPayTransaction
         
         orders = []
-        for order in orders_queryset:
+        for order in page:
             # Compter les articles dans la commande
             items_count = OrderDetails.objects.filter(order=order).count()
             
@@ -600,14 +590,11 @@ class MyOrdersJsonListView(LoginRequiredMixin, View):
             
             orders.append(order_data)
         
-        orders_size = Order.objects.filter(
-            Q(user=self.request.user) | Q(email_client=self.request.user.email),
-            is_finished=True
-        ).count()
-        
-        logger.info(f"Total orders size: {orders_size}")
-        max_size = True if upper >= orders_size else False
-        return JsonResponse({"data": orders,  "max": max_size, "orders_size": orders_size, }, safe=False)
+        response = {"data": orders, "max": not page.has_next, "next_cursor": page.next_cursor}
+        # Total seulement pour la première page (COUNT mis en cache)
+        if not cursor:
+            response["orders_size"] = cached_count(orders_queryset)
+        return JsonResponse(response, safe=False)
 
 
 def order(request, order_id):
@@ -698,21 +685,11 @@ def sell_product(request):
         
         if table_exists:
             user_products = PeerToPeerProduct.objects.filter(seller=request.user).exclude(status=PeerToPeerProduct.SOLD).order_by('-date')
-            # Vérifier si les produits sont boostés
-            from c2c.models import ProductBoost
-            from django.utils import timezone
-            now = timezone.now()
+            # Vérifier si les produits sont boostés (index partagé des boosts actifs)
+            from .boost_index import get_boost_index
+            boosted_c2c = get_boost_index().c2c
             for product in user_products:
-                try:
-                    active_boost = ProductBoost.objects.filter(
-                        product=product,
-                        status=ProductBoost.ACTIVE,
-                        start_date__lte=now,
-                        end_date__gte=now
-                    ).first()
-                    product.is_boosted = active_boost is not None
-                except Exception:
-                    product.is_boosted = False
+                product.is_boosted = product.id in boosted_c2c
     except Exception as e:
         # Si la table n'existe pas encore (migrations non appliquées)
         user_products = []
@@ -1052,9 +1029,8 @@ def my_published_products(request):
             user_products = PeerToPeerProduct.objects.filter(seller=request.user).exclude(status=PeerToPeerProduct.SOLD).order_by('-date')
             # Calculer le nombre de messages non lus et vérifier si le produit est boosté
             from .models import ProductConversation
-            from c2c.models import ProductBoost
-            from django.utils import timezone
-            now = timezone.now()
+            from .boost_index import get_boost_index
+            boost_index = get_boost_index()
             
             for product in user_products:
                 try:
@@ -1067,18 +1043,9 @@ def my_published_products(request):
                     product.unread_messages_count = 0
                 
                 # Vérifier si le produit a un boost actif
-                try:
-                    active_boost = ProductBoost.objects.filter(
-                        product=product,
-                        status=ProductBoost.ACTIVE,
-                        start_date__lte=now,
-                        end_date__gte=now
-                    ).first()
-                    product.is_boosted = active_boost is not None
-                    if active_boost:
-                        product.boost_end_date = active_boost.end_date
-                except Exception:
-                    product.is_boosted = False
+                product.is_boosted = product.id in boost_index.c2c
+                if product.is_boosted:
+                    product.boost_end_date = boost_index.c2c_until[product.id]
         else:
             user_products = []
     except Exception as e:
@@ -1760,7 +1727,7 @@ def mark_conversation_messages_read(request, conversation_id):
     Vue pour marquer les messages d'une conversation comme lus (API JSON)
     """
     from django.http import JsonResponse
-    from .models import ProductConversation, ProductMessage
+    from .models import ProductConversation, ProductMessage, UserNotificationCounter
     from django.utils import timezone
     
     try:
@@ -1771,11 +1738,14 @@ def mark_conversation_messages_read(request, conversation_id):
         return JsonResponse({'error': 'Conversation introuvable'}, status=404)
     
     # Marquer les messages de l'autre participant comme lus
-    ProductMessage.objects.filter(
+    updated = ProductMessage.objects.filter(
         conversation=conversation,
         sender__in=[conversation.seller, conversation.buyer],
         is_read=False
     ).exclude(sender=request.user).update(is_read=True, read_at=timezone.now())
+    # update() n'émet pas de signal : recalculer le badge du lecteur
+    if updated:
+        UserNotificationCounter.refresh_for_users(request.user.id)
     
     return JsonResponse({'success': True})
 
@@ -1990,10 +1960,13 @@ def my_messages(request):
             
             if c2c_table_exists:
                 # Marquer toutes les intentions d'achat comme notifiées (le vendeur a vu la page)
-                PurchaseIntent.objects.filter(
+                updated = PurchaseIntent.objects.filter(
                     seller=request.user,
                     seller_notified=False
                 ).update(seller_notified=True)
+                if updated:
+                    from .models import UserNotificationCounter
+                    UserNotificationCounter.refresh_for_users(request.user.id)
         except Exception:
             pass  # Ignorer les erreurs
         
@@ -2253,7 +2226,7 @@ def send_b2c_message(request, conversation_id):
 def mark_b2c_conversation_read(request, conversation_id):
     from django.http import JsonResponse
     from django.utils import timezone
-    from .models import B2CProductConversation, B2CProductMessage
+    from .models import B2CProductConversation, B2CProductMessage, UserNotificationCounter
 
     if not _is_approved_b2c_vendor_user(request.user):
         return JsonResponse({'error': 'Accès réservé aux vendeurs professionnels'}, status=403)
@@ -2265,13 +2238,24 @@ def mark_b2c_conversation_read(request, conversation_id):
     if request.user != conv.vendor:
         return JsonResponse({'error': 'Accès non autorisé'}, status=403)
 
-    B2CProductMessage.objects.filter(
+    updated = B2CProductMessage.objects.filter(
         conversation=conv,
         is_read=False,
     ).exclude(sender=request.user).update(is_read=True, read_at=timezone.now())
+    # update() n'émet pas de signal : recalculer le badge du vendeur
+    if updated:
+        UserNotificationCounter.refresh_for_users(request.user.id)
     return JsonResponse({'success': True})
 
 
+def _peer_product_page(slug):
+    """Identité de la page détail C2C pour le cache de pages anonymes."""
+    row = (PeerToPeerProduct.objects.filter(PRDSlug=slug, status=PeerToPeerProduct.APPROVED)
+           .values_list('pk', 'date_update').first())
+    return (PeerToPeerProduct, *row) if row else None
+
+
+@anonymous_page_cache(_peer_product_page, on_hit=record_cached_view)
 def peer_product_details(request, slug):
     """Affiche les détails d'un article C2C"""
     from django.shortcuts import get_object_or_404
@@ -2279,21 +2263,21 @@ def peer_product_details(request, slug):
     try:
         peer_product = get_object_or_404(PeerToPeerProduct, PRDSlug=slug, status=PeerToPeerProduct.APPROVED)
         
-        # Incrémenter le compteur de vues
-        from django.db.models import F
-        PeerToPeerProduct.objects.filter(id=peer_product.id).update(view_count=F('view_count') + 1)
-        peer_product.refresh_from_db()
+        # Vue comptée en différé (products.view_counts), sans écriture en base
+        record_view(request, peer_product)
     except Exception as e:
         messages.error(request, "Cet article n'existe pas ou n'est pas encore approuvé.")
         return redirect('categories:shop')
     
-    # Récupérer les articles similaires (même catégorie principale)
+    # Articles similaires
     similar_products = []
     try:
-        if peer_product.product_maincategory:
-            similar_products = PeerToPeerProduct.objects.filter(
-                product_maincategory=peer_product.product_maincategory,
-                status=PeerToPeerProduct.APPROVED
+        # Voisins précalculés (products.related), sinon même catégorie principale
+        approved = PeerToPeerProduct.objects.filter(status=PeerToPeerProduct.APPROVED)
+        similar_products = related_items(peer_product, approved, 8)
+        if not similar_products and peer_product.product_maincategory:
+            similar_products = approved.filter(
+                product_maincategory=peer_product.product_maincategory
             ).exclude(id=peer_product.id)[:8]
     except Exception:
         pass
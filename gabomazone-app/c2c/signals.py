@@ -5,7 +5,9 @@ Gestion des notifications et mises à jour automatiques
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
-from .models import PurchaseIntent, C2COrder, DeliveryVerification
+from accounts.boost_index import CACHE_NAMESPACE as BOOST_INDEX_NAMESPACE
+from project.context_cache import invalidate_on
+from .models import PurchaseIntent, C2COrder, DeliveryVerification, ProductBoost
 import logging
 
 logger = logging.getLogger(__name__)
@@ -74,3 +76,7 @@ def complete_order_on_verification(sender, instance, created, **kwargs):
                 logger.error('[C2C·SIGNAL] Erreur libération escrow: %s', response.get('error'))
         except Exception as e:
             logger.exception('[C2C·SIGNAL] Erreur libération escrow C2C: %s', e)
+
+
+# Index des produits boostés (accounts/boost_index.py) : reconstruit après le commit de chaque changement de boost C2C
+invalidate_on(BOOST_INDEX_NAMESPACE, ProductBoost)
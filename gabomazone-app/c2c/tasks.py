@@ -18,8 +18,12 @@ def expire_old_intents():
             PurchaseIntent.AWAITING_AVAILABILITY,
         ]
     )
-    count = expired.count()
-    expired.update(status=PurchaseIntent.EXPIRED)
+    seller_ids = set(expired.values_list('seller_id', flat=True))
+    count = expired.update(status=PurchaseIntent.EXPIRED)
+    # update() n'émet pas de signal : recalculer les badges des vendeurs concernés
+    if seller_ids:
+        from accounts.models import UserNotificationCounter
+        UserNotificationCounter.refresh_for_users(*seller_ids)
     logger.info('%d intentions d\'achat expirées.', count)
     return f'{count} intentions expirées.'
 
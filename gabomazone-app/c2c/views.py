@@ -35,6 +35,7 @@ from .services import (
     DeliveryVerificationService, BoostService
 )
 from accounts.models import PeerToPeerProduct
+from project.schema_registry import table_exists as schema_table_exists
 
 
 def _purchase_intent_wants_json(request):
@@ -504,11 +505,10 @@ def accept_purchase_intent(request, intent_id):
         
         # Créer un message automatique
         from accounts.models import ProductConversation, ProductMessage
-        from django.db import connection as db_connection
         
         # Vérifier si la table existe
         try:
-            table_exists = 'accounts_productconversation' in db_connection.introspection.table_names()
+            table_exists = schema_table_exists('accounts_productconversation')
         except Exception:
             table_exists = False
         
@@ -574,11 +574,10 @@ def reject_purchase_intent(request, intent_id):
         
         # Créer un message automatique
         from accounts.models import ProductConversation, ProductMessage
-        from django.db import connection as db_connection
         
         # Vérifier si la table existe
         try:
-            table_exists = 'accounts_productconversation' in db_connection.introspection.table_names()
+            table_exists = schema_table_exists('accounts_productconversation')
         except Exception:
             table_exists = False
         
@@ -639,11 +638,10 @@ def cancel_purchase_intent(request, intent_id):
         
         # Créer un message automatique dans la conversation si elle existe
         from accounts.models import ProductConversation, ProductMessage
-        from django.db import connection as db_connection
         
         # Vérifier si la table existe
         try:
-            table_exists = 'accounts_productconversation' in db_connection.introspection.table_names()
+            table_exists = schema_table_exists('accounts_productconversation')
         except Exception:
             table_exists = False
         
@@ -1,14 +1,12 @@
-
-from .models import SubCategory, MainCategory, SuperCategory, MiniCategory
+from project.lazy_context import lazy_processor
+from .tree import get_category_tree, SUPER, MAIN, SUB, MINI
 
 
+@lazy_processor('supercategory', 'maincategory', 'subcategory', 'minicategory')
 def category_obj(request):
-    supercategory = SuperCategory.objects.all()
-    maincategory = MainCategory.objects.all()
-    subcategory = SubCategory.objects.all()
-    minicategory = MiniCategory.objects.all()
+    tree = get_category_tree()
     return {
-        'supercategory': supercategory,
-        'maincategory': maincategory,
-        'subcategory': subcategory,
-        'minicategory': minicategory, }
+        'supercategory': tree.all(SUPER),
+        'maincategory': tree.all(MAIN),
+        'subcategory': tree.all(SUB),
+        'minicategory': tree.all(MINI), }
@@ -0,0 +1,194 @@
+"""
+Listing fusionné Product (B2C) + PeerToPeerProduct (C2C) pour le scroll infini.
+
+Les deux catalogues sont projetés sur des colonnes communes (kind, item_id,
+boosted, sort_date, price, likes) puis réunis par UNION ALL ; le tri (boostés
+d'abord selon l'ordre demandé) et la limite de page sont appliqués en SQL.
+La pagination est par curseur (project.cursor_pagination) : chaque partie
+est filtrée « après la dernière ligne servie » avant l'union, donc une page
+profonde coûte autant que la première. Les objets de la page sont ensuite
+chargés par id (deux requêtes au plus).
+
+Les ordres reproduisent ceux de l'ancien tri en mémoire :
+- '-date'       : boostés, puis plus récents ;
+- 'date'        : plus anciens d'abord, sans priorité boost, sans date en dernier ;
+- '-PRDPrice'   : boostés, puis prix décroissant ;
+- 'PRDPrice'    : boostés, puis prix croissant ;
+- '-like_count' : boostés, puis nombre de favoris décroissant.
+Toute autre valeur retombe sur '-date'. À égalité, les produits boutique
+passent avant les articles C2C (comme l'ancien tri stable).
+
+Le filtre catégorie est résolu par l'arbre des catégories
+(CategoryTree.product_filter) ; une catégorie inconnue donne un listing vide.
+Les filtres de facettes (search.facets.FacetFilters : prix, état, ville,
+vendeur, stock) s'y ajoutent ; un filtre qu'un catalogue ne peut satisfaire
+(ex. l'état pour la boutique) retire sa partie de l'union.
+"""
+from django.db.models import BooleanField, Case, F, IntegerField, Q, Value, When
+
+from accounts.boost_index import get_boost_index
+from accounts.models import PeerToPeerProduct
+from products.models import Product
+from project.cursor_pagination import Keyset, cached_count
+from .tree import LEVELS, MINI, get_category_tree
+
+SHOP = 0
+PEER = 1
+
+DEFAULT_ORDER = '-date'
+
+# Ordre → clés de tri sur la projection commune (NULL en dernier)
+ORDERINGS = {
+    '-date': ('-boosted', '-sort_date'),
+    'date': ('sort_date',),
+    '-PRDPrice': ('-boosted', '-price'),
+    'PRDPrice': ('-boosted', 'price'),
+    '-like_count': ('-boosted', '-likes'),
+}
+# Départage stable et déterministe (pages sans doublon ni trou)
+TIEBREAK = ('kind', '-sort_date', '-item_id')
+
+COLUMNS = ('kind', 'item_id', 'boosted', 'sort_date', 'price', 'likes')
+
+
+def category_filters(cat_type, cat_id):
+    """
+    Filtres catégorie (boutique, C2C), ou None si la catégorie est inconnue.
+    Sans niveau de catégorie (ex. 'all') ou sans cat_id : aucun filtre. Les
+    articles C2C n'ont pas de mini-catégorie et ne sont filtrés que jusqu'à
+    la sous-catégorie.
+    """
+    if cat_type not in LEVELS or not cat_id:
+        return {}, {}
+    shop = get_category_tree().product_filter(cat_type, cat_id)
+    if shop is None:
+        return None
+    return shop, {} if cat_type == MINI else shop
+
+
+def active_boost():
+    """Expression booléenne : le produit a un boost actif (index accounts.boost_index)."""
+    boosted = get_boost_index().b2c
+    if not boosted:
+        return Value(False, output_field=BooleanField())
+    return Case(When(id__in=sorted(boosted), then=Value(True)),
+                default=Value(False), output_field=BooleanField())
+
+
+class MergedListing:
+    """Requête paginée sur l'union des catalogues boutique et C2C."""
+
+    def __init__(self, cat_type='all', cat_id='', order_by=DEFAULT_ORDER, product_type='all', filters=None):
+        self.order_by = order_by if order_by in ORDERINGS else DEFAULT_ORDER
+        self.product_type = product_type
+        categories = category_filters(cat_type, cat_id)
+        self.shop_filter, self.peer_filter = categories or ({}, {})
+        self.shop_facets = filters.shop_q() if filters else Q()
+        self.peer_facets = filters.peer_q() if filters else Q()
+        self.include_shop = (categories is not None and product_type in ('all', 'shop')
+                             and self.shop_facets is not None)
+        self.include_peer = (categories is not None and product_type in ('all', 'peer')
+                             and self.peer_facets is not None)
+        ordering = ORDERINGS[self.order_by]
+        ordering += tuple(key for key in TIEBREAK if key.lstrip('-') not in
+                          {name.lstrip('-') for name in ordering})
+        self.keyset = Keyset(ordering, tiebreak=None)
+
+    def shop_queryset(self):
+        return Product.objects.filter(self.shop_facets, PRDISDeleted=False, PRDISactive=True, **self.shop_filter)
+
+    def peer_queryset(self):
+        return PeerToPeerProduct.objects.filter(self.peer_facets, status=PeerToPeerProduct.APPROVED,
+                                                **self.peer_filter)
+
+    def _projections(self):
+        """Querysets annotés avec les colonnes communes (avant values())."""
+        parts = []
+        if self.include_shop:
+            parts.append(self.shop_queryset().annotate(
+                kind=Value(SHOP, output_field=IntegerField()),
+                item_id=F('id'),
+                boosted=active_boost(),
+                sort_date=F('date'),
+                price=F('PRDPrice'),
+                likes=F('like_count'),
+            ))
+        if self.include_peer:
+            parts.append(self.peer_queryset().annotate(
+                kind=Value(PEER, output_field=IntegerField()),
+                item_id=F('id'),
+                boosted=Value(False, output_field=BooleanField()),
+                sort_date=F('date'),
+                price=F('PRDPrice'),
+                likes=F('like_count'),
+            ))
+        return parts
+
+    def kinds(self):
+        """
+        Types d'entrées de l'index de recherche couverts, pour les comptes de
+        facettes (les filtres de facettes y sont appliqués sur SearchEntry).
+        """
+        return [kind for kind, types in ((SHOP, ('all', 'shop')), (PEER, ('all', 'peer')))
+                if self.product_type in types]
+
+    def count(self):
+        """Total (COUNT mis en cache quelques secondes)."""
+        total = 0
+        if self.include_shop:
+            total += cached_count(self.shop_queryset())
+        if self.include_peer:
+            total += cached_count(self.peer_queryset())
+        return total
+
+    def rows(self, limit, cursor=None, offset=0):
+        """
+        Lignes projetées suivant le curseur (ou à partir d'un décalage), dans
+        l'ordre demandé.
+        Lève project.cursor_pagination.InvalidCursor si le curseur est invalide.
+        """
+        parts = self._projections()
+        if not parts:
+            return []
+        if cursor:
+            values = self.keyset.decode(cursor, parts[0])
+            parts = [self.keyset.after(part, values) for part in parts]
+        parts = [part.values(*COLUMNS).order_by() for part in parts]
+        queryset = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+        return list(queryset.order_by(*self.keyset.order_by())[offset:offset + limit])
+
+    def page(self, limit, cursor=None):
+        """
+        Page suivant le curseur : (items, next_cursor). items est une liste de
+        (objet, is_peer_to_peer, is_boosted) ; produits et articles C2C portent
+        leur compteur like_count. next_cursor vaut None en fin de liste.
+        """
+        rows = self.rows(limit + 1, cursor)
+        next_cursor = self.keyset.encode(rows[limit - 1]) if len(rows) > limit else None
+        return self._load(rows[:limit]), next_cursor
+
+    def __getitem__(self, key):
+        """
+        Tranche par décalage, pour django.core.paginator (pages numérotées de
+        la recherche sans mot-clé) ; le scroll infini utilise page().
+        """
+        if not isinstance(key, slice):
+            raise TypeError("MergedListing ne se découpe que par tranche")
+        start = key.start or 0
+        stop = self.count() if key.stop is None else key.stop
+        return self._load(self.rows(stop - start, offset=start)) if stop > start else []
+
+    def _load(self, rows):
+        """Objets des lignes, dans leur ordre : (objet, is_peer_to_peer, is_boosted)."""
+        shop_ids = [row['item_id'] for row in rows if row['kind'] == SHOP]
+        peer_ids = [row['item_id'] for row in rows if row['kind'] == PEER]
+        shop = Product.objects.select_related('product_vendor').in_bulk(shop_ids) if shop_ids else {}
+        peer = PeerToPeerProduct.objects.in_bulk(peer_ids) if peer_ids else {}
+
+        items = []
+        for row in rows:
+            source = shop if row['kind'] == SHOP else peer
+            obj = source.get(row['item_id'])
+            if obj is not None:
+                items.append((obj, row['kind'] == PEER, bool(row['boosted'])))
+        return items
@@ -0,0 +1,8 @@
+"""
+Reconstruction de l'arbre des catégories (utilisé par les vues et les context processors)
+"""
+from project.context_cache import invalidate_on
+from .models import SuperCategory, MainCategory, SubCategory, MiniCategory
+from .tree import CACHE_NAMESPACE
+
+invalidate_on(CACHE_NAMESPACE, SuperCategory, MainCategory, SubCategory, MiniCategory)
@@ -1,3 +1,185 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.boost_index import get_boost_index
+from accounts.models import (PeerToPeerProduct, PeerToPeerProductFavorite,
+                             ProductBoostRequest)
+from products.models import Product, ProductFavorite
+from project import context_cache
+from .listing import MergedListing
+from .views import ProductListHTMXView
+from .models import SuperCategory, MainCategory, SubCategory, MiniCategory
+from .tree import SUPER, MAIN, SUB, MINI, get_category_tree
+
+
+class CategoryTreeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        context_cache.clear_local()
+        self.mode = SuperCategory.objects.create(name='Mode')
+        self.homme = MainCategory.objects.create(name='Homme', super_category=self.mode)
+        self.femme = MainCategory.objects.create(name='Femme', super_category=self.mode)
+        self.chaussures = SubCategory.objects.create(name='Chaussures', main_category=self.homme)
+        self.baskets = MiniCategory.objects.create(name='Baskets', sub_category=self.chaussures)
+
+    def test_lookups_and_children(self):
+        tree = get_category_tree()
+        self.assertEqual(tree.get_by_slug(SUPER, self.mode.slug), self.mode)
+        self.assertEqual([c.name for c in tree.children(SUPER, self.mode.id)], ['Femme', 'Homme'])
+        self.assertEqual(tree.parent(SUB, self.chaussures.id), self.homme)
+        self.assertEqual(tree.breadcrumb(MINI, self.baskets.id),
+                         (self.mode, self.homme, self.chaussures, self.baskets))
+        self.assertEqual(tree.breadcrumb(MAIN, self.femme.id), (self.mode, self.femme))
+        self.assertEqual(tree.breadcrumb(MINI, self.baskets.id + 100), ())
+        self.assertEqual(tree.product_filter(MINI, self.baskets.id), {'product_minicategor_id': self.baskets.id})
+        self.assertIsNone(tree.product_filter(MAIN, self.chaussures.id + 100))
+
+    def test_descendants(self):
+        tree = get_category_tree()
+        descendants = tree.descendant_ids(SUPER, self.mode.id)
+        self.assertEqual(descendants[MAIN], {self.homme.id, self.femme.id})
+        self.assertEqual(descendants[SUB], {self.chaussures.id})
+        self.assertEqual(descendants[MINI], {self.baskets.id})
+        self.assertIsInstance(descendants[MAIN], frozenset)
+        self.assertEqual(dict(tree.descendant_ids(MAIN, self.femme.id)), {SUB: set(), MINI: set()})
+        self.assertEqual(dict(tree.descendant_ids(MINI, self.baskets.id)), {})
+
+    def test_parent_relations_need_no_query(self):
+        tree = get_category_tree()
+        with CaptureQueriesContext(connection) as ctx:
+            mini = tree.get(MINI, self.baskets.id)
+            self.assertEqual(mini.sub_category.main_category.super_category.name, 'Mode')
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_save_rebuilds_tree(self):
+        get_category_tree()
+        with self.captureOnCommitCallbacks(execute=True):
+            enfant = MainCategory.objects.create(name='Enfant', super_category=self.mode)
+        self.assertIn(enfant, get_category_tree().children(SUPER, self.mode.id))
+
+    def test_category_pages(self):
+        response = self.client.get(reverse('categories:super-category', args=[self.mode.slug]))
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('categories:sub-category', args=[self.chaussures.slug]))
+        self.assertEqual(response.context['breadcrumb'], [
+            {'name': 'Mode', 'url': reverse('categories:super-category', args=[self.mode.slug])},
+            {'name': 'Homme', 'url': reverse('categories:main-category', args=[self.homme.slug])},
+        ])
+        self.assertContains(response, reverse('categories:main-category', args=[self.homme.slug]))
+        response = self.client.get(reverse('categories:super-category', args=['inconnue']))
+        self.assertEqual(response.status_code, 404)
+
+
+class MergedListingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        context_cache.clear_local()
+        now = timezone.now()
+        seller = User.objects.create_user('vendeur', 'vendeur@example.com', 'secret')
+
+        def shop(name, price, days_ago):
+            product = Product.objects.create(
+                product_name=name, product_description=name, PRDPrice=price)
+            Product.objects.filter(pk=product.pk).update(date=now - timedelta(days=days_ago))
+            return product
+
+        def peer(name, price, days_ago):
+            product = PeerToPeerProduct.objects.create(
+                seller=seller, product_name=name, product_description=name, PRDPrice=price,
+                seller_phone='074000000', seller_address='Akanda', seller_city='Libreville',
+                status=PeerToPeerProduct.APPROVED)
+            PeerToPeerProduct.objects.filter(pk=product.pk).update(date=now - timedelta(days=days_ago))
+            return product
+
+        self.a = shop('A', 100, 5)
+        self.b = shop('B', 300, 3)
+        self.c = shop('C', 200, 4)
+        self.p = peer('P', 250, 1)
+        self.q = peer('Q', 50, 10)
+        ProductBoostRequest.objects.create(
+            vendor=seller.profile, product=self.a, status=ProductBoostRequest.ACTIVE,
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1))
+        ProductFavorite.objects.create(product=self.c, session_key='s1')
+        ProductFavorite.objects.create(product=self.c, session_key='s2')
+        PeerToPeerProductFavorite.objects.create(product=self.p, session_key='s1')
+
+    def names(self, order_by, **kwargs):
+        items, _cursor = MergedListing(order_by=order_by, **kwargs).page(12)
+        return [obj.product_name for obj, _peer, _boosted in items]
+
+    def walk(self, order_by, limit):
+        """Parcourt toutes les pages via les curseurs."""
+        listing = MergedListing(order_by=order_by)
+        names, cursor = [], None
+        while True:
+            items, cursor = listing.page(limit, cursor)
+            names += [obj.product_name for obj, _peer, _boosted in items]
+            if cursor is None:
+                return names
+
+    def test_orderings_match_previous_in_memory_sort(self):
+        self.assertEqual(self.names('-date'), ['A', 'P', 'B', 'C', 'Q'])
+        self.assertEqual(self.names('date'), ['Q', 'A', 'C', 'B', 'P'])
+        self.assertEqual(self.names('-PRDPrice'), ['A', 'B', 'P', 'C', 'Q'])
+        self.assertEqual(self.names('PRDPrice'), ['A', 'Q', 'C', 'P', 'B'])
+        self.assertEqual(self.names('-like_count'), ['A', 'C', 'P', 'B', 'Q'])
+        self.assertEqual(self.names('inconnu'), self.names('-date'))
+
+    def test_cursor_pages_are_contiguous_for_every_order(self):
+        for order_by in ('-date', 'date', '-PRDPrice', 'PRDPrice', '-like_count'):
+            with self.subTest(order_by=order_by):
+                self.assertEqual(self.walk(order_by, 2), self.names(order_by))
+
+    def test_product_type_filter(self):
+        self.assertEqual(self.names('-date', product_type='peer'), ['P', 'Q'])
+        self.assertEqual(MergedListing(product_type='shop').count(), 3)
+
+    def test_category_filter_goes_through_the_tree(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            mode = SuperCategory.objects.create(name='Mode')
+        Product.objects.filter(pk=self.b.pk).update(product_supercategory=mode)
+        PeerToPeerProduct.objects.filter(pk=self.q.pk).update(product_supercategory=mode)
+        self.assertEqual(self.names('-date', cat_type=SUPER, cat_id=str(mode.id)), ['B', 'Q'])
+        # Catégorie inconnue ou cat_id invalide : aucun produit
+        self.assertEqual(self.names('-date', cat_type=MAIN, cat_id=str(mode.id)), [])
+        self.assertEqual(MergedListing(cat_type=SUPER, cat_id='x').count(), 0)
+        self.assertEqual(self.names('-date', cat_type='all', cat_id=str(mode.id)), self.names('-date'))
+
+    def test_page_fetch_is_bounded(self):
+        get_boost_index()
+        with CaptureQueriesContext(connection) as ctx:
+            items, cursor = MergedListing(order_by='-like_count').page(2)
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual([obj.like_count for obj, _peer, _boosted in items], [0, 2])
+        self.assertTrue(items[0][2])
+        self.assertIsNotNone(cursor)
+
+    def test_htmx_view_follows_cursor(self):
+        url = reverse('categories:shop-htmx')
+        response = self.client.get(url, {'order_by': 'PRDPrice', 'page': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_products'], 5)
+        self.assertEqual([item['product'].product_name for item in response.context['products_data']],
+                         ['A', 'Q', 'C', 'P', 'B'])
+        self.assertIsNone(response.context['next_cursor'])
+
+        with mock.patch.object(ProductListHTMXView, 'PAGE_SIZE', 3):
+            first = self.client.get(url, {'order_by': 'PRDPrice'})
+            second = self.client.get(url, {'order_by': 'PRDPrice', 'cursor': first.context['next_cursor']})
+        self.assertEqual([item['product'].product_name for item in second.context['products_data']], ['P', 'B'])
+        self.assertIsNone(second.context['total_products'])
 
-# Create your tests here.
+    def test_cursor_from_another_order_is_rejected(self):
+        _items, cursor = MergedListing(order_by='-date').page(2)
+        response = self.client.get(reverse('categories:shop-htmx'), {'order_by': 'date', 'cursor': cursor})
+        self.assertEqual(response.status_code, 400)
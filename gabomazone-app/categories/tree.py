@@ -0,0 +1,180 @@
+"""
+Arbre des catégories en mémoire (SuperCategory → MainCategory → SubCategory → MiniCategory).
+
+L'arbre est construit en une seule passe (une requête par niveau), puis mis
+en cache via project.context_cache : il est partagé par toutes les requêtes
+et reconstruit dès qu'une catégorie est enregistrée ou supprimée
+(voir categories/signals.py).
+
+L'objet est immuable une fois construit : index en MappingProxyType, listes
+en tuples, ensembles en frozenset. Les ids descendants (par niveau) et le
+chemin depuis la racine de chaque catégorie sont calculés pendant la même
+passe. Les nœuds sont les instances des modèles ; les relations parentes
+sont préchargées, donc main.super_category ou sub.main_category.super_category
+ne déclenchent aucune requête.
+"""
+from types import MappingProxyType
+
+from project.context_cache import get_or_build
+from .models import SuperCategory, MainCategory, SubCategory, MiniCategory
+
+CACHE_NAMESPACE = 'category_tree'
+
+SUPER = 'super'
+MAIN = 'main'
+SUB = 'sub'
+MINI = 'mini'
+LEVELS = (SUPER, MAIN, SUB, MINI)
+
+# Niveau → (modèle, nom du champ parent)
+LEVEL_MODELS = {
+    SUPER: (SuperCategory, None),
+    MAIN: (MainCategory, 'super_category'),
+    SUB: (SubCategory, 'main_category'),
+    MINI: (MiniCategory, 'sub_category'),
+}
+
+# Champ catégorie correspondant sur Product / PeerToPeerProduct
+PRODUCT_FIELDS = {
+    SUPER: 'product_supercategory',
+    MAIN: 'product_maincategory',
+    SUB: 'product_subcategory',
+    MINI: 'product_minicategor',
+}
+
+
+def _name_key(node):
+    return (node.name or '').lower()
+
+
+class CategoryTree:
+    """Index immuable de la taxonomie à quatre niveaux."""
+
+    def __init__(self, nodes_by_level):
+        self._nodes_by_level = {level: list(nodes_by_level[level]) for level in LEVELS}
+        by_id = {}
+        by_slug = {}
+        children = {}
+        parent = {}
+        # Clé (niveau, id) → clés des ancêtres puis du nœud, depuis la racine
+        paths = {}
+        # Clé (niveau, id) → {niveau inférieur: ids descendants}
+        descendants = {}
+
+        for depth, level in enumerate(LEVELS):
+            model, parent_field = LEVEL_MODELS[level]
+            level_by_id = {}
+            level_by_slug = {}
+            for node in nodes_by_level[level]:
+                level_by_id[node.id] = node
+                if node.slug:
+                    level_by_slug[node.slug] = node
+                key = (level, node.id)
+                children[key] = []
+                descendants[key] = {lower: set() for lower in LEVELS[depth + 1:]}
+                paths[key] = (key,)
+                if parent_field is None:
+                    continue
+                parent_level = LEVELS[depth - 1]
+                parent_node = by_id[parent_level].get(getattr(node, parent_field + '_id'))
+                # Précharger la relation parente : aucun accès base depuis les templates
+                model._meta.get_field(parent_field).set_cached_value(node, parent_node)
+                if parent_node is not None:
+                    parent_key = (parent_level, parent_node.id)
+                    parent[key] = parent_key
+                    children[parent_key].append(node)
+                    paths[key] = paths[parent_key] + (key,)
+                    for ancestor in paths[parent_key]:
+                        descendants[ancestor][level].add(node.id)
+            by_id[level] = MappingProxyType(level_by_id)
+            by_slug[level] = MappingProxyType(level_by_slug)
+
+        self._by_id = MappingProxyType(by_id)
+        self._by_slug = MappingProxyType(by_slug)
+        self._parent = MappingProxyType(parent)
+        self._children = MappingProxyType({
+            key: tuple(sorted(nodes, key=_name_key)) for key, nodes in children.items()
+        })
+        self._levels = MappingProxyType({
+            level: tuple(nodes_by_level[level]) for level in LEVELS
+        })
+        self._paths = MappingProxyType({
+            key: tuple(by_id[level][node_id] for level, node_id in path) for key, path in paths.items()
+        })
+        self._descendants = MappingProxyType({
+            key: MappingProxyType({lower: frozenset(ids) for lower, ids in sets.items()})
+            for key, sets in descendants.items()
+        })
+
+    def __reduce__(self):
+        # Les MappingProxyType ne sont pas picklables : on reconstruit les index
+        return (self.__class__, (self._nodes_by_level,))
+
+    # ------------------------------------------------------------------ lecture
+
+    def all(self, level):
+        """Tous les nœuds d'un niveau (ordre de la base)."""
+        return self._levels[level]
+
+    def sorted(self, level):
+        """Tous les nœuds d'un niveau triés par nom."""
+        return tuple(sorted(self._levels[level], key=_name_key))
+
+    def get(self, level, category_id):
+        """Nœud par id (None si inconnu)."""
+        try:
+            return self._by_id[level].get(int(category_id))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def get_by_slug(self, level, slug):
+        """Nœud par slug (None si inconnu)."""
+        return self._by_slug.get(level, {}).get(slug)
+
+    def children(self, level, category_id):
+        """Enfants directs triés par nom."""
+        node = self.get(level, category_id)
+        if node is None:
+            return ()
+        return self._children[(level, node.id)]
+
+    def parent(self, level, category_id):
+        """Nœud parent, ou None pour une super-catégorie / un orphelin."""
+        node = self.get(level, category_id)
+        if node is None:
+            return None
+        key = self._parent.get((level, node.id))
+        return self._by_id[key[0]][key[1]] if key else None
+
+    def descendant_ids(self, level, category_id):
+        """{niveau inférieur: frozenset d'ids} pour une catégorie."""
+        node = self.get(level, category_id)
+        if node is None:
+            return MappingProxyType({})
+        return self._descendants[(level, node.id)]
+
+    def breadcrumb(self, level, category_id):
+        """Chemin (tuple de nœuds) depuis la racine jusqu'à la catégorie incluse."""
+        node = self.get(level, category_id)
+        if node is None:
+            return ()
+        return self._paths[(level, node.id)]
+
+    def product_filter(self, cat_type, cat_id):
+        """Filtre ORM des produits d'une catégorie, ou None si elle est inconnue."""
+        node = self.get(cat_type, cat_id)
+        if node is None:
+            return None
+        return {f'{PRODUCT_FIELDS[cat_type]}_id': node.id}
+
+
+def build_category_tree():
+    """Construit l'arbre (une requête par niveau)."""
+    return CategoryTree({
+        level: list(model.objects.all()) for level, (model, _parent) in LEVEL_MODELS.items()
+    })
+
+
+def get_category_tree():
+    """Arbre partagé, reconstruit après toute modification de catégorie."""
+    return get_or_build(CACHE_NAMESPACE, build_category_tree)
@@ -0,0 +1,123 @@
+"""
+Rotation des publicités (remplace order_by("?")).
+
+order_by("?") impose un tri aléatoire de toute la table en base à chaque
+affichage. Ici, la liste des publicités d'un emplacement est mise en cache
+(project.context_cache, invalidée par signaux) et le tirage se fait en Python :
+- tirage pondéré sans remise (poids RotatingAd.weight, 0 = désactivée) ;
+- fenêtre de diffusion start_date / end_date appliquée au moment du tirage,
+  le cache n'a donc pas à expirer quand une campagne commence ou se termine ;
+- impressions comptées dans le cache partagé (project.counter_buffer) et
+  écrites en base par la tâche périodique home.tasks.flush_ad_impressions
+  (un UPDATE par modèle) ; sans cache partagé, écrites directement. Une
+  écriture en échec laisse les impressions en attente pour le passage suivant.
+"""
+import random
+import logging
+from collections import namedtuple
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from project.context_cache import get_or_build
+from project.counter_buffer import CounterBuffer, increment, is_shared
+from .models import (HomeAdMiddlebar, HomeAdSupplier, HomeAdDaily, HomeAdDealTime,
+                     VendorDetailsAdImage, ShopAdSidebar, HotDealAd, HeadTextAd)
+
+logger = logging.getLogger(__name__)
+
+Placement = namedtuple('Placement', 'model namespace select_related')
+
+# Emplacement → modèle, namespace du cache, relations à précharger
+PLACEMENTS = {
+    'deal_time': Placement(HomeAdDealTime, 'home_ads:deal_time', ('supplier__user',)),
+    'vendor_details': Placement(VendorDetailsAdImage, 'home_ads:vendor_details', ()),
+    'shop_sidebar': Placement(ShopAdSidebar, 'home_ads:shop_sidebar', ('supplier__user',)),
+    'hot_deal': Placement(HotDealAd, 'home_ads:hot_deal', ()),
+    'head_text': Placement(HeadTextAd, 'home_ads:head_text', ()),
+    'middlebar': Placement(HomeAdMiddlebar, 'home_ads:middlebar', ()),
+    'supplier': Placement(HomeAdSupplier, 'home_ads:supplier', ()),
+    'daily': Placement(HomeAdDaily, 'home_ads:daily', ()),
+}
+
+_impressions = CounterBuffer('ad_impressions')
+
+
+def candidates(placement):
+    """Publicités de l'emplacement (liste mise en cache, tous statuts confondus)."""
+    model, namespace, select_related = PLACEMENTS[placement]
+
+    def build():
+        return list(model.objects.select_related(*select_related).filter(weight__gt=0))
+
+    return get_or_build(namespace, build)
+
+
+def weighted_order(ads):
+    """
+    Ordre aléatoire pondéré sans remise (Efraimidis-Spirakis) :
+    clé u ** (1 / poids), tri décroissant.
+    """
+    keyed = [(random.random() ** (1.0 / ad.weight), ad) for ad in ads if ad.weight]
+    keyed.sort(key=lambda item: item[0], reverse=True)
+    return [ad for _key, ad in keyed]
+
+
+def rotate(placement, limit=None, **match):
+    """
+    Publicités diffusables de l'emplacement, dans un ordre tiré au sort.
+    match restreint aux publicités dont les attributs sont égaux
+    (ex. supplier_id=...). Les publicités retournées sont comptées comme
+    affichées : passer limit quand le template n'en affiche que les premières.
+    """
+    now = timezone.now()
+    ads = weighted_order(
+        ad for ad in candidates(placement)
+        if ad.is_live(now) and all(getattr(ad, k) == v for k, v in match.items()))
+    if limit is not None:
+        ads = ads[:limit]
+    if ads:
+        record_impressions(PLACEMENTS[placement].model, ads)
+    return ads
+
+
+def record_impressions(model, ads):
+    """Compte une impression pour chacune des publicités ads."""
+    label = model._meta.label
+    if not is_shared():
+        try:
+            write_impressions({(label, ad.pk): 1 for ad in ads})
+        except DatabaseError as e:
+            logger.warning("Impressions non enregistrées pour %s: %s", label, e)
+        return
+    for ad in ads:
+        _impressions.add(label, ad.pk)
+
+
+def write_impressions(pending):
+    """
+    Ajoute {(label, pk): impressions} aux compteurs en base : un UPDATE par
+    modèle, tous dans une transaction. Lève DatabaseError en cas d'échec.
+    """
+    models_by_label = {p.model._meta.label: p.model for p in PLACEMENTS.values()}
+    by_label = {}
+    for (label, pk), count in pending.items():
+        by_label.setdefault(label, {})[pk] = count
+    written = 0
+    with transaction.atomic():
+        for label, counts in by_label.items():
+            if label in models_by_label:
+                written += increment(models_by_label[label], counts, 'impressions')
+    return written
+
+
+def flush_impressions():
+    """Écrit en base les impressions en attente dans le cache partagé."""
+    try:
+        written = _impressions.drain(write_impressions)
+    except DatabaseError as e:
+        logger.warning("Impressions non écrites, nouvel essai au prochain passage: %s", e)
+        return 0
+    if written:
+        logger.info("Impressions publicitaires écrites: %d", written)
+    return written
@@ -1,37 +1,43 @@
-
-from .models import (HeadTextAd, HomeAdDealTime, VendorDetailsAdImage,
-                     ShopAdSidebar, HotDealAd)
+from project.lazy_context import lazy_processor
+from .ad_rotation import rotate
 
 
+@lazy_processor('home_ads_deal_time_obj')
 def DealTime_obj(request):
-    home_ads_deal_time_obj = HomeAdDealTime.objects.all().order_by("?")
+    home_ads_deal_time_obj = rotate('deal_time')
     return {
         'home_ads_deal_time_obj': home_ads_deal_time_obj,
     }
 
 
+@lazy_processor('vendor_page_ad_image')
 def vendor_details_ad_image(request):
-    vendor_page_ad_image = VendorDetailsAdImage.objects.all().order_by("?")
+    # Les templates n'affichent que la première image
+    vendor_page_ad_image = rotate('vendor_details', limit=1)
     return{
         'vendor_page_ad_image': vendor_page_ad_image,
     }
 
 
+@lazy_processor('shop_page_ad')
 def shop_ad_sidebar(request):
-    shop_page_ad = ShopAdSidebar.objects.all().order_by("?")
+    # Les templates n'affichent que la première publicité
+    shop_page_ad = rotate('shop_sidebar', limit=1)
     return {
         "shop_page_ad": shop_page_ad,
     }
 
 
+@lazy_processor('hot_dael')
 def hot_deal_ad(request):
-    hot_dael = HotDealAd.objects.all().order_by("?")
+    hot_dael = rotate('hot_deal')
     return{
         "hot_dael": hot_dael,
     }
 
+@lazy_processor('head_text')
 def head_text_ad(request):
-    head_text = HeadTextAd.objects.all().order_by("?")
+    head_text = rotate('head_text')
     return{
         "head_text": head_text,
     }    
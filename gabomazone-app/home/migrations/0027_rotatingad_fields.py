@@ -0,0 +1,173 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0026_alter_carousel_options_alter_headtextad_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='headtextad',
+            name='end_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='End date'),
+        ),
+        migrations.AddField(
+            model_name='headtextad',
+            name='impressions',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Impressions'),
+        ),
+        migrations.AddField(
+            model_name='headtextad',
+            name='start_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Start date'),
+        ),
+        migrations.AddField(
+            model_name='headtextad',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Relative display weight (0 disables the ad)', verbose_name='Weight'),
+        ),
+        migrations.AddField(
+            model_name='homeaddaily',
+            name='end_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='End date'),
+        ),
+        migrations.AddField(
+            model_name='homeaddaily',
+            name='impressions',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Impressions'),
+        ),
+        migrations.AddField(
+            model_name='homeaddaily',
+            name='start_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Start date'),
+        ),
+        migrations.AddField(
+            model_name='homeaddaily',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Relative display weight (0 disables the ad)', verbose_name='Weight'),
+        ),
+        migrations.AddField(
+            model_name='homeaddealtime',
+            name='end_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='End date'),
+        ),
+        migrations.AddField(
+            model_name='homeaddealtime',
+            name='impressions',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Impressions'),
+        ),
+        migrations.AddField(
+            model_name='homeaddealtime',
+            name='start_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Start date'),
+        ),
+        migrations.AddField(
+            model_name='homeaddealtime',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Relative display weight (0 disables the ad)', verbose_name='Weight'),
+        ),
+        migrations.AddField(
+            model_name='homeadmiddlebar',
+            name='end_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='End date'),
+        ),
+        migrations.AddField(
+            model_name='homeadmiddlebar',
+            name='impressions',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Impressions'),
+        ),
+        migrations.AddField(
+            model_name='homeadmiddlebar',
+            name='start_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Start date'),
+        ),
+        migrations.AddField(
+            model_name='homeadmiddlebar',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Relative display weight (0 disables the ad)', verbose_name='Weight'),
+        ),
+        migrations.AddField(
+            model_name='homeadsupplier',
+            name='end_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='End date'),
+        ),
+        migrations.AddField(
+            model_name='homeadsupplier',
+            name='impressions',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Impressions'),
+        ),
+        migrations.AddField(
+            model_name='homeadsupplier',
+            name='start_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Start date'),
+        ),
+        migrations.AddField(
+            model_name='homeadsupplier',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Relative display weight (0 disables the ad)', verbose_name='Weight'),
+        ),
+        migrations.AddField(
+            model_name='hotdealad',
+            name='end_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='End date'),
+        ),
+        migrations.AddField(
+            model_name='hotdealad',
+            name='impressions',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Impressions'),
+        ),
+        migrations.AddField(
+            model_name='hotdealad',
+            name='start_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Start date'),
+        ),
+        migrations.AddField(
+            model_name='hotdealad',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Relative display weight (0 disables the ad)', verbose_name='Weight'),
+        ),
+        migrations.AddField(
+            model_name='shopadsidebar',
+            name='end_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='End date'),
+        ),
+        migrations.AddField(
+            model_name='shopadsidebar',
+            name='impressions',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Impressions'),
+        ),
+        migrations.AddField(
+            model_name='shopadsidebar',
+            name='start_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Start date'),
+        ),
+        migrations.AddField(
+            model_name='shopadsidebar',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Relative display weight (0 disables the ad)', verbose_name='Weight'),
+        ),
+        migrations.AddField(
+            model_name='vendordetailsadimage',
+            name='end_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='End date'),
+        ),
+        migrations.AddField(
+            model_name='vendordetailsadimage',
+            name='impressions',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Impressions'),
+        ),
+        migrations.AddField(
+            model_name='vendordetailsadimage',
+            name='start_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Start date'),
+        ),
+        migrations.AddField(
+            model_name='vendordetailsadimage',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Relative display weight (0 disables the ad)', verbose_name='Weight'),
+        ),
+    ]
@@ -1,9 +1,40 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from accounts.models import Profile
 # Create your models here.
 
 
+class RotatingAd(models.Model):
+    """
+    Champs communs aux publicités tirées au sort par home.ad_rotation :
+    poids relatif, fenêtre de diffusion et compteur d'impressions.
+    """
+    weight = models.PositiveSmallIntegerField(
+        default=1, verbose_name=_("Weight"),
+        help_text=_("Relative display weight (0 disables the ad)"))
+    start_date = models.DateTimeField(
+        blank=True, null=True, verbose_name=_("Start date"))
+    end_date = models.DateTimeField(
+        blank=True, null=True, verbose_name=_("End date"))
+    impressions = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name=_("Impressions"))
+
+    class Meta:
+        abstract = True
+
+    def is_live(self, now=None):
+        """Publicité diffusable maintenant (poids > 0 et dans sa fenêtre)."""
+        now = now or timezone.now()
+        if not self.weight:
+            return False
+        if self.start_date and self.start_date > now:
+            return False
+        if self.end_date and self.end_date <= now:
+            return False
+        return True
+
+
 class Carousel(models.Model):
     CARImage = models.ImageField(
         upload_to='carousel/', verbose_name=_("Image"), blank=True, null=True, help_text=_("Please use our recommended dimensions: 1372px X 830px"))
@@ -48,7 +79,7 @@ class HomeAdSidebar(models.Model):
         return self.ad_title
 
 
-class HomeAdMiddlebar(models.Model):
+class HomeAdMiddlebar(RotatingAd):
     ad_mage = models.ImageField(
         upload_to='ads/middlebar/', verbose_name=_("Image"), blank=True, null=True, help_text=_("Please use our recommended dimensions: 768px x 450px, 250 KB MAX"))
     ad_title = models.CharField(
@@ -75,7 +106,7 @@ class HomeAdMiddlebar(models.Model):
         return self.ad_title
 
 
-class HomeAdSupplier(models.Model):
+class HomeAdSupplier(RotatingAd):
     ad_mage = models.ImageField(
         upload_to='ads/suppliers/', verbose_name=_("Image"), blank=True, null=True, help_text=_("Please use our recommended dimensions: 756px x 332px, 250 KB MAX"))
     ad_title = models.CharField(
@@ -102,7 +133,7 @@ class HomeAdSupplier(models.Model):
         return self.ad_title
 
 
-class HomeAdDaily(models.Model):
+class HomeAdDaily(RotatingAd):
     ad_mage = models.ImageField(
         upload_to='ads/daily/', verbose_name=_("Image"), blank=True, null=True, help_text=_("Please use our recommended dimensions: 540px x 769px, 250 KB MAX"))
     ad_title = models.CharField(
@@ -129,7 +160,7 @@ class HomeAdDaily(models.Model):
         return self.ad_title
 
 
-class HomeAdDealTime(models.Model):
+class HomeAdDealTime(RotatingAd):
     ad_mage = models.ImageField(
         upload_to='ads/deal-time/', verbose_name=_("Image"), blank=True, null=True, help_text=_("Please use our recommended dimensions: 568px x 503px, 250 KB MAX"))
     ad_title = models.CharField(
@@ -157,7 +188,7 @@ class HomeAdDealTime(models.Model):
         return self.ad_title
 
 
-class VendorDetailsAdImage(models.Model):
+class VendorDetailsAdImage(RotatingAd):
     ad_mage = models.ImageField(
         upload_to='ads/vendor-page/', verbose_name=_("Image"), blank=True, null=True, help_text=_("Please use our recommended dimensions: 360px x 250px, 250 KB MAX"))
 
@@ -172,7 +203,7 @@ class VendorDetailsAdImage(models.Model):
         return str(self.id)
 
 
-class ShopAdSidebar(models.Model):
+class ShopAdSidebar(RotatingAd):
     ad_mage = models.ImageField(
         upload_to='ads/shop-ad/', verbose_name=_("Image"), blank=True, null=True, help_text=_("Please use our recommended dimensions: 1024px x 1076px, 250 KB MAX"))
     ad_title = models.CharField(
@@ -201,7 +232,7 @@ class ShopAdSidebar(models.Model):
         return self.ad_title
 
 
-class HotDealAd(models.Model):
+class HotDealAd(RotatingAd):
     ad_mage = models.ImageField(
         upload_to='ads/hot-deal-ad/', verbose_name=_("Image"), blank=True, null=True, help_text=_("Please use our recommended dimensions: 508px x 332px, 250 KB MAX"))
     rate = models.PositiveIntegerField(
@@ -229,7 +260,7 @@ class HotDealAd(models.Model):
 
 
 
-class HeadTextAd(models.Model):
+class HeadTextAd(RotatingAd):
     ad_title = models.CharField(
         max_length=40, verbose_name=_("Title"), blank=True, null=True)
     ad_URL = models.URLField(blank=True, null=True)
@@ -0,0 +1,8 @@
+"""
+Invalidation du cache des publicités (voir home.ad_rotation)
+"""
+from project.context_cache import invalidate_on
+from .ad_rotation import PLACEMENTS
+
+for _placement in PLACEMENTS.values():
+    invalidate_on(_placement.namespace, _placement.model)
@@ -0,0 +1,13 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_ad_impressions():
+    """Écrit en base les impressions publicitaires en attente (voir home.ad_rotation)."""
+    from .ad_rotation import flush_impressions
+
+    written = flush_impressions()
+    return f'{written} impression(s) écrite(s).'
@@ -1,3 +1,236 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.contrib.auth.models import AnonymousUser
+from django.db import DatabaseError, connection
+from django.template import engines
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from project import context_cache
+from . import ad_rotation
+from .models import HeadTextAd
+from categories.models import SuperCategory
+from project.lazy_context import get_processor_timings
+from settings.models import SupportNumber
+
+# Tables lues par les context processors mis en cache
+CACHED_TABLES = (
+    'settings_socaillinks',
+    'settings_contactinfo',
+    'settings_supportnumber',
+    'settings_sitesetting',
+    'pages_pageslist',
+    'home_homeaddealtime',
+    'home_vendordetailsadimage',
+    'home_shopadsidebar',
+    'home_hotdealad',
+    'home_headtextad',
+    'categories_supercategory',
+    'categories_maincategory',
+    'categories_subcategory',
+    'categories_minicategory',
+)
+
+# Variables fournies par ces context processors
+CACHED_VARIABLES = (
+    'supercategory', 'maincategory', 'subcategory', 'minicategory',
+    'home_ads_deal_time_obj', 'vendor_page_ad_image', 'shop_page_ad', 'hot_dael', 'head_text',
+    'Socail_links', 'contact_info', 'support_number', 'site_info', 'pages_list',
+)
+
+
+class ContextProcessorCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        context_cache.clear_local()
+
+    def _cached_table_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries
+                if any(table in q['sql'] for table in CACHED_TABLES)]
+
+    def test_home_page_steady_state_uses_no_context_queries(self):
+        url = reverse('home:index')
+        self.assertTrue(self._cached_table_queries(url))
+        self.assertEqual(self._cached_table_queries(url), [])
+
+    def test_cached_processors_run_no_query_at_steady_state(self):
+        HeadTextAd.objects.create(ad_title='Promo')
+        SuperCategory.objects.create(name='Mode')
+        SupportNumber.objects.create(number='+241 01 23 45 67', Work_time='8h-18h')
+        template = engines['django'].from_string(
+            ''.join('{{ %s|length }}' % name for name in CACHED_VARIABLES))
+
+        def render():
+            request = RequestFactory().get(reverse('home:index'))
+            request.user = AnonymousUser()
+            return template.render({}, request)
+
+        # Impressions en attente dans le cache partagé, comme en production
+        with mock.patch.object(ad_rotation, 'is_shared', return_value=True):
+            render()
+            with CaptureQueriesContext(connection) as ctx:
+                render()
+        cache.clear()
+        self.assertEqual([q['sql'] for q in ctx.captured_queries], [])
+
+    def test_steady_state_survives_l1_loss(self):
+        url = reverse('home:index')
+        self.client.get(url)
+        context_cache.clear_local()
+        self.assertEqual(self._cached_table_queries(url), [])
+
+    def test_save_invalidates_cached_context(self):
+        url = reverse('home:index')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            SupportNumber.objects.create(number='+241 01 23 45 67', Work_time='8h-18h')
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['support_number']), 1)
+
+    def test_delete_invalidates_cached_context(self):
+        number = SupportNumber.objects.create(number='+241 01 23 45 67', Work_time='8h-18h')
+        url = reverse('home:index')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            number.delete()
+        response = self.client.get(url)
+        self.assertEqual(response.context['support_number'], [])
+
+
+class LazyContextProcessorTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        context_cache.clear_local()
+        self.request = RequestFactory().get('/')
+        self.request.user = AnonymousUser()
+
+    def _render(self, template_code):
+        return engines['django'].from_string(template_code).render({}, self.request)
+
+    def test_only_read_variables_fire_their_processor(self):
+        self._render('{{ support_number|length }}')
+        self.assertEqual(set(get_processor_timings(self.request)), {'settings.support_number_settings'})
+
+    def test_template_without_global_variables_runs_no_project_processor(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self._render('ok'), 'ok')
+        self.assertEqual(get_processor_timings(self.request), {})
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_result_is_memoized_for_the_request(self):
+        SupportNumber.objects.create(number='+241 01 23 45 67', Work_time='8h-18h')
+        self.assertEqual(self._render('{{ support_number|length }}'), '1')
+        SupportNumber.objects.create(number='+241 07 00 00 00', Work_time='8h-18h')
+        self.assertEqual(self._render('{{ support_number|length }}'), '1')
+
+    def test_view_context_overrides_lazy_value(self):
+        template = engines['django'].from_string('{{ cart_count }}')
+        self.assertEqual(template.render({'cart_count': 7}, self.request), '7')
+        self.assertEqual(get_processor_timings(self.request), {})
+
+
+class AdRotationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        context_cache.clear_local()
+        # Comportement de production : impressions en attente dans le cache partagé
+        shared = mock.patch.object(ad_rotation, 'is_shared', return_value=True)
+        shared.start()
+        self.addCleanup(shared.stop)
+
+    def tearDown(self):
+        # Impressions en attente dans le cache : rien ne doit survivre au test
+        cache.clear()
+
+    def test_rotation_uses_cached_list(self):
+        HeadTextAd.objects.create(ad_title='Promo')
+        ad_rotation.rotate('head_text')
+        with CaptureQueriesContext(connection) as ctx:
+            ads = ad_rotation.rotate('head_text')
+        self.assertEqual([ad.ad_title for ad in ads], ['Promo'])
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_schedule_and_zero_weight_are_excluded(self):
+        now = timezone.now()
+        HeadTextAd.objects.create(ad_title='Active')
+        HeadTextAd.objects.create(ad_title='Future', start_date=now + timedelta(days=1))
+        HeadTextAd.objects.create(ad_title='Finie', end_date=now - timedelta(days=1))
+        HeadTextAd.objects.create(ad_title='Coupée', weight=0)
+        self.assertEqual([ad.ad_title for ad in ad_rotation.rotate('head_text')], ['Active'])
+
+    def test_weights_bias_the_first_slot(self):
+        heavy = HeadTextAd.objects.create(ad_title='Lourde', weight=9)
+        HeadTextAd.objects.create(ad_title='Légère', weight=1)
+        firsts = [ad_rotation.rotate('head_text', limit=1)[0].pk for _ in range(400)]
+        self.assertGreater(firsts.count(heavy.pk), 300)
+
+    def test_impressions_are_buffered_then_flushed(self):
+        ad = HeadTextAd.objects.create(ad_title='Promo')
+        other = HeadTextAd.objects.create(ad_title='Solde')
+        ad_rotation.rotate('head_text')
+        ad_rotation.rotate('head_text', limit=1)
+        self.assertEqual(HeadTextAd.objects.get(pk=ad.pk).impressions, 0)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(ad_rotation.flush_impressions(), 3)
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]), 1)
+        self.assertEqual(HeadTextAd.objects.get(pk=ad.pk).impressions
+                         + HeadTextAd.objects.get(pk=other.pk).impressions, 3)
+        self.assertEqual(ad_rotation.flush_impressions(), 0)
+
+    def impressions(self, *ads):
+        return [HeadTextAd.objects.get(pk=ad.pk).impressions for ad in ads]
+
+    def test_failed_write_keeps_impressions(self):
+        ad = HeadTextAd.objects.create(ad_title='Promo')
+        ad_rotation.record_impressions(HeadTextAd, [ad])
+        with mock.patch.object(ad_rotation, 'increment', side_effect=DatabaseError('panne')):
+            self.assertEqual(ad_rotation.flush_impressions(), 0)
+        ad_rotation.record_impressions(HeadTextAd, [ad])
+        self.assertEqual(ad_rotation.flush_impressions(), 2)
+        self.assertEqual(self.impressions(ad), [2])
+
+    def test_journal_gap_is_retried_then_skipped(self):
+        first, late, lost, last = [HeadTextAd.objects.create(ad_title=f'Pub {n}') for n in range(4)]
+        buffer, label = ad_rotation._impressions, HeadTextAd._meta.label
+
+        def interrupted_add(ad):
+            # add() arrêté entre l'attribution du numéro et l'écriture de l'entrée
+            cache.set(buffer._counter(label, ad.pk), 1)
+            cache.add(buffer._registered(label, ad.pk), 1)
+            cache.incr(buffer.seq_key)
+            return cache.get(buffer.seq_key)
+
+        ad_rotation.record_impressions(HeadTextAd, [first])
+        late_seq = interrupted_add(late)
+        lost_seq = interrupted_add(lost)
+        ad_rotation.record_impressions(HeadTextAd, [last])
+        # Passage 1 : arrêt au premier numéro sans entrée
+        self.assertEqual(ad_rotation.flush_impressions(), 1)
+        self.assertEqual(self.impressions(first, late, lost, last), [1, 0, 0, 0])
+        # L'écrivain termine ; passage 2 : l'entrée tardive est lue, le numéro
+        # toujours vide est sauté
+        cache.set(buffer._item(late_seq), (label, late.pk))
+        self.assertEqual(ad_rotation.flush_impressions(), 2)
+        self.assertEqual(self.impressions(first, late, lost, last), [1, 1, 0, 1])
+        self.assertIsNone(cache.get(buffer._item(lost_seq)))
+        # Inscription perdue : refaite au premier incrément après son expiration
+        cache.delete(buffer._registered(label, lost.pk))
+        ad_rotation.record_impressions(HeadTextAd, [lost])
+        self.assertEqual(ad_rotation.flush_impressions(), 2)
+        self.assertEqual(self.impressions(first, late, lost, last), [1, 1, 2, 1])
+
+    def test_without_shared_cache_impressions_are_written_directly(self):
+        ad = HeadTextAd.objects.create(ad_title='Promo')
+        with mock.patch.object(ad_rotation, 'is_shared', return_value=False):
+            ad_rotation.rotate('head_text')
+        self.assertEqual(HeadTextAd.objects.get(pk=ad.pk).impressions, 1)
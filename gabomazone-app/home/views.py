@@ -1,7 +1,8 @@
 from django.shortcuts import render
-from categories.models import SuperCategory, MainCategory
-from .models import (Carousel, HomeAdSidebar, HomeAdMiddlebar,
-                     HomeAdSupplier, HomeAdDaily, HomeAdDealTime)
+from django.utils.functional import SimpleLazyObject
+from categories.tree import SUPER, MAIN, get_category_tree
+from .ad_rotation import rotate
+from .models import Carousel, HomeAdSidebar
 from products.models import Product
 from django.http import HttpResponseRedirect, JsonResponse
 from django.conf import settings
@@ -9,33 +10,38 @@ from settings.models import HomePageTheme
 from django.db.models import Count
 from django.db import connection
 import random
-import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _shuffled(items):
+    """Copie mélangée d'une liste en cache."""
+    return random.sample(items, len(items))
+
+
 def home_page(request):
     """Render the marketplace homepage."""
     logger.debug("home_page user=%s", request.user)
     if not request.session.has_key('currency'):
         request.session['currency'] = settings.DEFAULT_CURRENCY
-    super_category = SuperCategory.objects.all().order_by("?")
+    # Tirages au sort en Python sur des listes en cache, évalués seulement si le template les lit
+    category_tree = get_category_tree()
+    super_category = SimpleLazyObject(lambda: _shuffled(category_tree.all(SUPER)))
     carousels = Carousel.objects.all()
     home_ads_left = HomeAdSidebar.objects.all().filter(
         image_position="Left")[0:1]
     home_ads_right = HomeAdSidebar.objects.all().filter(
         image_position="Right")[0:1]
-    home_ad_middlebar = HomeAdMiddlebar.objects.all().order_by("?")
-    main_category = MainCategory.objects.all().order_by("?")
-    home_ad_suppliers = HomeAdSupplier.objects.all().order_by("?")
-    home_ad_daily = HomeAdDaily.objects.all().order_by("?")
-    home_ads_deal_time = HomeAdDealTime.objects.all().order_by("?")
+    home_ad_middlebar = SimpleLazyObject(lambda: rotate('middlebar'))
+    main_category = SimpleLazyObject(lambda: _shuffled(category_tree.all(MAIN)))
+    home_ad_suppliers = SimpleLazyObject(lambda: rotate('supplier'))
+    home_ad_daily = SimpleLazyObject(lambda: rotate('daily'))
+    home_ads_deal_time = SimpleLazyObject(lambda: rotate('deal_time'))
     index = str(HomePageTheme.objects.all().filter(active=True).first())
     
     # Récupérer les produits les plus populaires (priorisant les boostés, puis par vues)
     from django.db.models import Q, F, Case, When, IntegerField
-    from django.utils import timezone
     from orders.models import OrderDetails
     
     try:
@@ -43,27 +49,11 @@ def home_page(request):
         from products.models import Product
         from accounts.models import PeerToPeerProduct
         
-        now = timezone.now()
-        
-        # Récupérer les IDs des produits normaux boostés actifs
-        from accounts.models import ProductBoostRequest
-        active_boosted_product_ids = list(
-            ProductBoostRequest.objects.filter(
-                status=ProductBoostRequest.ACTIVE,
-                start_date__lte=now,
-                end_date__gte=now,
-                payment_status=True
-            ).values_list('product_id', flat=True)
-        )
-        
-        # Récupérer les IDs des produits C2C boostés actifs
-        from c2c.models import ProductBoost
-        active_boosted_c2c_boosts = ProductBoost.objects.filter(
-            status=ProductBoost.ACTIVE,
-            start_date__lte=now,
-            end_date__gte=now
-        )
-        active_boosted_c2c_product_ids = list(active_boosted_c2c_boosts.values_list('product_id', flat=True))
+        # IDs des produits boostés actifs (index partagé, sans requête en régime établi)
+        from accounts.boost_index import get_boost_index
+        boost_index = get_boost_index()
+        active_boosted_product_ids = list(boost_index.b2c_paid)
+        active_boosted_c2c_product_ids = list(boost_index.c2c)
         
         # Debug: afficher les produits C2C boostés trouvés
         if active_boosted_c2c_product_ids:
@@ -77,7 +67,6 @@ def home_page(request):
             PRDISactive=True, 
             PRDISDeleted=False
         ).select_related('product_vendor').annotate(
-            like_count=Count('favorites', distinct=True),
             # Compter les commandes terminées via OrderDetails
             order_count=Count(
                 'orderdetails',
@@ -109,7 +98,6 @@ def home_page(request):
         popular_c2c_products_queryset = PeerToPeerProduct.objects.filter(
             status=PeerToPeerProduct.APPROVED
         ).annotate(
-            like_count=Count('favorites', distinct=True),
             # Flag pour indiquer si le produit est boosté
             is_boosted=Case(
                 When(id__in=active_boosted_c2c_product_ids if active_boosted_c2c_product_ids else [], then=1),
@@ -198,61 +186,6 @@ def home_page(request):
         is_boosted = item['is_boosted']
         view_count = item['view_count']
         
-        product_images = []
-        if is_peer_to_peer:
-            # Produit C2C
-            if product.product_image:
-                img_path = str(product.product_image)
-                if not img_path.startswith('/media/'):
-                    img_path = '/media/' + img_path
-                product_images.append(img_path)
-            # Les produits C2C n'ont généralement qu'une seule image
-        else:
-            # Produit normal
-            if product.product_image:
-                img_path = str(product.product_image)
-                if not img_path.startswith('/media/'):
-                    img_path = '/media/' + img_path
-                product_images.append(img_path)
-            if hasattr(product, 'additional_image_1') and product.additional_image_1:
-                img_path = str(product.additional_image_1)
-                if not img_path.startswith('/media/'):
-                    img_path = '/media/' + img_path
-                product_images.append(img_path)
-            if hasattr(product, 'additional_image_2') and product.additional_image_2:
-                img_path = str(product.additional_image_2)
-                if not img_path.startswith('/media/'):
-                    img_path = '/media/' + img_path
-                product_images.append(img_path)
-            if hasattr(product, 'additional_image_3') and product.additional_image_3:
-                img_path = str(product.additional_image_3)
-                if not img_path.startswith('/media/'):
-                    img_path = '/media/' + img_path
-                product_images.append(img_path)
-            if hasattr(product, 'additional_image_4') and product.additional_image_4:
-                img_path = str(product.additional_image_4)
-                if not img_path.startswith('/media/'):
-                    img_path = '/media/' + img_path
-                product_images.append(img_path)
-        
-        like_count = 0
-        try:
-            if is_peer_to_peer:
-                # Pour les produits C2C, utiliser le related_name 'favorites'
-                like_count = getattr(product, 'like_count', 0)
-                if like_count is None or like_count == 0:
-                    from accounts.models import PeerToPeerProductFavorite
-                    like_count = PeerToPeerProductFavorite.objects.filter(product=product).count()
-            else:
-                like_count = getattr(product, 'like_count', 0)
-                if like_count is None:
-                    like_count = 0
-                if like_count == 0:
-                    from products.models import ProductFavorite
-                    like_count = ProductFavorite.objects.filter(product=product).count()
-        except Exception:
-            like_count = 0
-        
         # Récupérer les statistiques du produit
         order_count = 0
         if not is_peer_to_peer:
@@ -260,8 +193,8 @@ def home_page(request):
         
         popular_products_data.append({
             'product': product,
-            'product_images': json.dumps(product_images),
-            'like_count': like_count,
+            'product_images': product.image_manifest,
+            'like_count': product.like_count,
             'order_count': order_count,
             'view_count': view_count,
             'is_boosted': bool(is_boosted),  # Convertir en bool pour le template
@@ -271,40 +204,6 @@ def home_page(request):
     # Préparer les données des nouveaux produits avec images multiples
     new_products_data = []
     for product in new_products_queryset:
-        product_images = []
-        if product.product_image:
-            img_path = str(product.product_image)
-            if not img_path.startswith('/media/'):
-                img_path = '/media/' + img_path
-            product_images.append(img_path)
-        if product.additional_image_1:
-            img_path = str(product.additional_image_1)
-            if not img_path.startswith('/media/'):
-                img_path = '/media/' + img_path
-            product_images.append(img_path)
-        if product.additional_image_2:
-            img_path = str(product.additional_image_2)
-            if not img_path.startswith('/media/'):
-                img_path = '/media/' + img_path
-            product_images.append(img_path)
-        if product.additional_image_3:
-            img_path = str(product.additional_image_3)
-            if not img_path.startswith('/media/'):
-                img_path = '/media/' + img_path
-            product_images.append(img_path)
-        if product.additional_image_4:
-            img_path = str(product.additional_image_4)
-            if not img_path.startswith('/media/'):
-                img_path = '/media/' + img_path
-            product_images.append(img_path)
-        
-        like_count = 0
-        try:
-            from products.models import ProductFavorite
-            like_count = ProductFavorite.objects.filter(product=product).count()
-        except Exception:
-            like_count = 0
-        
         # Récupérer les statistiques du produit
         view_count = getattr(product, 'view_count', 0) or 0
         
@@ -318,8 +217,8 @@ def home_page(request):
         
         new_products_data.append({
             'product': product,
-            'product_images': json.dumps(product_images),
-            'like_count': like_count,
+            'product_images': product.image_manifest,
+            'like_count': product.like_count,
             'view_count': view_count,
             'is_peer_to_peer': is_peer_to_peer,
         })
@@ -0,0 +1,120 @@
+"""
+Totaux du panier B2C (commande Order ouverte de l'utilisateur).
+
+Service partagé par les vues cart, add_to_cart, remove_item et
+get_cart_count :
+- open_order() : la commande ouverte, lue une seule fois par requête et
+  verrouillée (select_for_update) quand la requête la modifie ;
+- totals() : nombre de lignes, quantité, sous-total et poids en une seule
+  requête d'agrégation (SUM(price * quantity)) au lieu de parcourir les
+  OrderDetails en Python ;
+- refresh_totals() / refresh_supplier_totals() : recalcul des montants
+  enregistrés sur Order / OrderSupplier, écrits seulement s'ils ont changé.
+  Un affichage du panier sans modification n'écrit donc plus en base (Order.save
+  réenregistre aussi chaque OrderSupplier de la commande).
+
+Les montants de Order et OrderSupplier restent des CharField : ils sont
+comparés en Decimal et écrits au format str(Decimal) à deux décimales.
+"""
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, DecimalField, F, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Coupon, Order, OrderDetails, OrderDetailsSupplier
+
+CENT = Decimal('0.01')
+GRAM = Decimal('0.001')
+
+Totals = namedtuple('Totals', 'lines quantity sub_total weight discount amount coupon')
+
+# Valeur par défaut de refresh_totals : conserver le coupon de la commande
+KEEP = object()
+
+
+def open_order(user, lock=False):
+    """Commande ouverte (is_finished=False) de user, ou None. lock : verrou jusqu'au commit."""
+    if not user.is_authenticated:
+        return None
+    queryset = Order.objects.filter(user=user, is_finished=False)
+    if lock:
+        queryset = queryset.select_for_update()
+    return queryset.first()
+
+
+def cart_count(user):
+    """Nombre de lignes du panier de user (une requête)."""
+    if not user.is_authenticated:
+        return 0
+    order = Order.objects.filter(user=user, is_finished=False).values('pk')[:1]
+    return OrderDetails.objects.filter(order=Subquery(order)).count()
+
+
+def _aggregate(queryset):
+    money = DecimalField(max_digits=20, decimal_places=2)
+    mass = DecimalField(max_digits=20, decimal_places=3)
+    # Alias distincts des noms de champs (quantity, weight) exigés par aggregate()
+    row = queryset.aggregate(
+        lines=Count('pk'),
+        units=Coalesce(Sum('quantity'), 0),
+        price_total=Coalesce(Sum(F('price') * F('quantity'), output_field=money), Value(0), output_field=money),
+        weight_total=Coalesce(Sum(F('weight') * F('quantity'), output_field=mass), Value(0), output_field=mass),
+    )
+    return (row['lines'], row['units'],
+            Decimal(row['price_total']).quantize(CENT), Decimal(row['weight_total']).quantize(GRAM))
+
+
+def totals(order, coupon=KEEP):
+    """Totaux de order ; coupon : Coupon appliqué, None, ou KEEP (celui de la commande)."""
+    if coupon is KEEP:
+        coupon = Coupon.objects.filter(pk=order.coupon_id).first() if order.coupon_id else None
+    lines, quantity, sub_total, weight = _aggregate(OrderDetails.objects.filter(order=order))
+    discount = Decimal('0')
+    if coupon is not None:
+        discount = (Decimal(coupon.discount) / Decimal('100') * sub_total).quantize(CENT)
+    return Totals(lines, quantity, sub_total, weight, discount, sub_total - discount, coupon)
+
+
+def _decimal(value):
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _store(instance, values):
+    """Affecte values à instance ; enregistre les seuls champs modifiés. Retourne leurs noms."""
+    changed = []
+    for field_name, value in values.items():
+        current = getattr(instance, field_name)
+        if isinstance(value, Decimal):
+            if _decimal(current) == value:
+                continue
+            value = value if field_name == 'weight' else str(value)
+        elif current == value:
+            continue
+        setattr(instance, field_name, value)
+        changed.append(field_name)
+    if changed:
+        instance.save(update_fields=changed + ['date_update'])
+    return changed
+
+
+def refresh_totals(order, coupon=KEEP):
+    """Recalcule sous-total, remise, montant et poids de order. Retourne ses Totals."""
+    result = totals(order, coupon)
+    _store(order, {
+        'sub_total': result.sub_total,
+        'discount': result.discount,
+        'amount': result.amount,
+        'weight': result.weight,
+        'coupon_id': result.coupon.pk if result.coupon is not None else None,
+    })
+    return result
+
+
+def refresh_supplier_totals(order_supplier):
+    """Recalcule montant et poids d'une commande par magasin (OrderSupplier)."""
+    _, _, sub_total, weight = _aggregate(OrderDetailsSupplier.objects.filter(order_supplier=order_supplier))
+    _store(order_supplier, {'amount': sub_total, 'weight': weight})
@@ -1,7 +1,9 @@
 
+from project.lazy_context import lazy_processor
 from .models import Order, OrderDetails
 
 
+@lazy_processor('order_context', 'order_details_context', 'cart_count')
 def orders_cart_obj(request):
         try:
             # Seuls les utilisateurs authentifiés peuvent avoir un panier
@@ -1,3 +1,112 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from products.models import Product
+
+from . import cart as cart_service
+from .models import Coupon, Order, OrderDetails
+
+
+class CartTotalsTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('acheteur', 'acheteur@example.com', 'secret')
+        self.order = Order.objects.create(user=self.user, email_client=self.user.email, amount='0')
+        product = Product.objects.create(
+            product_name='Montre', product_description='Montre', PRDPrice=1500)
+        self.first = OrderDetails.objects.create(
+            order=self.order, product=product, price=Decimal('1500.50'), quantity=2, weight=Decimal('0.250'))
+        self.second = OrderDetails.objects.create(
+            order=self.order, product=product, price=Decimal('1000'), quantity=3, weight=Decimal('1.000'))
+        self.coupon = Coupon.objects.create(
+            code='REMISE10', valid_form=timezone.now(), valid_to=timezone.now() + timedelta(days=1),
+            discount=10, active=True)
+
+    def test_totals_from_one_aggregate(self):
+        with self.assertNumQueries(1):
+            totals = cart_service.totals(self.order, coupon=None)
+        self.assertEqual((totals.lines, totals.quantity), (2, 5))
+        self.assertEqual(totals.sub_total, Decimal('6001.00'))
+        self.assertEqual(totals.weight, Decimal('3.500'))
+        self.assertEqual(totals.amount, Decimal('6001.00'))
+
+    def test_coupon_discount(self):
+        totals = cart_service.refresh_totals(self.order, coupon=self.coupon)
+        self.assertEqual(totals.discount, Decimal('600.10'))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.amount, '5400.90')
+        self.assertEqual(self.order.coupon, self.coupon)
+        # Coupon conservé par les recalculs suivants (ajout / suppression d'article)
+        self.assertEqual(cart_service.refresh_totals(self.order).coupon, self.coupon)
+
+    def test_unchanged_totals_are_not_written(self):
+        cart_service.refresh_totals(self.order)
+        with self.assertNumQueries(2):
+            # Verrou de la commande + agrégat, aucune écriture
+            order = cart_service.open_order(self.user, lock=True)
+            cart_service.refresh_totals(order)
+
+    def test_cart_view_uses_stored_totals(self):
+        self.client.force_login(self.user)
+        session = self.client.session
+        session['coupon_id'] = self.coupon.id
+        session['code'] = self.coupon.code
+        session.save()
+        response = self.client.get(reverse('orders:cart'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total'], Decimal('5400.90'))
+        self.assertEqual(response.context['value'], Decimal('600.10'))
+        updated = Order.objects.get(pk=self.order.pk).date_update
+        self.client.get(reverse('orders:cart'))
+        self.assertEqual(Order.objects.get(pk=self.order.pk).date_update, updated)
+
+    def test_add_to_cart_refreshes_totals(self):
+        product = Product.objects.create(
+            product_name='Sac', product_description='Sac', PRDPrice=2000, available=10)
+        self.client.force_login(self.user)
+        for _ in range(2):
+            response = self.client.post(
+                reverse('orders:add-to-cart'),
+                {'product_id': product.id, 'qyt': 1, 'product_Price': 2000},
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            self.assertEqual(response.json()['cart_count'], 3)
+        self.order.refresh_from_db()
+        self.assertEqual(OrderDetails.objects.get(order=self.order, product=product).quantity, 2)
+        self.assertEqual(self.order.amount, '10001.00')
+
+    def test_failed_add_to_cart_rolls_back(self):
+        vendor = User.objects.create_user('vendeur', 'vendeur@example.com', 'secret').profile
+        product = Product.objects.create(
+            product_name='Sac', product_description='Sac', PRDPrice=2000, available=10, product_vendor=vendor)
+        self.client.force_login(self.user)
+        data = {'product_id': product.id, 'qyt': 1, 'product_Price': 2000}
+        self.client.post(reverse('orders:add-to-cart'), data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.order.refresh_from_db()
+        amount = self.order.amount
+        with mock.patch.object(cart_service, 'refresh_supplier_totals', side_effect=RuntimeError('panne')):
+            response = self.client.post(reverse('orders:add-to-cart'), data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(OrderDetails.objects.get(order=self.order, product=product).quantity, 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.amount, amount)
+
+    def test_remove_item_refreshes_totals(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('orders:remove-item', args=[self.second.id]))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.sub_total, '3001.00')
+        self.assertEqual(self.order.weight, Decimal('0.500'))
+        self.assertEqual(self.client.get(reverse('orders:get-cart-count')).json()['cart_count'], 1)
 
-# Create your tests here.
+    def test_remove_item_of_another_cart_is_refused(self):
+        other = User.objects.create_user('autre', 'autre@example.com', 'secret')
+        self.client.force_login(other)
+        self.client.get(reverse('orders:remove-item', args=[self.second.id]))
+        self.assertTrue(OrderDetails.objects.filter(pk=self.second.pk).exists())
+        self.assertEqual(cart_service.cart_count(other), 0)
@@ -3,7 +3,6 @@ from .models import Order, OrderDetails, Payment, Coupon, Country, OrderSupplier
 from products.models import Product
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.utils import timezone
 from decimal import Context, Decimal, InvalidOperation
 from accounts.models import Profile
 from settings.models import SiteSetting, ContactInfo
@@ -18,7 +17,8 @@ from django.views import View
 from django.views.decorators.http import require_http_methods
 import datetime
 from .utils import code_generator
-from django.db.models import Sum
+from . import cart as cart_service
+from django.db import transaction
 import logging
 
 logger = logging.getLogger(__name__)
@@ -180,521 +180,350 @@ def add_to_cart(request):
                 if qyt <= 0:
                     qyt = 1
 
-            try:
+            # Panier modifié sous verrou : une seule lecture de la commande ouverte,
+            # annulée en entier en cas d'erreur
+            with transaction.atomic():
                 # Utilisateur doit être authentifié (décorateur @login_required)
-                order = Order.objects.filter(
-                    user=request.user, is_finished=False).first()
+                order = cart_service.open_order(request.user, lock=True)
                 logger.debug("order: %s", order)
 
-            except Exception as e:
-                logger.warning("Erreur lors de la récupération de la commande: %s", e)
-                order = None
-
-            # Vérifier que le produit existe (normal ou C2C)
-            if not is_peer_to_peer and not Product.objects.all().filter(id=product_id).exists():
-                if is_ajax:
-                    return JsonResponse({'success': False, 'error': 'Produit non trouvé !'}, status=404)
-                return HttpResponse(f"this product not found !")
-
-            if order:
-                if request.user.is_authenticated and not request.user.is_anonymous:
-                    # Utilisateur doit être authentifié (décorateur @login_required)
-                    old_orde = Order.objects.filter(
-                        user=request.user, is_finished=False).first()
-                
-                if not old_orde:
+                # Vérifier que le produit existe (normal ou C2C)
+                if not is_peer_to_peer and not Product.objects.all().filter(id=product_id).exists():
                     if is_ajax:
-                        return JsonResponse({'success': False, 'error': 'Erreur: Commande non trouvée'}, status=400)
-                    return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
-                # Chercher l'item dans OrderDetails (produit normal ou C2C)
-                if is_peer_to_peer:
-                    item = OrderDetails.objects.filter(order=old_orde, peer_product=peer_product).first()
-                else:
-                    item = OrderDetails.objects.filter(order=old_orde, product=product).first()
-                
-                if item:
-                    # Vérifier si OrderDetailsSupplier existe, sinon le créer
-                    # Seulement si le produit a un vendeur (product_vendor) - pas pour les articles C2C
-                    if not is_peer_to_peer and product and hasattr(product, 'product_vendor') and product.product_vendor:
-                        if OrderDetailsSupplier.objects.all().filter(order=old_orde, product=product).exists():
-                            item_supplier = OrderDetailsSupplier.objects.get(
-                                order=old_orde, product=product)
-                        else:
-                            # Créer OrderDetailsSupplier si il n'existe pas
-                            try:
-                                old_order_supplier = OrderSupplier.objects.get(
-                                    is_finished=False, order=old_orde, vendor=product.product_vendor)
-                            except OrderSupplier.DoesNotExist:
-                                old_order_supplier = OrderSupplier.objects.create(
-                                    user=request.user if request.user.is_authenticated else None,
-                                    order=old_orde,
-                                    vendor=product.product_vendor,
-                                    is_finished=False
-                                )
-                            item_supplier = OrderDetailsSupplier.objects.create(
-                                supplier=product.product_vendor.user,
-                                product=product,
-                                order=old_orde,
-                                order_supplier=old_order_supplier,
-                                order_details=item,
-                                price=safe_decimal_price(product.PRDPrice),
-                                quantity=item.quantity,
-                                size=size if hasattr(item, 'size') else None,
-                                weight=safe_decimal_price(getattr(product, 'PRDWeight', 0))
-                            )
-                    else:
-                        # Si le produit n'a pas de vendeur ou c'est un article C2C, on ne crée pas OrderDetailsSupplier
-                        item_supplier = None
-                    # Vérifier le stock seulement pour les produits normaux
-                    if not is_peer_to_peer and product and item.quantity >= product.available:
-                        qyt = item.quantity
-                        if is_ajax:
-                            return JsonResponse({'success': False, 'error': f"Vous ne pouvez pas ajouter plus de ce produit, disponible seulement : {qyt}"}, status=400)
-                        messages.warning(
-                            request, f"You can't add more from this product, available only : {qyt}")
-                        return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
-
-                    elif is_peer_to_peer or (product and qyt < product.available):
-                        if not is_peer_to_peer and product:
-                            qyt = qyt + item.quantity
-                            if qyt > product.available:
-                                qyt = product.available
-                        else:
-                            qyt = qyt + item.quantity
-
-                        item.quantity = int(qyt)
-                        item.save()
-                        if item_supplier:
-                            item_supplier.quantity = int(qyt)
-                            item_supplier.save()
-
-                        # code for total amount main order
-                        order_details_main = OrderDetails.objects.all().filter(order=old_orde)
-                        f_total = Decimal('0')
-                        w_total = Decimal('0')
-                        weight = Decimal('0')
-                        for sub in order_details_main:
-                            if sub.price and sub.quantity:
-                                f_total += Decimal(str(sub.price)) * Decimal(str(sub.quantity))
-                            if sub.weight and sub.quantity:
-                                w_total += Decimal(str(sub.weight)) * Decimal(str(sub.quantity))
-                        total = f_total
-                        weight = w_total
-
-                        old_orde.sub_total = str(f_total)
-                        old_orde.weight = float(weight)
-                        old_orde.amount = str(total)
-                        old_orde.save()
-
-                        # code for total amount supplier order - seulement si le produit a un vendeur (pas pour les articles C2C)
-                        if not is_peer_to_peer and product and hasattr(product, 'product_vendor') and product.product_vendor:
-                            try:
-                                old_order_supplier = OrderSupplier.objects.get(
-                                    is_finished=False, order=old_orde, vendor=product.product_vendor)
-                                order_supplier = OrderDetailsSupplier.objects.all().filter(
-                                    order_supplier=old_order_supplier)
-                                weight = Decimal('0')
-                                f_total = Decimal('0')
-                                w_total = Decimal('0')
-                                for sub in order_supplier:
-                                    if sub.price and sub.quantity:
-                                        f_total += Decimal(str(sub.price)) * Decimal(str(sub.quantity))
-                                    if sub.weight and sub.quantity:
-                                        w_total += Decimal(str(sub.weight)) * Decimal(str(sub.quantity))
-                                total = f_total
-                                weight = w_total
-                                old_order_supplier.weight = float(weight)
-                                old_order_supplier.amount = str(total)
-                                old_order_supplier.save()
-                            except OrderSupplier.DoesNotExist:
-                                # Créer OrderSupplier si il n'existe pas
-                                old_order_supplier = OrderSupplier.objects.create(
-                                    user=request.user if request.user.is_authenticated else None,
-                                    order=old_orde,
-                                    vendor=product.product_vendor,
-                                    is_finished=False
-                                )
-                                # Mettre à jour item_supplier avec le nouveau order_supplier
-                                if item_supplier:
-                                    try:
-                                        item_supplier.order_supplier = old_order_supplier
-                                        item_supplier.save()
-                                    except Exception:
-                                        pass
-                                # Calculer le total
-                                order_supplier = OrderDetailsSupplier.objects.all().filter(
-                                    order_supplier=old_order_supplier)
-                                weight = Decimal('0')
-                                f_total = Decimal('0')
-                                w_total = Decimal('0')
-                                for sub in order_supplier:
-                                    if sub.price and sub.quantity:
-                                        f_total += Decimal(str(sub.price)) * Decimal(str(sub.quantity))
-                                    if sub.weight and sub.quantity:
-                                        w_total += Decimal(str(sub.weight)) * Decimal(str(sub.quantity))
-                                total = f_total
-                                weight = w_total
-                                old_order_supplier.weight = float(weight)
-                                old_order_supplier.amount = str(total)
-                                old_order_supplier.save()
-                            except Exception as e:
-                                if is_ajax:
-                                    return JsonResponse({'success': False, 'error': f'Erreur lors de la mise à jour: {str(e)}'}, status=500)
-                                messages.error(request, f'Erreur lors de la mise à jour: {str(e)}')
-                                return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
+                        return JsonResponse({'success': False, 'error': 'Produit non trouvé !'}, status=404)
+                    return HttpResponse(f"this product not found !")
 
+                if order:
+                    # Chercher l'item dans OrderDetails (produit normal ou C2C)
+                    if is_peer_to_peer:
+                        item = OrderDetails.objects.filter(order=order, peer_product=peer_product).first()
                     else:
-                        item.quantity = int(qyt)
-                        item.save()
-                        # Vérifier si item_supplier existe avant de le mettre à jour - seulement si le produit a un vendeur (pas pour les articles C2C)
+                        item = OrderDetails.objects.filter(order=order, product=product).first()
+                
+                    if item:
+                        # Vérifier si OrderDetailsSupplier existe, sinon le créer
+                        # Seulement si le produit a un vendeur (product_vendor) - pas pour les articles C2C
                         if not is_peer_to_peer and product and hasattr(product, 'product_vendor') and product.product_vendor:
-                            try:
+                            if OrderDetailsSupplier.objects.all().filter(order=order, product=product).exists():
                                 item_supplier = OrderDetailsSupplier.objects.get(
-                                    order=old_orde, product=product)
-                                item_supplier.quantity = int(qyt)
-                                item_supplier.save()
-                            except OrderDetailsSupplier.DoesNotExist:
+                                    order=order, product=product)
+                            else:
                                 # Créer OrderDetailsSupplier si il n'existe pas
                                 try:
                                     old_order_supplier = OrderSupplier.objects.get(
-                                        is_finished=False, order=old_orde, vendor=product.product_vendor)
+                                        is_finished=False, order=order, vendor=product.product_vendor)
                                 except OrderSupplier.DoesNotExist:
                                     old_order_supplier = OrderSupplier.objects.create(
                                         user=request.user if request.user.is_authenticated else None,
-                                        order=old_orde,
+                                        order=order,
                                         vendor=product.product_vendor,
                                         is_finished=False
                                     )
-                                OrderDetailsSupplier.objects.create(
+                                item_supplier = OrderDetailsSupplier.objects.create(
                                     supplier=product.product_vendor.user,
                                     product=product,
-                                    order=old_orde,
+                                    order=order,
                                     order_supplier=old_order_supplier,
                                     order_details=item,
                                     price=safe_decimal_price(product.PRDPrice),
-                                    quantity=int(qyt),
+                                    quantity=item.quantity,
                                     size=size if hasattr(item, 'size') else None,
                                     weight=safe_decimal_price(getattr(product, 'PRDWeight', 0))
                                 )
+                        else:
+                            # Si le produit n'a pas de vendeur ou c'est un article C2C, on ne crée pas OrderDetailsSupplier
+                            item_supplier = None
+                        # Vérifier le stock seulement pour les produits normaux
+                        if not is_peer_to_peer and product and item.quantity >= product.available:
+                            qyt = item.quantity
+                            # Refus : annuler les écritures déjà faites dans la transaction
+                            transaction.set_rollback(True)
+                            if is_ajax:
+                                return JsonResponse({'success': False, 'error': f"Vous ne pouvez pas ajouter plus de ce produit, disponible seulement : {qyt}"}, status=400)
+                            messages.warning(
+                                request, f"You can't add more from this product, available only : {qyt}")
+                            return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
+
+                        elif is_peer_to_peer or (product and qyt < product.available):
+                            if not is_peer_to_peer and product:
+                                qyt = qyt + item.quantity
+                                if qyt > product.available:
+                                    qyt = product.available
+                            else:
+                                qyt = qyt + item.quantity
+
+                            item.quantity = int(qyt)
+                            item.save()
+                            if item_supplier:
+                                item_supplier.quantity = int(qyt)
+                                item_supplier.save()
 
-                        # code for total amount main order
-                        order_details_main = OrderDetails.objects.all().filter(order=old_orde)
-                        f_total = Decimal('0')
-                        w_total = Decimal('0')
-                        weight = Decimal('0')
-                        for sub in order_details_main:
-                            if sub.price and sub.quantity:
-                                f_total += Decimal(str(sub.price)) * Decimal(str(sub.quantity))
-                            if sub.weight and sub.quantity:
-                                w_total += Decimal(str(sub.weight)) * Decimal(str(sub.quantity))
-                        total = f_total
-                        weight = w_total
-
-                        old_orde.sub_total = str(f_total)
-                        old_orde.weight = float(weight)
-                        old_orde.amount = str(total)
-                        old_orde.save()
-
-                        # code for total amount supplier order
-                        try:
-                            old_order_supplier = OrderSupplier.objects.get(
-                                is_finished=False, order=old_orde, vendor=product.product_vendor)
-                            order_supplier = OrderDetailsSupplier.objects.all().filter(
-                                order_supplier=old_order_supplier)
-
-                            f_total = Decimal('0')
-                            w_total = Decimal('0')
-                            weight = Decimal('0')
-                            for sub in order_supplier:
-                                if sub.price and sub.quantity:
-                                    f_total += Decimal(str(sub.price)) * Decimal(str(sub.quantity))
-                                if sub.weight and sub.quantity:
-                                    w_total += Decimal(str(sub.weight)) * Decimal(str(sub.quantity))
-                            total = f_total
-                            weight = w_total
-                            old_order_supplier.weight = float(weight)
-                            old_order_supplier.amount = str(total)
-                            old_order_supplier.save()
-                        except OrderSupplier.DoesNotExist:
-                            # Si OrderSupplier n'existe pas, le créer
-                            old_order_supplier = OrderSupplier.objects.create(
-                                user=request.user if request.user.is_authenticated else None,
-                                order=old_orde,
-                                vendor=product.product_vendor,
-                                is_finished=False
-                            )
-                            # Récupérer ou créer OrderDetailsSupplier
+                            # code for total amount main order
+                            cart_service.refresh_totals(order)
+
+                            # code for total amount supplier order - seulement si le produit a un vendeur (pas pour les articles C2C)
+                            if not is_peer_to_peer and product and hasattr(product, 'product_vendor') and product.product_vendor:
+                                try:
+                                    old_order_supplier = OrderSupplier.objects.get(
+                                        is_finished=False, order=order, vendor=product.product_vendor)
+                                    cart_service.refresh_supplier_totals(old_order_supplier)
+                                except OrderSupplier.DoesNotExist:
+                                    # Créer OrderSupplier si il n'existe pas
+                                    old_order_supplier = OrderSupplier.objects.create(
+                                        user=request.user if request.user.is_authenticated else None,
+                                        order=order,
+                                        vendor=product.product_vendor,
+                                        is_finished=False
+                                    )
+                                    # Mettre à jour item_supplier avec le nouveau order_supplier
+                                    if item_supplier:
+                                        try:
+                                            # Point de sauvegarde : un échec ne casse pas la transaction du panier
+                                            with transaction.atomic():
+                                                item_supplier.order_supplier = old_order_supplier
+                                                item_supplier.save()
+                                        except Exception:
+                                            pass
+                                    # Calculer le total
+                                    cart_service.refresh_supplier_totals(old_order_supplier)
+                                except Exception as e:
+                                    # Annuler la quantité et les totaux déjà enregistrés
+                                    transaction.set_rollback(True)
+                                    if is_ajax:
+                                        return JsonResponse({'success': False, 'error': f'Erreur lors de la mise à jour: {str(e)}'}, status=500)
+                                    messages.error(request, f'Erreur lors de la mise à jour: {str(e)}')
+                                    return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
+
+                        else:
+                            item.quantity = int(qyt)
+                            item.save()
+                            # Vérifier si item_supplier existe avant de le mettre à jour - seulement si le produit a un vendeur (pas pour les articles C2C)
+                            if not is_peer_to_peer and product and hasattr(product, 'product_vendor') and product.product_vendor:
+                                try:
+                                    item_supplier = OrderDetailsSupplier.objects.get(
+                                        order=order, product=product)
+                                    item_supplier.quantity = int(qyt)
+                                    item_supplier.save()
+                                except OrderDetailsSupplier.DoesNotExist:
+                                    # Créer OrderDetailsSupplier si il n'existe pas
+                                    try:
+                                        old_order_supplier = OrderSupplier.objects.get(
+                                            is_finished=False, order=order, vendor=product.product_vendor)
+                                    except OrderSupplier.DoesNotExist:
+                                        old_order_supplier = OrderSupplier.objects.create(
+                                            user=request.user if request.user.is_authenticated else None,
+                                            order=order,
+                                            vendor=product.product_vendor,
+                                            is_finished=False
+                                        )
+                                    OrderDetailsSupplier.objects.create(
+                                        supplier=product.product_vendor.user,
+                                        product=product,
+                                        order=order,
+                                        order_supplier=old_order_supplier,
+                                        order_details=item,
+                                        price=safe_decimal_price(product.PRDPrice),
+                                        quantity=int(qyt),
+                                        size=size if hasattr(item, 'size') else None,
+                                        weight=safe_decimal_price(getattr(product, 'PRDWeight', 0))
+                                    )
+
+                            # code for total amount main order
+                            cart_service.refresh_totals(order)
+
+                            # code for total amount supplier order
                             try:
-                                item_supplier = OrderDetailsSupplier.objects.get(
-                                    order=old_orde, product=product)
-                                item_supplier.order_supplier = old_order_supplier
-                                item_supplier.save()
-                            except OrderDetailsSupplier.DoesNotExist:
-                                OrderDetailsSupplier.objects.create(
+                                old_order_supplier = OrderSupplier.objects.get(
+                                    is_finished=False, order=order, vendor=product.product_vendor)
+                                cart_service.refresh_supplier_totals(old_order_supplier)
+                            except OrderSupplier.DoesNotExist:
+                                # Si OrderSupplier n'existe pas, le créer
+                                old_order_supplier = OrderSupplier.objects.create(
+                                    user=request.user if request.user.is_authenticated else None,
+                                    order=order,
+                                    vendor=product.product_vendor,
+                                    is_finished=False
+                                )
+                                # Récupérer ou créer OrderDetailsSupplier
+                                try:
+                                    item_supplier = OrderDetailsSupplier.objects.get(
+                                        order=order, product=product)
+                                    item_supplier.order_supplier = old_order_supplier
+                                    item_supplier.save()
+                                except OrderDetailsSupplier.DoesNotExist:
+                                    OrderDetailsSupplier.objects.create(
+                                        supplier=product.product_vendor.user,
+                                        product=product,
+                                        order=order,
+                                        order_supplier=old_order_supplier,
+                                        order_details=item,
+                                        price=safe_decimal_price(product.PRDPrice),
+                                        quantity=int(qyt),
+                                        size=size if hasattr(item, 'size') else None,
+                                        weight=safe_decimal_price(getattr(product, 'PRDWeight', 0))
+                                    )
+                                # Calculer le total
+                                cart_service.refresh_supplier_totals(old_order_supplier)
+                        
+                            # Retourner une réponse JSON pour AJAX
+                            if is_ajax:
+                                cart_count = cart_service.cart_count(request.user)
+                                return JsonResponse({'success': True, 'message': 'Produit ajouté au panier avec succès !', 'cart_count': cart_count})
+                            return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
+
+                    else:
+                        # Créer un nouvel OrderDetails
+                        if is_peer_to_peer:
+                            # Pour les articles C2C, pas de supplier
+                            order_details = OrderDetails.objects.create(
+                                supplier=None,
+                                product=None,
+                                peer_product=peer_product,
+                                order=order,
+                                price=safe_decimal_price(peer_product.PRDPrice),
+                                quantity=qyt,
+                                size=size,
+                                weight=Decimal('0')  # Pas de poids pour les articles C2C
+                            )
+                        else:
+                            # Pour les produits normaux
+                            supplier_user = product.product_vendor.user if (hasattr(product, 'product_vendor') and product.product_vendor) else None
+                            order_details = OrderDetails.objects.create(
+                                supplier=supplier_user,
+                                product=product,
+                                peer_product=None,
+                                order=order,
+                                price=safe_decimal_price(product.PRDPrice),
+                                quantity=qyt,
+                                size=size,
+                                weight=safe_decimal_price(getattr(product, 'PRDWeight', 0))
+                            )
+                        # code for total amount main order
+
+                        cart_service.refresh_totals(order)
+                        # add product for old order supplier - seulement si le produit a un vendeur (pas pour les articles C2C)
+                        if not is_peer_to_peer and product and hasattr(product, 'product_vendor') and product.product_vendor:
+                            if OrderSupplier.objects.all().filter(
+                                    order=order, is_finished=False, vendor=product.product_vendor).exists():
+                                old_order_supplier = OrderSupplier.objects.get(
+                                    is_finished=False, order=order, vendor=product.product_vendor)
+                                order_details_supplier = OrderDetailsSupplier.objects.create(
                                     supplier=product.product_vendor.user,
                                     product=product,
-                                    order=old_orde,
+                                    order=order,
                                     order_supplier=old_order_supplier,
-                                    order_details=item,
+                                    order_details=order_details,
                                     price=safe_decimal_price(product.PRDPrice),
-                                    quantity=int(qyt),
-                                    size=size if hasattr(item, 'size') else None,
+                                    quantity=qyt,
+                                    size=size,
                                     weight=safe_decimal_price(getattr(product, 'PRDWeight', 0))
                                 )
-                            # Calculer le total
-                            order_supplier = OrderDetailsSupplier.objects.all().filter(
-                                order_supplier=old_order_supplier)
-                            f_total = Decimal('0')
-                            w_total = Decimal('0')
-                            weight = Decimal('0')
-                            for sub in order_supplier:
-                                if sub.price and sub.quantity:
-                                    f_total += Decimal(str(sub.price)) * Decimal(str(sub.quantity))
-                                if sub.weight and sub.quantity:
-                                    w_total += Decimal(str(sub.weight)) * Decimal(str(sub.quantity))
-                            total = f_total
-                            weight = w_total
-                            old_order_supplier.weight = float(weight)
-                            old_order_supplier.amount = str(total)
-                            old_order_supplier.save()
-                        
-                        # Retourner une réponse JSON pour AJAX
-                        if is_ajax:
-                            cart_count = OrderDetails.objects.filter(order=old_orde).aggregate(total=Sum('quantity'))['total'] or 0
-                            return JsonResponse({'success': True, 'message': 'Produit ajouté au panier avec succès !', 'cart_count': cart_count})
-                        return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
+
+                                # code for total amount supplier order
+                                cart_service.refresh_supplier_totals(old_order_supplier)
+
+                            else:
+                                # order for  new supllier
+                                new_order_supplier = OrderSupplier()
+                                if request.user.is_authenticated and not request.user.is_anonymous:
+                                    new_order_supplier.user = request.user
+                                    new_order_supplier.email_client = request.user.email
+
+                                new_order_supplier.vendor = product.product_vendor
+                                new_order_supplier.order = order
+                                new_order_supplier.save()
+                                order_details_supplier = OrderDetailsSupplier.objects.create(
+                                    supplier=product.product_vendor.user,
+                                    product=product,
+                                    order=order,
+                                    order_supplier=new_order_supplier,
+                                    order_details=order_details,
+                                    price=safe_decimal_price(product.PRDPrice),
+                                    quantity=qyt,
+                                    size=size,
+                                    weight=safe_decimal_price(getattr(product, 'PRDWeight', 0))
+                                )
+
+                                # code for total amount supplier order
+                                cart_service.refresh_supplier_totals(new_order_supplier)
+
+                    messages.success(request, 'Produit ajouté au panier avec succès !')
+                    if is_ajax:
+                        # Compter les articles dans le panier
+                        cart_count = cart_service.cart_count(request.user)
+                        return JsonResponse({'success': True, 'message': 'Produit ajouté au panier avec succès !', 'cart_count': cart_count})
+                    return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
 
                 else:
-                    # Créer un nouvel OrderDetails
+                    # order for all
+                    new_order = Order()
+                    if request.user.is_authenticated and not request.user.is_anonymous:
+                        new_order.user = request.user
+                        new_order.email_client = request.user.email
+
+                    new_order.save()
+
+                    # order for supllier - seulement si le produit a un vendeur (pas pour les articles C2C)
+                    if not is_peer_to_peer and product and hasattr(product, 'product_vendor') and product.product_vendor:
+                        new_order_supplier = OrderSupplier()
+                        if request.user.is_authenticated and not request.user.is_anonymous:
+                            new_order_supplier.user = request.user
+                            new_order_supplier.email_client = request.user.email
+
+                        new_order_supplier.vendor = product.product_vendor
+                        new_order_supplier.order = new_order
+                        new_order_supplier.save()
+
+                    # Créer OrderDetails
                     if is_peer_to_peer:
-                        # Pour les articles C2C, pas de supplier
                         order_details = OrderDetails.objects.create(
                             supplier=None,
                             product=None,
                             peer_product=peer_product,
-                            order=old_orde,
+                            order=new_order,
                             price=safe_decimal_price(peer_product.PRDPrice),
                             quantity=qyt,
                             size=size,
                             weight=Decimal('0')  # Pas de poids pour les articles C2C
                         )
                     else:
-                        # Pour les produits normaux
-                        supplier_user = product.product_vendor.user if (hasattr(product, 'product_vendor') and product.product_vendor) else None
                         order_details = OrderDetails.objects.create(
-                            supplier=supplier_user,
+                            supplier=product.product_vendor.user if (hasattr(product, 'product_vendor') and product.product_vendor) else None,
                             product=product,
                             peer_product=None,
-                            order=old_orde,
+                            order=new_order,
                             price=safe_decimal_price(product.PRDPrice),
                             quantity=qyt,
                             size=size,
                             weight=safe_decimal_price(getattr(product, 'PRDWeight', 0))
                         )
-                    # code for total amount main order
 
-                    order_details_main = OrderDetails.objects.all().filter(order=old_orde)
-                    weight = Decimal('0')
-                    f_total = Decimal('0')
-                    w_total = Decimal('0')
-                    for sub in order_details_main:
-                        if sub.price and sub.quantity:
-                            f_total += Decimal(str(sub.price)) * Decimal(str(sub.quantity))
-                        if sub.weight and sub.quantity:
-                            w_total += Decimal(str(sub.weight)) * Decimal(str(sub.quantity))
-                    total = f_total
-                    weight = w_total
-
-                    old_orde.sub_total = str(f_total)
-                    old_orde.weight = float(weight)
-                    old_orde.amount = str(total)
-                    old_orde.save()
-                    # add product for old order supplier - seulement si le produit a un vendeur (pas pour les articles C2C)
+                    # Créer OrderDetailsSupplier seulement si le produit a un vendeur (pas pour les articles C2C)
                     if not is_peer_to_peer and product and hasattr(product, 'product_vendor') and product.product_vendor:
-                        if OrderSupplier.objects.all().filter(
-                                order=old_orde, is_finished=False, vendor=product.product_vendor).exists():
-                            old_order_supplier = OrderSupplier.objects.get(
-                                is_finished=False, order=old_orde, vendor=product.product_vendor)
-                            order_details_supplier = OrderDetailsSupplier.objects.create(
-                                supplier=product.product_vendor.user,
-                                product=product,
-                                order=old_orde,
-                                order_supplier=old_order_supplier,
-                                order_details=order_details,
-                                price=safe_decimal_price(product.PRDPrice),
-                                quantity=qyt,
-                                size=size,
-                                weight=safe_decimal_price(getattr(product, 'PRDWeight', 0))
-                            )
-
-                            # code for total amount supplier order
-                            order__supplier = OrderDetailsSupplier.objects.all().filter(
-                                order_supplier=old_order_supplier)
-                            f_total = Decimal('0')
-                            w_total = Decimal('0')
-                            weight = Decimal('0')
-                            for sub in order__supplier:
-                                if sub.price and sub.quantity:
-                                    f_total += Decimal(str(sub.price)) * Decimal(str(sub.quantity))
-                                if sub.weight and sub.quantity:
-                                    w_total += Decimal(str(sub.weight)) * Decimal(str(sub.quantity))
-                            total = f_total
-                            weight = w_total
-                            old_order_supplier.weight = float(weight)
-                            old_order_supplier.amount = str(total)
-                            old_order_supplier.save()
-
-                        else:
-                            # order for  new supllier
-                            new_order_supplier = OrderSupplier()
-                            if request.user.is_authenticated and not request.user.is_anonymous:
-                                new_order_supplier.user = request.user
-                                new_order_supplier.email_client = request.user.email
-
-                            new_order_supplier.vendor = product.product_vendor
-                            new_order_supplier.order = old_orde
-                            new_order_supplier.save()
-                            order_details_supplier = OrderDetailsSupplier.objects.create(
-                                supplier=product.product_vendor.user,
-                                product=product,
-                                order=old_orde,
-                                order_supplier=new_order_supplier,
-                                order_details=order_details,
-                                price=safe_decimal_price(product.PRDPrice),
-                                quantity=qyt,
-                                size=size,
-                                weight=safe_decimal_price(getattr(product, 'PRDWeight', 0))
-                            )
-
-                            # code for total amount supplier order
-                            order_supplier = OrderDetailsSupplier.objects.all().filter(
-                                order_supplier=new_order_supplier)
-                            weight = Decimal('0')
-                            f_total = Decimal('0')
-                            w_total = Decimal('0')
-                            for sub in order_supplier:
-                                if sub.price and sub.quantity:
-                                    f_total += Decimal(str(sub.price)) * Decimal(str(sub.quantity))
-                                if sub.weight and sub.quantity:
-                                    w_total += Decimal(str(sub.weight)) * Decimal(str(sub.quantity))
-                            total = f_total
-                            weight = w_total
-                            new_order_supplier.weight = float(weight)
-                            new_order_supplier.amount = str(total)
-                            new_order_supplier.save()
-
-                messages.success(request, 'Produit ajouté au panier avec succès !')
-                if is_ajax:
-                    # Compter les articles dans le panier
-                    try:
-                        cart_count = OrderDetails.objects.filter(order=old_orde).count()
-                    except Exception:
-                        cart_count = 0
-                    return JsonResponse({'success': True, 'message': 'Produit ajouté au panier avec succès !', 'cart_count': cart_count})
-                return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
-
-            else:
-                # order for all
-                new_order = Order()
-                if request.user.is_authenticated and not request.user.is_anonymous:
-                    new_order.user = request.user
-                    new_order.email_client = request.user.email
-
-                new_order.save()
-
-                # order for supllier - seulement si le produit a un vendeur (pas pour les articles C2C)
-                if not is_peer_to_peer and product and hasattr(product, 'product_vendor') and product.product_vendor:
-                    new_order_supplier = OrderSupplier()
-                    if request.user.is_authenticated and not request.user.is_anonymous:
-                        new_order_supplier.user = request.user
-                        new_order_supplier.email_client = request.user.email
-
-                    new_order_supplier.vendor = product.product_vendor
-                    new_order_supplier.order = new_order
-                    new_order_supplier.save()
-
-                # Créer OrderDetails
-                if is_peer_to_peer:
-                    order_details = OrderDetails.objects.create(
-                        supplier=None,
-                        product=None,
-                        peer_product=peer_product,
-                        order=new_order,
-                        price=safe_decimal_price(peer_product.PRDPrice),
-                        quantity=qyt,
-                        size=size,
-                        weight=Decimal('0')  # Pas de poids pour les articles C2C
-                    )
-                else:
-                    order_details = OrderDetails.objects.create(
-                        supplier=product.product_vendor.user if (hasattr(product, 'product_vendor') and product.product_vendor) else None,
-                        product=product,
-                        peer_product=None,
-                        order=new_order,
-                        price=safe_decimal_price(product.PRDPrice),
-                        quantity=qyt,
-                        size=size,
-                        weight=safe_decimal_price(getattr(product, 'PRDWeight', 0))
-                    )
+                        order_details_supplier = OrderDetailsSupplier.objects.create(
+                            supplier=product.product_vendor.user,
+                            product=product,
+                            order=new_order,
+                            order_supplier=new_order_supplier,
+                            order_details=order_details,
+                            price=safe_decimal_price(product.PRDPrice),
+                            quantity=qyt,
+                            size=size,
+                            weight=safe_decimal_price(getattr(product, 'PRDWeight', 0))
+                        )
+                    # code for total amount main order
 
-                # Créer OrderDetailsSupplier seulement si le produit a un vendeur (pas pour les articles C2C)
-                if not is_peer_to_peer and product and hasattr(product, 'product_vendor') and product.product_vendor:
-                    order_details_supplier = OrderDetailsSupplier.objects.create(
-                        supplier=product.product_vendor.user,
-                        product=product,
-                        order=new_order,
-                        order_supplier=new_order_supplier,
-                        order_details=order_details,
-                        price=safe_decimal_price(product.PRDPrice),
-                        quantity=qyt,
-                        size=size,
-                        weight=safe_decimal_price(getattr(product, 'PRDWeight', 0))
-                    )
-                # code for total amount main order
-
-                order_details_main = OrderDetails.objects.all().filter(order=new_order)
-                f_total = Decimal('0')
-                w_total = Decimal('0')
-                weight = Decimal('0')
-                for sub in order_details_main:
-                    if sub.price and sub.quantity:
-                        f_total += Decimal(str(sub.price)) * Decimal(str(sub.quantity))
-                    if sub.weight and sub.quantity:
-                        w_total += Decimal(str(sub.weight)) * Decimal(str(sub.quantity))
-                total = f_total
-                weight = w_total
-
-                new_order.sub_total = str(f_total)
-                new_order.weight = float(weight)
-                new_order.amount = str(total)
-                new_order.save()
-                # code for total amount supplier order - seulement si new_order_supplier existe (produits avec vendeur)
-                if not is_peer_to_peer and product and hasattr(product, 'product_vendor') and product.product_vendor and 'new_order_supplier' in locals():
-                    order_details__supplier = OrderDetailsSupplier.objects.all().filter(
-                        order_supplier=new_order_supplier)
-                    f_total = Decimal('0')
-                    w_total = Decimal('0')
-                    weight = Decimal('0')
-                    for sub in order_details__supplier:
-                        if sub.price and sub.quantity:
-                            f_total += Decimal(str(sub.price)) * Decimal(str(sub.quantity))
-                        if sub.weight and sub.quantity:
-                            w_total += Decimal(str(sub.weight)) * Decimal(str(sub.quantity))
-                    total = f_total
-                    weight = w_total
-                    new_order_supplier.weight = float(weight)
-                    new_order_supplier.amount = str(total)
-                    new_order_supplier.save()
-                request.session['cart_id'] = new_order.id
-                messages.success(request, 'Produit ajouté au panier avec succès !')
-                if is_ajax:
-                    # Compter les articles dans le panier
-                    try:
-                        cart_count = OrderDetails.objects.filter(order=new_order).count()
-                    except Exception:
-                        cart_count = 0
-                    return JsonResponse({'success': True, 'message': 'Produit ajouté au panier avec succès !', 'cart_count': cart_count})
-                return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
+                    cart_service.refresh_totals(new_order)
+                    # code for total amount supplier order - seulement si new_order_supplier existe (produits avec vendeur)
+                    if not is_peer_to_peer and product and hasattr(product, 'product_vendor') and product.product_vendor and 'new_order_supplier' in locals():
+                        cart_service.refresh_supplier_totals(new_order_supplier)
+                    request.session['cart_id'] = new_order.id
+                    messages.success(request, 'Produit ajouté au panier avec succès !')
+                    if is_ajax:
+                        # Compter les articles dans le panier
+                        cart_count = cart_service.cart_count(request.user)
+                        return JsonResponse({'success': True, 'message': 'Produit ajouté au panier avec succès !', 'cart_count': cart_count})
+                    return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
         else:
             if is_ajax:
                 return JsonResponse({'success': False, 'error': 'Vous devez d\'abord vous connecter pour ajouter un produit au panier.', 'requires_login': True}, status=403)
@@ -728,12 +557,10 @@ def cart(request):
         request.session['currency'] = settings.DEFAULT_CURRENCY
 
     if "code" in request.POST:
-        now = timezone.now()
         code = request.POST['code']
         request.session['code'] = code
-        coupon = None
-        if Coupon.objects.all().filter(code=code, active=True):
-            coupon = Coupon.objects.get(code=code, active=True)
+        coupon = Coupon.objects.filter(code=code, active=True).first()
+        if coupon:
             request.session['coupon_id'] = coupon.id
             messages.success(
                 request, 'Code de réduction ajouté avec succès')
@@ -748,85 +575,34 @@ def cart(request):
     # Plus de gestion des pays, on travaille uniquement au Gabon
     provinces = Province.objects.all()
 
-    try:
+    with transaction.atomic():
         # Utilisateur doit être authentifié (décorateur @login_required)
-        order_view = Order.objects.all().filter(
-            user=request.user, is_finished=False).first()
-        if order_view:
-            request.session['cart_id'] = order_view.id
-    except Exception as e:
-        order_view = None
-
-    if order_view:
-        try:
-            blance = Profile.objects.get(user=request.user).balance
-
-        except Exception:
-            blance = 0
+        order = cart_service.open_order(request.user, lock=True)
+        if order:
+            request.session['cart_id'] = order.id
+            coupon = None
+            coupon_id = request.session.get("coupon_id")
+            if coupon_id:
+                coupon = Coupon.objects.filter(id=coupon_id).first()
+            # Écriture seulement si les montants enregistrés ont changé
+            totals = cart_service.refresh_totals(order, coupon=coupon)
 
-        if request.user.is_authenticated and not request.user.is_anonymous:
-            order = Order.objects.filter(
-                user=request.user, is_finished=False).first()
-        else:
-            order = Order.objects.get(id=cart_id, is_finished=False)
+    if order:
+        # Profil utilisateur : solde et pré-remplissage du formulaire
+        profile = Profile.objects.filter(user=request.user).first()
+        blance = profile.balance if profile else 0
 
         order_details = OrderDetails.objects.all().filter(order=order)
 
         # Vérifier s'il y a des articles peer-to-peer dans le panier
         has_peer_products = order_details.filter(peer_product__isnull=False).exists()
 
-        coupon_id = None
-        value = None
-        total = None
-        weight = None
-        code = None
-        f_total = 0
-        w_total = 0
-        for sub in order_details:
-            f_total += sub.price * sub.quantity
-            w_total += sub.weight * sub.quantity
-            total = f_total
-            weight = w_total
-
-        if request.session.get("coupon_id"):
-            coupon_id = request.session.get("coupon_id")
-            code = request.session.get("code")
-            if Coupon.objects.all().filter(id=coupon_id):
-                discount = Coupon.objects.get(id=coupon_id).discount
-                value = (discount / Decimal("100")) * f_total
-                total = f_total-value
-                if order:
-                    if request.user.is_authenticated and not request.user.is_anonymous:
-                        old_orde = Order.objects.get(
-                            user=request.user, is_finished=False)
-                    else:
-                        old_orde = Order.objects.get(
-                            id=cart_id, is_finished=False)
-
-                    old_orde.amount = total
-                    old_orde.discount = value
-                    old_orde.sub_total = f_total
-                    old_orde.coupon = Coupon.objects.get(id=coupon_id)
-                    old_orde.save()
-
-        else:
-            # Utilisateur doit être authentifié (décorateur @login_required)
-            old_orde = Order.objects.get(
-                user=request.user, is_finished=False)
-            old_orde.amount = total
-            old_orde.discount = 0
-            old_orde.sub_total = f_total
-            old_orde.weight = weight
-            old_orde.coupon = None
-            old_orde.save()
-
-        # Récupérer le profil utilisateur pour pré-remplir le formulaire
-        profile = None
-        if request.user.is_authenticated and not request.user.is_anonymous:
-            try:
-                profile = Profile.objects.get(user=request.user)
-            except Profile.DoesNotExist:
-                profile = None
+        f_total = totals.sub_total
+        total = totals.amount
+        weight = totals.weight
+        coupon_id = totals.coupon.id if totals.coupon else None
+        value = totals.discount if totals.coupon else None
+        code = request.session.get("code") if totals.coupon else None
 
         selected_province = resolve_cart_province_selection(
             profile.state if profile else None)
@@ -890,78 +666,42 @@ def remove_item(request, productdeatails_id):
     if not request.session.has_key('currency'):
         request.session['currency'] = settings.DEFAULT_CURRENCY
 
-    item_id = OrderDetails.objects.get(id=productdeatails_id)
-    order = item_id.order
     try:
-        if order.user.id != request.user.id:
-            messages.error(request, 'Vous n\'avez pas l\'autorisation de modifier cette commande.')
-            return redirect('orders:cart')
-        item = OrderDetails.objects.filter(order_id=order.id).count()
-        if item <= 1:
-            try:
+        with transaction.atomic():
+            order = cart_service.open_order(request.user, lock=True)
+            item_id = OrderDetails.objects.filter(id=productdeatails_id, order=order).first() if order else None
+            if item_id is None:
+                messages.error(request, 'Vous n\'avez pas l\'autorisation de modifier cette commande.')
+                return redirect('orders:cart')
+            item = OrderDetails.objects.filter(order_id=order.id).count()
+            if item <= 1:
                 order.delete()
                 if "coupon_id" in request.session.keys():
                     del request.session["coupon_id"]
                 messages.warning(request, 'Panier vidé')
                 return redirect('orders:cart')
-            except Exception:
-                messages.warning(request, 'Produit supprimé du panier')
-                return redirect('orders:cart')
-        else:
-            all_orders = OrderDetails.objects.filter(order_id=order.id).exclude(id=productdeatails_id)
-            f_total = Decimal('0')
-            w_total = Decimal('0')
-            for sub in all_orders:
-                if sub.price and sub.quantity:
-                    f_total += Decimal(str(sub.price)) * Decimal(str(sub.quantity))
-                if sub.weight and sub.quantity:
-                    w_total += Decimal(str(sub.weight)) * Decimal(str(sub.quantity))
-
-            order.sub_total = str(f_total)
-            order.weight = float(w_total)
-            order.amount = str(f_total)
-            order.save()
-
-            if item_id.peer_product:
-                item_id.delete()
-                messages.warning(request, 'Produit supprimé du panier')
-                return redirect('orders:cart')
-            elif item_id.product and hasattr(item_id.product, 'product_vendor') and item_id.product.product_vendor:
-                try:
-                    item_supplier = OrderDetailsSupplier.objects.get(order_details=item_id)
-                    obj_order_supplier = OrderSupplier.objects.get(
-                        is_finished=False, order=order, vendor=item_id.product.product_vendor)
 
+            if item_id.product and hasattr(item_id.product, 'product_vendor') and item_id.product.product_vendor:
+                obj_order_supplier = OrderSupplier.objects.filter(
+                    is_finished=False, order=order, vendor=item_id.product.product_vendor).first()
+                if obj_order_supplier and OrderDetailsSupplier.objects.filter(order_details=item_id).exists():
                     item_supplier_count = OrderDetailsSupplier.objects.filter(
                         order_supplier=obj_order_supplier).count()
-
                     if item_supplier_count == 1:
                         obj_order_supplier.delete()
                         item_id.delete()
                     else:
                         item_id.delete()
-                        order_details__supplier = OrderDetailsSupplier.objects.filter(
-                            order_supplier=obj_order_supplier)
-                        f_total_supplier = Decimal('0')
-                        w_total_supplier = Decimal('0')
-                        for sub in order_details__supplier:
-                            if sub.price and sub.quantity:
-                                f_total_supplier += Decimal(str(sub.price)) * Decimal(str(sub.quantity))
-                            if sub.weight and sub.quantity:
-                                w_total_supplier += Decimal(str(sub.weight)) * Decimal(str(sub.quantity))
-                        obj_order_supplier.weight = float(w_total_supplier)
-                        obj_order_supplier.amount = str(f_total_supplier)
-                        obj_order_supplier.save()
-                    messages.warning(request, 'Produit supprimé du panier')
-                    return redirect('orders:cart')
-                except OrderDetailsSupplier.DoesNotExist:
+                        cart_service.refresh_supplier_totals(obj_order_supplier)
+                else:
                     item_id.delete()
-                    messages.warning(request, 'Produit supprimé du panier')
-                    return redirect('orders:cart')
             else:
                 item_id.delete()
-                messages.warning(request, 'Produit supprimé du panier')
-                return redirect('orders:cart')
+
+            # Totaux recalculés après la suppression (une requête d'agrégation)
+            cart_service.refresh_totals(order)
+        messages.warning(request, 'Produit supprimé du panier')
+        return redirect('orders:cart')
     except Exception:
         messages.warning(request, "Vous ne pouvez pas supprimer ce produit !")
         return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
@@ -1465,17 +1205,8 @@ def invoice_print(request, order_id):
 def get_cart_count(request):
     """Vue AJAX pour obtenir le nombre d'articles dans le panier"""
     try:
-        if request.user.is_authenticated and not request.user.is_anonymous:
-            order = Order.objects.filter(user=request.user, is_finished=False).first()
-        else:
-            # Seuls les utilisateurs authentifiés peuvent avoir un panier
-            order = None
-        
-        if order:
-            cart_count = OrderDetails.objects.filter(order=order).count()
-        else:
-            cart_count = 0
-        
+        # Seuls les utilisateurs authentifiés peuvent avoir un panier
+        cart_count = cart_service.cart_count(request.user)
         return JsonResponse({'cart_count': cart_count})
     except Exception as e:
         return JsonResponse({'cart_count': 0, 'error': str(e)})
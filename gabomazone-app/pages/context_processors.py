@@ -1,9 +1,15 @@
-
+from project.context_cache import get_or_build
+from project.lazy_context import lazy_processor
 from .models import PagesList
 
+CONTEXT_CACHE_NAMESPACE = 'pages'
+
 
+@lazy_processor('pages_list')
 def pages_list_obj(request):
-    pages_list = PagesList.objects.all().filter(active = True)
+    pages_list = get_or_build(
+        CONTEXT_CACHE_NAMESPACE,
+        lambda: list(PagesList.objects.all().filter(active = True)))
   
     return {
         'pages_list': pages_list,
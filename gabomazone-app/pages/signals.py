@@ -0,0 +1,8 @@
+"""
+Invalidation du cache de la liste des pages utilisé par les context processors
+"""
+from project.context_cache import invalidate_on
+from .context_processors import CONTEXT_CACHE_NAMESPACE
+from .models import PagesList
+
+invalidate_on(CONTEXT_CACHE_NAMESPACE, PagesList)
@@ -1,10 +1,12 @@
+from project.lazy_context import lazy_processor
+from project.schema_registry import table_exists
 from .models import ProductFavorite, Product
-from django.db import connection
 from django.db.models import Q
 from django.urls import reverse
-from accounts.models import PeerToPeerProductFavorite, ProductConversation, B2CProductConversation
+from accounts.models import PeerToPeerProductFavorite, UserNotificationCounter
 
 
+@lazy_processor('new_products')
 def new_products_obj(request):
     """Context processor pour les nouveaux produits"""
     try:
@@ -18,13 +20,13 @@ def new_products_obj(request):
         }
 
 
+@lazy_processor('wishlist_count')
 def wishlist_count(request):
     """Context processor pour le compteur de la liste à souhaits (produits normaux + articles d'occasion)"""
     try:
         # Vérifier si les tables existent
-        existing_tables = connection.introspection.table_names()
-        product_fav_table_exists = ProductFavorite._meta.db_table in existing_tables
-        peer_fav_table_exists = PeerToPeerProductFavorite._meta.db_table in existing_tables
+        product_fav_table_exists = table_exists(ProductFavorite._meta.db_table)
+        peer_fav_table_exists = table_exists(PeerToPeerProductFavorite._meta.db_table)
         
         if not product_fav_table_exists and not peer_fav_table_exists:
             return {'wishlist_count': 0}
@@ -52,80 +54,35 @@ def wishlist_count(request):
         return {'wishlist_count': 0}
 
 
+@lazy_processor('messages_count', 'unread_messages_count', 'unread_orders_count',
+                'total_notifications_count', 'b2c_unread_messages_count')
 def messages_count(request):
     """Context processor pour le compteur de messages non lus, commandes et notifications totales"""
     try:
-        if not request.user.is_authenticated:
+        if (not request.user.is_authenticated
+                or not table_exists('accounts_usernotificationcounter')):
             return {
                 'messages_count': 0,
                 'unread_messages_count': 0,
                 'unread_orders_count': 0,
                 'total_notifications_count': 0,
+                'b2c_unread_messages_count': 0,
             }
         
-        total_unread_messages = 0
-        total_unread_orders = 0
-        total_unread_intents = 0
-        
-        # Vérifier si les tables existent
-        existing_tables = connection.introspection.table_names()
-        conv_table_exists = 'accounts_productconversation' in existing_tables
-        notif_table_exists = 'accounts_peertopeerordernotification' in existing_tables
-        intent_table_exists = 'c2c_purchaseintent' in existing_tables
-        
-        # Messages non lus dans les conversations (hors conversations archivées)
-        if conv_table_exists:
-            # Messages non lus en tant que vendeur
-            seller_conversations = ProductConversation.objects.filter(
-                seller=request.user, is_archived_by_seller=False)
-            for conv in seller_conversations:
-                total_unread_messages += conv.get_unread_count_for_seller()
+        # Compteurs dénormalisés (UserNotificationCounter) : une seule lecture
+        counter = UserNotificationCounter.get_for_user(request.user)
 
-            # Messages non lus en tant qu'acheteur
-            buyer_conversations = ProductConversation.objects.filter(
-                buyer=request.user, is_archived_by_buyer=False)
-            for conv in buyer_conversations:
-                total_unread_messages += conv.get_unread_count_for_buyer()
-        
-        # Commandes non lues (notifications peer-to-peer)
-        if notif_table_exists:
-            from accounts.models import PeerToPeerOrderNotification
-            total_unread_orders = PeerToPeerOrderNotification.objects.filter(
-                seller=request.user,
-                is_read=False
-            ).count()
-        
-        # Intentions d'achat non notifiées (ajouter aux notifications de commandes)
-        if intent_table_exists:
-            from c2c.models import PurchaseIntent
-            total_unread_intents = PurchaseIntent.objects.filter(
-                seller=request.user,
-                seller_notified=False,
-                status__in=[
-                    PurchaseIntent.PENDING,
-                    PurchaseIntent.AWAITING_AVAILABILITY,
-                    PurchaseIntent.NEGOTIATING,
-                ]
-            ).count()
-        
-        # Total des messages non lus (conversations uniquement)
-        unread_messages = total_unread_messages
+        # Messages non lus (conversations C2C hors archivées)
+        unread_messages = counter.unread_c2c_messages
         
-        # Total des commandes non lues (commandes + intentions d'achat)
-        unread_orders = total_unread_orders + total_unread_intents
+        # Commandes non lues (notifications peer-to-peer + intentions d'achat)
+        unread_orders = counter.unread_orders
         
         # Total des notifications (messages + commandes)
-        total_notifications = unread_messages + unread_orders
+        total_notifications = counter.total_notifications
         
         # Messagerie B2C produit : badge uniquement côté vendeur pro (interface dans le dashboard vendeur)
-        b2c_unread_messages_count = 0
-        b2c_conv_table_exists = 'accounts_b2cproductconversation' in existing_tables
-        if b2c_conv_table_exists:
-            from accounts.models import Profile
-            prof = Profile.objects.filter(user=request.user).first()
-            if prof and prof.status == 'vendor' and prof.admission:
-                for conv in B2CProductConversation.objects.filter(vendor=request.user):
-                    b2c_unread_messages_count += conv.unread_for_vendor()
+        b2c_unread_messages_count = counter.unread_b2c_messages
 
         return {
             'messages_count': total_notifications,  # Pour compatibilité
@@ -148,6 +105,7 @@ def messages_count(request):
         }
 
 
+@lazy_processor('pending_c2c_meeting')
 def pending_c2c_meeting_for_modal(request):
     """
     Commande C2C où l'utilisateur doit confirmer un point de rencontre proposé par l'autre partie.
@@ -158,8 +116,7 @@ def pending_c2c_meeting_for_modal(request):
     try:
         from c2c.models import C2COrder
 
-        existing_tables = connection.introspection.table_names()
-        if 'c2c_c2corder' not in existing_tables:
+        if not table_exists('c2c_c2corder'):
             return {'pending_c2c_meeting': None}
 
         order = (
@@ -0,0 +1,87 @@
+"""
+Manifeste d'images précalculé des cartes produit (Product, PeerToPeerProduct).
+
+Les listings reconstruisaient, pour chaque carte, la liste des chemins
+/media/ des images puis l'encodaient en JSON. Le manifeste est calculé une
+seule fois à l'enregistrement du produit (post_save) et stocké déjà sérialisé
+dans image_manifest : les templates l'émettent tel quel (data-images).
+
+Format : liste JSON d'objets {"url", "w", "h"} dans l'ordre d'affichage
+(image principale puis images supplémentaires). Les dimensions ne sont lues
+que pour les images nouvelles ou modifiées ; elles valent null si le fichier
+est illisible. La sérialisation échappe ' < > & pour rester sûre dans un
+attribut HTML entre apostrophes.
+"""
+import json
+import logging
+
+from django.db.models.signals import post_save
+
+logger = logging.getLogger(__name__)
+
+_ESCAPES = {ord("'"): '\\u0027', ord('<'): '\\u003C', ord('>'): '\\u003E', ord('&'): '\\u0026'}
+
+
+def dumps(entries):
+    """Sérialise un manifeste (JSON compact, sûr dans un attribut HTML)."""
+    return json.dumps(entries, separators=(',', ':')).translate(_ESCAPES)
+
+
+def loads(manifest):
+    """Liste des entrées d'un manifeste sérialisé ([] si vide ou illisible)."""
+    try:
+        entries = json.loads(manifest or '[]')
+    except ValueError:
+        return []
+    return entries if isinstance(entries, list) else []
+
+
+def _dimensions(fieldfile):
+    try:
+        return fieldfile.width, fieldfile.height
+    except Exception as e:
+        logger.warning("Dimensions illisibles pour %s: %s", fieldfile.name, e)
+        return None, None
+
+
+def build_manifest(instance, previous=''):
+    """
+    Manifeste sérialisé de instance (champs instance.CARD_IMAGE_FIELDS).
+    Les dimensions déjà connues dans previous sont réutilisées.
+    """
+    known = {entry.get('url'): entry for entry in loads(previous) if isinstance(entry, dict)}
+    entries = []
+    for field_name in instance.CARD_IMAGE_FIELDS:
+        fieldfile = getattr(instance, field_name)
+        if not fieldfile:
+            continue
+        url = fieldfile.url
+        entry = known.get(url)
+        if entry is None:
+            width, height = _dimensions(fieldfile)
+            entry = {'url': url, 'w': width, 'h': height}
+        entries.append(entry)
+    return dumps(entries)
+
+
+def refresh_manifest(instance):
+    """Recalcule et enregistre le manifeste si les images ont changé. Retourne True si modifié."""
+    manifest = build_manifest(instance, instance.image_manifest)
+    if manifest == instance.image_manifest:
+        return False
+    type(instance).objects.filter(pk=instance.pk).update(image_manifest=manifest)
+    instance.image_manifest = manifest
+    return True
+
+
+def track_image_manifest(model):
+    """Recalcule le manifeste de model à chaque enregistrement touchant ses images."""
+    def _saved(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw:
+            return
+        if update_fields is not None and not set(update_fields) & set(model.CARD_IMAGE_FIELDS):
+            return
+        refresh_manifest(instance)
+
+    post_save.connect(_saved, sender=model, weak=False,
+                      dispatch_uid=f'image_manifest:{model._meta.label_lower}')
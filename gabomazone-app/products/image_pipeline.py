@@ -0,0 +1,206 @@
+"""
+Traitement des images en arrière-plan : Product, ProductImage et
+PeerToPeerProduct.
+
+L'enregistrement d'un produit ne décode plus ses images (l'ancien
+compress() de Product.save / ProductImage.save pouvait traiter deux fois la
+même image d'un nouveau produit, et les images C2C n'étaient jamais
+réduites). Le fichier envoyé est stocké tel quel et conservé comme original ;
+après validation de la transaction, la tâche Celery
+products.tasks.process_images produit ses déclinaisons WebP (RENDITIONS) :
+- card : vignette des cartes de listing ;
+- detail : image de la page détail ;
+- zoom : agrandissement (aperçu plein écran).
+
+Les déclinaisons sont rangées à côté de l'original :
+products/imgs/robe.jpg -> products/imgs/robe.jpg.card.webp,
+robe.jpg.detail.webp, robe.jpg.zoom.webp. Le champ désigne ensuite la
+déclinaison detail : les templates qui affichent image.url servent donc une
+image réduite, et le filtre srcset (products/templatetags/image_renditions.py)
+donne les trois largeurs au navigateur.
+
+Sans broker (IMAGE_PIPELINE_ASYNC faux, développement) ou si l'envoi de la
+tâche échoue, le traitement s'exécute dans le processus après le commit.
+Une déclinaison déjà présente dans le stockage n'est jamais recalculée, et le
+champ n'est modifié que s'il désigne toujours l'original traité.
+"""
+import logging
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_save
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Déclinaison -> (côté maximal en pixels, qualité WebP)
+RENDITIONS = {
+    'card': (480, 70),
+    'detail': (1100, 75),
+    'zoom': (2000, 80),
+}
+# Ordre de calcul : chaque déclinaison est réduite depuis la précédente
+ORDER = ('zoom', 'detail', 'card')
+PROCESSED_SUFFIX = '.detail.webp'
+
+# Modèle -> champs suivis (track_image_pipeline)
+_tracked = {}
+
+
+def is_processed(name):
+    """Vrai si name désigne déjà une déclinaison detail."""
+    return str(name or '').endswith(PROCESSED_SUFFIX)
+
+
+def original_name(name):
+    """Nom de l'original d'une image (name lui-même s'il n'est pas traité)."""
+    name = str(name or '')
+    return name[:-len(PROCESSED_SUFFIX)] if is_processed(name) else name
+
+
+def rendition_name(name, rendition):
+    """Nom de la déclinaison rendition de l'image name (original ou déclinaison detail)."""
+    return f'{original_name(name)}.{rendition}.webp'
+
+
+def pending_fields(instance, fields):
+    """Champs de instance dont l'image attend son traitement (images par défaut exclues)."""
+    pending = []
+    for field_name in fields:
+        fieldfile = getattr(instance, field_name)
+        default = instance._meta.get_field(field_name).default
+        if fieldfile and not is_processed(fieldfile.name) and fieldfile.name != default:
+            pending.append(field_name)
+    return pending
+
+
+def prepare(image, size):
+    """
+    Image prête à réduire vers size pixels au plus : décodage JPEG directement
+    à l'échelle réduite la plus proche (draft), orientation EXIF appliquée,
+    mode RGB (RGBA si l'image a de la transparence).
+    """
+    image.draft('RGB', (size, size))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if alpha else 'RGB')
+    return image
+
+
+def _encode(image, quality):
+    buffer = BytesIO()
+    image.save(buffer, format='WEBP', quality=quality, method=4)
+    return ContentFile(buffer.getvalue())
+
+
+def build_renditions(storage, name):
+    """Crée les déclinaisons manquantes de l'image name. Retourne les noms créés."""
+    missing = [rendition for rendition in ORDER if not storage.exists(rendition_name(name, rendition))]
+    if not missing:
+        return []
+    created = []
+    with storage.open(name, 'rb') as source:
+        largest = RENDITIONS[ORDER[0]][0]
+        image = prepare(Image.open(source), largest)
+        for rendition in ORDER:
+            size, quality = RENDITIONS[rendition]
+            image.thumbnail((size, size))
+            if rendition not in missing:
+                continue
+            target = rendition_name(name, rendition)
+            saved = storage.save(target, _encode(image, quality))
+            if saved != target:
+                # Déclinaison écrite entre-temps par un autre traitement
+                storage.delete(saved)
+                continue
+            created.append(saved)
+    return created
+
+
+def process_images(model, pk, fields):
+    """
+    Produit les déclinaisons des images en attente de l'objet model(pk) et
+    fait pointer les champs sur la déclinaison detail. Retourne le nombre de
+    champs mis à jour.
+    """
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return 0
+    done = {}
+    for field_name in pending_fields(instance, fields):
+        fieldfile = getattr(instance, field_name)
+        try:
+            build_renditions(fieldfile.storage, fieldfile.name)
+        except Exception as e:
+            logger.warning("Déclinaisons impossibles pour %s: %s", fieldfile.name, e)
+            continue
+        if not fieldfile.storage.exists(rendition_name(fieldfile.name, 'detail')):
+            # Le champ ne doit jamais désigner une déclinaison absente
+            logger.warning("Déclinaison detail absente pour %s", fieldfile.name)
+            continue
+        done[field_name] = fieldfile.name
+    if not done:
+        return 0
+
+    with transaction.atomic():
+        instance = model.objects.select_for_update().filter(pk=pk).first()
+        if instance is None:
+            return 0
+        # Une image remplacée pendant le traitement garde sa propre tâche
+        changed = [field_name for field_name, name in done.items()
+                   if getattr(instance, field_name).name == name]
+        for field_name in changed:
+            setattr(instance, field_name, rendition_name(done[field_name], 'detail'))
+        if changed:
+            # save() : manifeste, cache de pages et index de recherche suivent
+            instance.save(update_fields=changed)
+    return len(changed)
+
+
+def run(label, pk, fields):
+    """Point d'entrée de la tâche : model désigné par son label ('products.Product')."""
+    return process_images(apps.get_model(label), pk, fields)
+
+
+def enqueue(instance, fields):
+    """Planifie le traitement des champs fields après le commit de l'enregistrement."""
+    label, pk, fields = instance._meta.label, instance.pk, list(fields)
+
+    def _send():
+        if settings.IMAGE_PIPELINE_ASYNC:
+            try:
+                from .tasks import process_images as task
+                task.delay(label, pk, fields)
+                return
+            except Exception as e:
+                logger.warning("Tâche d'images non envoyée, traitement immédiat: %s", e)
+        run(label, pk, fields)
+
+    transaction.on_commit(_send)
+
+
+def tracked_models():
+    """{modèle: champs} des modèles dont les images passent par le pipeline."""
+    return dict(_tracked)
+
+
+def track_image_pipeline(model, fields):
+    """Planifie le traitement des nouvelles images de model à chaque enregistrement."""
+    fields = tuple(fields)
+    _tracked[model] = fields
+
+    def _saved(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw:
+            return
+        if update_fields is not None and not set(update_fields) & set(fields):
+            return
+        pending = pending_fields(instance, fields)
+        if pending:
+            enqueue(instance, pending)
+
+    post_save.connect(_saved, sender=model, weak=False,
+                      dispatch_uid=f'image_pipeline:{model._meta.label_lower}')
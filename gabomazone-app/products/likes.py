@@ -0,0 +1,44 @@
+"""
+Compteurs de favoris dénormalisés : Product.like_count et
+PeerToPeerProduct.like_count.
+
+Les listings trient et affichent les favoris sans jointure ni COUNT par
+ligne. Le compteur est maintenu atomiquement (expressions F) à la création
+et à la suppression d'un favori ; rebuild_like_counts() le recalcule depuis
+les favoris (commande rebuild_like_counts).
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save
+
+
+def _bump(product_model, product_id, delta):
+    product_model.objects.filter(pk=product_id).update(
+        like_count=Greatest(F('like_count') + delta, 0))
+
+
+def track_likes(favorite_model):
+    """Connecte les signaux d'un modèle de favoris au like_count de son produit."""
+    product_model = favorite_model._meta.get_field('product').related_model
+
+    def _created(sender, instance, created, raw=False, **kwargs):
+        if created and not raw:
+            _bump(product_model, instance.product_id, 1)
+
+    def _deleted(sender, instance, **kwargs):
+        _bump(product_model, instance.product_id, -1)
+
+    uid = f'like_count:{favorite_model._meta.label_lower}'
+    post_save.connect(_created, sender=favorite_model, weak=False, dispatch_uid=uid)
+    post_delete.connect(_deleted, sender=favorite_model, weak=False, dispatch_uid=uid)
+
+
+def rebuild_like_counts(product_model, favorite_model, ids=None):
+    """Recalcule like_count depuis les favoris (une requête UPDATE). Retourne le nombre de lignes."""
+    likes = (favorite_model.objects.filter(product=OuterRef('pk'))
+             .order_by().values('product').annotate(n=Count('pk')).values('n'))
+    queryset = product_model.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    return queryset.update(like_count=Coalesce(
+        Subquery(likes, output_field=IntegerField()), Value(0)))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import PeerToPeerProduct
+from products.image_manifest import refresh_manifest
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Calcule le manifeste d'images des cartes (Product / PeerToPeerProduct.image_manifest)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help="Relit les dimensions de toutes les images, même déjà connues.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for model in (Product, PeerToPeerProduct):
+            queryset = model.objects.only('pk', 'image_manifest', *model.CARD_IMAGE_FIELDS)
+            if not options['force']:
+                queryset = queryset.filter(image_manifest='')
+            updated = 0
+            for instance in queryset.order_by('pk').iterator(chunk_size=options['batch_size']):
+                if options['force']:
+                    instance.image_manifest = ''
+                updated += refresh_manifest(instance)
+            self.stdout.write(self.style.SUCCESS(
+                f"{model._meta.verbose_name_plural} : {updated} manifeste(s) mis à jour."))
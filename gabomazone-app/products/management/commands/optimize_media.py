@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from products.media_optimizer import optimize_media
+
+
+class Command(BaseCommand):
+    help = ("Ré-encode les images existantes (catalogue, C2C, catégories, publicités) "
+            "en parallèle ; reprend là où une exécution précédente s'est arrêtée")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Nombre de processus (par défaut : nombre de cœurs).")
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Images traitées entre deux écritures en base et du manifeste.")
+        parser.add_argument('--manifest', default=None,
+                            help="Fichier manifeste (par défaut : MEDIA_ROOT/.optimize_media.json).")
+        parser.add_argument('--reset', action='store_true',
+                            help="Ignore le manifeste existant (les déclinaisons présentes restent réutilisées).")
+
+    def handle(self, *args, **options):
+        stats = optimize_media(workers=options['workers'], batch_size=options['batch_size'],
+                               manifest_path=options['manifest'], reset=options['reset'],
+                               log=self.stdout.write)
+        before, after, seconds = stats['bytes_before'], stats['bytes_after'], stats['seconds']
+        saved = before - after
+        self.stdout.write(
+            f"{stats['walked']} fichier(s) parcouru(s), {stats['processed']} image(s) traitée(s), "
+            f"{stats['skipped']} déjà traitée(s) (manifeste), {stats['missing']} absente(s) du disque, "
+            f"{stats['errors']} erreur(s) ; {stats['fields']} champ(s) mis à jour.")
+        if seconds:
+            self.stdout.write(
+                f"Débit : {stats['processed'] / seconds:.1f} image(s)/s, "
+                f"{before / seconds / 1024 / 1024:.1f} Mo/s lus en {seconds:.1f} s.")
+        ratio = f" ({saved * 100 / before:.0f} %)" if before else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"Octets servis : {before} avant, {after} après, {saved} gagné(s){ratio}."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import PeerToPeerProduct, PeerToPeerProductFavorite
+from products.likes import rebuild_like_counts
+from products.models import Product, ProductFavorite
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs de favoris dénormalisés (Product / PeerToPeerProduct.like_count)'
+
+    def handle(self, *args, **options):
+        shop = rebuild_like_counts(Product, ProductFavorite)
+        peer = rebuild_like_counts(PeerToPeerProduct, PeerToPeerProductFavorite)
+        self.stdout.write(self.style.SUCCESS(
+            f'{shop} produit(s) et {peer} article(s) C2C recalculé(s).'))
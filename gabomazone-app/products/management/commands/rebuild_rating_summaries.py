@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product, ProductRating, ProductRatingSummary
+from products.ratings import rebuild_rating_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les résumés de notes (ProductRatingSummary, Product.feedbak_*) depuis les notes'
+
+    def handle(self, *args, **options):
+        count = rebuild_rating_summaries(Product, ProductRating, ProductRatingSummary)
+        self.stdout.write(self.style.SUCCESS(f'{count} résumé(s) de notes recalculé(s).'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.related import rebuild_related_products
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les produits similaires précalculés (Product / PeerToPeerProduct.related_ids)'
+
+    def handle(self, *args, **options):
+        written = rebuild_related_products()
+        self.stdout.write(self.style.SUCCESS(f'{written} liste(s) de produits similaires modifiée(s).'))
@@ -0,0 +1,285 @@
+"""
+Ré-encodage en masse de la médiathèque existante (commande optimize_media).
+
+Les images envoyées avant products/image_pipeline.py (ou qui l'ont contourné)
+sont servies telles quelles. optimize_media() les traite hors ligne :
+- catalogue (Product, ProductImage, PeerToPeerProduct) : déclinaisons card /
+  detail / zoom du pipeline, le champ désigne ensuite la déclinaison detail ;
+- catégories et publicités : ré-encodage WebP (côté maximal MAX_SIZE) sous
+  <nom>.opt.webp, retenu seulement s'il est plus léger que l'original.
+
+Déroulement :
+1. les chemins encore non traités sont relevés en base, champ par champ ;
+2. l'arborescence MEDIA_ROOT est parcourue (hors cache de vignettes) et
+   chaque fichier référencé est haché (SHA-256) ;
+3. un contenu déjà présent dans le manifeste n'est pas décodé : ses champs
+   reçoivent le résultat déjà produit ; les autres contenus (une seule fois
+   par contenu, même s'il est présent sous plusieurs noms) sont répartis sur
+   un ProcessPoolExecutor ;
+4. les champs sont mis à jour par lots et le manifeste est enregistré après
+   chaque lot : une exécution interrompue reprend là où elle s'était arrêtée.
+
+Chaque champ n'est réécrit que s'il désigne encore le nom relevé à l'étape 1
+(UPDATE ... WHERE champ = ancien nom) : une image remplacée pendant
+l'exécution est conservée, et les références MediaBlob tenues par
+track_blobs restent justes (la déclinaison detail compte pour son blob).
+
+Ces UPDATE ne déclenchent pas post_save : après chaque lot, les manifestes
+d'images des produits concernés sont recalculés et leurs pages en cache, ainsi
+que les caches des catégories et publicités, sont périmés.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from PIL import Image
+
+from project import context_cache
+from project.page_cache import invalidate_page
+from project.thumbnails import CACHE_DIR
+
+from .image_manifest import build_manifest
+from .image_pipeline import build_renditions, is_processed, prepare, rendition_name, tracked_models
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '.optimize_media.json'
+REENCODED_SUFFIX = '.opt.webp'
+MAX_SIZE = 2000
+QUALITY = 80
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff')
+
+CATALOG, REENCODE = 'catalog', 'reencode'
+
+# page : None, 'self' (page détail de l'objet) ou clé étrangère vers l'objet affiché
+Target = namedtuple('Target', 'model fields mode namespace page')
+
+
+def _targets():
+    from accounts.models import PeerToPeerProduct
+    from categories.models import MainCategory, MiniCategory, SubCategory, SuperCategory
+    from categories.tree import CACHE_NAMESPACE as CATEGORIES_NAMESPACE
+    from home.ad_rotation import PLACEMENTS
+    from home.models import Carousel, HomeAdSidebar
+    from .models import Product, ProductImage
+
+    tracked = tracked_models()
+    targets = [
+        Target(Product, tracked[Product], CATALOG, None, 'self'),
+        Target(ProductImage, tracked[ProductImage], CATALOG, None, 'PRDIProduct'),
+        Target(PeerToPeerProduct, tracked[PeerToPeerProduct], CATALOG, None, 'self'),
+    ]
+    targets += [Target(model, ('category_image',), REENCODE, CATEGORIES_NAMESPACE, None)
+                for model in (SuperCategory, MainCategory, SubCategory, MiniCategory)]
+    targets += [Target(placement.model, ('ad_mage',), REENCODE, placement.namespace, None)
+                for placement in PLACEMENTS.values()
+                if any(field.name == 'ad_mage' for field in placement.model._meta.fields)]
+    targets += [Target(Carousel, ('CARImage',), REENCODE, None, None),
+                Target(HomeAdSidebar, ('ad_mage',), REENCODE, None, None)]
+    return targets
+
+
+def is_done(name, mode):
+    return is_processed(name) if mode == CATALOG else name.endswith(REENCODED_SUFFIX)
+
+
+def references(targets):
+    """{(nom, mode): [(target, champ, pk)]} des images encore à traiter."""
+    refs = defaultdict(list)
+    for target in targets:
+        for field in target.fields:
+            default = target.model._meta.get_field(field).default
+            rows = (target.model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+                    .values_list('pk', field))
+            for pk, name in rows.iterator():
+                if name != default and not is_done(name, target.mode):
+                    refs[(name, target.mode)].append((target, field, pk))
+    return refs
+
+
+def walk(root):
+    """Noms (relatifs, séparateur /) des images sous root, hors cache de vignettes."""
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(name for name in dirs if directory != root or name != CACHE_DIR)
+        for filename in sorted(files):
+            if filename.lower().endswith(EXTENSIONS):
+                yield os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, '/')
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def reencode(storage, name):
+    """WebP de name (côté maximal MAX_SIZE) ; None s'il n'est pas plus léger ou si l'image est animée."""
+    target = f'{name}{REENCODED_SUFFIX}'
+    if storage.exists(target):
+        return target
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        if getattr(image, 'is_animated', False):
+            return None
+        image = prepare(image, MAX_SIZE)
+        image.thumbnail((MAX_SIZE, MAX_SIZE))
+        buffer = BytesIO()
+        image.save(buffer, format='WEBP', quality=QUALITY, method=4)
+    if buffer.tell() >= storage.size(name):
+        return None
+    return storage.save(target, ContentFile(buffer.getvalue()))
+
+
+def _init_worker():
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def optimize_file(root, name, mode):
+    """
+    Traite un fichier (processus de travail, sans accès à la base).
+    Retourne (résultat ou None, octets de l'original, octets du résultat servi).
+    """
+    storage = FileSystemStorage(location=root)
+    before = storage.size(name)
+    if mode == CATALOG:
+        build_renditions(storage, name)
+        result = rendition_name(name, 'detail')
+    else:
+        result = reencode(storage, name)
+    return result, before, storage.size(result) if result else before
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get('results', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, results):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump({'results': results}, f)
+    os.replace(temporary, path)
+
+
+def apply_updates(updates, batch_size):
+    """
+    Écrit {(target, champ): {pk: (ancien nom, nouveau nom)}} là où le champ vaut
+    encore l'ancien nom, puis rafraîchit manifestes et caches. Retourne le
+    nombre de champs mis à jour.
+    """
+    by_target = defaultdict(set)
+    applied = 0
+    for (target, field), names in updates.items():
+        rows = list(names.items())
+        for start in range(0, len(rows), batch_size):
+            with transaction.atomic():
+                for pk, (old, new) in rows[start:start + batch_size]:
+                    if target.model.objects.filter(pk=pk, **{field: old}).update(**{field: new}):
+                        by_target[target].add(pk)
+                        applied += 1
+                    else:
+                        logger.info("%s %s : %s modifié pendant l'exécution, ignoré",
+                                    target.model._meta.label, pk, field)
+
+    namespaces = set()
+    for target, pks in by_target.items():
+        if target.namespace:
+            namespaces.add(target.namespace)
+        if target.page == 'self':
+            manifests = []
+            for instance in target.model.objects.filter(pk__in=pks).only(
+                    'pk', 'image_manifest', *target.model.CARD_IMAGE_FIELDS):
+                manifest = build_manifest(instance, instance.image_manifest)
+                if manifest != instance.image_manifest:
+                    instance.image_manifest = manifest
+                    manifests.append(instance)
+            target.model.objects.bulk_update(manifests, ['image_manifest'], batch_size=batch_size)
+            for pk in pks:
+                invalidate_page(target.model, pk)
+        elif target.page:
+            parent = target.model._meta.get_field(target.page)
+            parents = target.model.objects.filter(pk__in=pks).values_list(parent.attname, flat=True)
+            for pk in set(parents):
+                invalidate_page(parent.related_model, pk)
+    for namespace in namespaces:
+        context_cache.invalidate(namespace)
+    updates.clear()
+    return applied
+
+
+def optimize_media(root=None, workers=None, batch_size=200, manifest_path=None, reset=False, log=None):
+    """Traite la médiathèque ; retourne les statistiques (Counter)."""
+    root = str(root or settings.MEDIA_ROOT)
+    manifest_path = manifest_path or os.path.join(root, MANIFEST_NAME)
+    results = {} if reset else load_manifest(manifest_path)
+    refs = references(_targets())
+    stats = Counter()
+    updates = defaultdict(dict)
+
+    def _assign(names, mode, result):
+        for name in names:
+            for target, field, pk in refs[(name, mode)]:
+                updates[(target, field)][pk] = (name, result)
+
+    # Contenus à traiter : (mode, empreinte) -> noms portant ce contenu
+    jobs = defaultdict(list)
+    for name in walk(root):
+        stats['walked'] += 1
+        for mode in (CATALOG, REENCODE):
+            if (name, mode) not in refs:
+                continue
+            digest = file_hash(os.path.join(root, name))
+            key = f'{mode}:{digest}'
+            if key in results and (results[key] is None or os.path.isfile(os.path.join(root, results[key]))):
+                stats['skipped'] += 1
+                if results[key]:
+                    _assign([name], mode, results[key])
+                continue
+            jobs[(mode, digest)].append(name)
+    stats['missing'] = len(refs) - sum(len(names) for names in jobs.values()) - stats['skipped']
+
+    started = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker) as pool:
+        futures = {pool.submit(optimize_file, root, names[0], mode): (mode, digest, names)
+                   for (mode, digest), names in jobs.items()}
+        for future in as_completed(futures):
+            mode, digest, names = futures[future]
+            try:
+                result, before, after = future.result()
+            except Exception as e:
+                logger.warning("Image %s non traitée: %s", names[0], e)
+                stats['errors'] += 1
+                continue
+            results[f'{mode}:{digest}'] = result
+            stats['processed'] += 1
+            stats['bytes_before'] += before
+            stats['bytes_after'] += after
+            if result:
+                _assign(names, mode, result)
+            if stats['processed'] % batch_size == 0:
+                stats['fields'] += apply_updates(updates, batch_size)
+                save_manifest(manifest_path, results)
+                if log:
+                    log(f"{stats['processed']}/{len(jobs)} image(s) traitée(s)")
+    stats['fields'] += apply_updates(updates, batch_size)
+    save_manifest(manifest_path, results)
+    stats['seconds'] = time.monotonic() - started
+    return stats
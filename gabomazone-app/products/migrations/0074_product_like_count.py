@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:26
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_like_counts(apps, schema_editor):
+    # Modèles historiques seulement : même calcul que products.likes.rebuild_like_counts
+    Product = apps.get_model('products', 'Product')
+    Favorite = apps.get_model('products', 'ProductFavorite')
+    likes = (Favorite.objects.filter(product=OuterRef('pk'))
+             .order_by().values('product').annotate(n=Count('pk')).values('n'))
+    Product.objects.update(like_count=Coalesce(Subquery(likes, output_field=IntegerField()), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0073_product_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Nombre de favoris'),
+        ),
+        migrations.RunPython(backfill_like_counts, migrations.RunPython.noop),
+    ]
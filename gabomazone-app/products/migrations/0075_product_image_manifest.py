@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0074_product_like_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_manifest',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name="Manifeste d'images"),
+        ),
+    ]
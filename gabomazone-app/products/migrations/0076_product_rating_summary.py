@@ -0,0 +1,53 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+STARS = (1, 2, 3, 4, 5)
+
+
+def backfill_rating_summaries(apps, schema_editor):
+    # Modèles historiques seulement : même calcul que products.ratings.rebuild_rating_summaries
+    Product = apps.get_model('products', 'Product')
+    ProductRating = apps.get_model('products', 'ProductRating')
+    ProductRatingSummary = apps.get_model('products', 'ProductRatingSummary')
+    rows = (ProductRating.objects.filter(active=True, rate__in=STARS, PRDIProduct__isnull=False)
+            .order_by().values('PRDIProduct')
+            .annotate(count=Count('pk'), total=Sum('rate'),
+                      **{f'star_{star}': Count('pk', filter=Q(rate=star)) for star in STARS}))
+    ProductRatingSummary.objects.bulk_create(
+        [ProductRatingSummary(product_id=row.pop('PRDIProduct'), **row) for row in rows], batch_size=500)
+
+    summary = ProductRatingSummary.objects.filter(product=OuterRef('pk'))
+    average = Round(Cast(F('total') * 20, FloatField()) / NullIf(F('count'), 0))
+    Product.objects.update(
+        feedbak_number=Coalesce(Subquery(summary.values('count'), output_field=IntegerField()), Value(0)),
+        feedbak_average=Coalesce(Subquery(summary.annotate(average=average).values('average'),
+                                          output_field=IntegerField()), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0075_product_image_manifest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRatingSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='products.product', verbose_name='Product')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Nombre de notes')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Somme des notes')),
+                ('star_1', models.PositiveIntegerField(default=0)),
+                ('star_2', models.PositiveIntegerField(default=0)),
+                ('star_3', models.PositiveIntegerField(default=0)),
+                ('star_4', models.PositiveIntegerField(default=0)),
+                ('star_5', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_rating_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0076_product_rating_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='related_ids',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Produits similaires'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:33
+
+import products.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0077_product_related_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Blob')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='Références')),
+            ],
+            options={
+                'verbose_name': 'Blob média',
+                'verbose_name_plural': 'Blobs média',
+            },
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='additional_image_1',
+            field=models.ImageField(blank=True, max_length=500, null=True, storage=products.storage.content_storage, upload_to='products/imgs/product_imgs/', verbose_name='Additional  Image_1'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='additional_image_2',
+            field=models.ImageField(blank=True, max_length=500, null=True, storage=products.storage.content_storage, upload_to='products/imgs/product_imgs/', verbose_name='Additional  Image_2'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='additional_image_3',
+            field=models.ImageField(blank=True, max_length=500, null=True, storage=products.storage.content_storage, upload_to='products/imgs/product_imgs/', verbose_name='Additional  Image_3'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='additional_image_4',
+            field=models.ImageField(blank=True, max_length=500, null=True, storage=products.storage.content_storage, upload_to='products/imgs/product_imgs/', verbose_name='Additional  Image_4'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='product_image',
+            field=models.ImageField(default='products/product.jpg', max_length=500, storage=products.storage.content_storage, upload_to='products/imgs/', verbose_name='Product Image'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='PRDIImage',
+            field=models.ImageField(max_length=500, storage=products.storage.content_storage, upload_to='products/imgs/product_imgs/', verbose_name='Image'),
+        ),
+    ]
@@ -11,9 +11,6 @@ from django.core import validators
 from django.core.validators import FileExtensionValidator, MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
-from io import BytesIO
-from PIL import Image
-from django.core.files import File
 # Create your models here.
 
 try:
@@ -25,26 +22,11 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.deconstruct import deconstructible
 from ckeditor.fields import RichTextField
 from accounts.models import Profile
+from .storage import content_storage
 from django.core.validators import FileExtensionValidator
 from django.contrib.auth.models import User
 
 
-def compress(image):
-    im = Image.open(image)
-    # create a BytesIO object
-    im_io = BytesIO()
-    if im.mode in ("RGBA", "P"):
-        im = im.convert("RGB")
-    if im.width > 1100 or im.height > 1100:
-        out_size = (1100, 1100)
-        im.thumbnail(out_size)
-    # save image to BytesIO object
-    im.save(im_io, format="webp", quality=20, optimize=True)
-    # create a django-friendly Files object
-    new_image = File(im_io, name=image.name)
-    return new_image
-
-
 class Product(models.Model):
     product_vendor = models.ForeignKey(
         Profile, on_delete=models.CASCADE, verbose_name=_("Product Vendor"), blank=True, null=True,)
@@ -54,7 +36,7 @@ class Product(models.Model):
     # DESCRIPTION
     product_description = models.TextField(verbose_name=_("Short Description"))
     product_image = models.ImageField(
-        upload_to='products/imgs/', default='products/product.jpg', max_length=500, verbose_name=_("Product Image"))
+        upload_to='products/imgs/', storage=content_storage, default='products/product.jpg', max_length=500, verbose_name=_("Product Image"))
     product_minicategor = models.ForeignKey(
         MiniCategory, on_delete=models.SET_NULL, blank=True, null=True, verbose_name=_("Mini Category"))
 
@@ -92,16 +74,16 @@ class Product(models.Model):
             self.save(update_fields=['stock_quantity', 'is_out_of_stock'])
 
     additional_image_1 = models.ImageField(
-        upload_to='products/imgs/product_imgs/', blank=True, null=True, max_length=500, verbose_name=_("Additional  Image_1"), )
+        upload_to='products/imgs/product_imgs/', storage=content_storage, blank=True, null=True, max_length=500, verbose_name=_("Additional  Image_1"), )
 
     additional_image_2 = models.ImageField(
-        upload_to='products/imgs/product_imgs/', blank=True, null=True, max_length=500, verbose_name=_("Additional  Image_2"), )
+        upload_to='products/imgs/product_imgs/', storage=content_storage, blank=True, null=True, max_length=500, verbose_name=_("Additional  Image_2"), )
 
     additional_image_3 = models.ImageField(
-        upload_to='products/imgs/product_imgs/', blank=True, null=True, max_length=500, verbose_name=_("Additional  Image_3"), )
+        upload_to='products/imgs/product_imgs/', storage=content_storage, blank=True, null=True, max_length=500, verbose_name=_("Additional  Image_3"), )
 
     additional_image_4 = models.ImageField(
-        upload_to='products/imgs/product_imgs/', blank=True, null=True, max_length=500, verbose_name=_("Additional  Image_4"),)
+        upload_to='products/imgs/product_imgs/', storage=content_storage, blank=True, null=True, max_length=500, verbose_name=_("Additional  Image_4"),)
 
     # PRDCost = models.FloatField(verbose_name=_("Cost"), blank=True, null=True)
 
@@ -195,21 +177,20 @@ class Product(models.Model):
                                blank=True, null=True, allow_unicode=True, unique=True, verbose_name=_("Slugfiy"))
     view_count = models.PositiveIntegerField(
         default=0, blank=True, null=True, verbose_name=_("Nombre de vues"))
+    # Maintenu par products/likes.py (signaux de ProductFavorite)
+    like_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name=_("Nombre de favoris"))
+    # Manifeste JSON des images de la carte, maintenu par products/image_manifest.py
+    image_manifest = models.TextField(
+        blank=True, default='', editable=False, verbose_name=_("Manifeste d'images"))
+    # Ids des produits similaires classés, calculés par products/related.py
+    related_ids = models.JSONField(
+        default=list, blank=True, editable=False, verbose_name=_("Produits similaires"))
     date = models.DateTimeField(auto_now_add=True, blank=True, null=True)
     date_update = models.DateTimeField(auto_now=True, blank=True, null=True)
-    __original_product_image_name = None
-    __original_additional_image_1_name = None
-    __original_additional_image_2_name = None
-    __original_additional_image_3_name = None
-    __original_additional_image_4_name = None
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.__original_product_image_name = self.product_image
-        self.__original_additional_image_1_name = self.additional_image_1
-        self.__original_additional_image_2_name = self.additional_image_2
-        self.__original_additional_image_3_name = self.additional_image_3
-        self.__original_additional_image_4_name = self.additional_image_4
+    # Images de la carte ; déclinaisons produites par products/image_pipeline.py
+    CARD_IMAGE_FIELDS = ('product_image', 'additional_image_1', 'additional_image_2',
+                         'additional_image_3', 'additional_image_4')
 
     class meta:
 
@@ -248,83 +229,6 @@ class Product(models.Model):
     preview_image_4.short_description = "image 4"
     preview_image_4.allow_tags = True
 
-    def save(self, *args, **kwargs):
-        # main image
-        if self.product_image != self.__original_product_image_name:
-
-            # call the compress function
-            new_image = compress(self.product_image)
-            # set self.image to new_image
-            self.product_image = new_image
-
-        if self.pk is None and self.product_image:
-
-            # call the compress function
-            new_image = compress(self.product_image)
-            # set self.image to new_image
-            self.product_image = new_image
-
-        # additional_image_1
-        if self.additional_image_1 != self.__original_additional_image_1_name:
-
-            # call the compress function
-            new_image_1 = compress(self.additional_image_1)
-            # set self.image to new_image
-            self.additional_image_1 = new_image_1
-
-        if self.pk is None and self.additional_image_1:
-
-            # call the compress function
-            new_image_1 = compress(self.additional_image_1)
-            # set self.image to new_image
-            self.additional_image_1 = new_image_1
-
-        # additional_image_2
-        if self.additional_image_2 != self.__original_additional_image_2_name:
-            # call the compress function
-            new_image_2 = compress(self.additional_image_2)
-            # set self.image to new_image
-            self.additional_image_2 = new_image_2
-
-        if self.pk is None and self.additional_image_2:
-            # call the compress function
-            new_image_2 = compress(self.additional_image_2)
-            # set self.image to new_image
-            self.additional_image_2 = new_image_2
-
-        # additional_image_3
-        if self.additional_image_3 != self.__original_additional_image_3_name:
-            # call the compress function
-            new_image_3 = compress(self.additional_image_3)
-            # set self.image to new_image
-            self.additional_image_3 = new_image_3
-
-        if self.pk is None and self.additional_image_3:
-            # call the compress function
-            new_image_3 = compress(self.additional_image_3)
-            # set self.image to new_image
-            self.additional_image_3 = new_image_3
-
-        # additional_image_4
-        if self.additional_image_4 != self.__original_additional_image_4_name:
-            # call the compress function
-            new_image_4 = compress(self.additional_image_4)
-            # set self.image to new_image
-            self.additional_image_4 = new_image_4
-
-        if self.pk is None and self.additional_image_4:
-            # call the compress function
-            new_image_4 = compress(self.additional_image_4)
-            # set self.image to new_image
-            self.additional_image_4 = new_image_4
-
-        super().save(*args, **kwargs)
-        self.__original_product_image_name = self.product_image
-        self.__original_additional_image_1_name = self.additional_image_1
-        self.__original_additional_image_2_name = self.additional_image_2
-        self.__original_additional_image_3_name = self.additional_image_3
-        self.__original_additional_image_4_name = self.additional_image_4
-
 
 def pre_save_post_receiver(sender, instance, *args, **kwargs):
     if not instance.PRDSlug or instance.PRDSlug is None or instance.PRDSlug == "":
@@ -343,7 +247,7 @@ class ProductImage(models.Model):
     PRDIProduct = models.ForeignKey(
         Product, on_delete=models.CASCADE, verbose_name=_("product"))
     PRDIImage = models.ImageField(
-        upload_to='products/imgs/product_imgs/', max_length=500,  verbose_name=_("Image"))
+        upload_to='products/imgs/product_imgs/', storage=content_storage, max_length=500,  verbose_name=_("Image"))
 
     def __str__(self):
         return str(self.PRDIProduct)
@@ -351,14 +255,6 @@ class ProductImage(models.Model):
     class Meta:
         ordering = ('id',)
 
-    def save(self, *args, **kwargs):
-        # call the compress function
-        new_image = compress(self.PRDIImage)
-        # set self.image to new_image
-        self.PRDIImage = new_image
-        # save
-        super().save(*args, **kwargs)
-
 
 class ProductRating(models.Model):
     PRDIProduct = models.ForeignKey(
@@ -380,6 +276,38 @@ class ProductRating(models.Model):
         return str(self.PRDIProduct)
 
 
+class ProductRatingSummary(models.Model):
+    """
+    Agrégats des notes actives d'un produit (nombre, somme, histogramme),
+    maintenus par products.ratings dans la transaction de chaque note.
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name='rating_summary',
+        verbose_name=_("Product"))
+    count = models.PositiveIntegerField(default=0, verbose_name=_("Nombre de notes"))
+    total = models.PositiveIntegerField(default=0, verbose_name=_("Somme des notes"))
+    star_1 = models.PositiveIntegerField(default=0)
+    star_2 = models.PositiveIntegerField(default=0)
+    star_3 = models.PositiveIntegerField(default=0)
+    star_4 = models.PositiveIntegerField(default=0)
+    star_5 = models.PositiveIntegerField(default=0)
+
+    STARS = (1, 2, 3, 4, 5)
+
+    def __str__(self):
+        return str(self.product)
+
+    @property
+    def average(self):
+        """Note moyenne sur 5 (0 sans note)."""
+        return self.total / self.count if self.count else 0
+
+    def percentages(self):
+        """{étoile: part des notes en %}."""
+        return {star: (getattr(self, f'star_{star}') / self.count * 100 if self.count else 0)
+                for star in self.STARS}
+
+
 class ProductSize(models.Model):
     PRDIProduct = models.ForeignKey(
         Product, on_delete=models.CASCADE, verbose_name=_("Product"), blank=True, null=True,)
@@ -413,4 +341,20 @@ class ProductFavorite(models.Model):
     def __str__(self):
         if self.user:
             return f"{self.user.username} - {self.product.product_name}"
-        return f"Session {self.session_key} - {self.product.product_name}"
\ No newline at end of file
+        return f"Session {self.session_key} - {self.product.product_name}"
+
+
+class MediaBlob(models.Model):
+    """
+    Fichier image adressé par son contenu (blobs/...) et nombre de champs qui
+    le désignent, maintenu par products.storage.track_blobs.
+    """
+    name = models.CharField(max_length=255, primary_key=True, verbose_name=_("Blob"))
+    refcount = models.PositiveIntegerField(default=0, verbose_name=_("Références"))
+
+    class Meta:
+        verbose_name = _("Blob média")
+        verbose_name_plural = _("Blobs média")
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,105 @@
+"""
+Agrégats de notes dénormalisés : ProductRatingSummary (nombre, somme,
+histogramme par étoile) et Product.feedbak_average / feedbak_number.
+
+La page produit lit une seule ligne (jointe au produit) au lieu d'agréger
+ProductRating à chaque vue. Une note active de 1 à 5 contribue au résumé de
+son produit ; à chaque écriture (signaux pre_save / post_save / post_delete,
+donc dans la transaction de l'écriture), l'ancienne contribution est retirée
+et la nouvelle ajoutée par expressions F. rebuild_rating_summaries() recalcule
+les résumés depuis les notes (commande rebuild_rating_summaries).
+"""
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Greatest, NullIf, Round
+from django.db.models.signals import post_delete, post_save, pre_save
+
+STARS = (1, 2, 3, 4, 5)
+
+
+def _contribution(rating):
+    """(product_id, note) comptée dans le résumé, ou None."""
+    if rating is None or not rating.active or rating.PRDIProduct_id is None:
+        return None
+    try:
+        rate = int(rating.rate)
+    except (TypeError, ValueError):
+        return None
+    return (rating.PRDIProduct_id, rate) if rate in STARS else None
+
+
+def sync_product_feedback(product_model, summary_model, queryset=None):
+    """Recopie le résumé dans Product.feedbak_number / feedbak_average (moyenne × 20) : un UPDATE."""
+    summary = summary_model.objects.filter(product=OuterRef('pk'))
+    average = Round(Cast(F('total') * 20, FloatField()) / NullIf(F('count'), 0))
+    queryset = product_model.objects.all() if queryset is None else queryset
+    return queryset.update(
+        feedbak_number=Coalesce(Subquery(summary.values('count'), output_field=IntegerField()), Value(0)),
+        feedbak_average=Coalesce(Subquery(summary.annotate(average=average).values('average'),
+                                          output_field=IntegerField()), Value(0)),
+    )
+
+
+def rebuild_rating_summaries(product_model, rating_model, summary_model, ids=None):
+    """Recalcule les résumés (et les champs feedbak_*) depuis les notes. Retourne le nombre de résumés."""
+    ratings = rating_model.objects.filter(active=True, rate__in=STARS, PRDIProduct__isnull=False)
+    summaries = summary_model.objects.all()
+    products = product_model.objects.all()
+    if ids is not None:
+        ratings = ratings.filter(PRDIProduct__in=ids)
+        summaries = summaries.filter(product__in=ids)
+        products = products.filter(pk__in=ids)
+    rows = (ratings.order_by().values('PRDIProduct')
+            .annotate(count=Count('pk'), total=Sum('rate'),
+                      **{f'star_{star}': Count('pk', filter=Q(rate=star)) for star in STARS}))
+    objs = [summary_model(product_id=row.pop('PRDIProduct'), **row) for row in rows]
+    summaries.exclude(product__in=[obj.product_id for obj in objs]).delete()
+    summary_model.objects.bulk_create(
+        objs, update_conflicts=True, unique_fields=['product'],
+        update_fields=['count', 'total'] + [f'star_{star}' for star in STARS])
+    sync_product_feedback(product_model, summary_model, products)
+    return len(objs)
+
+
+def _apply(product_id, rate, delta):
+    from .models import Product, ProductRating, ProductRatingSummary
+
+    updated = ProductRatingSummary.objects.filter(pk=product_id).update(
+        count=Greatest(F('count') + delta, 0),
+        total=Greatest(F('total') + delta * rate, 0),
+        **{f'star_{rate}': Greatest(F(f'star_{rate}') + delta, 0)})
+    if updated:
+        sync_product_feedback(Product, ProductRatingSummary, Product.objects.filter(pk=product_id))
+    else:
+        # Premier avis (ou résumé absent) : calcul complet depuis les notes
+        rebuild_rating_summaries(Product, ProductRating, ProductRatingSummary, ids=[product_id])
+
+
+def track_ratings(rating_model):
+    """Connecte les signaux de ProductRating aux résumés de notes."""
+
+    def _before(sender, instance, raw=False, **kwargs):
+        previous = None
+        if instance.pk and not raw:
+            previous = sender.objects.filter(pk=instance.pk).only('PRDIProduct', 'rate', 'active').first()
+        instance._rating_before = _contribution(previous)
+
+    def _saved(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        before, after = getattr(instance, '_rating_before', None), _contribution(instance)
+        if before != after:
+            if before is not None:
+                _apply(*before, -1)
+            if after is not None:
+                _apply(*after, 1)
+        instance._rating_before = after
+
+    def _deleted(sender, instance, **kwargs):
+        contribution = _contribution(instance)
+        if contribution is not None:
+            _apply(*contribution, -1)
+
+    uid = f'rating_summary:{rating_model._meta.label_lower}'
+    pre_save.connect(_before, sender=rating_model, weak=False, dispatch_uid=uid)
+    post_save.connect(_saved, sender=rating_model, weak=False, dispatch_uid=uid)
+    post_delete.connect(_deleted, sender=rating_model, weak=False, dispatch_uid=uid)
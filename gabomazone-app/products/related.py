@@ -0,0 +1,189 @@
+"""
+Produits similaires précalculés : Product.related_ids et
+PeerToPeerProduct.related_ids.
+
+Les pages détail listaient, à chaque vue, des produits de la même catégorie
+sans classement. Un calcul par lots (tâche Celery
+products.tasks.rebuild_related_products, commande rebuild_related_products)
+classe maintenant les voisins de chaque produit et stocke leurs ids ; la
+page détail charge ces ids par clé primaire (related_items, une requête).
+
+Chaque produit est un vecteur creux de caractéristiques pondérées :
+- catégories (les niveaux fins pèsent plus que la super-catégorie) ;
+- tags et mots du nom (pondérés par IDF : un tag rare rapproche plus) ;
+- tranche de prix (search.facets.price_bucket ; tranches voisines à moitié) ;
+- co-favoris : utilisateurs ou sessions ayant mis les deux produits en favori ;
+- co-achats : acheteurs (OrderDetails de commandes terminées) ayant commandé
+  les deux produits ; les paniers ouverts ou abandonnés ne comptent pas.
+
+La similarité est le cosinus des vecteurs normalisés. Le produit creux
+X·Xᵀ est calculé par listes inversées, donc seulement pour les paires qui
+partagent une caractéristique. Chaque liste est tronquée aux MAX_POSTING
+produits les plus populaires pour borner le coût des caractéristiques très
+fréquentes (super-catégorie). Les voisins restent dans le catalogue du
+produit (boutique ou C2C).
+"""
+import heapq
+import logging
+import math
+from collections import defaultdict, namedtuple
+
+from search.facets import PRICE_BOUNDS, price_bucket
+from search.text import fold, singular
+
+logger = logging.getLogger(__name__)
+
+TOP_N = 12
+MAX_POSTING = 300
+
+# Poids par type de caractéristique (avant IDF et normalisation)
+WEIGHTS = {
+    'super': 0.5,
+    'main': 1.0,
+    'sub': 1.5,
+    'mini': 2.0,
+    'tag': 1.0,
+    'word': 0.5,
+    'price': 1.0,
+    'favorite': 2.0,
+    'buyer': 3.0,
+}
+# Types pondérés par IDF (les autres gardent leur poids fixe)
+IDF_KINDS = ('tag', 'word', 'favorite', 'buyer')
+
+Catalog = namedtuple('Catalog', 'model queryset category_fields tags_field favorite_model order_field')
+
+
+def _catalogs():
+    from accounts.models import PeerToPeerProduct, PeerToPeerProductFavorite
+    from .models import Product, ProductFavorite
+    return (
+        Catalog(Product, Product.objects.filter(PRDISDeleted=False, PRDISactive=True),
+                (('super', 'product_supercategory_id'), ('main', 'product_maincategory_id'),
+                 ('sub', 'product_subcategory_id'), ('mini', 'product_minicategor_id')),
+                'PRDtags', ProductFavorite, 'product_id'),
+        Catalog(PeerToPeerProduct, PeerToPeerProduct.objects.filter(status=PeerToPeerProduct.APPROVED),
+                (('super', 'product_supercategory_id'), ('main', 'product_maincategory_id'),
+                 ('sub', 'product_subcategory_id')),
+                None, PeerToPeerProductFavorite, 'peer_product_id'),
+    )
+
+
+def _words(text):
+    return {singular(word) for word in fold(text).split() if len(word) > 2}
+
+
+def _tags(text):
+    return {fold(tag) for tag in (text or '').split(',') if fold(tag)}
+
+
+def build_vectors(catalog):
+    """
+    ({id: {caractéristique: poids}}, {id: popularité}, {id: related_ids actuels})
+    pour les produits visibles du catalogue ; vecteurs normalisés (L2).
+    """
+    from orders.models import OrderDetails
+
+    fields = ['id', 'product_name', 'PRDPrice', 'view_count', 'like_count', 'related_ids']
+    fields += [field for _level, field in catalog.category_fields]
+    if catalog.tags_field:
+        fields.append(catalog.tags_field)
+
+    vectors, popularity, current = {}, {}, {}
+    for row in catalog.queryset.values(*fields).iterator():
+        vector = {}
+        for level, field in catalog.category_fields:
+            if row[field] is not None:
+                vector[(level, row[field])] = WEIGHTS[level]
+        bucket = price_bucket(row['PRDPrice'])
+        if bucket is not None:
+            vector[('price', bucket)] = WEIGHTS['price']
+            for near in (bucket - 1, bucket + 1):
+                if 0 <= near < len(PRICE_BOUNDS):
+                    vector[('price', near)] = WEIGHTS['price'] / 2
+        if catalog.tags_field:
+            for tag in _tags(row[catalog.tags_field]):
+                vector[('tag', tag)] = WEIGHTS['tag']
+        for word in _words(row['product_name']):
+            vector.setdefault(('word', word), WEIGHTS['word'])
+        vectors[row['id']] = vector
+        popularity[row['id']] = (row['view_count'] or 0) + (row['like_count'] or 0)
+        current[row['id']] = row['related_ids'] or []
+
+    favorites = catalog.favorite_model.objects.filter(product__in=catalog.queryset)
+    for product_id, user_id, session_key in favorites.values_list('product_id', 'user_id', 'session_key').iterator():
+        owner = f'u{user_id}' if user_id else f's{session_key}'
+        if product_id in vectors and (user_id or session_key):
+            vectors[product_id][('favorite', owner)] = WEIGHTS['favorite']
+    purchases = OrderDetails.objects.filter(order__is_finished=True, **{f'{catalog.order_field}__isnull': False})
+    for product_id, buyer_id, order_id in purchases.values_list(
+            catalog.order_field, 'order__user_id', 'order_id').iterator():
+        if product_id in vectors:
+            buyer = f'u{buyer_id}' if buyer_id else f'o{order_id}'
+            vectors[product_id][('buyer', buyer)] = WEIGHTS['buyer']
+
+    # IDF puis normalisation
+    frequency = defaultdict(int)
+    for vector in vectors.values():
+        for feature in vector:
+            if feature[0] in IDF_KINDS:
+                frequency[feature] += 1
+    total = len(vectors)
+    for vector in vectors.values():
+        for feature in vector:
+            if feature[0] in IDF_KINDS:
+                vector[feature] *= math.log(1 + total / frequency[feature])
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        if norm:
+            for feature in vector:
+                vector[feature] /= norm
+    return vectors, popularity, current
+
+
+def nearest_neighbours(vectors, popularity, top_n=TOP_N):
+    """{id: [ids voisins]} classés par cosinus décroissant (popularité à égalité)."""
+    postings = defaultdict(list)
+    for item in sorted(vectors, key=lambda item: -popularity[item]):
+        for feature, weight in vectors[item].items():
+            posting = postings[feature]
+            if len(posting) < MAX_POSTING:
+                posting.append((item, weight))
+
+    neighbours = {}
+    for item, vector in vectors.items():
+        scores = defaultdict(float)
+        for feature, weight in vector.items():
+            for other, other_weight in postings[feature]:
+                scores[other] += weight * other_weight
+        scores.pop(item, None)
+        best = heapq.nlargest(top_n, scores, key=lambda other: (scores[other], popularity[other]))
+        neighbours[item] = best
+    return neighbours
+
+
+def rebuild_related_products():
+    """Recalcule les voisins des deux catalogues ; n'écrit que les listes modifiées."""
+    written = 0
+    for catalog in _catalogs():
+        vectors, popularity, current = build_vectors(catalog)
+        neighbours = nearest_neighbours(vectors, popularity)
+        changed = [catalog.model(pk=item, related_ids=ids) for item, ids in neighbours.items()
+                   if ids != current[item]]
+        # bulk_update ne déclenche pas post_save : index et caches restent valides
+        catalog.model.objects.bulk_update(changed, ['related_ids'], batch_size=500)
+        written += len(changed)
+        logger.info("Produits similaires %s : %d produit(s), %d liste(s) modifiée(s)",
+                    catalog.model._meta.label, len(vectors), len(changed))
+    return written
+
+
+def related_items(obj, queryset, limit):
+    """
+    Voisins précalculés de obj, dans l'ordre, parmi queryset (produits
+    visibles) ; [] tant que la liste n'a pas été calculée.
+    """
+    ids = list(obj.related_ids or [])
+    if not ids:
+        return []
+    found = queryset.in_bulk(ids)
+    return [found[item] for item in ids if item in found][:limit]
@@ -0,0 +1,31 @@
+from project.page_cache import invalidate_page_on
+
+from .image_manifest import track_image_manifest
+from .image_pipeline import track_image_pipeline
+from .likes import track_likes
+from .models import Product, ProductFavorite, ProductImage, ProductRating, ProductSize
+from .ratings import track_ratings
+from .storage import track_blobs
+
+# Product.like_count suit les créations / suppressions de favoris
+track_likes(ProductFavorite)
+
+# Manifeste d'images des cartes recalculé à l'enregistrement
+track_image_manifest(Product)
+
+# Déclinaisons card / detail / zoom des nouvelles images, hors requête
+track_image_pipeline(Product, Product.CARD_IMAGE_FIELDS)
+track_image_pipeline(ProductImage, ('PRDIImage',))
+
+# Références des blobs d'images (stockage adressé par contenu, products/storage.py)
+track_blobs(Product, Product.CARD_IMAGE_FIELDS)
+track_blobs(ProductImage, ('PRDIImage',))
+
+# Résumé des notes (nombre, somme, histogramme) ajusté à chaque note
+track_ratings(ProductRating)
+
+# Page détail en cache (anonymes) périmée quand le produit, ses images,
+# tailles ou notes changent
+invalidate_page_on(Product)
+for model in (ProductImage, ProductSize, ProductRating):
+    invalidate_page_on(model, 'PRDIProduct')
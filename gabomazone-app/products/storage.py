@@ -0,0 +1,268 @@
+"""
+Stockage adressé par contenu des images produit (Product, ProductImage,
+PeerToPeerProduct).
+
+Un même visuel envoyé pour plusieurs produits n'est écrit qu'une fois : le
+fichier (« blob ») est rangé sous l'empreinte SHA-256 de son contenu,
+blobs/ab/cd/<empreinte>.<ext>, quel que soit le upload_to du champ. Un envoi
+en double ne fait qu'enregistrer le nom du blob existant dans le champ.
+Les fichiers dérivés d'un blob (déclinaisons de products/image_pipeline.py,
+blobs/.../<empreinte>.jpg.detail.webp) sont écrits sous leur nom exact, et
+sont donc eux aussi partagés.
+
+MediaBlob compte les champs qui désignent chaque blob (track_blobs : signaux
+pre_save / post_save / post_delete, dans la transaction de l'écriture). Quand
+un produit est supprimé ou que son image est remplacée, les blobs retombés à
+zéro sont supprimés après le commit avec leurs déclinaisons et vignettes.
+Un blob réutilisé récemment (date de modification rafraîchie à chaque envoi
+en double) n'est supprimé qu'après GRACE secondes, par la tâche périodique
+products.tasks.collect_media_blobs : un envoi concurrent du même visuel ne
+perd pas son fichier.
+
+Les fichiers antérieurs (hors blobs/) ne sont pas comptés et ne sont jamais
+supprimés ; leurs fichiers dérivés (products/imgs/robe.jpg.zoom.webp) sont
+écrits sous leur nom exact, à côté d'eux.
+
+Un blob écrit dans une transaction annulée n'a pas de ligne MediaBlob : le
+balayage périodique (collect() sans clés) supprime aussi ces fichiers sans
+ligne, passé GRACE secondes.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = 'blobs'
+# Blob lui-même (hors déclinaisons) : blobs/ab/cd/<sha256><ext>
+BLOB_PATTERN = re.compile(rf'^{BLOB_DIR}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(\.[A-Za-z0-9]+)?$')
+# Âge minimal (secondes) d'un blob sans référence avant suppression
+GRACE = 60 * 60
+
+
+def is_blob(name):
+    return str(name or '').startswith(f'{BLOB_DIR}/')
+
+
+def blob_key(name):
+    """Blob désigné par name (blob lui-même ou déclinaison detail) ; None hors blobs/."""
+    from .image_pipeline import original_name
+
+    return original_name(name) if is_blob(name) else None
+
+
+def blob_name(digest, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage dont les envois sont rangés sous l'empreinte de leur contenu."""
+
+    def get_available_name(self, name, max_length=None):
+        # Le nom définitif est choisi par _save (blob ou nom dérivé exact)
+        return name
+
+    def _derived(self, name):
+        """Vrai si name dérive d'un fichier stocké (<fichier>.<déclinaison>.webp, <fichier>.opt.webp)."""
+        base = name
+        for _ in range(2):
+            base = os.path.splitext(base)[0]
+            if base != name and os.path.isfile(self.path(base)):
+                return True
+        return False
+
+    def _save(self, name, content):
+        if is_blob(name) or self._derived(name):
+            return self._write(name, content)
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        name = blob_name(digest.hexdigest(), name)
+        if self.exists(name):
+            # Envoi en double : écriture des seules métadonnées (le champ)
+            os.utime(self.path(name))
+            return name
+        content.seek(0)
+        return self._write(name, content)
+
+    def _write(self, name, content):
+        """Écriture atomique (fichier temporaire puis renommage)."""
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                for chunk in content.chunks():
+                    output.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            raise
+        return name
+
+
+_storage = ContentAddressedStorage()
+
+
+def content_storage():
+    """Stockage des champs image produit (argument storage des ImageField)."""
+    return _storage
+
+
+def blob_files(key):
+    """Fichiers à supprimer avec le blob key : blob, déclinaisons, vignettes en cache."""
+    from project.thumbnails import SIZES, cache_path
+    from .image_pipeline import RENDITIONS, rendition_name
+
+    names = [key] + [rendition_name(key, rendition) for rendition in RENDITIONS]
+    files = [_storage.path(name) for name in names]
+    for name in (key, rendition_name(key, 'detail')):
+        files += [cache_path(name, width, height) for width, height in SIZES]
+    return files
+
+
+def _remove(key):
+    for path in blob_files(key):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _age(key):
+    try:
+        return time.time() - os.path.getmtime(_storage.path(key))
+    except FileNotFoundError:
+        return None
+
+
+def collect_unrecorded(grace=None):
+    """
+    Supprime les blobs sans ligne MediaBlob (écrits par une transaction
+    annulée) plus anciens que grace secondes. Retourne leur nombre.
+    """
+    from .models import MediaBlob
+
+    grace = GRACE if grace is None else grace
+    root = _storage.path(BLOB_DIR)
+    found = []
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            name = os.path.relpath(os.path.join(directory, filename), _storage.location).replace(os.sep, '/')
+            if BLOB_PATTERN.match(name):
+                found.append(name)
+    deleted = 0
+    for start in range(0, len(found), 500):
+        batch = found[start:start + 500]
+        recorded = set(MediaBlob.objects.filter(pk__in=batch).values_list('pk', flat=True))
+        for key in batch:
+            age = _age(key)
+            if key not in recorded and age is not None and age >= grace:
+                _remove(key)
+                deleted += 1
+    return deleted
+
+
+def collect(keys=None, grace=None):
+    """
+    Supprime les blobs sans référence (tous si keys est None) dont le fichier
+    n'a pas été réutilisé depuis grace secondes (GRACE par défaut). Sans keys,
+    les blobs sans ligne MediaBlob sont aussi supprimés. Retourne le nombre de
+    blobs supprimés.
+    """
+    from .models import MediaBlob
+
+    grace = GRACE if grace is None else grace
+    queryset = MediaBlob.objects.filter(refcount=0)
+    if keys is not None:
+        queryset = queryset.filter(pk__in=keys)
+    deleted = 0
+    for key in queryset.values_list('pk', flat=True):
+        with transaction.atomic():
+            if not MediaBlob.objects.select_for_update().filter(pk=key, refcount=0).exists():
+                continue
+            age = _age(key)
+            if age is not None and age < grace:
+                continue
+            _remove(key)
+            MediaBlob.objects.filter(pk=key).delete()
+        deleted += 1
+    if keys is None:
+        deleted += collect_unrecorded(grace)
+    if deleted:
+        logger.info("Blobs média supprimés: %d", deleted)
+    return deleted
+
+
+def _apply(increments, decrements):
+    from .models import MediaBlob
+
+    if increments:
+        MediaBlob.objects.bulk_create([MediaBlob(pk=key) for key in increments], ignore_conflicts=True)
+        for key, count in increments.items():
+            MediaBlob.objects.filter(pk=key).update(refcount=F('refcount') + count)
+    if decrements:
+        for key, count in decrements.items():
+            MediaBlob.objects.filter(pk=key).update(refcount=Greatest(F('refcount') - count, 0))
+        keys = list(decrements)
+        transaction.on_commit(lambda: collect(keys))
+
+
+def _keys(instance, fields):
+    keys = {}
+    for field_name in fields:
+        key = blob_key(getattr(instance, field_name).name)
+        if key:
+            keys[key] = keys.get(key, 0) + 1
+    return keys
+
+
+def track_blobs(model, fields):
+    """Tient à jour les références de MediaBlob pour les champs image fields de model."""
+    fields = tuple(fields)
+
+    def _before(sender, instance, raw=False, update_fields=None, **kwargs):
+        instance._blobs_before = None
+        if raw or instance.pk is None:
+            return
+        if update_fields is not None and not set(update_fields) & set(fields):
+            return
+        previous = sender.objects.filter(pk=instance.pk).only(*fields).first()
+        instance._blobs_before = _keys(previous, fields) if previous is not None else None
+
+    def _saved(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw:
+            return
+        if update_fields is not None and not set(update_fields) & set(fields):
+            return
+        before = getattr(instance, '_blobs_before', None) or {}
+        after = _keys(instance, fields)
+        increments = {key: count - before.get(key, 0) for key, count in after.items()
+                      if count > before.get(key, 0)}
+        decrements = {key: count - after.get(key, 0) for key, count in before.items()
+                      if count > after.get(key, 0)}
+        _apply(increments, decrements)
+        instance._blobs_before = after
+
+    def _deleted(sender, instance, **kwargs):
+        _apply({}, _keys(instance, fields))
+
+    uid = f'media_blobs:{model._meta.label_lower}'
+    pre_save.connect(_before, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(_saved, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(_deleted, sender=model, weak=False, dispatch_uid=uid)
@@ -0,0 +1,41 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_view_counts():
+    """Écrit en base les compteurs de vues en attente (voir products.view_counts)."""
+    from .view_counts import flush_view_counts as flush
+
+    written = flush()
+    return f'{written} vues écrites.'
+
+
+@shared_task
+def rebuild_related_products():
+    """Recalcule les produits similaires des deux catalogues (voir products.related)."""
+    from .related import rebuild_related_products as rebuild
+
+    written = rebuild()
+    logger.info('Produits similaires recalculés: %d liste(s) modifiée(s).', written)
+    return f'{written} listes modifiées.'
+
+
+@shared_task
+def process_images(label, pk, fields):
+    """Produit les déclinaisons des images d'un produit (voir products.image_pipeline)."""
+    from .image_pipeline import run
+
+    updated = run(label, pk, fields)
+    return f'{updated} image(s) traitée(s).'
+
+
+@shared_task
+def collect_media_blobs():
+    """Supprime les blobs d'images sans référence (voir products.storage)."""
+    from .storage import collect
+
+    deleted = collect()
+    return f'{deleted} blob(s) supprimé(s).'
@@ -0,0 +1,38 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from products.image_pipeline import RENDITIONS, is_processed, rendition_name
+from project.thumbnails import thumbnail_url
+
+register = template.Library()
+
+# Déclinaisons annoncées au navigateur, de la plus petite à la plus grande
+SRCSET = ('card', 'detail', 'zoom')
+
+
+def _storage_and_name(image):
+    """Accepte un FieldFile ou un chemin relatif à MEDIA_ROOT."""
+    return getattr(image, 'storage', default_storage), str(getattr(image, 'name', image) or '')
+
+
+@register.filter
+def srcset(image):
+    """
+    Attribut srcset des déclinaisons d'une image traitée par
+    products/image_pipeline.py ; chaîne vide tant qu'elle ne l'est pas.
+    """
+    storage, name = _storage_and_name(image)
+    if not is_processed(name):
+        return ''
+    return ', '.join(f'{storage.url(rendition_name(name, rendition))} {RENDITIONS[rendition][0]}w'
+                     for rendition in SRCSET)
+
+
+@register.filter
+def thumbnail(image, size):
+    """URL de la vignette à la demande (project/thumbnails.py) ; size au format '480x480'."""
+    _storage, name = _storage_and_name(image)
+    if not name:
+        return ''
+    width, height = (int(value) for value in size.split('x'))
+    return thumbnail_url(name, width, height)
@@ -1,3 +1,659 @@
-from django.test import TestCase
+import json
+import os
+import random
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from django.urls import reverse
+
+from accounts.models import PeerToPeerProduct, PeerToPeerProductFavorite
+from categories.models import MainCategory, SuperCategory
+from categories.tree import CACHE_NAMESPACE as CATEGORIES_NAMESPACE
+from project import context_cache, schema_registry, thumbnails
+from . import image_pipeline, media_optimizer, storage as media_storage, view_counts
+from .related import rebuild_related_products
+from .models import MediaBlob, Product, ProductFavorite, ProductImage, ProductRating, ProductRatingSummary
+from .templatetags.image_renditions import srcset
+
+
+class SchemaRegistryTests(TestCase):
+
+    def test_registry_lists_installed_tables(self):
+        self.assertTrue(schema_registry.table_exists('products_productfavorite'))
+        self.assertFalse(schema_registry.table_exists('products_table_inexistante'))
+
+    def test_page_view_does_no_catalog_introspection(self):
+        user = User.objects.create_user('acheteur', 'acheteur@example.com', 'secret')
+        self.client.force_login(user)
+        self.client.get(reverse('home:index'))
+        with mock.patch.object(connection.introspection, 'table_names',
+                               wraps=connection.introspection.table_names) as table_names:
+            response = self.client.get(reverse('home:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['wishlist_count'], 0)
+        table_names.assert_not_called()
+
+
+class LikeCounterTests(TestCase):
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            product_name='Montre', product_description='Montre', PRDPrice=10000)
+        seller = User.objects.create_user('vendeur', 'vendeur@example.com', 'secret')
+        self.article = PeerToPeerProduct.objects.create(
+            seller=seller, product_name='Vélo', product_description='Bon vélo',
+            PRDPrice=50000, seller_phone='074000000', seller_address='Akanda',
+            seller_city='Libreville', status=PeerToPeerProduct.APPROVED)
+
+    def likes(self, obj):
+        return type(obj).objects.values_list('like_count', flat=True).get(pk=obj.pk)
+
+    def test_favorites_maintain_counters(self):
+        ProductFavorite.objects.create(product=self.product, session_key='s1')
+        favorite = ProductFavorite.objects.create(product=self.product, session_key='s2')
+        PeerToPeerProductFavorite.objects.create(product=self.article, session_key='s1')
+        self.assertEqual(self.likes(self.product), 2)
+        self.assertEqual(self.likes(self.article), 1)
+        favorite.delete()
+        PeerToPeerProductFavorite.objects.all().delete()
+        self.assertEqual(self.likes(self.product), 1)
+        self.assertEqual(self.likes(self.article), 0)
+
+    def test_toggle_returns_maintained_count(self):
+        url = reverse('products:toggle-favorite')
+        response = self.client.post(url, {'product_id': self.product.id})
+        self.assertEqual(response.json()['like_count'], 1)
+        response = self.client.post(url, {'product_id': f'peer_{self.article.id}'})
+        self.assertEqual(response.json()['like_count'], 1)
+        response = self.client.post(url, {'product_id': self.product.id})
+        self.assertEqual(response.json()['like_count'], 0)
+
+    def test_rebuild_command_repairs_counters(self):
+        ProductFavorite.objects.create(product=self.product, session_key='s1')
+        Product.objects.filter(pk=self.product.pk).update(like_count=42)
+        PeerToPeerProduct.objects.filter(pk=self.article.pk).update(like_count=7)
+        call_command('rebuild_like_counts', stdout=StringIO())
+        self.assertEqual(self.likes(self.product), 1)
+        self.assertEqual(self.likes(self.article), 0)
+
+
+def _png(name, size):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ImageManifestTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def manifest(self, product):
+        return json.loads(Product.objects.values_list('image_manifest', flat=True).get(pk=product.pk))
+
+    def test_manifest_is_computed_on_save(self):
+        product = Product.objects.create(
+            product_name='Montre', product_description='Montre', PRDPrice=10000,
+            product_image=_png("l'avant.png", (40, 30)), additional_image_1=_png('dos.png', (20, 10)))
+        entries = self.manifest(product)
+        self.assertEqual([(e['w'], e['h']) for e in entries], [(40, 30), (20, 10)])
+        self.assertEqual(entries[0]['url'], product.product_image.url)
+        self.assertNotIn("'", product.image_manifest)
+
+        product.additional_image_1 = _png('dos.png', (8, 6))
+        product.save()
+        self.assertEqual(self.manifest(product)[1]['w'], 8)
+
+    def test_listing_emits_stored_manifest(self):
+        product = Product.objects.create(
+            product_name='Montre', product_description='Montre', PRDPrice=10000,
+            product_image=_png('face.png', (40, 30)))
+        response = self.client.get(reverse('categories:shop-htmx'))
+        self.assertContains(response, "data-images='%s'" % product.image_manifest)
+
+    def test_backfill_command_fills_missing_manifests(self):
+        product = Product.objects.create(
+            product_name='Montre', product_description='Montre', PRDPrice=10000,
+            product_image=_png('face.png', (40, 30)))
+        Product.objects.filter(pk=product.pk).update(image_manifest='')
+        call_command('build_image_manifests', stdout=StringIO())
+        self.assertEqual(self.manifest(product)[0]['w'], 40)
+
+
+class ImagePipelineTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_PIPELINE_ASYNC=False)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def create(self, **images):
+        with self.captureOnCommitCallbacks() as callbacks:
+            product = Product.objects.create(
+                product_name='Montre', product_description='Montre', PRDPrice=10000, **images)
+        return product, self.pipeline(callbacks)
+
+    def pipeline(self, callbacks):
+        # Les autres signaux (index de suggestions) programment aussi des callbacks
+        return [callback for callback in callbacks if callback.__module__ == image_pipeline.__name__]
+
+    def test_save_stores_original_and_defers_renditions(self):
+        product, callbacks = self.create(product_image=_png('face.png', (3000, 1500)))
+        original = product.product_image.name
+        self.assertTrue(original.endswith('.png'))
+        self.assertEqual(len(callbacks), 1)
+        storage = product.product_image.storage
+        self.assertFalse(storage.exists(image_pipeline.rendition_name(original, 'card')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            callbacks[0]()
+        product.refresh_from_db()
+        self.assertEqual(product.product_image.name, f'{original}.detail.webp')
+        self.assertTrue(storage.exists(original))
+        widths = {}
+        for rendition in image_pipeline.RENDITIONS:
+            with storage.open(image_pipeline.rendition_name(product.product_image.name, rendition)) as f:
+                widths[rendition] = Image.open(f).width
+        self.assertEqual(widths, {'card': 480, 'detail': 1100, 'zoom': 2000})
+        self.assertEqual(self.manifest_width(product), 1100)
+
+    def manifest_width(self, product):
+        return json.loads(Product.objects.values_list('image_manifest', flat=True).get(pk=product.pk))[0]['w']
+
+    def test_renditions_are_built_once(self):
+        product, callbacks = self.create(product_image=_png('face.png', (600, 600)))
+        with self.captureOnCommitCallbacks(execute=True):
+            callbacks[0]()
+        with mock.patch.object(image_pipeline, '_encode') as encode:
+            self.assertEqual(image_pipeline.process_images(Product, product.pk, ['product_image']), 0)
+            product.refresh_from_db()
+            product.save()
+            encode.assert_not_called()
+
+    def test_default_image_and_unrelated_saves_are_skipped(self):
+        product, callbacks = self.create()
+        self.assertEqual(callbacks, [])
+        with self.captureOnCommitCallbacks() as callbacks:
+            ProductImage.objects.create(PRDIProduct=product, PRDIImage=_png('cote.png', (50, 50)))
+            product.save(update_fields=['PRDPrice'])
+        self.assertEqual(len(self.pipeline(callbacks)), 1)
+
+    def test_srcset_lists_renditions_of_processed_images(self):
+        self.assertEqual(srcset('products/imgs/face.png'), '')
+        self.assertEqual(
+            srcset('products/imgs/face.png.detail.webp'),
+            '/media/products/imgs/face.png.card.webp 480w, /media/products/imgs/face.png.detail.webp 1100w, '
+            '/media/products/imgs/face.png.zoom.webp 2000w')
+
+
+class ThumbnailTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        os.makedirs(os.path.join(self.media_root, 'products', 'imgs'))
+        Image.new('RGB', (1600, 1200), 'blue').save(os.path.join(self.media_root, 'products', 'imgs', 'robe.jpg'))
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def get(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        if response.streaming:
+            response.image = Image.open(BytesIO(b''.join(response.streaming_content)))
+        return response
+
+    def test_first_request_renders_then_serves_cached_file(self):
+        url = thumbnails.thumbnail_url('products/imgs/robe.jpg', 240, 240)
+        self.assertEqual(url, '/media/thumb/240x240/products/imgs/robe.jpg')
+        response = self.get(url)
+        self.assertEqual(response['X-Thumbnail-Cache'], 'miss')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response.image.size, (240, 180))
+        self.assertIn('max-age', response['Cache-Control'])
+        self.assertTrue(os.path.isfile(thumbnails.cache_path('products/imgs/robe.jpg', 240, 240)))
+
+        with mock.patch.object(thumbnails, 'render_thumbnail') as render:
+            self.assertEqual(self.get(url)['X-Thumbnail-Cache'], 'hit')
+            response = self.get(url, **{'If-Modified-Since': response['Last-Modified']})
+            render.assert_not_called()
+        self.assertEqual(response.status_code, 304)
+
+    def test_cached_file_is_sent_by_nginx(self):
+        url = thumbnails.thumbnail_url('products/imgs/robe.jpg', 240, 240)
+        cached = os.path.relpath(thumbnails.cache_path('products/imgs/robe.jpg', 240, 240), self.media_root)
+        with override_settings(THUMBNAIL_ACCEL_REDIRECT=True):
+            for state in ('miss', 'hit'):
+                response = self.get(url)
+                self.assertEqual(response['X-Thumbnail-Cache'], state)
+                self.assertFalse(response.streaming)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['X-Accel-Redirect'], f'/media/{cached}')
+                self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertTrue(cached.startswith('thumb_cache/'))
+
+    def test_sizes_and_paths_are_restricted(self):
+        self.assertEqual(self.get('/media/thumb/241x241/products/imgs/robe.jpg').status_code, 404)
+        self.assertEqual(self.get('/media/thumb/240x240/../settings.py').status_code, 404)
+        self.assertEqual(self.get('/media/thumb/240x240/products/imgs/absente.jpg').status_code, 404)
+        self.get('/media/thumb/240x240/products/imgs/robe.jpg')
+        cached = os.path.relpath(thumbnails.cache_path('products/imgs/robe.jpg', 240, 240), self.media_root)
+        self.assertEqual(self.get(f'/media/thumb/240x240/{cached}').status_code, 404)
+
+    def test_processed_image_is_reduced_from_smallest_rendition(self):
+        name = 'products/imgs/robe.jpg'
+        Image.new('RGB', (480, 360), 'green').save(
+            os.path.join(self.media_root, image_pipeline.rendition_name(name, 'card')), format='WEBP')
+        response = self.get(thumbnails.thumbnail_url(image_pipeline.rendition_name(name, 'detail'), 480, 480))
+        self.assertEqual(response.image.size, (480, 360))
+        _red, green, blue = response.image.convert('RGB').getpixel((10, 10))
+        self.assertGreater(green, blue)
+
+
+class OptimizeMediaTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        noise = Image.frombytes('RGB', (300, 200), random.Random(0).randbytes(300 * 200 * 3))
+        self.photo = BytesIO()
+        noise.save(self.photo, format='PNG')
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def upload(self, name):
+        return SimpleUploadedFile(name, self.photo.getvalue(), content_type='image/png')
+
+    def optimize(self):
+        out = StringIO()
+        call_command('optimize_media', workers=2, stdout=out)
+        return out.getvalue()
+
+    def test_library_is_reencoded_once_per_content(self):
+        first = Product.objects.create(product_name='Robe', product_description='-', PRDPrice=1000,
+                                       product_image=self.upload('robe.png'))
+        copy = Product.objects.create(product_name='Robe bis', product_description='-', PRDPrice=1000,
+                                      product_image=self.upload('robe-bis.png'))
+        category = SuperCategory.objects.create(name='Mode', category_image=self.upload('mode.png'))
+        version = context_cache.version(CATEGORIES_NAMESPACE)
+
+        # Copie sous un autre nom (fichier antérieur au stockage adressé par contenu)
+        shutil.copy(first.product_image.path, os.path.join(self.media_root, 'robe-bis.png'))
+        Product.objects.filter(pk=copy.pk).update(product_image='robe-bis.png')
+
+        output = self.optimize()
+        self.assertIn('2 image(s) traitée(s)', output)
+        self.assertIn('3 champ(s) mis à jour', output)
+        first.refresh_from_db()
+        copy.refresh_from_db()
+        category.refresh_from_db()
+        self.assertTrue(first.product_image.name.endswith('.png.detail.webp'))
+        self.assertEqual(copy.product_image.name, first.product_image.name)
+        self.assertEqual(json.loads(first.image_manifest)[0]['url'], first.product_image.url)
+        self.assertEqual(category.category_image.name, 'categories/super/imgs/mode.png.opt.webp')
+        self.assertLess(category.category_image.size, len(self.photo.getvalue()))
+        self.assertGreater(context_cache.version(CATEGORIES_NAMESPACE), version)
+
+        self.assertIn('0 image(s) traitée(s)', self.optimize())
+
+    def test_known_content_is_reused_from_manifest(self):
+        product = Product.objects.create(product_name='Robe', product_description='-', PRDPrice=1000,
+                                         product_image=self.upload('robe.png'))
+        original = product.product_image.name
+        self.optimize()
+        Product.objects.filter(pk=product.pk).update(product_image=original)
+        output = self.optimize()
+        self.assertIn('0 image(s) traitée(s), 1 déjà traitée(s)', output)
+        product.refresh_from_db()
+        self.assertEqual(product.product_image.name, f'{original}.detail.webp')
+
+    def test_image_replaced_during_run_is_kept(self):
+        product = Product.objects.create(product_name='Robe', product_description='-', PRDPrice=1000,
+                                         product_image=self.upload('robe.png'))
+        original = product.product_image.name
+        references = media_optimizer.references
+
+        def replace_after_snapshot(targets):
+            refs = references(targets)
+            # Envoi concurrent, après le relevé des chemins
+            product.product_image = _png('nouveau.png', (30, 30))
+            product.save()
+            return refs
+
+        with mock.patch.object(media_optimizer, 'references', side_effect=replace_after_snapshot):
+            output = self.optimize()
+        self.assertIn('1 image(s) traitée(s)', output)
+        self.assertIn('0 champ(s) mis à jour', output)
+        replaced = product.product_image.name
+        product.refresh_from_db()
+        self.assertEqual(product.product_image.name, replaced)
+        self.assertEqual(dict(MediaBlob.objects.values_list('name', 'refcount')), {original: 0, replaced: 1})
+
+
+class MediaBlobTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def refcounts(self):
+        return dict(MediaBlob.objects.values_list('name', 'refcount'))
+
+    def create(self, **images):
+        return Product.objects.create(product_name='Sac', product_description='-', PRDPrice=1000, **images)
+
+    def test_duplicate_uploads_share_one_blob(self):
+        with mock.patch.object(media_storage.ContentAddressedStorage, '_write',
+                               autospec=True, side_effect=media_storage.ContentAddressedStorage._write) as write:
+            first = self.create(product_image=_png('sac.png', (40, 40)))
+            second = self.create(product_image=_png('sac-copie.png', (40, 40)))
+            ProductImage.objects.create(PRDIProduct=second, PRDIImage=_png('autre-nom.png', (40, 40)))
+        self.assertEqual(write.call_count, 1)
+        name = first.product_image.name
+        self.assertTrue(name.startswith('blobs/'))
+        self.assertEqual(second.product_image.name, name)
+        self.assertEqual(self.refcounts(), {name: 3})
+
+    def test_orphaned_blobs_are_collected(self):
+        product = self.create(product_image=_png('sac.png', (40, 40)))
+        kept = self.create(product_image=_png('sac.png', (40, 40)))
+        old = product.product_image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            image_pipeline.process_images(Product, product.pk, ['product_image'])
+        product.refresh_from_db()
+        self.assertEqual(self.refcounts(), {old: 2})
+
+        with mock.patch.object(media_storage, 'GRACE', 0), self.captureOnCommitCallbacks(execute=True):
+            product.product_image = _png('nouveau.png', (30, 30))
+            product.save()
+            kept.delete()
+        new = product.product_image.name
+        self.assertEqual(self.refcounts(), {new: 1})
+        storage = product.product_image.storage
+        self.assertFalse(storage.exists(old))
+        self.assertFalse(storage.exists(image_pipeline.rendition_name(old, 'zoom')))
+        self.assertTrue(storage.exists(new))
+
+    def test_recently_reused_blob_waits_for_periodic_collection(self):
+        product = self.create(product_image=_png('sac.png', (40, 40)))
+        name = product.product_image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(self.refcounts(), {name: 0})
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
+        self.assertEqual(media_storage.collect(grace=0), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, name)))
+        self.assertEqual(self.refcounts(), {})
+
+    def test_legacy_image_renditions_stay_next_to_it(self):
+        product = self.create()
+        legacy = 'products/imgs/ancienne.png'
+        os.makedirs(os.path.join(self.media_root, 'products/imgs'))
+        Image.new('RGB', (60, 40), 'red').save(os.path.join(self.media_root, legacy))
+        Product.objects.filter(pk=product.pk).update(product_image=legacy)
+        product.refresh_from_db()
+        with override_settings(IMAGE_PIPELINE_ASYNC=False), self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.product_image.name, f'{legacy}.detail.webp')
+        for rendition in image_pipeline.RENDITIONS:
+            self.assertTrue(os.path.isfile(os.path.join(
+                self.media_root, image_pipeline.rendition_name(legacy, rendition))))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'blobs')))
+
+    def test_blob_of_rolled_back_upload_is_collected(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            name = self.create(product_image=_png('annule.png', (40, 40))).product_image.name
+            raise RuntimeError
+        self.assertEqual(self.refcounts(), {})
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
+        self.assertEqual(media_storage.collect(), 0)
+        self.assertEqual(media_storage.collect(grace=0), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, name)))
+
+
+class ViewCounterTests(TestCase):
+    browser = 'Mozilla/5.0 (Linux; Android 13) Chrome/120.0 Mobile Safari/537.36'
+
+    def setUp(self):
+        cache.clear()
+        # Comportement de production : vues en attente dans le cache partagé
+        shared = mock.patch.object(view_counts, 'is_shared', return_value=True)
+        shared.start()
+        self.addCleanup(shared.stop)
+        self.addCleanup(cache.clear)
+        self.product = Product.objects.create(product_name='Lampe', product_description='-', PRDPrice=1000)
+        seller = User.objects.create_user('vendeur', 'vendeur@example.com', 'secret')
+        self.article = PeerToPeerProduct.objects.create(
+            seller=seller, product_name='Vélo', product_description='-', PRDPrice=30000,
+            seller_phone='074000000', seller_address='Akanda', seller_city='Libreville',
+            status=PeerToPeerProduct.APPROVED)
+
+    def view(self, obj, user_agent=browser, address='10.0.0.1'):
+        request = mock.Mock(method='GET', headers={'User-Agent': user_agent}, META={'REMOTE_ADDR': address})
+        request.user.is_authenticated = False
+        request.session.session_key = None
+        return view_counts.record_view(request, obj)
+
+    def test_refreshes_and_bots_are_not_counted(self):
+        self.assertTrue(self.view(self.product))
+        self.assertFalse(self.view(self.product))
+        self.assertTrue(self.view(self.product, address='10.0.0.2'))
+        self.assertFalse(self.view(self.product, user_agent='Googlebot/2.1', address='10.0.0.3'))
+        self.assertFalse(self.view(self.product, user_agent='', address='10.0.0.4'))
+        self.assertEqual(view_counts.flush_view_counts(), 2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.view_count, 2)
+
+    def test_detail_page_does_not_write_the_counter(self):
+        response = self.client.get(reverse('products:product-details', args=[self.product.PRDSlug]),
+                                   HTTP_USER_AGENT=self.browser)
+        self.assertEqual(response.status_code, 200)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.view_count, 0)
+        view_counts.flush_view_counts()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.view_count, 1)
+
+    def test_pending_views_are_flushed_in_one_update_per_model(self):
+        self.view(self.product)
+        self.view(self.article)
+        self.view(self.product, address='10.0.0.2')
+        self.assertEqual(Product.objects.get(pk=self.product.pk).view_count, 0)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(view_counts.flush_view_counts(), 3)
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]), 2)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).view_count, 2)
+        self.assertEqual(PeerToPeerProduct.objects.get(pk=self.article.pk).view_count, 1)
+        self.assertEqual(view_counts.flush_view_counts(), 0)
+        self.view(self.product, address='10.0.0.3')
+        self.assertEqual(view_counts.flush_view_counts(), 1)
+
+    def test_failed_write_keeps_pending_views(self):
+        self.view(self.product)
+        self.view(self.article)
+        with mock.patch.object(view_counts, 'increment', side_effect=[1, DatabaseError('panne')]):
+            with self.assertRaises(DatabaseError):
+                view_counts.flush_view_counts()
+        self.assertEqual(Product.objects.get(pk=self.product.pk).view_count, 0)
+        self.view(self.product, address='10.0.0.2')
+        self.assertEqual(view_counts.flush_view_counts(), 3)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).view_count, 2)
+        self.assertEqual(PeerToPeerProduct.objects.get(pk=self.article.pk).view_count, 1)
+
+    def test_without_shared_cache_views_are_written_directly(self):
+        with mock.patch.object(view_counts, 'is_shared', return_value=False):
+            self.view(self.product)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).view_count, 1)
+
+
+class RatingSummaryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(product_name='Lampe', product_description='-', PRDPrice=1000)
+        self.clients = [User.objects.create_user(f'client{i}', f'client{i}@example.com', 'secret').profile
+                        for i in range(3)]
+
+    def rate(self, client, rate, **kwargs):
+        return ProductRating.objects.create(PRDIProduct=self.product, client_name=client, rate=rate, **kwargs)
+
+    def summary(self):
+        summary = ProductRatingSummary.objects.get(product=self.product)
+        return summary.count, summary.total, [getattr(summary, f'star_{star}') for star in summary.STARS]
+
+    def test_writes_maintain_summary_and_feedback_fields(self):
+        self.rate(self.clients[0], 5)
+        rating = self.rate(self.clients[1], 2)
+        self.rate(self.clients[2], 4, active=False)
+        self.assertEqual(self.summary(), (2, 7, [0, 1, 0, 0, 1]))
+        rating.rate = 3
+        rating.save()
+        self.assertEqual(self.summary(), (2, 8, [0, 0, 1, 0, 1]))
+        rating.active = False
+        rating.save()
+        self.assertEqual(self.summary(), (1, 5, [0, 0, 0, 0, 1]))
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.feedbak_number, self.product.feedbak_average), (1, 100))
+        ProductRating.objects.filter(rate=5).delete()
+        self.assertEqual(self.summary(), (0, 0, [0, 0, 0, 0, 0]))
+
+    def test_detail_page_reads_the_summary(self):
+        self.rate(self.clients[0], 5)
+        self.rate(self.clients[1], 4)
+        response = self.client.get(reverse('products:product-details', args=[self.product.PRDSlug]),
+                                   HTTP_USER_AGENT='Mozilla/5.0')
+        self.assertEqual(response.context['average_rating'], 4.5)
+        self.assertEqual(response.context['feedbak_number'], 2)
+        self.assertEqual((response.context['start_5'], response.context['start_4'], response.context['start_1']),
+                         (50, 50, 0))
+
+    def test_rebuild_command_repairs_summaries(self):
+        self.rate(self.clients[0], 5)
+        ProductRatingSummary.objects.filter(product=self.product).update(count=9, star_1=9)
+        call_command('rebuild_rating_summaries', stdout=StringIO())
+        self.assertEqual(self.summary(), (1, 5, [0, 0, 0, 0, 1]))
+
+
+class RelatedProductsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        mode = SuperCategory.objects.create(name='Mode')
+        maison = SuperCategory.objects.create(name='Maison')
+        sacs = MainCategory.objects.create(name='Sacs', super_category=mode)
+        self.toile = self.product('Sac en toile', 3000, mode, sacs, PRDtags='plage, toile')
+        self.paille = self.product('Panier en paille', 4000, mode, sacs, PRDtags='plage')
+        self.cuir = self.product('Sac en cuir', 400000, mode, sacs)
+        self.lampe = self.product('Lampe de chevet', 3500, maison)
+        self.hidden = self.product('Sac de plage', 3000, mode, sacs, PRDtags='plage', PRDISactive=False)
+
+    def product(self, name, price, super_category, main_category=None, **kwargs):
+        return Product.objects.create(product_name=name, product_description='-', PRDPrice=price,
+                                      product_supercategory=super_category,
+                                      product_maincategory=main_category, **kwargs)
+
+    def related(self, product):
+        product.refresh_from_db()
+        return product.related_ids
+
+    def test_neighbours_are_ranked_and_refreshed_by_co_favorites(self):
+        rebuild_related_products()
+        self.assertEqual(self.related(self.toile), [self.paille.id, self.cuir.id, self.lampe.id])
+        self.assertEqual(self.related(self.hidden), [])
+        for name in ('ada', 'ben'):
+            user = User.objects.create_user(name, f'{name}@example.com', 'secret')
+            ProductFavorite.objects.create(product=self.toile, user=user)
+            ProductFavorite.objects.create(product=self.lampe, user=user)
+        rebuild_related_products()
+        self.assertEqual(self.related(self.toile)[0], self.lampe.id)
+
+    def test_only_finished_orders_count_as_co_purchases(self):
+        from orders.models import Order, OrderDetails
+
+        orders = []
+        for name in ('ada', 'ben'):
+            user = User.objects.create_user(name, f'{name}@example.com', 'secret')
+            order = Order.objects.create(user=user, email_client=user.email, is_finished=False)
+            for product in (self.toile, self.lampe):
+                OrderDetails.objects.create(order=order, product=product, price=product.PRDPrice, quantity=1)
+            orders.append(order.pk)
+        rebuild_related_products()
+        # Paniers ouverts : aucun co-achat
+        self.assertEqual(self.related(self.toile)[0], self.paille.id)
+        Order.objects.filter(pk__in=orders).update(is_finished=True)
+        rebuild_related_products()
+        self.assertEqual(self.related(self.toile)[0], self.lampe.id)
+
+    def test_detail_page_loads_stored_neighbours_in_order(self):
+        Product.objects.filter(pk=self.toile.pk).update(related_ids=[self.hidden.id, self.lampe.id, self.cuir.id])
+        response = self.client.get(reverse('products:product-details', args=[self.toile.PRDSlug]),
+                                   HTTP_USER_AGENT='Mozilla/5.0')
+        self.assertEqual([item['product'].id for item in response.context['related_products_data']],
+                         [self.lampe.id, self.cuir.id])
+
+
+class PageCacheTests(TestCase):
+    browser = 'Mozilla/5.0 (X11; Linux x86_64) Firefox/128.0'
+
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(product_name='Lampe', product_description='-', PRDPrice=1000)
+        self.url = reverse('products:product-details', args=[self.product.PRDSlug])
+
+    def get(self):
+        return self.client.get(self.url, HTTP_USER_AGENT=self.browser)
+
+    def test_anonymous_page_is_served_with_holes_filled(self):
+        self.assertEqual(self.get()['X-Page-Cache'], 'miss')
+        session = self.client.session
+        session.save()
+        ProductFavorite.objects.create(product=self.product, session_key=session.session_key)
+        with mock.patch.object(view_counts, 'record_view') as record_view:
+            response = self.get()
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        record_view.assert_called_once()
+        content = response.content.decode()
+        self.assertNotIn('gm-hole', content)
+        self.assertRegex(content, r'name="csrfmiddlewaretoken" value="\w{64}"')
+        self.assertIn('flavoriz-favorite-btn-large liked', content)
+        self.assertIn('style="display: flex;">1</span>', content)
+
+    def test_rating_invalidates_and_users_bypass_the_cache(self):
+        self.get()
+        client = User.objects.create_user('client', 'client@example.com', 'secret')
+        ProductRating.objects.create(PRDIProduct=self.product, client_name=client.profile, rate=4)
+        self.assertEqual(self.get()['X-Page-Cache'], 'miss')
+        self.client.force_login(client)
+        self.assertNotIn('X-Page-Cache', self.get())
@@ -10,6 +10,7 @@ urlpatterns = [
     path('product-details/<str:slug>',
          views.product_details, name='product-details'),
     path('product-search/',views.product_search , name="product-search"),
+    path('suggest', views.suggest, name="suggest"),
     path('rating/', views.product_rating, name="product_rating"),
     path('toggle-favorite/', views.toggle_favorite, name="toggle-favorite"),
     path('wishlist/', views.wishlist, name="wishlist"),
@@ -0,0 +1,104 @@
+"""
+Compteurs de vues en écriture différée : Product.view_count et
+PeerToPeerProduct.view_count.
+
+Une page produit ne fait plus d'UPDATE : la vue est ajoutée aux compteurs en
+attente du cache partagé (project.counter_buffer, un cache.incr). La tâche
+Celery products.tasks.flush_view_counts les relit chaque minute et les écrit
+en base : un UPDATE groupé (CASE) par modèle, dans une transaction. Si
+l'écriture échoue, les vues restent en attente pour le passage suivant. Les
+tris par popularité lisent la valeur écrite en base.
+
+Sans cache partagé (LocMem, développement), la vue est écrite en base
+directement.
+
+Ne sont pas comptées :
+- les requêtes de robots (User-Agent vide ou connu) et les préchargements ;
+- les vues répétées d'un même visiteur sur un même produit pendant
+  DEDUP_WINDOW secondes (rafraîchissements).
+"""
+import hashlib
+import logging
+import re
+
+from django.core.cache import cache
+from django.db import transaction
+
+from project.counter_buffer import CounterBuffer, increment, is_shared
+
+logger = logging.getLogger(__name__)
+
+# Vues d'un même visiteur sur un même produit comptées une fois par fenêtre
+DEDUP_WINDOW = 30 * 60
+
+BOT_PATTERN = re.compile(
+    r'bot|crawl|spider|slurp|scrap|preview|fetch|monitor|curl|wget|python|java/|go-http|'
+    r'headless|lighthouse|facebookexternalhit|whatsapp', re.IGNORECASE)
+
+_views = CounterBuffer('view_counts')
+
+
+def _models():
+    from accounts.models import PeerToPeerProduct
+    from .models import Product
+    return {model._meta.label: model for model in (Product, PeerToPeerProduct)}
+
+
+def is_bot(request):
+    """Robot, outil en ligne de commande ou préchargement du navigateur."""
+    purpose = request.headers.get('Sec-Purpose') or request.headers.get('Purpose') or ''
+    if 'prefetch' in purpose.lower():
+        return True
+    user_agent = request.headers.get('User-Agent', '')
+    return not user_agent or bool(BOT_PATTERN.search(user_agent))
+
+
+def _visitor(request):
+    """Empreinte du visiteur : utilisateur, session, sinon adresse IP + User-Agent."""
+    if request.user.is_authenticated:
+        raw = f'u{request.user.pk}'
+    elif request.session.session_key:
+        raw = f's{request.session.session_key}'
+    else:
+        forwarded = request.headers.get('X-Forwarded-For', '')
+        address = forwarded.split(',')[0].strip() or request.META.get('REMOTE_ADDR', '')
+        raw = f'a{address}|{request.headers.get("User-Agent", "")}'
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def record_view(request, obj):
+    """Compte une vue de obj (Product ou PeerToPeerProduct) si elle est légitime."""
+    if request.method != 'GET' or is_bot(request):
+        return False
+    label = obj._meta.label
+    if not cache.add(f'views:seen:{label}:{obj.pk}:{_visitor(request)}', 1, DEDUP_WINDOW):
+        return False
+    if is_shared():
+        _views.add(label, obj.pk)
+    else:
+        write_views({(label, obj.pk): 1})
+    return True
+
+
+def record_cached_view(request, model, pk):
+    """Compte la vue d'une page servie par le cache de pages (project.page_cache)."""
+    return record_view(request, model(pk=pk))
+
+
+def write_views(pending):
+    """Ajoute {(label, pk): vues} aux compteurs en base : un UPDATE par modèle, dans une transaction."""
+    by_label = {}
+    for (label, pk), count in pending.items():
+        by_label.setdefault(label, {})[pk] = count
+    models = _models()
+    with transaction.atomic():
+        return sum(increment(models[label], counts, 'view_count')
+                   for label, counts in by_label.items() if label in models)
+
+
+def flush_view_counts():
+    """Écrit en base les vues en attente dans le cache partagé."""
+    written = _views.drain(write_views)
+    if written:
+        logger.info("Vues écrites en base: %d", written)
+    return written
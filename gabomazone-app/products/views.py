@@ -1,18 +1,23 @@
 from django.shortcuts import render, get_object_or_404
-from .models import Product, ProductImage, ProductRating, ProductSize, ProductFavorite
+from .models import Product, ProductImage, ProductRating, ProductRatingSummary, ProductSize, ProductFavorite
 from django.core.paginator import Paginator
 import random
 from django.http import JsonResponse
 from django.views.generic import View, TemplateView
 from project import settings
 from django.http import HttpResponse, HttpResponseRedirect
-from django.db.models import Sum, Count
+from django.urls import reverse
+from urllib.parse import urlencode
+from django.db import transaction
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 from accounts.models import Profile
+from project.page_cache import anonymous_page_cache
+from project.schema_registry import model_table_exists
+from .related import related_items
+from .view_counts import record_cached_view, record_view
 from django.views.decorators.http import require_POST, require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from categories.models import SuperCategory
-import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,28 +25,10 @@ logger = logging.getLogger(__name__)
 
 def _c2c_peer_product_card_context(peer_product):
     """Données pour `components/product_card.html` (article C2C, aligné sur le shop)."""
-    from accounts.models import PeerToPeerProductFavorite
-
-    product_images = []
-    if peer_product.product_image:
-        img_path = str(peer_product.product_image)
-        if not img_path.startswith('/media/'):
-            img_path = '/media/' + img_path
-        product_images.append(img_path)
-    for attr in ('additional_image_1', 'additional_image_2', 'additional_image_3'):
-        if getattr(peer_product, attr, None):
-            img_path = str(getattr(peer_product, attr))
-            if not img_path.startswith('/media/'):
-                img_path = '/media/' + img_path
-            product_images.append(img_path)
-    try:
-        like_count = PeerToPeerProductFavorite.objects.filter(product=peer_product).count()
-    except Exception:
-        like_count = 0
     return {
         'product': peer_product,
-        'product_images': json.dumps(product_images),
-        'like_count': like_count,
+        'product_images': peer_product.image_manifest,
+        'like_count': peer_product.like_count,
         'is_peer_to_peer': True,
         'is_boosted': False,
     }
@@ -49,39 +36,33 @@ def _c2c_peer_product_card_context(peer_product):
 
 def _b2b_product_card_context(product, boosted_ids):
     """Données pour `components/product_card.html` (aligné sur le HTMX shop)."""
-    product_images = []
-    if product.product_image:
-        img_path = str(product.product_image)
-        if not img_path.startswith('/media/'):
-            img_path = '/media/' + img_path
-        product_images.append(img_path)
-    for attr in ('additional_image_1', 'additional_image_2', 'additional_image_3', 'additional_image_4'):
-        if getattr(product, attr, None):
-            img_path = str(getattr(product, attr))
-            if not img_path.startswith('/media/'):
-                img_path = '/media/' + img_path
-            product_images.append(img_path)
     return {
         'product': product,
-        'product_images': json.dumps(product_images),
-        'like_count': getattr(product, 'like_count', 0),
+        'product_images': product.image_manifest,
+        'like_count': product.like_count,
         'is_peer_to_peer': False,
         'is_boosted': product.id in boosted_ids,
     }
 
 
+def _product_page(slug):
+    """Identité de la page détail pour le cache de pages anonymes."""
+    row = Product.objects.filter(PRDSlug=slug, PRDISactive=True).values_list('pk', 'date_update').first()
+    return (Product, *row) if row else None
+
+
+@anonymous_page_cache(_product_page, on_hit=record_cached_view)
 def product_details(request, slug):
     """Display B2B product detail page."""
     logger.info("product_details slug=%s user=%s", slug, request.user)
     if not request.session.has_key('currency'):
         request.session['currency'] = settings.DEFAULT_CURRENCY
 
-    product_detail = get_object_or_404(Product, PRDSlug=slug, PRDISactive=True)
+    product_detail = get_object_or_404(Product.objects.select_related('rating_summary'),
+                                       PRDSlug=slug, PRDISactive=True)
     
-    # Incrémenter le compteur de vues
-    from django.db.models import F
-    Product.objects.filter(id=product_detail.id).update(view_count=F('view_count') + 1)
-    product_detail.refresh_from_db()
+    # Vue comptée en différé (products.view_counts), sans écriture en base
+    record_view(request, product_detail)
     
     product_variations = ProductSize.objects.all().filter(PRDIProduct=product_detail)
     product_image = ProductImage.objects.all().filter(PRDIProduct=product_detail)
@@ -89,19 +70,12 @@ def product_details(request, slug):
     from categories.views import get_active_boosted_product_ids
 
     _boosted = get_active_boosted_product_ids()
-    try:
-        related_products_qs = (
-            Product.objects.filter(product_minicategor=related_products_minicategor, PRDISactive=True)
-            .exclude(pk=product_detail.pk)
-            .select_related('product_vendor')
-            .annotate(like_count=Count('favorites'))[:4]
-        )
-    except Exception:
-        related_products_qs = (
-            Product.objects.filter(product_minicategor=related_products_minicategor, PRDISactive=True)
-            .exclude(pk=product_detail.pk)
-            .select_related('product_vendor')[:4]
-        )
+    # Voisins précalculés (products.related), sinon même mini-catégorie
+    visible = Product.objects.filter(PRDISactive=True, PRDISDeleted=False).select_related('product_vendor')
+    related_products_qs = related_items(product_detail, visible, 4) or (
+        visible.filter(product_minicategor=related_products_minicategor)
+        .exclude(pk=product_detail.pk)[:4]
+    )
     related_products_data = [_b2b_product_card_context(p, _boosted) for p in related_products_qs]
 
     supplier_Products = Product.objects.all().filter(product_vendor=product_detail.product_vendor,
@@ -109,42 +83,11 @@ def product_details(request, slug):
 
     product_feedback = ProductRating.objects.all().filter(
         PRDIProduct=product_detail, active=True)
-    feedback_sum = ProductRating.objects.all().filter(
-        PRDIProduct=product_detail, active=True).aggregate(Sum('rate'))
-    feedbak_number = product_feedback.count()
-
-    try:
-
-        average_rating = int(feedback_sum["rate__sum"]) / feedbak_number
-
-        start_1_sum = ProductRating.objects.all().filter(
-            PRDIProduct=product_detail, active=True, rate=1).count()
-
-        start_2_sum = ProductRating.objects.all().filter(
-            PRDIProduct=product_detail, active=True, rate=2).count()
-
-        start_3_sum = ProductRating.objects.all().filter(
-            PRDIProduct=product_detail, active=True, rate=3).count()
-
-        start_4_sum = ProductRating.objects.all().filter(
-            PRDIProduct=product_detail, active=True, rate=4).count()
-
-        start_5_sum = ProductRating.objects.all().filter(
-            PRDIProduct=product_detail, active=True, rate=5).count()
-
-        start_1 = (start_1_sum / feedbak_number) * 100
-        start_2 = (start_2_sum / feedbak_number) * 100
-        start_3 = (start_3_sum / feedbak_number) * 100
-        start_4 = (start_4_sum / feedbak_number) * 100
-        start_5 = (start_5_sum / feedbak_number) * 100
-
-    except Exception:
-        average_rating = 0
-        start_1 = 0
-        start_2 = 0
-        start_3 = 0
-        start_4 = 0
-        start_5 = 0
+    # Agrégats lus sur le résumé joint au produit (products.ratings)
+    summary = getattr(product_detail, 'rating_summary', None) or ProductRatingSummary(product=product_detail)
+    average_rating = summary.average
+    feedbak_number = summary.count
+    percentages = summary.percentages()
 
     # Collecter toutes les images du produit pour la popup
     product_images = []
@@ -161,11 +104,9 @@ def product_details(request, slug):
     
     # Vérifier si le produit est dans les favoris de l'utilisateur
     is_favorited = False
-    like_count = 0
     try:
         from .models import ProductFavorite
-        from django.db import connection
-        table_exists = ProductFavorite._meta.db_table in connection.introspection.table_names()
+        table_exists = model_table_exists(ProductFavorite)
         
         if table_exists:
             if request.user.is_authenticated:
@@ -174,7 +115,6 @@ def product_details(request, slug):
                 session_key = request.session.session_key
                 if session_key:
                     is_favorited = ProductFavorite.objects.filter(product=product_detail, session_key=session_key).exists()
-            like_count = ProductFavorite.objects.filter(product=product_detail).count()
     except Exception:
         pass
 
@@ -188,193 +128,121 @@ def product_details(request, slug):
         'product_feedback': product_feedback,
         'average_rating': average_rating,
         'feedbak_number': feedbak_number,
-        "start_1": start_1,
-        "start_2": start_2,
-        "start_3": start_3,
-        "start_4": start_4,
-        "start_5": start_5,
+        "start_1": percentages[1],
+        "start_2": percentages[2],
+        "start_3": percentages[3],
+        "start_4": percentages[4],
+        "start_5": percentages[5],
         'is_favorited': is_favorited,
-        'like_count': like_count,
+        'like_count': product_detail.like_count,
     }
     return render(request, 'products/shop-product-vendor.html', context)
 
 
+def _search_results(word, category, params):
+    """
+    Produits boutique et articles C2C correspondant à la recherche, en un seul
+    flux classé par pertinence (search.engine), boostés d'abord. Une requête
+    vide liste les deux catalogues comme la grille (boostés, puis plus récents).
+    Les éléments sont des triplets (objet, is_peer_to_peer, is_boosted).
+
+    category est un slug de super-catégorie ; params (GET) porte les filtres
+    de facettes, où cat_type / cat_id remplacent cette super-catégorie.
+    Retourne (résultats, groupes de facettes, chaîne GET des filtres actifs).
+    """
+    from categories.listing import MergedListing
+    from categories.tree import SUPER, get_category_tree
+    from search.engine import search_catalog
+    from search.facets import FacetFilters, facet_counts, facet_groups
+
+    selected = None
+    if category:
+        node = get_category_tree().get_by_slug(SUPER, category)
+        if node is None:
+            # Catégorie inconnue : aucun résultat
+            return [], [], ''
+        selected = (SUPER, node.id)
+    filters = FacetFilters.from_params(params, selected)
+    active = filters.params()
+    if filters.category is not None and filters.category != selected:
+        active = {'cat_type': filters.category[0], 'cat_id': filters.category[1], **active}
+
+    results = search_catalog(word, filters=filters)
+    if results.terms:
+        counts = results.facets()
+    else:
+        cat_type, cat_id = filters.category or ('all', '')
+        results = MergedListing(cat_type, cat_id, filters=filters)
+        counts = facet_counts(kinds=results.kinds(), filters=filters)
+    base_params = {'q': word, 'category': category} if category else {'q': word}
+    return results, facet_groups(counts, filters, base_params), urlencode(active)
+
+
+def suggest(request):
+    """Suggestions de saisie (JSON) pour la recherche ; servies depuis la mémoire, sans requête SQL."""
+    from search.suggest import suggest as suggestions
+
+    query = request.GET.get('q', '')[:100]
+    return JsonResponse({'query': query, 'suggestions': suggestions(query)})
+
+
+def _search_url(word, category_name):
+    """URL GET d'une recherche envoyée par l'ancien formulaire POST (nom de super-catégorie)."""
+    from categories.tree import SUPER, get_category_tree
+
+    params = {'q': word}
+    if category_name and category_name != "All Categories":
+        node = next((c for c in get_category_tree().all(SUPER) if c.name == category_name), None)
+        params['category'] = node.slug if node else category_name
+    return f"{reverse('products:product-search')}?{urlencode(params)}"
+
+
 def product_search(request):
-    """Search products by keyword, with category filtering."""
-    logger.info("product_search user=%s query=%s", request.user, request.POST.get('search-product', ''))
-    context = {}
-    if not request.session.has_key('currency'):
-        request.session['currency'] = settings.DEFAULT_CURRENCY
+    """
+    Recherche par mots-clés, sans état de session : la requête (q), la
+    super-catégorie (category, slug), les facettes et la page sont dans l'URL.
+    Les ids classés d'une recherche et ses comptes de facettes sont mis en
+    cache brièvement (search.engine) : la pagination ne relance pas la
+    recherche.
+    """
+    from categories.tree import SUPER, get_category_tree
 
-    # Récupérer les catégories pour le filtre
-    supercategory = SuperCategory.objects.all().order_by('name')
-    
-    # Préparer les données des produits avec like_count et images
-    import json
-    products_data = []
-    qs = None
-    page_obj = None
-    
     if request.method == 'POST':
-        try:
-            word = request.POST['search-product']
-        except Exception:
-            word = ""
-        request.session["search_product"] = word
+        # Anciens formulaires / pages en cache : même recherche en GET
+        return HttpResponseRedirect(_search_url(request.POST.get('search-product', '').strip(),
+                                                request.POST.get('category-select')))
 
-        try:
-            category_select = request.POST['category-select']
-        except Exception:
-            category_select = "All Categories"
-        request.session["search_category_select"] = category_select
-
-        if category_select == "All Categories":
-            try:
-                queryset = Product.objects.filter(
-                    product_name__icontains=word, PRDISDeleted=False, PRDISactive=True
-                ).select_related('product_vendor').annotate(
-                    like_count=Count('favorites')
-                ).order_by('-date').distinct()
-            except Exception:
-                queryset = Product.objects.filter(
-                    product_name__icontains=word, PRDISDeleted=False, PRDISactive=True
-                ).select_related('product_vendor').order_by('-date').distinct()
-        else:
-            try:
-                queryset = Product.objects.filter(
-                    product_name__icontains=word, PRDISDeleted=False, PRDISactive=True, 
-                    product_supercategory__name=category_select
-                ).select_related('product_vendor').annotate(
-                    like_count=Count('favorites')
-                ).order_by('-date').distinct()
-            except Exception:
-                queryset = Product.objects.filter(
-                    product_name__icontains=word, PRDISDeleted=False, PRDISactive=True, 
-                    product_supercategory__name=category_select
-                ).select_related('product_vendor').order_by('-date').distinct()
-        
-        request.session["products_count"] = queryset.count()
-        paginator = Paginator(queryset, 12)
-        page = request.GET.get('page', 1)
-        try:
-            page_obj = paginator.page(page)
-        except PageNotAnInteger:
-            page_obj = paginator.page(1)
-        except EmptyPage:
-            page_obj = paginator.page(paginator.num_pages)
-            
-    elif "search_product" in request.session.keys():
-        word = request.session.get("search_product", "")
-        category_select = request.session.get("search_category_select", "All Categories")
-        
-        if category_select == "All Categories":
-            try:
-                queryset = Product.objects.filter(
-                    product_name__icontains=word, PRDISDeleted=False, PRDISactive=True
-                ).select_related('product_vendor').annotate(
-                    like_count=Count('favorites')
-                ).order_by('-date').distinct()
-            except Exception:
-                queryset = Product.objects.filter(
-                    product_name__icontains=word, PRDISDeleted=False, PRDISactive=True
-                ).select_related('product_vendor').order_by('-date').distinct()
-        else:
-            try:
-                queryset = Product.objects.filter(
-                    product_name__icontains=word, PRDISDeleted=False, PRDISactive=True, 
-                    product_supercategory__name=category_select
-                ).select_related('product_vendor').annotate(
-                    like_count=Count('favorites')
-                ).order_by('-date').distinct()
-            except Exception:
-                queryset = Product.objects.filter(
-                    product_name__icontains=word, PRDISDeleted=False, PRDISactive=True, 
-                    product_supercategory__name=category_select
-                ).select_related('product_vendor').order_by('-date').distinct()
-        
-        paginator = Paginator(queryset, 12)
-        page = request.GET.get('page', 1)
-        try:
-            page_obj = paginator.page(page)
-        except PageNotAnInteger:
-            page_obj = paginator.page(1)
-        except EmptyPage:
-            page_obj = paginator.page(paginator.num_pages)
-    
-    # Préparer les données des produits avec images multiples
-    if page_obj:
-        for product in page_obj:
-            # Collecter toutes les images
-            product_images = []
-            if product.product_image:
-                img_path = str(product.product_image)
-                if not img_path.startswith('/media/'):
-                    img_path = '/media/' + img_path
-                product_images.append(img_path)
-            if product.additional_image_1:
-                img_path = str(product.additional_image_1)
-                if not img_path.startswith('/media/'):
-                    img_path = '/media/' + img_path
-                product_images.append(img_path)
-            if product.additional_image_2:
-                img_path = str(product.additional_image_2)
-                if not img_path.startswith('/media/'):
-                    img_path = '/media/' + img_path
-                product_images.append(img_path)
-            if product.additional_image_3:
-                img_path = str(product.additional_image_3)
-                if not img_path.startswith('/media/'):
-                    img_path = '/media/' + img_path
-                product_images.append(img_path)
-            if product.additional_image_4:
-                img_path = str(product.additional_image_4)
-                if not img_path.startswith('/media/'):
-                    img_path = '/media/' + img_path
-                product_images.append(img_path)
-            
-            # Récupérer le like_count de manière sécurisée
-            like_count = 0
-            try:
-                like_count = getattr(product, 'like_count', 0)
-                if like_count is None:
-                    like_count = 0
-            except Exception:
-                try:
-                    from .models import ProductFavorite
-                    like_count = ProductFavorite.objects.filter(product=product).count()
-                except Exception:
-                    like_count = 0
-            
-            products_data.append({
-                'product': product,
-                'product_images': json.dumps(product_images),
-                'like_count': like_count,
-            })
+    word = request.GET.get('q', '').strip()[:200]
+    category = request.GET.get('category', '').strip()
+    logger.info("product_search query=%s category=%s", word, category)
+
+    products_data = []
+    page_obj = None
+    facets = []
+    facet_query = ''
+    if 'q' in request.GET:
+        queryset, facets, facet_query = _search_results(word, category, request.GET)
+        page_obj = Paginator(queryset, 12).get_page(request.GET.get('page'))
+        # Même carte que la grille (boutique ou C2C)
+        from categories.views import product_card
+        products_data = [product_card(*item) for item in page_obj]
+
+    search_params = urlencode({'q': word, 'category': category} if category else {'q': word})
+    if facet_query:
+        search_params += '&' + facet_query
 
-    # Calculer le total de produits pour l'affichage
-    total_products = 0
-    if page_obj:
-        total_products = page_obj.paginator.count
-    
-    # Récupérer la requête de recherche pour l'affichage
-    search_query = ""
-    if request.method == 'POST':
-        try:
-            search_query = request.POST.get('search-product', '').strip()
-        except Exception:
-            search_query = ""
-    elif "search_product" in request.session.keys():
-        search_query = request.session.get("search_product", "")
-    
     context = {
-        'supercategory': supercategory,
+        'supercategory': get_category_tree().sorted(SUPER),
         'products_data': products_data,
         'page_obj': page_obj,
-        'total_products': total_products,
-        'search_query': search_query,
+        'total_products': page_obj.paginator.count if page_obj else 0,
+        'search_query': word,
+        'search_category': category,
+        'search_params': search_params,
         'qs': page_obj,  # Pour compatibilité avec l'ancien template
+        'facets': facets,
+        'facet_query': facet_query,
     }
-
     return render(request, 'products/product-search.html', context)
 
 
@@ -385,60 +253,28 @@ def product_rating(request):
         product_rate = request.POST.get("product_rate")
         message = request.POST.get("client_message")
         client = Profile.objects.get(user=request.user)
-        if request.is_ajax():
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             product = Product.objects.get(id=product_id)
 
-            if ProductRating.objects.all().filter(PRDIProduct=product, client_name__user=request.user).exists():
-                old_rating = ProductRating.objects.get(
-                    PRDIProduct=product, client_name__user=request.user)
-                old_rating.vendor = product.product_vendor
-                old_rating.client_name = client
-                old_rating.client_comment = message
-                old_rating.save()
-
-                product_feedback = ProductRating.objects.all().filter(
-                    PRDIProduct=product, active=True)
-                feedback_sum = ProductRating.objects.all().filter(
-                    PRDIProduct=product, active=True).aggregate(Sum('rate'))
-                feedbak_number = product_feedback.count()
-                try:
-                    if feedback_sum != None or feedback_sum != 0:
-                        average_rating = round(
-                            (int(feedback_sum["rate__sum"]) / feedbak_number) * 20)
-                        product.feedbak_average = average_rating
-                        product.feedbak_number = feedbak_number
-                        product.save()
-
-                except Exception:
-                    pass
+            # Le résumé de notes et Product.feedbak_* sont ajustés par signaux
+            # (products.ratings), dans cette transaction
+            with transaction.atomic():
+                old_rating = ProductRating.objects.select_for_update().filter(
+                    PRDIProduct=product, client_name__user=request.user).first()
+                if old_rating is not None:
+                    old_rating.vendor = product.product_vendor
+                    old_rating.client_name = client
+                    old_rating.client_comment = message
+                    old_rating.save()
+                else:
+                    ProductRating.objects.create(
+                        PRDIProduct=product,
+                        vendor=product.product_vendor,
+                        rate=product_rate,
+                        client_name=client,
 
-            else:
-                ProductRating.objects.create(
-                    PRDIProduct=product,
-                    vendor=product.product_vendor,
-                    rate=product_rate,
-                    client_name=client,
-
-                    client_comment=message,
-                )
-
-                product_feedback = ProductRating.objects.all().filter(
-                    PRDIProduct=product, active=True)
-                feedback_sum = ProductRating.objects.all().filter(
-                    PRDIProduct=product, active=True).aggregate(Sum('rate'))
-                feedbak_number = product_feedback.count()
-                try:
-                    if feedback_sum != None or feedback_sum != 0:
-                        average_rating = round(
-                            (int(feedback_sum["rate__sum"]) / feedbak_number * 20))
-                        product.feedbak_average = average_rating
-                        product.feedbak_number = feedbak_number
-                        product.save()
-
-                except Exception:
-                    product.feedbak_average = int(product_rate) * 20
-                    product.feedbak_number = 1
-                    product.save()
+                        client_comment=message,
+                    )
             return JsonResponse({"succes": True, "product_id": product_id, "product_rate": product_rate, }, safe=False)
         return JsonResponse({"succes": False, }, safe=False)
 
@@ -449,8 +285,7 @@ def toggle_favorite(request):
     if request.method == 'POST':
         try:
             # Vérifier si la table existe
-            from django.db import connection
-            table_exists = ProductFavorite._meta.db_table in connection.introspection.table_names()
+            table_exists = model_table_exists(ProductFavorite)
             
             if not table_exists:
                 return JsonResponse({
@@ -509,8 +344,8 @@ def toggle_favorite(request):
                     else:
                         is_favorited = True
                 
-                # Compter le nombre total de likes
-                like_count = PeerToPeerProductFavorite.objects.filter(product=peer_product).count()
+                # Compteur maintenu par les signaux de favoris
+                like_count = PeerToPeerProduct.objects.values_list('like_count', flat=True).get(pk=peer_product.pk)
                 
                 # Compter le nombre total de favoris de l'utilisateur/session (produits normaux + C2C)
                 if request.user.is_authenticated:
@@ -563,8 +398,8 @@ def toggle_favorite(request):
                     else:
                         is_favorited = True
                 
-                # Compter le nombre total de likes
-                like_count = ProductFavorite.objects.filter(product=product).count()
+                # Compteur maintenu par les signaux de favoris
+                like_count = Product.objects.values_list('like_count', flat=True).get(pk=product.pk)
                 
                 # Compter le nombre total de favoris de l'utilisateur/session (produits normaux + C2C)
                 if request.user.is_authenticated:
@@ -600,10 +435,9 @@ def toggle_favorite(request):
 def get_wishlist_count(request):
     """Vue AJAX pour obtenir le nombre d'articles dans la liste à souhaits (produits normaux + articles C2C)"""
     try:
-        from django.db import connection
         from accounts.models import PeerToPeerProductFavorite
         
-        if ProductFavorite._meta.db_table not in connection.introspection.table_names():
+        if not model_table_exists(ProductFavorite):
             return JsonResponse({'wishlist_count': 0})
         
         if request.user.is_authenticated:
@@ -625,13 +459,11 @@ def get_wishlist_count(request):
 def wishlist(request):
     """Afficher la liste à souhaits de l'utilisateur (produits normaux + articles d'occasion)"""
     try:
-        from django.db import connection
         from accounts.models import PeerToPeerProductFavorite
         
         # Vérifier si les tables existent
-        existing_tables = connection.introspection.table_names()
-        product_fav_table_exists = ProductFavorite._meta.db_table in existing_tables
-        peer_fav_table_exists = PeerToPeerProductFavorite._meta.db_table in existing_tables
+        product_fav_table_exists = model_table_exists(ProductFavorite)
+        peer_fav_table_exists = model_table_exists(PeerToPeerProductFavorite)
         
         favorites = []
         if request.user.is_authenticated:
@@ -676,12 +508,7 @@ def wishlist(request):
             if getattr(fav, 'is_peer_to_peer', False):
                 wishlist_card_items.append(_c2c_peer_product_card_context(fav.product))
             else:
-                p = fav.product
-                try:
-                    p.like_count = ProductFavorite.objects.filter(product=p).count()
-                except Exception:
-                    p.like_count = 0
-                wishlist_card_items.append(_b2b_product_card_context(p, _boosted))
+                wishlist_card_items.append(_b2b_product_card_context(fav.product, _boosted))
         
         context = {
             'favorites': favorites,
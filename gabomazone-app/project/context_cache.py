@@ -0,0 +1,141 @@
+"""
+Cache inter-requêtes pour les context processors globaux.
+
+Deux niveaux :
+- L1 : dictionnaire en mémoire du processus (aucun aller-retour réseau) ;
+- L2 : cache Django configuré (Redis en production, LocMem sinon).
+
+Chaque namespace possède un numéro de version stocké dans le cache Django.
+Les valeurs sont rangées sous une clé versionnée ; invalider un namespace
+revient à incrémenter sa version (les anciennes entrées expirent d'elles-mêmes).
+update() publie une valeur modifiée sous une nouvelle version, sans la
+reconstruire (mises à jour incrémentales).
+Les signaux post_save / post_delete des modèles concernés déclenchent
+l'invalidation (voir invalidate_on) après le commit de la transaction : un
+lecteur concurrent ne peut pas ranger sous la nouvelle version une valeur
+construite depuis des lignes pas encore validées.
+"""
+import threading
+import time
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+logger = logging.getLogger(__name__)
+
+# Durée pendant laquelle le L1 est servi sans revalider la version dans le L2
+L1_TTL = 5
+# Durée de vie des valeurs dans le cache Django (la version fait foi)
+L2_TTL = 60 * 60 * 24
+
+_MISSING = object()
+_local = {}
+_lock = threading.Lock()
+
+
+def _version_key(namespace):
+    return f'ctx:{namespace}:version'
+
+
+def _value_key(namespace, version):
+    return f'ctx:{namespace}:v{version}'
+
+
+def _get_version(namespace):
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), 1, None)
+        version = cache.get(_version_key(namespace), 1)
+    return version
+
+
+def version(namespace):
+    """Version courante du namespace (à inclure dans les clés de caches dérivés)."""
+    return _get_version(namespace)
+
+
+def get_or_build(namespace, builder):
+    """
+    Retourne la valeur du namespace, en la construisant via builder() si absente.
+    builder doit retourner une valeur picklable (listes d'instances, dict...).
+    """
+    now = time.monotonic()
+    entry = _local.get(namespace)
+    if entry is not None and now - entry[2] < L1_TTL:
+        return entry[1]
+
+    version = _get_version(namespace)
+    if entry is not None and entry[0] == version:
+        with _lock:
+            _local[namespace] = (version, entry[1], now)
+        return entry[1]
+
+    value = cache.get(_value_key(namespace, version), _MISSING)
+    if value is _MISSING:
+        value = builder()
+        cache.set(_value_key(namespace, version), value, L2_TTL)
+    with _lock:
+        _local[namespace] = (version, value, now)
+    return value
+
+
+def invalidate(namespace):
+    """Invalide un namespace pour tous les processus partageant le cache Django."""
+    with _lock:
+        _local.pop(namespace, None)
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        # Clé absente (cache vidé ou jamais initialisée)
+        cache.add(_version_key(namespace), 1, None)
+        cache.incr(_version_key(namespace))
+    logger.debug('Context cache invalidé: %s', namespace)
+
+
+def update(namespace, func):
+    """
+    Applique func à la valeur courante et publie le résultat sous une nouvelle
+    version, pour tous les processus. Sans valeur en cache, rien n'est fait
+    (la prochaine lecture reconstruit) ; si func retourne la valeur reçue
+    telle quelle, rien n'est publié. Deux mises à jour concurrentes peuvent
+    se masquer : les valeurs mises à jour ainsi doivent aussi expirer.
+    Depuis un signal, appeler update() au commit (transaction.on_commit).
+    """
+    version = _get_version(namespace)
+    entry = _local.get(namespace)
+    if entry is not None and entry[0] == version:
+        value = entry[1]
+    else:
+        value = cache.get(_value_key(namespace, version), _MISSING)
+        if value is _MISSING:
+            return
+    new_value = func(value)
+    if new_value is value:
+        return
+    try:
+        version = cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.add(_version_key(namespace), 1, None)
+        version = cache.incr(_version_key(namespace))
+    cache.set(_value_key(namespace, version), new_value, L2_TTL)
+    with _lock:
+        _local[namespace] = (version, new_value, time.monotonic())
+
+
+def clear_local():
+    """Vide le L1 du processus courant (utile en test)."""
+    with _lock:
+        _local.clear()
+
+
+def invalidate_on(namespace, *models):
+    """Connecte post_save / post_delete des modèles à l'invalidation du namespace (après commit)."""
+    def _receiver(sender, **kwargs):
+        transaction.on_commit(lambda: invalidate(namespace))
+
+    for model in models:
+        uid = f'context_cache:{namespace}:{model._meta.label_lower}'
+        post_save.connect(_receiver, sender=model, weak=False, dispatch_uid=uid + ':save')
+        post_delete.connect(_receiver, sender=model, weak=False, dispatch_uid=uid + ':delete')
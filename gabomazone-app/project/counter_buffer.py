@@ -0,0 +1,139 @@
+"""
+Compteurs en écriture différée, partagés entre processus (impressions
+publicitaires, vues produit).
+
+Chaque incrément va directement dans le cache partagé ; aucun tampon ne reste
+dans la mémoire d'un processus web (un processus inactif ou arrêté ne retient
+donc rien) :
+- compteur '<namespace>:n:<label>:<pk>' (cache.incr, atomique) ;
+- un objet sans inscription en cours ('<namespace>:r:<label>:<pk>', posé par
+  cache.add) est inscrit dans un journal numéroté ('<namespace>:seq',
+  '<namespace>:item:<n>'). Une inscription perdue (processus interrompu,
+  entrée expirée) est refaite au premier incrément après REGISTERED_TTL ;
+  une inscription en double est sans effet.
+
+drain(write), appelé par une tâche périodique Celery beat, relit le journal
+depuis son dernier passage et passe {(label, pk): unités} à write. Les unités
+ne sont retirées des compteurs (cache.decr) qu'après le retour de write : si
+write lève une exception, elles sont reproposées au passage suivant. La
+lecture s'arrête au premier numéro sans entrée (add() en cours) ; un numéro
+déjà vide au passage précédent est sauté.
+
+Sans cache partagé (LocMem, développement), le cache n'est pas vu par le
+worker Celery : is_shared() est faux et l'appelant écrit directement en base.
+"""
+import logging
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Case, F, IntegerField, Value, When
+
+logger = logging.getLogger(__name__)
+
+# Durée de vie d'une entrée du journal non encore relue
+ITEM_TTL = 60 * 60 * 24
+# Durée de vie d'une inscription au journal (réinscription ensuite)
+REGISTERED_TTL = 60 * 15
+# Entrées du journal lues par get_many
+CHUNK = 1000
+
+
+def is_shared():
+    """Vrai si le cache par défaut est partagé entre processus (Redis)."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def increment(model, counts, field):
+    """Ajoute {pk: unités} à model.field : un UPDATE (CASE) pour tous les objets."""
+    counts = {pk: count for pk, count in counts.items() if count}
+    if not counts:
+        return 0
+    delta = Case(*[When(pk=pk, then=Value(count)) for pk, count in counts.items()],
+                 default=Value(0), output_field=IntegerField())
+    # update() ne déclenche pas post_save : index et caches restent valides
+    model.objects.filter(pk__in=counts).update(**{field: F(field) + delta})
+    return sum(counts.values())
+
+
+class CounterBuffer:
+    """Compteurs {(label, pk): unités} en attente dans le cache partagé."""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.seq_key = f'{namespace}:seq'
+        self.done_key = f'{namespace}:done'
+        # Dernier numéro attribué lors du passage précédent
+        self.seen_key = f'{namespace}:seen'
+
+    def _counter(self, label, pk):
+        return f'{self.namespace}:n:{label}:{pk}'
+
+    def _item(self, n):
+        return f'{self.namespace}:item:{n}'
+
+    def _registered(self, label, pk):
+        return f'{self.namespace}:r:{label}:{pk}'
+
+    def _register(self, label, pk):
+        cache.add(self.seq_key, 0, None)
+        seq = cache.incr(self.seq_key)
+        cache.set(self._item(seq), (label, pk), ITEM_TTL)
+
+    def add(self, label, pk, count=1):
+        """Ajoute count unités à l'objet (label, pk)."""
+        key = self._counter(label, pk)
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            if not cache.add(key, count, None):
+                cache.incr(key, count)
+        # Après l'incrément : un drain() qui a déjà lu le compteur a retiré l'inscription
+        if cache.add(self._registered(label, pk), 1, REGISTERED_TTL):
+            self._register(label, pk)
+
+    def drain(self, write):
+        """
+        Passe à write les unités inscrites depuis le dernier passage, puis les
+        retire des compteurs. Retourne le résultat de write (0 sans unités).
+        """
+        seq = cache.get(self.seq_key) or 0
+        done = cache.get(self.done_key) or 0
+        if seq <= done:
+            return 0
+        seen = cache.get(self.seen_key) or 0
+        items = {}
+        for start in range(done + 1, seq + 1, CHUNK):
+            items.update(cache.get_many([self._item(n) for n in range(start, min(start + CHUNK, seq + 1))]))
+        # Numéro sans entrée : add() en cours, relu au passage suivant ; déjà
+        # vide au passage précédent : inscription perdue ou expirée, sautée
+        last = done
+        for n in range(done + 1, seq + 1):
+            if self._item(n) not in items and n > seen:
+                break
+            last = n
+        cache.set(self.seen_key, seq, None)
+        if last == done:
+            return 0
+        keys = [self._item(n) for n in range(done + 1, last + 1)]
+        entries = {items[key] for key in keys if key in items}
+
+        # Inscriptions retirées avant la lecture des compteurs : un incrément
+        # non lu ici réinscrit son objet pour le passage suivant
+        cache.delete_many([self._registered(label, pk) for label, pk in entries])
+        counters = cache.get_many([self._counter(label, pk) for label, pk in entries])
+        pending = {}
+        for label, pk in entries:
+            count = counters.get(self._counter(label, pk)) or 0
+            if count > 0:
+                pending[(label, pk)] = count
+
+        result = write(pending) if pending else 0
+        for (label, pk), count in pending.items():
+            try:
+                cache.decr(self._counter(label, pk), count)
+            except ValueError:
+                logger.warning('Compteur %s:%s:%s absent du cache', self.namespace, label, pk)
+        cache.set(self.done_key, last, None)
+        cache.delete_many(keys)
+        return result
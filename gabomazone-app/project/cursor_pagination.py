@@ -0,0 +1,187 @@
+"""
+Pagination par curseur (keyset) pour les listes JSON / HTMX en scroll infini.
+
+Au lieu de ?num_products=N (OFFSET qui relit toutes les lignes précédentes),
+la page suivante est désignée par un curseur opaque et signé contenant les
+valeurs de tri de la dernière ligne servie. La requête filtre directement
+« après cette ligne » : le coût d'une page ne dépend plus de sa profondeur.
+
+Le tri se termine toujours par une clé unique (id par défaut) ; les NULL sont
+placés en fin de liste quel que soit le sens. Le curseur embarque l'ordre de
+tri : un curseur émis pour un autre tri (ou modifié) lève InvalidCursor.
+
+Les totaux sont optionnels : cached_count() met un COUNT en cache quelques
+secondes, les vues ne le calculent que pour la première page.
+"""
+import datetime
+import decimal
+import hashlib
+import logging
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+
+logger = logging.getLogger(__name__)
+
+SALT = 'project.cursor_pagination'
+COUNT_TTL = 60
+
+
+class InvalidCursor(ValueError):
+    """Curseur illisible, falsifié ou émis pour un autre tri."""
+
+
+def _serialize(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+class Keyset:
+    """
+    Ordre de tri d'une pagination keyset : ('-date', 'id') etc.
+    Fournit le ORDER BY, le filtre « après la ligne » et l'encodage du curseur.
+    """
+
+    def __init__(self, ordering, tiebreak='id'):
+        ordering = list(ordering)
+        names = [name.lstrip('-') for name in ordering]
+        if tiebreak and tiebreak not in names:
+            descending = ordering[0].startswith('-') if ordering else False
+            ordering.append(('-' if descending else '') + tiebreak)
+        self.ordering = tuple(ordering)
+        self.fields = tuple((name.lstrip('-'), name.startswith('-')) for name in ordering)
+
+    def order_by(self):
+        """Expressions ORDER BY (NULL en dernier dans les deux sens)."""
+        return [F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True)
+                for name, descending in self.fields]
+
+    def values_of(self, row):
+        """Valeurs de tri d'une ligne (instance de modèle ou dict de values())."""
+        if isinstance(row, dict):
+            return [row[name] for name, _descending in self.fields]
+        return [getattr(row, name) for name, _descending in self.fields]
+
+    def encode(self, row):
+        """Curseur désignant la position juste après row."""
+        payload = {'o': list(self.ordering), 'v': [_serialize(v) for v in self.values_of(row)]}
+        return signing.dumps(payload, salt=SALT, compress=True)
+
+    def decode(self, cursor, queryset):
+        """Valeurs de tri contenues dans le curseur, converties au type des champs."""
+        try:
+            payload = signing.loads(cursor, salt=SALT)
+        except signing.BadSignature as e:
+            raise InvalidCursor(str(e))
+        if not isinstance(payload, dict) or payload.get('o') != list(self.ordering):
+            raise InvalidCursor("Curseur émis pour un autre tri")
+        values = payload.get('v')
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor("Curseur incomplet")
+        try:
+            return [self._to_python(queryset, name, value)
+                    for (name, _descending), value in zip(self.fields, values)]
+        except Exception as e:
+            raise InvalidCursor(str(e))
+
+    @staticmethod
+    def _output_field(queryset, name):
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def _to_python(self, queryset, name, value):
+        field = self._output_field(queryset, name)
+        if value is None or field is None:
+            return value
+        return field.to_python(value)
+
+    def _nullable(self, queryset, name):
+        field = self._output_field(queryset, name)
+        return True if field is None else bool(getattr(field, 'null', True))
+
+    def after(self, queryset, values):
+        """
+        Filtre lexicographique « strictement après values » pour l'ordre courant :
+        (a après) OU (a égal ET b après) OU ...
+        """
+        clauses = []
+        equal = Q()
+        for (name, descending), value in zip(self.fields, values):
+            if value is None:
+                # NULL en dernier : rien n'est « après » sur ce champ
+                strictly_after = None
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                strictly_after = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+                if self._nullable(queryset, name):
+                    strictly_after |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            if strictly_after is not None:
+                clauses.append(equal & strictly_after)
+            equal &= same
+        if not clauses:
+            return queryset.none()
+        condition = clauses[0]
+        for clause in clauses[1:]:
+            condition |= clause
+        return queryset.filter(condition)
+
+
+class CursorPage:
+    """Une page : object_list, next_cursor (None en fin de liste), has_next."""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.has_next = next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class CursorPaginator:
+    """Pagination keyset d'un queryset (instances ou values())."""
+
+    def __init__(self, queryset, ordering, page_size, tiebreak='id'):
+        self.queryset = queryset
+        self.keyset = Keyset(ordering, tiebreak)
+        self.page_size = page_size
+
+    def page(self, cursor=None):
+        """Page suivant le curseur (première page si cursor est vide)."""
+        queryset = self.queryset
+        if cursor:
+            queryset = self.keyset.after(queryset, self.keyset.decode(cursor, queryset))
+        # Une ligne de plus pour savoir s'il existe une page suivante, sans COUNT
+        rows = list(queryset.order_by(*self.keyset.order_by())[:self.page_size + 1])
+        has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        next_cursor = self.keyset.encode(rows[-1]) if has_next and rows else None
+        return CursorPage(rows, next_cursor)
+
+
+def cached_count(queryset, timeout=COUNT_TTL):
+    """COUNT(*) mis en cache quelques secondes (clé dérivée de la requête SQL)."""
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except Exception:
+        return queryset.count()
+    key = 'count:' + hashlib.md5(f'{sql}|{params!r}'.encode('utf-8')).hexdigest()
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, timeout)
+    return total
@@ -0,0 +1,201 @@
+"""
+Évaluation paresseuse des context processors.
+
+Un context processor décoré par @lazy_processor('cle1', 'cle2', ...) n'est plus
+exécuté à chaque rendu : ses clés sont placées dans le contexte sous forme de
+valeurs différées, et la fonction n'est appelée que lorsqu'un template lit
+l'une de ces variables. Le résultat est mémorisé sur la requête, de sorte que
+plusieurs rendus (page + partials) n'exécutent le processor qu'une seule fois.
+
+Les processors non décorés (ceux de Django notamment) restent exécutés
+immédiatement, comme avant.
+
+Le backend LazyDjangoTemplates (TEMPLATES['BACKEND']) active le mécanisme ;
+ContextProcessorTimingMiddleware journalise le temps de chaque processor
+effectivement exécuté et l'expose dans l'en-tête Server-Timing en DEBUG.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.template import Context, RequestContext
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def lazy_processor(*keys):
+    """Déclare les clés retournées par un context processor pour l'évaluer à la demande."""
+    def decorator(func):
+        func.lazy_context_keys = tuple(keys)
+        return func
+    return decorator
+
+
+def _processor_name(processor):
+    return f'{processor.__module__.split(".")[0]}.{processor.__name__}'
+
+
+def get_processor_timings(request):
+    """Durées (ms) des processors exécutés pendant la requête, par nom."""
+    return getattr(request, '_context_processor_timings', {})
+
+
+class DeferredProcessor:
+    """Exécute un context processor une seule fois par requête."""
+
+    def __init__(self, processor, request):
+        self.processor = processor
+        self.request = request
+
+    def result(self):
+        memo = self.request.__dict__.setdefault('_lazy_context_results', {})
+        name = _processor_name(self.processor)
+        if name not in memo:
+            start = time.perf_counter()
+            memo[name] = self.processor(self.request) or {}
+            elapsed = (time.perf_counter() - start) * 1000
+            self.request.__dict__.setdefault('_context_processor_timings', {})[name] = elapsed
+            logger.debug('Context processor %s exécuté en %.2f ms (%s)',
+                         name, elapsed, getattr(self.request, 'path', ''))
+        return memo[name]
+
+
+class LazyContextValue:
+    """Valeur de contexte résolue à la première lecture."""
+    __slots__ = ('deferred', 'key')
+
+    def __init__(self, deferred, key):
+        self.deferred = deferred
+        self.key = key
+
+    def resolve(self):
+        return self.deferred.result().get(self.key, _MISSING)
+
+
+class LazyRequestContext(RequestContext):
+    """RequestContext dont les processors déclarés sont évalués à la demande."""
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if isinstance(value, LazyContextValue):
+            value = value.resolve()
+            if value is _MISSING:
+                raise KeyError(key)
+        return value
+
+    def get(self, key, otherwise=None):
+        value = super().get(key, otherwise)
+        if isinstance(value, LazyContextValue):
+            value = value.resolve()
+            if value is _MISSING:
+                return otherwise
+        return value
+
+    def flatten(self):
+        flat = super().flatten()
+        for key, value in list(flat.items()):
+            if isinstance(value, LazyContextValue):
+                value = value.resolve()
+                if value is _MISSING:
+                    del flat[key]
+                else:
+                    flat[key] = value
+        return flat
+
+    @contextmanager
+    def bind_template(self, template):
+        if self.template is not None:
+            raise RuntimeError("Context is already bound to a template")
+
+        self.template = template
+        processors = template.engine.template_context_processors + self._processors
+        updates = {}
+        for processor in processors:
+            keys = getattr(processor, 'lazy_context_keys', None)
+            if keys is not None:
+                deferred = DeferredProcessor(processor, self.request)
+                for key in keys:
+                    updates[key] = LazyContextValue(deferred, key)
+                continue
+            context = processor(self.request)
+            try:
+                updates.update(context)
+            except TypeError as e:
+                raise TypeError(
+                    f"Context processor {processor.__qualname__} didn't return a "
+                    "dictionary."
+                ) from e
+
+        self.dicts[self._processors_index] = updates
+
+        try:
+            yield
+        finally:
+            self.template = None
+            self.dicts[self._processors_index] = {}
+
+
+def make_lazy_context(context, request=None, **kwargs):
+    """Équivalent de django.template.context.make_context utilisant LazyRequestContext."""
+    if context is not None and not isinstance(context, dict):
+        raise TypeError(
+            "context must be a dict rather than %s." % context.__class__.__name__
+        )
+    if request is None:
+        return Context(context, **kwargs)
+    original_context = context
+    context = LazyRequestContext(request, **kwargs)
+    if original_context:
+        context.push(original_context)
+    return context
+
+
+class LazyTemplate(Template):
+
+    def render(self, context=None, request=None):
+        context = make_lazy_context(
+            context, request, autoescape=self.backend.engine.autoescape
+        )
+        try:
+            return self.template.render(context)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self.backend)
+
+
+class LazyDjangoTemplates(DjangoTemplates):
+    """Backend DjangoTemplates avec évaluation paresseuse des context processors."""
+
+    def from_string(self, template_code):
+        return LazyTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return LazyTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class ContextProcessorTimingMiddleware:
+    """Journalise les context processors exécutés pour chaque vue."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        timings = get_processor_timings(request)
+        if timings:
+            logger.debug(
+                'Context processors pour %s : %s', request.path,
+                ', '.join(f'{name}={ms:.2f}ms' for name, ms in timings.items()),
+            )
+            if settings.DEBUG:
+                response['Server-Timing'] = ', '.join(
+                    f'{name};dur={ms:.2f}' for name, ms in timings.items()
+                )
+        return response
@@ -0,0 +1,180 @@
+"""
+Cache de pages complètes pour les visiteurs anonymes (pages détail produit).
+
+La page rendue pour un anonyme est identique d'un visiteur à l'autre, à
+quelques « trous » près. Le décorateur anonymous_page_cache la met en cache
+PAGE_TTL secondes sous une clé (objet, date_update, version, devise), puis
+la sert sans exécuter la vue ni les context processors. Les trous sont
+remplis à chaque réponse :
+- le jeton CSRF des formulaires (jeton de la requête courante) ;
+- les badges panier / favoris de l'en-tête et l'état « favori » du produit
+  (favoris de session des anonymes).
+
+Pendant le rendu mis en cache, request.page_cache_render est vrai : les
+templates concernés émettent alors un marqueur <!--gm-hole:nom:variante-->
+au lieu de la valeur (components/wishlist_badge.html, components/cart_badge.html).
+
+Chaque objet a un namespace de version (project.context_cache) :
+invalidate_page_on() l'incrémente quand l'objet, ses images, tailles ou
+notes changent ; la date_update fait aussi partie de la clé.
+"""
+import logging
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+
+from . import context_cache
+
+logger = logging.getLogger(__name__)
+
+PAGE_TTL = 60
+
+CSRF_HOLE = '<!--gm-hole:csrf:-->'
+_CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+_HOLE = re.compile(r'<!--gm-hole:(\w+):(\w*)-->')
+
+
+def page_namespace(model, pk):
+    return f'page:{model._meta.label_lower}:{pk}'
+
+
+def invalidate_page(model, pk):
+    """Périme les pages en cache de l'objet (toutes devises)."""
+    context_cache.invalidate(page_namespace(model, pk))
+
+
+def invalidate_page_on(sender, field=None):
+    """
+    Périme la page de l'objet à chaque enregistrement / suppression d'une
+    instance de sender : l'objet lui-même (field None) ou l'objet référencé
+    par la clé étrangère field (ex. ProductImage.PRDIProduct).
+    """
+    if field is None:
+        model = sender
+    else:
+        model = sender._meta.get_field(field).related_model
+
+    def _changed(instance, **kwargs):
+        pk = instance.pk if field is None else getattr(instance, f'{field}_id')
+        if pk is not None:
+            invalidate_page(model, pk)
+
+    uid = f'page_cache:{sender._meta.label_lower}:{field}'
+    post_save.connect(_changed, sender=sender, weak=False, dispatch_uid=uid)
+    post_delete.connect(_changed, sender=sender, weak=False, dispatch_uid=uid)
+
+
+def _has_pending_messages(request):
+    return 'messages' in request.COOKIES or '_messages' in request.session
+
+
+def is_cacheable_request(request):
+    """GET anonyme, sans paramètres ni messages flash en attente."""
+    return (request.method == 'GET' and not request.GET and not request.user.is_authenticated
+            and not _has_pending_messages(request))
+
+
+def _wishlist_count(request):
+    from products.context_processors import wishlist_count
+    return wishlist_count(request).get('wishlist_count', 0)
+
+
+def _cart_count(request):
+    from orders.context_processors import orders_cart_obj
+    return orders_cart_obj(request).get('cart_count', 0)
+
+
+def _is_favorite(request, product_id):
+    from products.models import ProductFavorite
+    session_key = request.session.session_key
+    return bool(session_key and product_id.isdigit() and ProductFavorite.objects.filter(
+        product_id=product_id, session_key=session_key).exists())
+
+
+def fill_holes(content, request):
+    """Remplit les trous d'une page en cache pour la requête courante."""
+    values = {}
+
+    def _fill(match):
+        name, variant = match.groups()
+        if name == 'csrf':
+            if 'csrf' not in values:
+                values['csrf'] = get_token(request)
+            return values['csrf']
+        if name == 'wishlist_badge':
+            if 'wishlist' not in values:
+                values['wishlist'] = _wishlist_count(request)
+            return render_to_string('components/wishlist_badge.html',
+                                    {'wishlist_count': values['wishlist'], 'mobile': variant == 'mobile'})
+        if name == 'cart_badge':
+            if 'cart' not in values:
+                values['cart'] = _cart_count(request)
+            return render_to_string('components/cart_badge.html',
+                                    {'cart_count': values['cart'], 'mobile': variant == 'mobile'})
+        if name == 'favorite':
+            return 'liked' if _is_favorite(request, variant) else ''
+        return ''
+
+    return _HOLE.sub(_fill, content)
+
+
+def punch_holes(content):
+    """Remplace le jeton CSRF du rendu par un trou (les autres trous sont émis par les templates)."""
+    match = _CSRF_INPUT.search(content)
+    if match:
+        content = content.replace(match.group(1), CSRF_HOLE)
+    return content
+
+
+def anonymous_page_cache(resolve, on_hit=None):
+    """
+    Décorateur de vue détail. resolve(*args, **kwargs) retourne
+    (model, pk, date_update) de l'objet affiché, ou None (la vue est alors
+    appelée normalement, ex. 404). on_hit(request, model, pk) est appelé
+    quand la page est servie depuis le cache (comptage des vues...).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view(request, *args, **kwargs)
+            identity = resolve(*args, **kwargs)
+            if identity is None:
+                return view(request, *args, **kwargs)
+            model, pk, date_update = identity
+            namespace = page_namespace(model, pk)
+            currency = request.session.get('currency', settings.DEFAULT_CURRENCY)
+            stamp = date_update.timestamp() if date_update else 0
+            key = f'{namespace}:v{context_cache.version(namespace)}:{stamp}:{currency}'
+
+            cached = cache.get(key)
+            if cached is not None:
+                if on_hit is not None:
+                    on_hit(request, model, pk)
+                content, content_type = cached
+                response = HttpResponse(fill_holes(content, request), content_type=content_type)
+                response['X-Page-Cache'] = 'hit'
+                return response
+
+            request.page_cache_render = True
+            try:
+                response = view(request, *args, **kwargs)
+                if hasattr(response, 'render') and callable(response.render):
+                    response = response.render()
+            finally:
+                request.page_cache_render = False
+            if response.status_code != 200 or response.streaming:
+                return response
+            content = punch_holes(response.content.decode(response.charset))
+            cache.set(key, (content, response['Content-Type']), PAGE_TTL)
+            response.content = fill_holes(content, request)
+            response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,60 @@
+"""
+Registre des tables installées, partagé par tout le processus.
+
+Remplace les appels à connection.introspection.table_names() (requête sur le
+catalogue sous PostgreSQL) faits à chaque requête ou à chaque post_save.
+La liste est chargée une seule fois, au premier usage après le démarrage,
+puis rafraîchie après chaque migrate (signal post_migrate).
+
+Une table absente est revérifiée au plus toutes les MISSING_RECHECK secondes,
+pour qu'un worker démarré avant une migration finisse par la voir.
+"""
+import threading
+import time
+import logging
+
+from django.db import connection
+from django.db.models.signals import post_migrate
+
+logger = logging.getLogger(__name__)
+
+MISSING_RECHECK = 60
+
+_tables = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def refresh(**kwargs):
+    """Recharge la liste des tables depuis la base."""
+    global _tables, _loaded_at
+    with _lock:
+        _tables = frozenset(connection.introspection.table_names())
+        _loaded_at = time.monotonic()
+    logger.debug('Registre des tables rechargé (%d tables)', len(_tables))
+    return _tables
+
+
+def installed_tables():
+    """Ensemble (frozenset) des tables présentes en base."""
+    tables = _tables
+    if tables is None:
+        tables = refresh()
+    return tables
+
+
+def table_exists(table_name):
+    """Indique si la table existe, sans introspection en régime établi."""
+    if table_name in installed_tables():
+        return True
+    if time.monotonic() - _loaded_at > MISSING_RECHECK:
+        return table_name in refresh()
+    return False
+
+
+def model_table_exists(model):
+    """Raccourci pour model._meta.db_table."""
+    return table_exists(model._meta.db_table)
+
+
+post_migrate.connect(refresh, dispatch_uid='project.schema_registry.refresh')
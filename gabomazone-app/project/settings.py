@@ -59,6 +59,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.humanize',
+    'django.contrib.postgres',
     'whitenoise.runserver_nostatic',
     'captcha',
     'currencies',
@@ -80,6 +81,7 @@ INSTALLED_APPS = [
     'pages',
     'payments',
     'c2c',  # Module C2C
+    'search',  # Recherche plein texte
     'django_ratelimit',
 ]
 
@@ -92,13 +94,17 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'project.lazy_context.ContextProcessorTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates avec context processors évalués à la demande
+        # (voir project/lazy_context.py et @lazy_processor)
+        'BACKEND': 'project.lazy_context.LazyDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -316,6 +322,12 @@ if _REDIS_URL:
 # =============================================================================
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://redis:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://redis:6379/1')
+# Déclinaisons d'images (products/image_pipeline.py) : tâche Celery si un
+# broker est disponible, sinon traitement dans le processus après le commit
+IMAGE_PIPELINE_ASYNC = config('IMAGE_PIPELINE_ASYNC', default=bool(_REDIS_URL), cast=bool)
+# Vignettes (project/thumbnails.py) : fichiers du cache envoyés par Nginx
+# (X-Accel-Redirect) ; à activer seulement derrière nginx/conf.d/gabomazone.conf
+THUMBNAIL_ACCEL_REDIRECT = config('THUMBNAIL_ACCEL_REDIRECT', default=False, cast=bool)
 CELERY_BEAT_SCHEDULE = {
     'expire-c2c-intents': {
         'task': 'c2c.tasks.expire_old_intents',
@@ -329,6 +341,22 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'accounts.tasks.cleanup_expired_sessions',
         'schedule': 86400.0,
     },
+    'flush-view-counts': {
+        'task': 'products.tasks.flush_view_counts',
+        'schedule': 60.0,
+    },
+    'rebuild-related-products': {
+        'task': 'products.tasks.rebuild_related_products',
+        'schedule': 86400.0,
+    },
+    'flush-ad-impressions': {
+        'task': 'home.tasks.flush_ad_impressions',
+        'schedule': 60.0,
+    },
+    'collect-media-blobs': {
+        'task': 'products.tasks.collect_media_blobs',
+        'schedule': 3600.0,
+    },
 }
 
 
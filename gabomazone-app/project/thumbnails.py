@@ -0,0 +1,136 @@
+"""
+Vignettes à la demande : /media/thumb/<l>x<h>/<chemin>.
+
+Les cartes produit (boutique, recherche, favoris, boutique vendeur)
+téléchargeaient l'image detail de 1100 px pour un emplacement d'environ
+250 px. serve_thumbnail() sert une réduction WebP de l'image
+MEDIA_ROOT/<chemin> tenant dans <l>x<h> :
+- premier appel : décodage réduit (draft() pour les JPEG, décodage à
+  l'échelle 1/2, 1/4 ou 1/8 la plus proche), réduction, écriture dans le
+  cache disque CACHE_DIR, réparti en sous-dossiers par hachage ;
+- appels suivants : fichier du cache servi directement, avec des en-têtes de
+  cache longue durée (et 304 si le navigateur l'a déjà).
+
+Derrière Nginx (THUMBNAIL_ACCEL_REDIRECT), la réponse ne porte que l'en-tête
+X-Accel-Redirect : Nginx envoie le fichier du cache depuis sa location
+internal /media/thumb_cache/ et le worker gunicorn est libéré aussitôt. Sans
+Nginx (développement, tests), le fichier est servi par FileResponse.
+
+Une image déjà traitée par products/image_pipeline.py est réduite depuis sa
+plus petite déclinaison suffisante (card, detail puis zoom). La vignette est
+recalculée si l'image source est plus récente. Seules les tailles de SIZES
+sont acceptées (le disque ne peut pas être rempli par des tailles
+arbitraires), et seules les images sous MEDIA_ROOT hors du cache.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.encoding import filepath_to_uri
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Tailles autorisées (largeur, hauteur)
+SIZES = frozenset({(240, 240), (480, 480)})
+CACHE_DIR = 'thumb_cache'
+QUALITY = 75
+MAX_AGE = 60 * 60 * 24 * 30
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+
+def thumbnail_url(name, width, height):
+    """URL de la vignette width x height de l'image name (relative à MEDIA_ROOT)."""
+    return f'{settings.MEDIA_URL}thumb/{width}x{height}/{filepath_to_uri(name)}'
+
+
+def cache_path(name, width, height):
+    """Fichier du cache disque : thumb_cache/ab/cd/<hachage>.webp."""
+    digest = hashlib.sha1(f'{width}x{height}:{name}'.encode('utf-8')).hexdigest()
+    return os.path.join(settings.MEDIA_ROOT, CACHE_DIR, digest[:2], digest[2:4], f'{digest}.webp')
+
+
+def accel_path(target):
+    """URI interne Nginx (X-Accel-Redirect) d'un fichier du cache."""
+    return settings.MEDIA_URL + filepath_to_uri(os.path.relpath(target, settings.MEDIA_ROOT))
+
+
+def _source(name, width, height):
+    """Chemin disque de la plus petite image suffisante pour la vignette, ou None."""
+    from products.image_pipeline import ORDER, RENDITIONS, is_processed, rendition_name
+
+    candidates = []
+    if is_processed(name):
+        needed = max(width, height)
+        candidates = [rendition_name(name, rendition)
+                      for rendition in sorted(ORDER, key=lambda rendition: RENDITIONS[rendition][0])
+                      if RENDITIONS[rendition][0] >= needed]
+    for candidate in candidates + [name]:
+        path = safe_join(settings.MEDIA_ROOT, candidate)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def render_thumbnail(source, target, width, height):
+    """Écrit la vignette de source dans target (remplacement atomique)."""
+    from products.image_pipeline import prepare
+
+    with Image.open(source) as image:
+        image = prepare(image, max(width, height))
+        image.thumbnail((width, height), reducing_gap=2.0)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                image.save(output, format='WEBP', quality=QUALITY, method=4)
+            os.replace(temporary, target)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+
+def serve_thumbnail(request, width, height, path):
+    """Vue /media/thumb/<width>x<height>/<path>."""
+    if (width, height) not in SIZES or not path.lower().endswith(EXTENSIONS):
+        raise Http404
+    if path.replace('\\', '/').split('/', 1)[0] == CACHE_DIR:
+        raise Http404
+    try:
+        source = _source(path, width, height)
+    except SuspiciousFileOperation:
+        raise Http404
+    if source is None:
+        raise Http404
+
+    target = cache_path(path, width, height)
+    try:
+        fresh = os.stat(target).st_mtime >= os.stat(source).st_mtime
+    except FileNotFoundError:
+        fresh = False
+    if not fresh:
+        try:
+            render_thumbnail(source, target, width, height)
+        except (OSError, Image.DecompressionBombError) as e:
+            logger.warning("Vignette %dx%d impossible pour %s: %s", width, height, path, e)
+            raise Http404
+    mtime = os.stat(target).st_mtime
+
+    if fresh and not was_modified_since(request.headers.get('If-Modified-Since'), mtime):
+        response = HttpResponseNotModified()
+    elif settings.THUMBNAIL_ACCEL_REDIRECT:
+        response = HttpResponse(content_type='image/webp')
+        response['X-Accel-Redirect'] = accel_path(target)
+    else:
+        response = FileResponse(open(target, 'rb'), content_type='image/webp')
+    response['Last-Modified'] = http_date(mtime)
+    response['Cache-Control'] = f'public, max-age={MAX_AGE}'
+    response['X-Thumbnail-Cache'] = 'hit' if fresh else 'miss'
+    return response
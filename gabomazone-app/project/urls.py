@@ -21,8 +21,10 @@ from django.views.static import serve
 from django.views.generic import RedirectView
 from pages.views import faq as faq_view
 from currencies.views import set_currency
+from project.thumbnails import serve_thumbnail
 
 urlpatterns = [
+    path('media/thumb/<int:width>x<int:height>/<path:path>', serve_thumbnail, name='media-thumbnail'),
     re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
     re_path(r'^static/(?P<path>.*)$', serve, {'document_root': settings.STATIC_ROOT}),
     path('admin/', admin.site.urls),
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    """Moteur de recherche plein texte du catalogue"""
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+    verbose_name = 'Recherche'
+
+    def ready(self):
+        """Connecter les signaux d'indexation"""
+        import search.signals  # noqa
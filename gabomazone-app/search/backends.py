@@ -0,0 +1,204 @@
+"""
+Back ends du moteur de recherche : même API sous PostgreSQL et SQLite.
+
+- PostgreSQL : vecteur tsvector pondéré (config 'french') dans
+  SearchEntry.vector, index GIN, classement ts_rank ; tolérance aux fautes
+  par similarité de trigrammes (pg_trgm, index GIN gin_trgm_ops sur title).
+- SQLite (USE_SQLITE=true) : table virtuelle FTS5 search_fts (rowid =
+  SearchEntry.id), classement bm25 pondéré ; tolérance aux fautes en
+  corrigeant les termes inconnus d'après le vocabulaire FTS5 (fts5vocab).
+
+Les pondérations suivent l'ordre nom > tags > description > catégories.
+Une même requête couvre plusieurs types d'entrées (boutique et C2C) : les
+objets boostés (ids fournis par l'appelant, par type) passent en tête, puis
+le classement par pertinence s'applique aux deux catalogues confondus.
+Les tables et index propres à chaque base sont créés par la migration
+search.0001_initial.
+"""
+import difflib
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import SearchEntry
+from .text import singular
+
+# Poids des champs (nom, tags, description, catégories)
+FIELD_WEIGHTS = (('title', 'A'), ('tags', 'B'), ('body', 'C'), ('categories', 'D'))
+BM25_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+MAX_CORRECTIONS = 3
+CORRECTION_CUTOFF = 0.75
+
+
+class SQLiteBackend:
+    """FTS5 + bm25 ; corrections d'après le vocabulaire de l'index."""
+
+    TABLE = 'search_fts'
+    VOCAB_TABLE = 'search_fts_vocab'
+
+    def __init__(self):
+        # Expressions MATCH déjà calculées (count() puis ranked() d'une même recherche)
+        self._matches = {}
+
+    def sync(self, entry):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.TABLE} WHERE rowid = %s', [entry.pk])
+            cursor.execute(
+                f'INSERT INTO {self.TABLE} (rowid, title, tags, body, categories) VALUES (%s, %s, %s, %s, %s)',
+                [entry.pk, entry.title, entry.tags, entry.body, entry.categories])
+
+    def remove(self, entry_ids):
+        if not entry_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(entry_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.TABLE} WHERE rowid IN ({placeholders})', list(entry_ids))
+
+    def _known(self, cursor, prefix):
+        cursor.execute(
+            f'SELECT 1 FROM {self.VOCAB_TABLE} WHERE term >= %s AND term < %s LIMIT 1',
+            [prefix, prefix + '{'])
+        return cursor.fetchone() is not None
+
+    def _corrections(self, cursor, term):
+        # Candidats de même initiale et de longueur voisine
+        cursor.execute(
+            f'SELECT term FROM {self.VOCAB_TABLE} WHERE term >= %s AND term < %s '
+            'AND length(term) BETWEEN %s AND %s',
+            [term[0], term[0] + '{', len(term) - 2, len(term) + 2])
+        candidates = [row[0] for row in cursor.fetchall()]
+        return difflib.get_close_matches(term, candidates, n=MAX_CORRECTIONS, cutoff=CORRECTION_CUTOFF)
+
+    def _match(self, terms):
+        key = tuple(terms)
+        if key not in self._matches:
+            self._matches[key] = self._build_match(terms)
+        return self._matches[key]
+
+    def _build_match(self, terms):
+        clauses = []
+        with connection.cursor() as cursor:
+            for term in terms:
+                stem = singular(term)
+                options = [f'"{stem}"*']
+                if not self._known(cursor, stem):
+                    options += [f'"{correction}"' for correction in self._corrections(cursor, term)]
+                clauses.append('(' + ' OR '.join(options) + ')')
+        return ' AND '.join(clauses)
+
+    def scope(self, terms):
+        """Filtre SearchEntry des entrées correspondant aux termes."""
+        return Q(id__in=RawSQL(f'SELECT rowid FROM {self.TABLE} WHERE {self.TABLE} MATCH %s',
+                               [self._match(terms)]))
+
+    def _where(self, terms, kinds, super_category_id, filters=None):
+        sql = f'{self.TABLE} MATCH %s AND e.kind IN ({", ".join(["%s"] * len(kinds))})'
+        params = [self._match(terms), *kinds]
+        if super_category_id is not None:
+            sql += ' AND e.super_category_id = %s'
+            params.append(super_category_id)
+        if filters:
+            # Filtres de facettes (Q sur SearchEntry) en sous-requête
+            subquery, subparams = SearchEntry.objects.filter(filters).values('id').query.sql_with_params()
+            sql += f' AND e.id IN ({subquery})'
+            params += subparams
+        return sql, params
+
+    def _boosted(self, boosted):
+        clauses, params = [], []
+        for kind, ids in sorted((boosted or {}).items()):
+            if ids:
+                clauses.append(f'(e.kind = %s AND e.object_id IN ({", ".join(["%s"] * len(ids))}))')
+                params += [kind, *sorted(ids)]
+        if not clauses:
+            return '0', []
+        return f'CASE WHEN {" OR ".join(clauses)} THEN 1 ELSE 0 END', params
+
+    def ranked(self, terms, kinds, super_category_id=None, boosted=None, limit=20, offset=0, filters=None):
+        boost, boost_params = self._boosted(boosted)
+        where, params = self._where(terms, kinds, super_category_id, filters)
+        weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT e.kind, e.object_id, {boost} AS boosted '
+                f'FROM {self.TABLE} JOIN search_searchentry e ON e.id = {self.TABLE}.rowid '
+                f'WHERE {where} ORDER BY boosted DESC, bm25({self.TABLE}, {weights}), e.id LIMIT %s OFFSET %s',
+                boost_params + params + [limit, offset])
+            return [(kind, object_id, bool(is_boosted)) for kind, object_id, is_boosted in cursor.fetchall()]
+
+    def count(self, terms, kinds, super_category_id=None, filters=None):
+        where, params = self._where(terms, kinds, super_category_id, filters)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {self.TABLE} JOIN search_searchentry e ON e.id = {self.TABLE}.rowid '
+                f'WHERE {where}', params)
+            return cursor.fetchone()[0]
+
+
+class PostgresBackend:
+    """tsvector pondéré + GIN ; tolérance aux fautes par pg_trgm sur le titre."""
+
+    CONFIG = 'french'
+    # Poids D, C, B, A attendus par ts_rank
+    RANK_WEIGHTS = [0.1, 0.2, 0.4, 1.0]
+
+    def sync(self, entry):
+        vector = None
+        for field, weight in FIELD_WEIGHTS:
+            part = SearchVector(field, weight=weight, config=self.CONFIG)
+            vector = part if vector is None else vector + part
+        SearchEntry.objects.filter(pk=entry.pk).update(vector=vector)
+
+    def remove(self, entry_ids):
+        # Le vecteur est porté par la ligne SearchEntry elle-même
+        return
+
+    def _query(self, terms):
+        raw = ' & '.join(f'{singular(term)}:*' for term in terms)
+        return SearchQuery(raw, search_type='raw', config=self.CONFIG), ' '.join(terms)
+
+    def scope(self, terms):
+        """Filtre SearchEntry des entrées correspondant aux termes."""
+        query, text = self._query(terms)
+        return Q(vector=query) | Q(title__trigram_word_similar=text)
+
+    def _queryset(self, terms, kinds, super_category_id, filters=None):
+        query, text = self._query(terms)
+        queryset = SearchEntry.objects.filter(kind__in=kinds)
+        if super_category_id is not None:
+            queryset = queryset.filter(super_category_id=super_category_id)
+        if filters:
+            queryset = queryset.filter(filters)
+        return queryset.filter(self.scope(terms)).annotate(
+            rank=SearchRank(F('vector'), query, weights=self.RANK_WEIGHTS),
+            similarity=TrigramWordSimilarity(text, 'title'),
+        )
+
+    def _boosted(self, boosted):
+        condition = Q()
+        for kind, ids in (boosted or {}).items():
+            if ids:
+                condition |= Q(kind=kind, object_id__in=sorted(ids))
+        if not condition:
+            return Value(0, output_field=IntegerField())
+        return Case(When(condition, then=Value(1)), default=Value(0), output_field=IntegerField())
+
+    def ranked(self, terms, kinds, super_category_id=None, boosted=None, limit=20, offset=0, filters=None):
+        queryset = self._queryset(terms, kinds, super_category_id, filters).annotate(
+            boosted=self._boosted(boosted),
+        ).order_by('-boosted', (F('rank') + F('similarity')).desc(), 'id')
+        rows = queryset.values_list('kind', 'object_id', 'boosted')[offset:offset + limit]
+        return [(kind, object_id, bool(is_boosted)) for kind, object_id, is_boosted in rows]
+
+    def count(self, terms, kinds, super_category_id=None, filters=None):
+        return self._queryset(terms, kinds, super_category_id, filters).count()
+
+
+def get_backend():
+    """Back end adapté à la base par défaut."""
+    if connection.vendor == 'postgresql':
+        return PostgresBackend()
+    return SQLiteBackend()
@@ -0,0 +1,168 @@
+"""
+API de recherche : résultats classés par pertinence, paginables.
+
+    results = search_catalog('chaussure cuir', super_category_id=3)
+    page = Paginator(results, 12).page(1)
+
+SearchResults se comporte comme une séquence paresseuse : count() et le
+découpage (slice) interrogent l'index via le back end, puis les objets de
+la tranche sont chargés par id (une requête par catalogue) dans l'ordre du
+classement. Boutique et C2C partagent le même index : une recherche
+catalogue produit un seul flux classé, boostés d'abord (accounts.boost_index).
+Les filtres de facettes (search.facets.FacetFilters) restreignent le flux ;
+facets() compte les valeurs de facettes des correspondances en une requête.
+
+Les MAX_CACHED premiers résultats classés et le total sont mis en cache
+RESULTS_TTL secondes sous une clé normalisée (termes, types, catégorie,
+filtres, version de l'index), les comptes de facettes à côté sous la même
+clé : les pages suivantes d'une même recherche, et la même recherche par
+d'autres visiteurs, ne réinterrogent pas l'index.
+"""
+import hashlib
+
+from django.core.cache import cache
+
+from accounts.boost_index import get_boost_index
+from project import context_cache
+
+from .backends import get_backend
+from .facets import INDEX_NAMESPACE, facet_counts
+from .models import SearchEntry
+from .text import terms as query_terms
+
+RESULTS_TTL = 60
+# Résultats classés gardés en cache par recherche (20 pages de 12)
+MAX_CACHED = 240
+
+
+class SearchResults:
+    """
+    Résultats classés d'une recherche (compatibles django.core.paginator).
+    Chaque élément est un triplet (objet, is_peer_to_peer, is_boosted),
+    comme categories.listing.MergedListing.page().
+    """
+
+    def __init__(self, query, kinds=(SearchEntry.SHOP, SearchEntry.PEER), super_category_id=None, filters=None):
+        self.query = query
+        self.terms = query_terms(query)
+        self.kinds = tuple(kinds)
+        self.super_category_id = super_category_id
+        self.filters = filters
+        self._backend = get_backend()
+        self._count = None
+        self._cached = None
+        self._facets = None
+
+    def _querysets(self):
+        from accounts.models import PeerToPeerProduct
+        from products.models import Product
+        return {
+            SearchEntry.SHOP: Product.objects.filter(
+                PRDISDeleted=False, PRDISactive=True).select_related('product_vendor'),
+            SearchEntry.PEER: PeerToPeerProduct.objects.filter(status=PeerToPeerProduct.APPROVED),
+        }
+
+    def _boosted(self):
+        index = get_boost_index()
+        return {SearchEntry.SHOP: index.b2c, SearchEntry.PEER: index.c2c}
+
+    def _load(self, hits):
+        querysets = self._querysets()
+        objects = {}
+        for kind in self.kinds:
+            ids = [object_id for hit_kind, object_id, _boosted in hits if hit_kind == kind]
+            objects[kind] = querysets[kind].in_bulk(ids) if ids else {}
+        # Entrées pas encore désindexées : l'objet invisible est ignoré
+        return [(objects[kind][object_id], kind == SearchEntry.PEER, is_boosted)
+                for kind, object_id, is_boosted in hits if object_id in objects[kind]]
+
+    def _cache_key(self):
+        boosted = self._boosted()
+        filters = (self.filters.category, sorted(self.filters.params().items())) if self.filters else None
+        raw = repr((self.terms, self.kinds, self.super_category_id, filters,
+                    sorted(boosted[SearchEntry.SHOP]), sorted(boosted[SearchEntry.PEER])))
+        digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+        return f'search:{context_cache.version(INDEX_NAMESPACE)}:{digest}'
+
+    def _head(self):
+        """(MAX_CACHED premiers résultats classés, total), depuis le cache partagé."""
+        if self._cached is None:
+            key = self._cache_key()
+            cached = cache.get(key)
+            if cached is None:
+                hits = self._backend.ranked(self.terms, self.kinds, self.super_category_id,
+                                            self._boosted(), MAX_CACHED, 0, self._filters())
+                total = len(hits) if len(hits) < MAX_CACHED else None
+                cached = (hits, total)
+                cache.set(key, cached, RESULTS_TTL)
+            self._cached = cached
+        return self._cached
+
+    def hits(self, limit, offset=0):
+        """(kind, object_id, is_boosted) classés de la tranche [offset, offset + limit)."""
+        if not self.terms or limit <= 0:
+            return []
+        if offset + limit <= MAX_CACHED:
+            return self._head()[0][offset:offset + limit]
+        return self._backend.ranked(self.terms, self.kinds, self.super_category_id,
+                                    self._boosted(), limit, offset, self._filters())
+
+    def _filters(self):
+        return self.filters.entry_q() if self.filters else None
+
+    def count(self):
+        if self._count is None:
+            if not self.terms:
+                self._count = 0
+            else:
+                self._count = self._head()[1]
+                if self._count is None:
+                    self._count = self._backend.count(self.terms, self.kinds, self.super_category_id,
+                                                      self._filters())
+        return self._count
+
+    def facets(self):
+        """Comptes de facettes des correspondances (search.facets.facet_counts), en cache avec les résultats."""
+        if not self.terms:
+            return {}
+        if self._facets is None:
+            key = f'{self._cache_key()}:facets'
+            facets = cache.get(key)
+            if facets is None:
+                facets = facet_counts(self._backend.scope(self.terms), self.kinds, self.filters, cached=False)
+                cache.set(key, facets, RESULTS_TTL)
+            self._facets = facets
+        return self._facets
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start = key.start or 0
+            stop = self.count() if key.stop is None else key.stop
+            return self._load(self.hits(stop - start, start))
+        items = self._load(self.hits(1, key))
+        if not items:
+            raise IndexError(key)
+        return items[0]
+
+
+class ProductSearchResults(SearchResults):
+    """Résultats limités au catalogue boutique : les éléments sont des Product."""
+
+    def __init__(self, query, super_category_id=None):
+        super().__init__(query, (SearchEntry.SHOP,), super_category_id)
+
+    def _load(self, hits):
+        return [product for product, _is_peer, _is_boosted in super()._load(hits)]
+
+
+def search_catalog(query, super_category_id=None, filters=None):
+    """Produits boutique et articles C2C visibles, en un seul flux classé."""
+    return SearchResults(query, (SearchEntry.SHOP, SearchEntry.PEER), super_category_id, filters)
+
+
+def search_products(query, super_category_id=None):
+    """Produits boutique visibles correspondant à la requête, par pertinence."""
+    return ProductSearchResults(query, super_category_id)
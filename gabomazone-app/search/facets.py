@@ -0,0 +1,323 @@
+"""
+Navigation à facettes pour la recherche et les listings de catégories.
+
+Facettes : catégorie (niveau suivant celui sélectionné), tranche de prix,
+état (articles C2C), ville (vendeur boutique ou vendeur C2C), vendeur
+boutique et disponibilité en stock.
+
+Les attributs de facettes sont recopiés dans SearchEntry à l'indexation.
+Tous les comptes d'une page viennent d'une seule requête agrégée sur cette
+table : un GROUP BY par facette, réunis par UNION ALL. Chaque facette est
+comptée avec tous les filtres actifs sauf le sien (comptes disjonctifs :
+choisir un prix n'annule pas les autres tranches). Sans texte de recherche,
+le résultat est mis en cache par périmètre ; la version du namespace
+'search_index' (incrémentée au commit de chaque écriture dans l'index) fait
+partie de la clé, donc une écriture validée rafraîchit les comptes.
+
+Le filtrage lui-même s'applique aux tables produits (listing fusionné,
+categories.listing) ou à SearchEntry (résultats de recherche).
+"""
+import hashlib
+from bisect import bisect_right
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, Count, Max, Q, Value
+from django.db.models.functions import Cast, Lower, Trim
+from django.db.models.lookups import Exact
+
+from categories.tree import LEVELS, MAIN, MINI, SUB, SUPER, get_category_tree
+from project import context_cache
+
+from .models import SearchEntry
+
+INDEX_NAMESPACE = 'search_index'
+CACHE_TTL = 60 * 60
+
+# Bornes inférieures des tranches de prix (FCFA) ; la dernière est ouverte
+PRICE_BOUNDS = (0, 5000, 20000, 50000, 100000, 500000)
+# Valeurs affichées au plus pour les facettes ouvertes (ville, vendeur)
+MAX_VALUES = 12
+
+# Niveau de catégorie → colonne SearchEntry
+LEVEL_FIELDS = {
+    SUPER: 'super_category_id',
+    MAIN: 'main_category_id',
+    SUB: 'sub_category_id',
+    MINI: 'mini_category_id',
+}
+
+CATEGORY = 'category'
+PRICE = 'price'
+CONDITION = 'condition'
+CITY = 'city'
+VENDOR = 'vendor'
+IN_STOCK = 'in_stock'
+
+# Facette → (colonne SearchEntry, titre affiché)
+FACETS = {
+    CATEGORY: (None, 'Catégories'),
+    PRICE: ('price_bucket', 'Prix'),
+    CONDITION: ('condition', 'État'),
+    CITY: ('city', 'Ville'),
+    VENDOR: ('vendor_id', 'Vendeur'),
+    IN_STOCK: ('in_stock', 'Disponibilité'),
+}
+
+
+def price_bucket(price):
+    """Indice de la tranche de prix (None sans prix)."""
+    if price is None or price < 0:
+        return None
+    return bisect_right(PRICE_BOUNDS, price) - 1
+
+
+def price_range(bucket):
+    """(min inclus, max exclu ou None) d'une tranche."""
+    upper = PRICE_BOUNDS[bucket + 1] if bucket + 1 < len(PRICE_BOUNDS) else None
+    return PRICE_BOUNDS[bucket], upper
+
+
+def _amount(value):
+    return f'{value:,}'.replace(',', ' ')
+
+
+def price_label(bucket):
+    low, high = price_range(bucket)
+    if low == 0:
+        return f'Moins de {_amount(high)} FCFA'
+    if high is None:
+        return f'Plus de {_amount(low)} FCFA'
+    return f'{_amount(low)} – {_amount(high)} FCFA'
+
+
+def normalize_city(city):
+    """Ville normalisée (espaces, casse) pour regrouper les saisies libres."""
+    return ' '.join((city or '').split()).title()[:100]
+
+
+def _city_q(field, city):
+    """Ville saisie librement : comparaison sans casse ni espaces de bord."""
+    return Q(Exact(Lower(Trim(field)), city.lower()))
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class FacetFilters:
+    """Filtres de facettes actifs, lus depuis les paramètres GET."""
+
+    def __init__(self, category=None, price=None, condition='', city='', vendor=None, in_stock=None):
+        # category : (niveau, id) ou None
+        self.category = category
+        self.price = price
+        self.condition = condition
+        self.city = city
+        self.vendor = vendor
+        self.in_stock = in_stock
+
+    @classmethod
+    def from_params(cls, params, category=None):
+        """
+        Filtres valides de params (QueryDict) ; les valeurs invalides sont
+        ignorées. cat_type / cat_id donnent la catégorie, sinon category.
+        """
+        cat_type, cat_id = params.get('cat_type'), _int(params.get('cat_id'))
+        if cat_type in LEVELS and cat_id is not None:
+            category = (cat_type, cat_id)
+        price = _int(params.get(PRICE))
+        if price is not None and not 0 <= price < len(PRICE_BOUNDS):
+            price = None
+        in_stock = params.get(IN_STOCK)
+        return cls(
+            category=category,
+            price=price,
+            condition=(params.get(CONDITION) or '').strip()[:20],
+            city=normalize_city(params.get(CITY)),
+            vendor=_int(params.get(VENDOR)),
+            in_stock={'1': True, '0': False}.get(in_stock),
+        )
+
+    def params(self):
+        """Paramètres GET des filtres actifs (hors catégorie)."""
+        values = {PRICE: self.price, CONDITION: self.condition, CITY: self.city, VENDOR: self.vendor,
+                  IN_STOCK: None if self.in_stock is None else int(self.in_stock)}
+        return {key: value for key, value in values.items() if value not in (None, '')}
+
+    def query(self):
+        """Chaîne de requête des filtres actifs (à reporter dans la pagination)."""
+        return urlencode(self.params())
+
+    def value(self, facet):
+        return getattr(self, facet)
+
+    def entry_q(self, exclude=None):
+        """Filtre SearchEntry ; exclude : facette laissée libre (comptes disjonctifs)."""
+        q = Q()
+        if self.category is not None:
+            level, category_id = self.category
+            q &= Q(**{LEVEL_FIELDS[level]: category_id})
+        for facet in (PRICE, CONDITION, CITY, VENDOR, IN_STOCK):
+            value = self.value(facet)
+            if facet != exclude and value not in (None, ''):
+                q &= Q(**{FACETS[facet][0]: value})
+        return q
+
+    def _price_q(self):
+        if self.price is None:
+            return Q()
+        low, high = price_range(self.price)
+        q = Q(PRDPrice__gte=low)
+        return q & Q(PRDPrice__lt=high) if high is not None else q
+
+    def shop_q(self):
+        """Filtre Product (hors catégorie), ou None si aucun produit boutique ne peut correspondre."""
+        if self.condition:
+            return None
+        q = self._price_q()
+        if self.city:
+            q &= _city_q('product_vendor__city', self.city)
+        if self.vendor is not None:
+            q &= Q(product_vendor_id=self.vendor)
+        if self.in_stock is not None:
+            q &= Q(is_out_of_stock=not self.in_stock)
+        return q
+
+    def peer_q(self):
+        """Filtre PeerToPeerProduct (hors catégorie), ou None si aucun article C2C ne peut correspondre."""
+        if self.vendor is not None or self.in_stock is False:
+            return None
+        q = self._price_q()
+        if self.condition:
+            q &= Q(condition=self.condition)
+        if self.city:
+            q &= _city_q('seller_city', self.city)
+        return q
+
+
+def _category_field(filters):
+    """Colonne de la facette catégorie : niveau sous la catégorie sélectionnée."""
+    if filters.category is None:
+        return LEVEL_FIELDS[SUPER]
+    depth = LEVELS.index(filters.category[0])
+    return LEVEL_FIELDS[LEVELS[depth + 1]] if depth + 1 < len(LEVELS) else None
+
+
+def _facet_queryset(entries, filters):
+    """Requête UNION ALL : une ligne (facet, value, label, n) par valeur de facette."""
+    parts = []
+    for facet, (field, _title) in FACETS.items():
+        if facet == CATEGORY:
+            field = _category_field(filters)
+            if field is None:
+                continue
+        queryset = entries.filter(filters.entry_q(exclude=facet)).exclude(**{f'{field}__isnull': True})
+        if field in ('condition', 'city'):
+            queryset = queryset.exclude(**{field: ''})
+        label = Max('vendor_name') if facet == VENDOR else Value('')
+        parts.append(queryset.order_by().values(
+            facet=Value(facet, output_field=CharField()),
+            value=Cast(field, CharField()),
+        ).annotate(label=label, n=Count('id')))
+    return parts[0].union(*parts[1:], all=True)
+
+
+def facet_counts(scope=None, kinds=None, filters=None, cached=True):
+    """
+    {facette: {valeur (str): (libellé, compte)}} pour les entrées du périmètre
+    (Q sur SearchEntry, ex. correspondances d'une recherche) et des types
+    donnés, en une requête ; mise en cache si cached.
+    """
+    filters = filters or FacetFilters()
+    entries = SearchEntry.objects.all()
+    if kinds is not None:
+        entries = entries.filter(kind__in=kinds)
+    if scope is not None:
+        entries = entries.filter(scope)
+    queryset = _facet_queryset(entries, filters)
+
+    key = None
+    if cached:
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(f'{sql}|{params!r}'.encode('utf-8')).hexdigest()
+        key = f'facets:{context_cache.version(INDEX_NAMESPACE)}:{digest}'
+        rows = cache.get(key)
+        if rows is not None:
+            return rows
+
+    rows = {facet: {} for facet in FACETS}
+    for row in queryset:
+        rows[row['facet']][row['value']] = (row['label'], row['n'])
+    if key is not None:
+        cache.set(key, rows, CACHE_TTL)
+    return rows
+
+
+def index_changed():
+    """
+    À appeler après toute écriture dans l'index : rafraîchit les comptes en
+    cache au commit, pour ne pas les recalculer depuis des entrées non validées.
+    """
+    transaction.on_commit(lambda: context_cache.invalidate(INDEX_NAMESPACE))
+
+
+def _labels(facet, values, filters):
+    if facet == CATEGORY:
+        level = LEVELS[0] if filters.category is None else LEVELS[LEVELS.index(filters.category[0]) + 1]
+        tree = get_category_tree()
+        return {value: (node.name if node else None, (level, value))
+                for value, node in ((value, tree.get(level, value)) for value in values)}
+    if facet == PRICE:
+        return {value: (price_label(int(value)), int(value)) for value in values}
+    if facet == CONDITION:
+        from accounts.models import PeerToPeerProduct
+        choices = dict(PeerToPeerProduct.CONDITION_CHOICES)
+        return {value: (str(choices.get(value, value)), value) for value in values}
+    if facet == IN_STOCK:
+        # Booléen converti en texte par la base : '1' / 'true' / 't'
+        return {value: (('En stock', 1) if value.lower() in ('1', 'true', 't') else ('En rupture', 0))
+                for value in values}
+    if facet == VENDOR:
+        return {value: (None, int(value)) for value in values}
+    return {value: (value, value) for value in values}
+
+
+def facet_groups(counts, filters, base_params):
+    """
+    Groupes affichables : [{key, title, options: [{label, count, selected, query}]}].
+    query est la chaîne GET qui applique (ou retire, si sélectionnée) l'option.
+    """
+    groups = []
+    active = filters.params()
+    for facet, (_field, title) in FACETS.items():
+        values = counts.get(facet) or {}
+        labels = _labels(facet, values, filters)
+        options = []
+        for value, (stored_label, count) in values.items():
+            label, param = labels[value]
+            label = label or stored_label or value
+            if facet == CATEGORY:
+                selected = False
+                params = {**base_params, **active, 'cat_type': param[0], 'cat_id': param[1]}
+            else:
+                selected = active.get(facet) == param
+                params = {**base_params, **active}
+                if selected:
+                    del params[facet]
+                else:
+                    params[facet] = param
+            # Tranches de prix dans l'ordre croissant, autres facettes par effectif
+            order = (param,) if facet == PRICE else (-count, label)
+            options.append((order, {'label': label, 'count': count, 'selected': selected,
+                                    'query': urlencode(params)}))
+        options = [option for _order, option in sorted(options, key=lambda item: item[0])]
+        if facet in (CATEGORY, CITY, VENDOR):
+            options = options[:MAX_VALUES]
+        if options:
+            groups.append({'key': facet, 'title': title, 'options': options})
+    return groups
@@ -0,0 +1,147 @@
+"""
+Maintenance de l'index de recherche (SearchEntry + structures du back end).
+
+Un produit boutique est indexé tant qu'il est visible (actif, non supprimé),
+un article C2C tant qu'il est approuvé ; sinon son document est retiré. Les
+noms de catégories viennent de l'arbre partagé (categories.tree), sans
+requête par produit (les articles C2C n'ont pas de mini-catégorie).
+"""
+import logging
+
+from django.db import transaction
+
+from categories.tree import MAIN, MINI, SUB, SUPER, get_category_tree
+
+from .backends import get_backend
+from .facets import index_changed, normalize_city, price_bucket
+from .models import SearchEntry
+from .text import fold
+
+logger = logging.getLogger(__name__)
+
+# Niveau de l'arbre → champ catégorie du produit
+CATEGORY_FIELDS = (
+    (SUPER, 'product_supercategory_id'),
+    (MAIN, 'product_maincategory_id'),
+    (SUB, 'product_subcategory_id'),
+    (MINI, 'product_minicategor_id'),
+)
+
+
+def _document(item, tree, **facets):
+    return {
+        'title': fold(item.product_name),
+        'tags': fold(getattr(item, 'PRDtags', '')),
+        'body': fold(item.product_description),
+        'categories': fold(_category_names(item, tree)),
+        'super_category_id': item.product_supercategory_id,
+        'main_category_id': item.product_maincategory_id,
+        'sub_category_id': item.product_subcategory_id,
+        'mini_category_id': getattr(item, 'product_minicategor_id', None),
+        'price_bucket': price_bucket(item.PRDPrice),
+        **facets,
+    }
+
+
+def _category_names(product, tree):
+    names = []
+    for level, field in CATEGORY_FIELDS:
+        node = tree.get(level, getattr(product, field, None))
+        if node is not None:
+            names.append(node.name or '')
+    return ' '.join(names)
+
+
+def product_document(product, tree=None):
+    """Champs SearchEntry d'un produit boutique, ou None s'il n'est pas visible."""
+    if product.PRDISDeleted or not product.PRDISactive:
+        return None
+    vendor = product.product_vendor
+    return _document(
+        product, tree or get_category_tree(),
+        condition='',
+        city=normalize_city(vendor.city if vendor else ''),
+        vendor_id=product.product_vendor_id,
+        vendor_name=((vendor.display_name if vendor else '') or '')[:100],
+        in_stock=not product.is_out_of_stock,
+    )
+
+
+def peer_document(peer_product, tree=None):
+    """Champs SearchEntry d'un article C2C, ou None s'il n'est pas approuvé."""
+    if peer_product.status != peer_product.APPROVED:
+        return None
+    return _document(
+        peer_product, tree or get_category_tree(),
+        condition=peer_product.condition or '',
+        city=normalize_city(peer_product.seller_city),
+        vendor_id=None,
+        vendor_name='',
+        in_stock=True,
+    )
+
+
+def index_document(kind, object_id, document, backend=None):
+    """Crée / met à jour (document) ou retire (None) l'entrée d'un objet."""
+    backend = backend or get_backend()
+    with transaction.atomic():
+        if document is None:
+            remove(kind, [object_id], backend)
+            return None
+        entry, _created = SearchEntry.objects.update_or_create(
+            kind=kind, object_id=object_id, defaults=document)
+        backend.sync(entry)
+    index_changed()
+    return entry
+
+
+def index_product(product, backend=None):
+    """Indexe (ou retire) un produit boutique."""
+    return index_document(SearchEntry.SHOP, product.pk, product_document(product), backend)
+
+
+def index_peer_product(peer_product, backend=None):
+    """Indexe (ou retire) un article C2C."""
+    return index_document(SearchEntry.PEER, peer_product.pk, peer_document(peer_product), backend)
+
+
+def _remove_entries(entries, backend):
+    with transaction.atomic():
+        backend.remove(list(entries.values_list('id', flat=True)))
+        deleted, _details = entries.delete()
+    if deleted:
+        index_changed()
+
+
+def remove(kind, object_ids, backend=None):
+    """Retire les entrées des objets donnés."""
+    _remove_entries(SearchEntry.objects.filter(kind=kind, object_id__in=object_ids),
+                    backend or get_backend())
+
+
+def _sources():
+    """(kind, objets visibles, fonction document) de chaque catalogue."""
+    from accounts.models import PeerToPeerProduct
+    from products.models import Product
+
+    return (
+        (SearchEntry.SHOP, Product.objects.filter(PRDISDeleted=False, PRDISactive=True)
+         .select_related('product_vendor'), product_document),
+        (SearchEntry.PEER, PeerToPeerProduct.objects.filter(status=PeerToPeerProduct.APPROVED), peer_document),
+    )
+
+
+def rebuild(batch_size=500):
+    """Réindexe les catalogues boutique et C2C. Retourne le nombre d'objets indexés."""
+    backend = get_backend()
+    tree = get_category_tree()
+    indexed = 0
+    for kind, visible, document in _sources():
+        for item in visible.order_by('pk').iterator(chunk_size=batch_size):
+            index_document(kind, item.pk, document(item, tree), backend)
+            indexed += 1
+        # Entrées orphelines (objets supprimés ou devenus invisibles)
+        _remove_entries(SearchEntry.objects.filter(kind=kind)
+                        .exclude(object_id__in=visible.values('pk')), backend)
+    logger.info("Index de recherche reconstruit : %s objet(s)", indexed)
+    return indexed
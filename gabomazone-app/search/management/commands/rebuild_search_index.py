@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from search.indexer import rebuild
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte (boutique et C2C)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        indexed = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{indexed} objet(s) indexé(s).'))
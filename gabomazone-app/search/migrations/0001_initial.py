@@ -0,0 +1,66 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:34
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# Structures propres à chaque base (voir search/backends.py)
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE search_fts USING fts5("
+    "title, tags, body, categories, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE search_fts_vocab USING fts5vocab(search_fts, 'row')",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS search_fts_vocab",
+    "DROP TABLE IF EXISTS search_fts",
+]
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX search_entry_vector_gin ON search_searchentry USING gin (vector)",
+    "CREATE INDEX search_entry_title_trgm ON search_searchentry USING gin (title gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS search_entry_title_trgm",
+    "DROP INDEX IF EXISTS search_entry_vector_gin",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(0, 'Produit boutique')], default=0, verbose_name='Type')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name="Id de l'objet")),
+                ('title', models.TextField(verbose_name='Titre')),
+                ('tags', models.TextField(blank=True, default='', verbose_name='Tags')),
+                ('body', models.TextField(blank=True, default='', verbose_name='Description')),
+                ('categories', models.TextField(blank=True, default='', verbose_name='Catégories')),
+                ('super_category_id', models.PositiveBigIntegerField(blank=True, db_index=True, null=True)),
+                ('vector', django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date de mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Document de recherche',
+                'verbose_name_plural': 'Documents de recherche',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_entry_unique_object')],
+            },
+        ),
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
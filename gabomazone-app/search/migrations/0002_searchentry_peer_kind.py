@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchentry',
+            name='kind',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Produit boutique'), (1, 'Article C2C')], default=0, verbose_name='Type'),
+        ),
+    ]
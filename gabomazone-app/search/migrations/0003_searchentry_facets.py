@@ -0,0 +1,58 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_searchentry_peer_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchentry',
+            name='city',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Ville'),
+        ),
+        migrations.AddField(
+            model_name='searchentry',
+            name='condition',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='État (C2C)'),
+        ),
+        migrations.AddField(
+            model_name='searchentry',
+            name='in_stock',
+            field=models.BooleanField(default=True, verbose_name='En stock'),
+        ),
+        migrations.AddField(
+            model_name='searchentry',
+            name='main_category_id',
+            field=models.PositiveBigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='searchentry',
+            name='mini_category_id',
+            field=models.PositiveBigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='searchentry',
+            name='price_bucket',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Tranche de prix'),
+        ),
+        migrations.AddField(
+            model_name='searchentry',
+            name='sub_category_id',
+            field=models.PositiveBigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='searchentry',
+            name='vendor_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Vendeur'),
+        ),
+        migrations.AddField(
+            model_name='searchentry',
+            name='vendor_name',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Nom du vendeur'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class SearchEntry(models.Model):
+    """
+    Document de recherche d'un produit visible, boutique (B2C) ou C2C.
+
+    Les textes sont stockés pliés (search.text.fold). Le vecteur pondéré est
+    tenu à jour par le back end PostgreSQL (nom > tags > description >
+    catégories) ; sous SQLite, la table FTS5 search_fts (rowid = id) joue ce
+    rôle et la colonne vector reste vide.
+
+    Les attributs de facettes (catégories, tranche de prix, état, ville,
+    vendeur, stock) sont recopiés à l'indexation : les comptes de facettes
+    se calculent sur cette seule table (search.facets).
+    """
+    SHOP = 0
+    PEER = 1
+
+    KIND_CHOICES = [
+        (SHOP, _('Produit boutique')),
+        (PEER, _('Article C2C')),
+    ]
+
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES, default=SHOP, verbose_name=_("Type"))
+    object_id = models.PositiveBigIntegerField(verbose_name=_("Id de l'objet"))
+
+    title = models.TextField(verbose_name=_("Titre"))
+    tags = models.TextField(blank=True, default='', verbose_name=_("Tags"))
+    body = models.TextField(blank=True, default='', verbose_name=_("Description"))
+    categories = models.TextField(blank=True, default='', verbose_name=_("Catégories"))
+
+    super_category_id = models.PositiveBigIntegerField(blank=True, null=True, db_index=True)
+    main_category_id = models.PositiveBigIntegerField(blank=True, null=True, db_index=True)
+    sub_category_id = models.PositiveBigIntegerField(blank=True, null=True, db_index=True)
+    mini_category_id = models.PositiveBigIntegerField(blank=True, null=True, db_index=True)
+
+    # Facettes (search.facets)
+    price_bucket = models.PositiveSmallIntegerField(blank=True, null=True, verbose_name=_("Tranche de prix"))
+    condition = models.CharField(max_length=20, blank=True, default='', verbose_name=_("État (C2C)"))
+    city = models.CharField(max_length=100, blank=True, default='', verbose_name=_("Ville"))
+    vendor_id = models.PositiveBigIntegerField(blank=True, null=True, verbose_name=_("Vendeur"))
+    vendor_name = models.CharField(max_length=100, blank=True, default='', verbose_name=_("Nom du vendeur"))
+    in_stock = models.BooleanField(default=True, verbose_name=_("En stock"))
+
+    vector = SearchVectorField(blank=True, null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Date de mise à jour"))
+
+    class Meta:
+        verbose_name = _("Document de recherche")
+        verbose_name_plural = _("Documents de recherche")
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_entry_unique_object'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id}"
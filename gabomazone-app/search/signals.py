@@ -0,0 +1,91 @@
+"""
+Signaux d'indexation : l'index de recherche suit les enregistrements et
+suppressions de produits boutique et d'articles C2C ; l'index de
+suggestions (search/suggest.py) suit aussi les vendeurs et les catégories.
+Ses mises à jour sont publiées après le commit de la transaction.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import PeerToPeerProduct, Profile
+from categories.models import MainCategory, SubCategory, SuperCategory
+from products.models import Product
+
+from . import indexer, suggest
+from .models import SearchEntry
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    try:
+        indexer.index_product(instance)
+    except Exception as e:
+        # L'index se répare avec la commande rebuild_search_index
+        logger.error("Indexation impossible pour le produit #%s: %s", instance.pk, e)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_on_delete(sender, instance, **kwargs):
+    try:
+        indexer.remove(SearchEntry.SHOP, [instance.pk])
+    except Exception as e:
+        logger.error("Désindexation impossible pour le produit #%s: %s", instance.pk, e)
+
+
+@receiver(post_save, sender=PeerToPeerProduct)
+def index_peer_product_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    try:
+        indexer.index_peer_product(instance)
+    except Exception as e:
+        logger.error("Indexation impossible pour l'article C2C #%s: %s", instance.pk, e)
+
+
+@receiver(post_delete, sender=PeerToPeerProduct)
+def remove_peer_product_on_delete(sender, instance, **kwargs):
+    try:
+        indexer.remove(SearchEntry.PEER, [instance.pk])
+    except Exception as e:
+        logger.error("Désindexation impossible pour l'article C2C #%s: %s", instance.pk, e)
+
+
+def _track_suggestions(model, kind, entry):
+    """Met à jour l'entrée de suggestion d'un objet à l'enregistrement / suppression."""
+    def _publish(object_id, value):
+        try:
+            suggest.update_item(kind, object_id, value)
+        except Exception as e:
+            # L'index de suggestions est reconstruit au plus tard après MAX_AGE
+            logger.error("Suggestions non mises à jour pour %s #%s: %s", kind, object_id, e)
+
+    def _update(instance, value):
+        # Publié au commit : une transaction annulée ne laisse rien dans l'index partagé
+        object_id = instance.pk
+        transaction.on_commit(lambda: _publish(object_id, value))
+
+    def _on_save(sender, instance, raw=False, **kwargs):
+        if not raw:
+            _update(instance, entry(instance))
+
+    def _on_delete(sender, instance, **kwargs):
+        _update(instance, None)
+
+    uid = f'search.suggest:{model._meta.label_lower}'
+    post_save.connect(_on_save, sender=model, weak=False, dispatch_uid=uid + ':save')
+    post_delete.connect(_on_delete, sender=model, weak=False, dispatch_uid=uid + ':delete')
+
+
+_track_suggestions(Product, suggest.PRODUCT, suggest.product_entry)
+_track_suggestions(PeerToPeerProduct, suggest.PEER, suggest.peer_entry)
+_track_suggestions(Profile, suggest.VENDOR, suggest.vendor_entry)
+_track_suggestions(SuperCategory, suggest.SUPER, suggest.category_entry)
+_track_suggestions(MainCategory, suggest.MAIN, suggest.category_entry)
+_track_suggestions(SubCategory, suggest.SUB, suggest.category_entry)
@@ -0,0 +1,197 @@
+"""
+Suggestions de saisie (typeahead) servies depuis un index de préfixes en mémoire.
+
+L'index associe chaque objet suggérable — produit boutique visible, article
+C2C approuvé, boutique vendeur admise, catégorie (super / principale /
+sous-catégorie) — à son libellé et à son slug. Les clés de recherche sont
+les fins du libellé plié (search.text.fold) à partir de chaque mot, triées :
+une recherche est une dichotomie (bisect) suivie d'un parcours borné, sans
+requête SQL.
+
+L'index est partagé par les workers via project.context_cache :
+- construit une fois depuis la base (une requête par source) ;
+- mis à jour objet par objet à l'enregistrement / suppression (signaux,
+  search/signals.py), sans reconstruction ;
+- reconstruit au plus tard après MAX_AGE secondes (mises à jour concurrentes
+  perdues, changements faits par update()).
+"""
+import time
+from bisect import bisect_left, insort
+
+from django.urls import reverse
+
+from project.context_cache import get_or_build, invalidate, update
+
+from .text import fold
+
+CACHE_NAMESPACE = 'suggest_index'
+MAX_AGE = 60 * 60
+
+MIN_PREFIX = 2
+MAX_RESULTS = 8
+# Clés examinées au plus par recherche (latence bornée)
+SCAN_LIMIT = 200
+# Mots du libellé servant de début de clé
+MAX_WORDS = 6
+
+PRODUCT = 'product'
+PEER = 'peer'
+VENDOR = 'vendor'
+SUPER = 'super'
+MAIN = 'main'
+SUB = 'sub'
+
+# Type → (nom d'URL, type exposé, rang à pertinence égale)
+KINDS = {
+    SUPER: ('categories:super-category', 'category', 0),
+    MAIN: ('categories:main-category', 'category', 0),
+    SUB: ('categories:sub-category', 'category', 0),
+    VENDOR: ('suppliers:vendor-details', 'vendor', 1),
+    PRODUCT: ('products:product-details', 'product', 2),
+    PEER: ('accounts:peer-product-details', 'product', 2),
+}
+
+
+def _keys(label):
+    """(clé, position du mot) pour chaque début de mot du libellé."""
+    words = fold(label).split()
+    for position, word in enumerate(words[:MAX_WORDS]):
+        if position == 0 or len(word) >= MIN_PREFIX:
+            yield ' '.join(words[position:]), position
+
+
+class SuggestIndex:
+    """Libellés suggérables et clés de préfixe triées."""
+
+    def __init__(self, items, keys=None, built_at=None):
+        # {(type, id): (libellé, slug)}
+        self.items = items
+        # [(clé, position, type, id)] triées
+        if keys is None:
+            keys = sorted(key + ref for ref, (label, _slug) in items.items() for key in _keys(label))
+        self.keys = keys
+        self.built_at = time.time() if built_at is None else built_at
+
+    def is_expired(self, now=None):
+        return (now or time.time()) - self.built_at >= MAX_AGE
+
+    def lookup(self, query, limit=MAX_RESULTS):
+        """Suggestions dont un mot commence par la requête : [{label, type, url}]."""
+        prefix = ' '.join(fold(query).split())
+        if len(prefix) < MIN_PREFIX:
+            return []
+        start = bisect_left(self.keys, (prefix,))
+        best = {}
+        for key, position, kind, object_id in self.keys[start:start + SCAN_LIMIT]:
+            if not key.startswith(prefix):
+                break
+            ref = (kind, object_id)
+            if position < best.get(ref, MAX_WORDS):
+                best[ref] = position
+        # Début de libellé d'abord, puis catégories, vendeurs, produits ; libellés courts d'abord
+        ranked = sorted(best, key=lambda ref: (best[ref] > 0, KINDS[ref[0]][2],
+                                               len(self.items[ref][0]), self.items[ref][0]))
+        suggestions = []
+        for kind, object_id in ranked[:limit]:
+            label, slug = self.items[(kind, object_id)]
+            url_name, public_kind, _rank = KINDS[kind]
+            suggestions.append({'label': label, 'type': public_kind, 'url': reverse(url_name, args=[slug])})
+        return suggestions
+
+    def with_item(self, ref, entry):
+        """
+        Copie de l'index où ref a pour entrée (libellé, slug), ou en est
+        retiré (None). Retourne l'index lui-même si rien ne change.
+        """
+        previous = self.items.get(ref)
+        if previous == entry:
+            return self
+        items = dict(self.items)
+        keys = list(self.keys)
+        if previous is not None:
+            del items[ref]
+            for key in _keys(previous[0]):
+                position = bisect_left(keys, key + ref)
+                if position < len(keys) and keys[position] == key + ref:
+                    del keys[position]
+        if entry is not None:
+            items[ref] = entry
+            for key in _keys(entry[0]):
+                insort(keys, key + ref)
+        return SuggestIndex(items, keys, self.built_at)
+
+
+def _entry(label, slug):
+    return (label, slug) if label and slug else None
+
+
+def product_entry(product):
+    """Entrée d'un produit boutique, ou None s'il n'est pas visible."""
+    if product.PRDISDeleted or not product.PRDISactive:
+        return None
+    return _entry(product.product_name, product.PRDSlug)
+
+
+def peer_entry(peer_product):
+    """Entrée d'un article C2C, ou None s'il n'est pas approuvé."""
+    if peer_product.status != peer_product.APPROVED:
+        return None
+    return _entry(peer_product.product_name, peer_product.PRDSlug)
+
+
+def vendor_entry(profile):
+    """Entrée d'une boutique vendeur, ou None si le profil n'est pas un vendeur admis."""
+    if profile.status != 'vendor' or not profile.admission:
+        return None
+    return _entry(profile.display_name, profile.slug)
+
+
+def category_entry(category):
+    return _entry(category.name, category.slug)
+
+
+def build_suggest_index():
+    """Construit l'index (une requête par source)."""
+    from accounts.models import PeerToPeerProduct, Profile
+    from categories.tree import get_category_tree
+    from products.models import Product
+
+    items = {}
+    sources = (
+        (PRODUCT, Product.objects.filter(PRDISDeleted=False, PRDISactive=True)
+         .values_list('id', 'product_name', 'PRDSlug')),
+        (PEER, PeerToPeerProduct.objects.filter(status=PeerToPeerProduct.APPROVED)
+         .values_list('id', 'product_name', 'PRDSlug')),
+        (VENDOR, Profile.objects.filter(status='vendor', admission=True)
+         .values_list('id', 'display_name', 'slug')),
+    )
+    for kind, rows in sources:
+        for object_id, label, slug in rows.iterator():
+            entry = _entry(label, slug)
+            if entry is not None:
+                items[(kind, object_id)] = entry
+    tree = get_category_tree()
+    for level in (SUPER, MAIN, SUB):
+        for category in tree.all(level):
+            entry = category_entry(category)
+            if entry is not None:
+                items[(level, category.id)] = entry
+    return SuggestIndex(items)
+
+
+def get_suggest_index():
+    """Index courant ; reconstruit après MAX_AGE secondes."""
+    index = get_or_build(CACHE_NAMESPACE, build_suggest_index)
+    if index.is_expired():
+        invalidate(CACHE_NAMESPACE)
+        index = get_or_build(CACHE_NAMESPACE, build_suggest_index)
+    return index
+
+
+def update_item(kind, object_id, entry):
+    """Met à jour (ou retire si entry vaut None) un objet dans l'index partagé."""
+    update(CACHE_NAMESPACE, lambda index: index.with_item((kind, object_id), entry))
+
+
+def suggest(query, limit=MAX_RESULTS):
+    return get_suggest_index().lookup(query, limit)
@@ -0,0 +1,315 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import PeerToPeerProduct
+from c2c.models import ProductBoost
+from categories.models import MainCategory, SuperCategory
+from products.models import Product
+from project import context_cache
+from .engine import search_catalog, search_products
+from .facets import FacetFilters, facet_counts
+from .models import SearchEntry
+from .suggest import get_suggest_index, suggest
+from .text import fold, terms
+
+
+class TextTests(TestCase):
+
+    def test_fold_removes_accents_and_punctuation(self):
+        self.assertEqual(fold("Chaussures d'Été <b>œuvre</b>"), 'chaussures d ete oeuvre')
+
+    def test_terms_are_deduplicated_and_bounded(self):
+        self.assertEqual(terms('Vélo velo a VTT'), ['velo', 'vtt'])
+
+
+class SearchEngineTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        context_cache.clear_local()
+        self.mode = SuperCategory.objects.create(name='Mode')
+        self.maison = SuperCategory.objects.create(name='Maison')
+        self.sandale = self.product('Sandales d’été', 'Cuir véritable', tags='plage', category=self.mode)
+        self.sac = self.product('Sac à main', 'Parfait avec des sandales', category=self.mode)
+        self.lampe = self.product('Lampe de chevet', 'Lumière douce', category=self.maison)
+
+    def product(self, name, description, tags=None, category=None, **kwargs):
+        return Product.objects.create(
+            product_name=name, product_description=description, PRDtags=tags,
+            PRDPrice=1000, product_supercategory=category, **kwargs)
+
+    def names(self, query, **kwargs):
+        return [p.product_name for p in search_products(query, **kwargs)[:10]]
+
+    def test_matches_name_tags_description_and_category_without_accents(self):
+        self.assertEqual(self.names('ETE'), [self.sandale.product_name])
+        self.assertEqual(self.names('plage'), [self.sandale.product_name])
+        self.assertEqual(self.names('lumiere'), [self.lampe.product_name])
+        self.assertEqual(self.names('maison'), [self.lampe.product_name])
+
+    def test_name_match_ranks_above_description_match(self):
+        self.assertEqual(self.names('sandale'), [self.sandale.product_name, self.sac.product_name])
+
+    def test_misspelled_term_is_corrected(self):
+        self.assertEqual(self.names('lampee chevett'), [self.lampe.product_name])
+
+    def test_super_category_filter_and_count(self):
+        results = search_products('sandales', super_category_id=self.maison.id)
+        self.assertEqual(results.count(), 0)
+        self.assertEqual(search_products('sandales', super_category_id=self.mode.id).count(), 2)
+
+    def test_hidden_and_deleted_products_leave_the_index(self):
+        self.sac.PRDISactive = False
+        self.sac.save()
+        self.assertEqual(self.names('sac'), [])
+        self.lampe.delete()
+        self.assertFalse(SearchEntry.objects.filter(object_id=self.lampe.id).exists())
+        self.assertEqual(self.names('lampe'), [])
+
+    def test_rebuild_command_restores_index(self):
+        SearchEntry.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.names('chevet'), [self.lampe.product_name])
+
+    def test_search_view_uses_ranked_results(self):
+        response = self.client.get(reverse('products:product-search'), {'q': 'sandale'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['product'].id for item in response.context['products_data']],
+                         [self.sandale.id, self.sac.id])
+
+    def test_search_view_is_stateless(self):
+        response = self.client.get(reverse('products:product-search'), {'q': 'sandale', 'category': 'mode'})
+        self.assertEqual([item['product'].id for item in response.context['products_data']],
+                         [self.sandale.id, self.sac.id])
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        response = self.client.get(reverse('products:product-search'), {'q': 'sandale', 'category': 'maison'})
+        self.assertEqual(response.context['products_data'], [])
+
+    def test_legacy_post_redirects_to_get_url(self):
+        response = self.client.post(reverse('products:product-search'),
+                                    {'search-product': 'sandale', 'category-select': 'Mode'})
+        self.assertRedirects(response, reverse('products:product-search') + '?q=sandale&category=mode',
+                             fetch_redirect_response=False)
+
+    def test_ranked_results_are_cached(self):
+        results = search_products('sandale')
+        self.assertEqual(results.count(), 2)
+        with mock.patch.object(type(results._backend), 'ranked') as ranked:
+            self.assertEqual(len(search_products(' SANDALE ')[1:2]), 1)
+            self.assertEqual(search_products('sandale').count(), 2)
+        ranked.assert_not_called()
+        # Une écriture dans l'index change la clé
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product('Sandale rouge', '-')
+        self.assertEqual(search_products('sandale').count(), 3)
+
+
+    def test_facets_are_cached_with_results(self):
+        counts = search_catalog('sandale').facets()
+        self.assertEqual(counts['category'], {str(self.mode.id): ('', 2)})
+        results = search_catalog(' SANDALE ')
+        with mock.patch.object(type(results._backend), 'scope') as scope, \
+                self.assertNumQueries(0):
+            self.assertEqual(results.facets(), counts)
+        scope.assert_not_called()
+        # Une écriture dans l'index change la clé
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product('Sandale rouge', '-', category=self.maison)
+        self.assertEqual(search_catalog('sandale').facets()['category'],
+                         {str(self.mode.id): ('', 2), str(self.maison.id): ('', 1)})
+
+
+class UnifiedSearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        context_cache.clear_local()
+        self.seller = User.objects.create_user('vendeur', 'vendeur@example.com', 'secret')
+        self.velo = Product.objects.create(
+            product_name='Vélo de course', product_description='Vélo à cadre carbone', PRDPrice=200000)
+        self.article = self.peer('Draisienne enfant', 'Petit vélo rouge')
+        self.pending = self.peer('Vélo cargo', 'Vélo familial', status=PeerToPeerProduct.PENDING)
+
+    def peer(self, name, description, status=PeerToPeerProduct.APPROVED):
+        return PeerToPeerProduct.objects.create(
+            seller=self.seller, product_name=name, product_description=description, PRDPrice=30000,
+            seller_phone='074000000', seller_address='Akanda', seller_city='Libreville', status=status)
+
+    def items(self, query):
+        return [(obj.id, is_peer, is_boosted) for obj, is_peer, is_boosted in search_catalog(query)[:10]]
+
+    def test_both_catalogs_in_one_ranked_stream(self):
+        self.assertEqual(self.items('velo'), [(self.velo.id, False, False), (self.article.id, True, False)])
+        self.assertEqual(search_catalog('velo').count(), 2)
+        self.assertEqual(self.items('enfant'), [(self.article.id, True, False)])
+
+    def test_peer_product_follows_its_status(self):
+        self.assertEqual(self.items('cargo'), [])
+        self.pending.status = PeerToPeerProduct.APPROVED
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pending.save()
+        self.assertEqual(self.items('cargo'), [(self.pending.id, True, False)])
+        self.pending.delete()
+        self.assertFalse(SearchEntry.objects.filter(kind=SearchEntry.PEER, object_id=self.pending.id).exists())
+
+    def test_boosted_items_come_first(self):
+        now = timezone.now()
+        ProductBoost.objects.create(
+            product=self.article, buyer=self.seller, duration=ProductBoost.BOOST_24H,
+            start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=23), price=Decimal('1000'))
+        self.assertEqual(self.items('velo'), [(self.article.id, True, True), (self.velo.id, False, False)])
+
+    def test_search_view_renders_peer_cards(self):
+        response = self.client.get(reverse('products:product-search'), {'q': 'velo'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(item['product'].id, item['is_peer_to_peer']) for item in response.context['products_data']],
+                         [(self.velo.id, False), (self.article.id, True)])
+        self.assertContains(response, reverse('accounts:peer-product-details', args=[self.article.PRDSlug]))
+
+    def test_empty_query_lists_both_catalogs(self):
+        response = self.client.get(reverse('products:product-search'), {'q': ''})
+        self.assertEqual(response.context['total_products'], 2)
+        self.assertEqual({item['is_peer_to_peer'] for item in response.context['products_data']}, {False, True})
+
+
+class SuggestTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        context_cache.clear_local()
+        self.mode = SuperCategory.objects.create(name='Mode', slug='mode')
+        self.chaussures = MainCategory.objects.create(name='Chaussures', slug='chaussures', super_category=self.mode)
+        self.basket = Product.objects.create(product_name='Chaussure de basket', product_description='-', PRDPrice=1000)
+        vendor = User.objects.create_user('vendeur', 'vendeur@example.com', 'secret').profile
+        vendor.status, vendor.admission, vendor.display_name, vendor.slug = 'vendor', True, 'Chez Ada', 'chez-ada'
+        vendor.save()
+
+    def labels(self, query):
+        return [(item['label'], item['type']) for item in suggest(query)]
+
+    def test_word_prefixes_ranked_label_start_first(self):
+        self.assertEqual(self.labels('chau'), [('Chaussures', 'category'), ('Chaussure de basket', 'product')])
+        self.assertEqual(self.labels('BASK'), [('Chaussure de basket', 'product')])
+        self.assertEqual(self.labels('ada'), [('Chez Ada', 'vendor')])
+        self.assertEqual(suggest('bask')[0]['url'], reverse('products:product-details', args=[self.basket.PRDSlug]))
+        self.assertEqual(self.labels('c'), [])
+
+    def test_saves_update_the_shared_index_without_rebuild(self):
+        built_at = get_suggest_index().built_at
+        self.basket.product_name = 'Sandale de plage'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.basket.save()
+            Product.objects.create(product_name='Chaussette', product_description='-', PRDPrice=500)
+            self.chaussures.delete()
+        context_cache.clear_local()
+        self.assertEqual(self.labels('chau'), [('Chaussette', 'product')])
+        self.assertEqual(self.labels('plage'), [('Sandale de plage', 'product')])
+        self.assertEqual(get_suggest_index().built_at, built_at)
+
+    def test_rolled_back_save_is_not_published(self):
+        get_suggest_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Product.objects.create(product_name='Chaussette', product_description='-', PRDPrice=500)
+                    raise ValueError
+            except ValueError:
+                pass
+        context_cache.clear_local()
+        self.assertEqual(self.labels('chaussette'), [])
+
+    def test_hidden_product_is_dropped(self):
+        self.basket.PRDISactive = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.basket.save()
+        self.assertEqual(self.labels('basket'), [])
+
+    def test_endpoint_serves_from_memory(self):
+        get_suggest_index()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('products:suggest'), {'q': 'chaus'})
+        self.assertEqual(response.json()['suggestions'][0]['label'], 'Chaussures')
+
+
+class FacetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        context_cache.clear_local()
+        self.mode = SuperCategory.objects.create(name='Mode')
+        vendor = User.objects.create_user('boutique', 'boutique@example.com', 'secret').profile
+        vendor.display_name, vendor.city = 'Chez Ada', 'libreville '
+        vendor.save()
+        self.seller = User.objects.create_user('vendeur', 'vendeur@example.com', 'secret')
+        self.cheap = Product.objects.create(
+            product_name='Sac en toile', product_description='-', PRDPrice=3000,
+            product_supercategory=self.mode, product_vendor=vendor)
+        self.dear = Product.objects.create(
+            product_name='Sac en cuir', product_description='-', PRDPrice=30000,
+            product_supercategory=self.mode, product_vendor=vendor, is_out_of_stock=True)
+        self.article = PeerToPeerProduct.objects.create(
+            seller=self.seller, product_name='Sac de sport', product_description='-', PRDPrice=4000,
+            seller_phone='074000000', seller_address='Akanda', seller_city='Akanda',
+            condition=PeerToPeerProduct.NEUF, status=PeerToPeerProduct.APPROVED)
+        self.vendor = vendor
+
+    def test_counts_are_disjunctive_and_use_one_query(self):
+        filters = FacetFilters(price=0)
+        with self.assertNumQueries(1):
+            counts = facet_counts(filters=filters, cached=False)
+        # La facette prix ignore son propre filtre, les autres le respectent
+        self.assertEqual(counts['price'], {'0': ('', 2), '2': ('', 1)})
+        self.assertEqual(counts['city'], {'Libreville': ('', 1), 'Akanda': ('', 1)})
+        self.assertEqual(counts['vendor'], {str(self.vendor.id): ('Chez Ada', 1)})
+        self.assertEqual(counts['condition'], {'NEUF': ('', 1)})
+        self.assertEqual(counts['category'], {str(self.mode.id): ('', 1)})
+
+    def test_cached_counts_refresh_on_write(self):
+        self.assertEqual(facet_counts()['in_stock'], {'1': ('', 2), '0': ('', 1)})
+        with self.assertNumQueries(0):
+            facet_counts()
+        self.dear.is_out_of_stock = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dear.save()
+        self.assertEqual(facet_counts()['in_stock'], {'1': ('', 3)})
+
+    def test_rolled_back_write_keeps_cached_counts(self):
+        counts = facet_counts()
+        try:
+            with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+                self.dear.is_out_of_stock = False
+                self.dear.save()
+                # Lecture concurrente pendant la transaction : pas de nouvelle version à remplir
+                self.assertEqual(facet_counts(), counts)
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(facet_counts()['in_stock'], {'1': ('', 2), '0': ('', 1)})
+
+    def test_listing_filters_and_facets(self):
+        response = self.client.get(reverse('categories:shop-htmx'), {'price': 0, 'city': 'libreville'})
+        self.assertEqual([item['product'].id for item in response.context['products_data']], [self.cheap.id])
+        self.assertEqual(response.context['facet_query'], 'price=0&city=Libreville')
+        groups = {group['key']: group for group in response.context['facets']}
+        self.assertEqual([(o['label'], o['count'], o['selected']) for o in groups['price']['options']],
+                         [('Moins de 5 000 FCFA', 1, True), ('20 000 – 50 000 FCFA', 1, False)])
+        self.assertContains(response, 'id="facets-panel"')
+        response = self.client.get(reverse('categories:shop-htmx'), {'condition': 'NEUF'})
+        self.assertEqual([item['product'].id for item in response.context['products_data']], [self.article.id])
+
+    def test_search_applies_filters(self):
+        results = search_catalog('sac', filters=FacetFilters(in_stock=True))
+        self.assertEqual({obj.id for obj, _peer, _boosted in results[:10]}, {self.cheap.id, self.article.id})
+        self.assertEqual(results.count(), 2)
+        self.assertEqual(results.facets()['in_stock'], {'1': ('', 2), '0': ('', 1)})
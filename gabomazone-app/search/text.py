@@ -0,0 +1,43 @@
+"""
+Normalisation du texte indexé et des requêtes (identique sur les deux back ends).
+
+fold() met en minuscules, retire les accents (é → e, ç → c, œ → oe) et
+remplace la ponctuation par des espaces : « Chaussures d'été » et
+« chaussures dete » s'indexent et se cherchent de la même façon.
+"""
+import re
+import unicodedata
+
+from django.utils.html import strip_tags
+
+MAX_TERMS = 8
+MIN_TERM_LENGTH = 2
+
+_LIGATURES = str.maketrans({'œ': 'oe', 'æ': 'ae', 'ß': 'ss'})
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+
+def fold(text):
+    """Texte en minuscules, sans accents ni ponctuation."""
+    if not text:
+        return ''
+    text = strip_tags(str(text)).lower().translate(_LIGATURES)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def terms(query):
+    """Termes d'une requête utilisateur (pliés, dédoublonnés, au plus MAX_TERMS)."""
+    seen = []
+    for term in fold(query).split():
+        if len(term) >= MIN_TERM_LENGTH and term not in seen:
+            seen.append(term)
+    return seen[:MAX_TERMS]
+
+
+def singular(term):
+    """Forme singulière approximative (pluriels réguliers en -s / -x)."""
+    if len(term) > 3 and term[-1] in 'sx':
+        return term[:-1]
+    return term
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class SettingsConfig(AppConfig):
     name = 'settings'
+
+    def ready(self):
+        import settings.signals  # noqa: F401
@@ -1,28 +1,48 @@
-
+from project.context_cache import get_or_build
+from project.lazy_context import lazy_processor
 from .models import (SocailLinks, ContactInfo , SupportNumber , SiteSetting)
 
+CONTEXT_CACHE_NAMESPACE = 'settings'
+
+
+def _build_settings_context():
+    return {
+        'Socail_links': list(SocailLinks.objects.all()),
+        'contact_info': list(ContactInfo.objects.all()),
+        'support_number': list(SupportNumber.objects.all()),
+        'site_info': SiteSetting.objects.all().first(),
+    }
+
+
+def _settings_context():
+    return get_or_build(CONTEXT_CACHE_NAMESPACE, _build_settings_context)
+
 
+@lazy_processor('Socail_links')
 def socail_links_settings(request):
-    Socail_links = SocailLinks.objects.all()
+    Socail_links = _settings_context()['Socail_links']
     return {
         'Socail_links': Socail_links,
     }
 
 
+@lazy_processor('contact_info')
 def contact_info_settings(request):
-    contact_info = ContactInfo.objects.all()
+    contact_info = _settings_context()['contact_info']
     return {
         'contact_info': contact_info,
     }
 
+@lazy_processor('support_number')
 def support_number_settings(request):
-    support_number = SupportNumber.objects.all()
+    support_number = _settings_context()['support_number']
     return {
         'support_number': support_number,
     }    
 
+@lazy_processor('site_info')
 def site_settings(request):
-    site_info = SiteSetting.objects.all().first()
+    site_info = _settings_context()['site_info']
     return {
         'site_info': site_info,
-    }      
\ No newline at end of file
+    }      
@@ -0,0 +1,8 @@
+"""
+Invalidation du cache des paramètres du site utilisé par les context processors
+"""
+from project.context_cache import invalidate_on
+from .context_processors import CONTEXT_CACHE_NAMESPACE
+from .models import SocailLinks, ContactInfo, SupportNumber, SiteSetting
+
+invalidate_on(CONTEXT_CACHE_NAMESPACE, SocailLinks, ContactInfo, SupportNumber, SiteSetting)
@@ -20,13 +20,14 @@ window.onload = function () {
 
 
 
-    let visible = 5;
+    // Curseur de la page suivante (null = première page)
+    let nextCursor = null;
     const handleGetData = (sorted, sortedStatus) => {
         $.ajax({
             type: "GET",
             url: `/supplier-orders-list-ajax/`,
             data: {
-                "num_products": visible,
+                "cursor": nextCursor || "",
                 "order_by": mySelect.value,
                 'order_by_status': selectStatus.value,
             },
@@ -34,6 +35,7 @@ window.onload = function () {
                 const data = response.data;
                 console.log(data);
                 const maxSize = response.max
+                nextCursor = response.next_cursor
                 emptyBox.classList.add("not-visible")
                 spinnerBox.classList.remove("not-visible")
                 loadsBox.classList.add("not-visible")
@@ -43,7 +45,11 @@ window.onload = function () {
                 setTimeout(() => {
                     spinnerBox.classList.add("not-visible")
 
-                    if (response.orders_size > 0) {
+                    // Le total n'est renvoyé qu'avec la première page
+                    if (response.orders_size === undefined) {
+                        loadsBox.classList.remove("not-visible")
+                    }
+                    else if (response.orders_size > 0) {
                         const orderText = response.orders_size === 1 ? 'commande' : 'commandes';
                         ordersNum.innerHTML = `Nous avons trouvé <strong>${response.orders_size}</strong> ${orderText} pour vous !`
                         loadsBox.classList.remove("not-visible")
@@ -122,18 +128,16 @@ window.onload = function () {
     handleGetData();
     loadBtn.addEventListener("click", () => {
 
-        visible += 5;
-
         handleGetData(false);
 
     })
     $('#mySelect').on('change', function () {
-        visible = 5;
+        nextCursor = null;
         handleGetData(true);
     })
 
     $('#select-status').on('change', function () {
-        visible = 5;
+        nextCursor = null;
         handleGetData(true);
     })
 
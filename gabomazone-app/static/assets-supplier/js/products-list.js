@@ -19,13 +19,14 @@ window.onload = function () {
 
 
 
-    let visible = 5;
+    // Curseur de la page suivante (null = première page)
+    let nextCursor = null;
     const handleGetData = (sorted, sortedStatus) => {
         $.ajax({
             type: "GET",
             url: `/supplier-products-list-ajax/`,
             data: {
-                "num_products": visible,
+                "cursor": nextCursor || "",
                 "order_by": mySelect.value,
                 'order_by_status': selectStatus.value,
             },
@@ -33,6 +34,7 @@ window.onload = function () {
                 const data = response.data;
                 console.log(data);
                 const maxSize = response.max
+                nextCursor = response.next_cursor
                 emptyBox.classList.add("not-visible")
                 spinnerBox.classList.remove("not-visible")
                 loadsBox.classList.add("not-visible")
@@ -43,10 +45,11 @@ window.onload = function () {
                     spinnerBox.classList.add("not-visible")
                     loadsBox.classList.remove("not-visible")
 
+                    // Le total n'est renvoyé qu'avec la première page
                     if (response.products_size > 0) {
                         productNum.innerHTML = `<p>Nous avons trouvé <strong class="text-brand">${response.products_size}</strong> produit(s) pour vous !</p>`
                     }
-                    else {
+                    else if (response.products_size === 0) {
                         productNum.innerHTML = ` <p>Aucun produit trouvé</p>`
                     }
 
@@ -113,20 +116,18 @@ window.onload = function () {
     handleGetData();
     loadBtn.addEventListener("click", () => {
 
-        visible += 5;
-
         handleGetData(false);
 
     })
     $('.mySelect').on('change', function () {
 
-        visible = 5;
+        nextCursor = null;
         handleGetData(true);
     })
 
     $('.select-status').on('change', function () {
 
-        visible = 5;
+        nextCursor = null;
         handleGetData(true);
     })
 
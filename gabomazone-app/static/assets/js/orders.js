@@ -13,7 +13,8 @@ window.onload = function () {
         return;
     }
 
-    let visible = 10;
+    // Curseur de la page suivante (null = première page)
+    let nextCursor = null;
     
     // Fonction pour formater le prix
     function formatPrice(amount) {
@@ -65,16 +66,18 @@ window.onload = function () {
         return classMap[status] || 'status-pending';
     }
     
-    const handleGetOrders = () => {
+    // reset : recharger depuis la première page ; sinon ajouter la page suivante
+    const handleGetOrders = (reset) => {
         $.ajax({
             type: "GET",
             url: `/orders-ajax/`,
             data: {
-                "num_products": visible,
+                "cursor": reset ? "" : (nextCursor || ""),
             },
             success: function (response) {
                 const data = response.data;
                 const maxSize = response.max;
+                nextCursor = response.next_cursor;
                 
                 // Vérifier que les éléments existent avant de manipuler leur classList
                 if (emptyBox) emptyBox.classList.add("not-visible");
@@ -85,13 +88,16 @@ window.onload = function () {
                     if (spinnerBox) spinnerBox.classList.add("not-visible");
                     if (loadsBox) loadsBox.classList.remove("not-visible");
 
-                    if (response.orders_size > 0) {
-                        if (orderNum) {
-                            orderNum.innerHTML = `Mes commandes (${response.orders_size})`;
+                    // Le total n'est renvoyé qu'avec la première page
+                    if (orderNum && response.orders_size !== undefined) {
+                        orderNum.innerHTML = `Mes commandes (${response.orders_size})`;
+                    }
+
+                    if (data.length > 0) {
+                        // Vider la liste avant de la remplir (première page)
+                        if (reset) {
+                            ordersList.innerHTML = '';
                         }
-                        
-                        // Vider la liste avant de la remplir
-                        ordersList.innerHTML = '';
 
                         data.forEach(order => {
                             const orderDate = order.order_date ? new Date(order.order_date) : new Date();
@@ -195,13 +201,12 @@ window.onload = function () {
                                 emptyBox.innerHTML = `<strong style="color: var(--color-orange); font-size: 15px;">Plus de commandes à afficher</strong>`;
                             }
                         }
-                    } else {
-                        if (orderNum) {
-                            orderNum.innerHTML = `Mes commandes (0)`;
-                        }
+                    } else if (reset) {
                         if (ordersList) ordersList.innerHTML = ``;
                         if (empty) empty.classList.remove("not-visible");
                         if (loadsBox) loadsBox.classList.add("not-visible");
+                    } else if (loadsBox) {
+                        loadsBox.classList.add("not-visible");
                     }
                 }, 500);
             },
@@ -216,12 +221,11 @@ window.onload = function () {
         });
     };
     
-    handleGetOrders();
+    handleGetOrders(true);
     
     if (loadBtn) {
         loadBtn.addEventListener("click", () => {
-            visible += 10;
-            handleGetOrders();
+            handleGetOrders(false);
         });
     }
     
@@ -232,10 +236,7 @@ window.onload = function () {
         resizeTimer = setTimeout(() => {
             // Recharger seulement si on a déjà des commandes affichées
             if (ordersList && ordersList.innerHTML.trim() !== '') {
-                const currentVisible = visible;
-                visible = 10;
-                handleGetOrders();
-                visible = currentVisible;
+                handleGetOrders(true);
             }
         }, 300);
     });
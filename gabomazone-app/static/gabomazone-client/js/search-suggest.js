@@ -0,0 +1,102 @@
+/* ============================================
+   SEARCH SUGGEST
+   Suggestions de saisie sous les champs de recherche du header
+   (endpoint JSON products:suggest, attribut data-suggest-url)
+   ============================================ */
+
+(function() {
+    'use strict';
+
+    const DELAY = 120;
+    const MIN_LENGTH = 2;
+    const TYPE_ICONS = {category: 'fi-rs-apps', vendor: 'fi-rs-shop', product: 'fi-rs-search'};
+
+    function attach(input) {
+        const url = input.getAttribute('data-suggest-url');
+        const container = input.closest('form') || input.parentNode;
+        const list = document.createElement('ul');
+        list.className = 'gm-suggest-list';
+        list.hidden = true;
+        container.appendChild(list);
+
+        let timer = null;
+        let controller = null;
+        let active = -1;
+
+        function close() {
+            list.hidden = true;
+            list.innerHTML = '';
+            active = -1;
+        }
+
+        function render(suggestions) {
+            list.innerHTML = '';
+            active = -1;
+            suggestions.forEach(function(suggestion) {
+                const item = document.createElement('li');
+                const link = document.createElement('a');
+                const icon = document.createElement('i');
+                link.href = suggestion.url;
+                icon.className = TYPE_ICONS[suggestion.type] || TYPE_ICONS.product;
+                link.appendChild(icon);
+                link.appendChild(document.createTextNode(' ' + suggestion.label));
+                item.appendChild(link);
+                list.appendChild(item);
+            });
+            list.hidden = suggestions.length === 0;
+        }
+
+        function fetchSuggestions() {
+            const query = input.value.trim();
+            if (query.length < MIN_LENGTH) {
+                close();
+                return;
+            }
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            fetch(url + '?q=' + encodeURIComponent(query), {signal: controller.signal})
+                .then(function(response) { return response.ok ? response.json() : {suggestions: []}; })
+                .then(function(data) {
+                    if (data.query === input.value.trim().slice(0, 100)) {
+                        render(data.suggestions || []);
+                    }
+                })
+                .catch(function() {});
+        }
+
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(fetchSuggestions, DELAY);
+        });
+
+        // Navigation clavier : flèches, Entrée sur une suggestion, Échap
+        input.addEventListener('keydown', function(e) {
+            const links = list.querySelectorAll('a');
+            if (list.hidden || links.length === 0) {
+                return;
+            }
+            if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+                e.preventDefault();
+                active = (active + (e.key === 'ArrowDown' ? 1 : links.length - 1)) % links.length;
+                links.forEach(function(link, index) {
+                    link.classList.toggle('active', index === active);
+                });
+            } else if (e.key === 'Enter' && active >= 0) {
+                e.preventDefault();
+                window.location.href = links[active].href;
+            } else if (e.key === 'Escape') {
+                close();
+            }
+        });
+
+        document.addEventListener('click', function(e) {
+            if (!container.contains(e.target)) {
+                close();
+            }
+        });
+    }
+
+    document.querySelectorAll('input[data-suggest-url]').forEach(attach);
+})();
@@ -22,6 +22,7 @@ from categories.models import SuperCategory, MainCategory, SubCategory, MiniCate
 from orders.models import Order, OrderSupplier, OrderDetailsSupplier, Payment
 from payments.models import VendorPayments, SingPayTransaction
 from payments.services.singpay import singpay_service
+from project.cursor_pagination import CursorPaginator, InvalidCursor, cached_count
 from .utils import vendor_only
 
 logger = logging.getLogger(__name__)
@@ -722,41 +723,34 @@ class CategoriesJsonListView(View):
 
 
 class SupplierProductsJsonListView(View):
-    """API JSON paginée pour la liste des produits du vendeur."""
+    """API JSON paginée (curseur) pour la liste des produits du vendeur."""
+    PAGE_SIZE = 5
+    ORDERINGS = ('-date', 'date', 'PRDPrice', '-PRDPrice')
 
     def get(self, *args, **kwargs):
         user = Profile.objects.get(user=self.request.user)
-        upper = int(self.request.GET.get('num_products'))
         order_by = self.request.GET.get('order_by')
+        if order_by not in self.ORDERINGS:
+            order_by = '-date'
         order_by_status = self.request.GET.get('order_by_status')
+        cursor = self.request.GET.get('cursor')
 
-        lower = upper - 5
-        if order_by_status == "All":
-            products_list = list(Product.objects.all().filter(
-                product_vendor=user, PRDISDeleted=False).values().order_by(order_by)[lower:upper])
+        products = Product.objects.filter(product_vendor=user, PRDISDeleted=False)
+        if order_by_status == "Active":
+            products = products.filter(PRDISactive=True)
+        elif order_by_status != "All":
+            products = products.filter(PRDISactive=False)
 
-            products_size = len(Product.objects.all().filter(
-                product_vendor=user, PRDISDeleted=False))
-
-            max_size = True if upper >= products_size else False
-        elif order_by_status == "Active":
-            products_list = list(Product.objects.all().filter(
-                product_vendor=user, PRDISactive=True, PRDISDeleted=False).values().order_by(order_by)[lower:upper])
-
-            products_size = len(Product.objects.all().filter(
-                product_vendor=user, PRDISactive=True, PRDISDeleted=False))
-
-            max_size = True if upper >= products_size else False
-        else:
-            products_list = list(Product.objects.all().filter(
-                product_vendor=user, PRDISactive=False, PRDISDeleted=False).values().order_by(order_by)[lower:upper])
-
-            products_size = len(Product.objects.all().filter(
-                product_vendor=user, PRDISactive=False, PRDISDeleted=False))
-
-            max_size = True if upper >= products_size else False
+        try:
+            page = CursorPaginator(products.values(), [order_by], self.PAGE_SIZE).page(cursor)
+        except InvalidCursor:
+            return JsonResponse({'error': 'Curseur invalide.'}, status=400)
 
-        return JsonResponse({"data": products_list,  "max": max_size, "products_size": products_size, }, safe=False)
+        response = {"data": page.object_list, "max": not page.has_next, "next_cursor": page.next_cursor}
+        # Total seulement pour la première page (COUNT mis en cache)
+        if not cursor:
+            response["products_size"] = cached_count(products)
+        return JsonResponse(response, safe=False)
 
 
 @vendor_only
@@ -1147,52 +1141,34 @@ def supplier_orders_list(request):
 
 
 class SupplierOrdersJsonListView(View):
-    """API JSON paginée pour les commandes du vendeur."""
+    """API JSON paginée (curseur) pour les commandes du vendeur."""
+    PAGE_SIZE = 5
+    ORDERINGS = ('-order_date', 'order_date', 'amount', '-amount')
 
     def get(self, *args, **kwargs):
         user = Profile.objects.get(user=self.request.user)
-        upper = int(self.request.GET.get('num_products'))
         order_by = self.request.GET.get('order_by')
+        if order_by not in self.ORDERINGS:
+            order_by = '-order_date'
         order_by_status = self.request.GET.get('order_by_status')
+        cursor = self.request.GET.get('cursor')
 
-        lower = upper - 5
-        if order_by_status == "All":
-            orders_list = list(OrderSupplier.objects.all().filter(
-                vendor=user, is_finished=True).values().order_by(order_by)[lower:upper])
-
-            orders_size = len(OrderSupplier.objects.all().filter(
-                vendor=user, is_finished=True))
-
-            max_size = True if upper >= orders_size else False
-
-        elif order_by_status == "Underway":
-            orders_list = list(OrderSupplier.objects.all().filter(
-                vendor=user, status="Underway", is_finished=True).values().order_by(order_by)[lower:upper])
+        orders = OrderSupplier.objects.filter(vendor=user, is_finished=True)
+        if order_by_status in ("Underway", "COMPLETE"):
+            orders = orders.filter(status=order_by_status)
+        elif order_by_status != "All":
+            orders = orders.filter(status="Refunded")
 
-            orders_size = len(OrderSupplier.objects.all().filter(
-                vendor=user, status="Underway", is_finished=True))
-
-            max_size = True if upper >= orders_size else False
-
-        elif order_by_status == "COMPLETE":
-            orders_list = list(OrderSupplier.objects.all().filter(
-                vendor=user, status="COMPLETE", is_finished=True).values().order_by(order_by)[lower:upper])
-
-            orders_size = len(OrderSupplier.objects.all().filter(
-                vendor=user, status="COMPLETE", is_finished=True))
-
-            max_size = True if upper >= orders_size else False
-
-        else:
-            orders_list = list(OrderSupplier.objects.all().filter(
-                vendor=user, status="Refunded", is_finished=True).values().order_by(order_by)[lower:upper])
-
-            orders_size = len(OrderSupplier.objects.all().filter(
-                vendor=user, status="Refunded", is_finished=True))
-
-            max_size = True if upper >= orders_size else False
-
-        return JsonResponse({"data": orders_list,  "max": max_size, "orders_size": orders_size, }, safe=False)
+        try:
+            page = CursorPaginator(orders.values(), [order_by], self.PAGE_SIZE).page(cursor)
+        except InvalidCursor:
+            return JsonResponse({'error': 'Curseur invalide.'}, status=400)
+
+        response = {"data": page.object_list, "max": not page.has_next, "next_cursor": page.next_cursor}
+        # Total seulement pour la première page (COUNT mis en cache)
+        if not cursor:
+            response["orders_size"] = cached_count(orders)
+        return JsonResponse(response, safe=False)
 
 
 @vendor_only
@@ -1,3 +1,62 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import Profile
+from products.models import Product
+from .views import VendorsJsonListView
+
+
+class VendorsCursorPaginationTests(TestCase):
+
+    def setUp(self):
+        self.vendors = []
+        for i in range(5):
+            user = User.objects.create_user(f'vendeur{i}', f'vendeur{i}@example.com', 'secret')
+            profile = Profile.objects.get(user=user)
+            profile.status = 'vendor'
+            profile.admission = True
+            profile.display_name = f'Boutique {i}'
+            profile.save()
+            self.vendors.append(profile)
+        for i, profile in enumerate(self.vendors):
+            for n in range(i % 3):
+                Product.objects.create(product_vendor=profile, product_name=f'P{i}{n}',
+                                       product_description='-', PRDPrice=1000)
+
+    def walk(self, order):
+        """Suit les curseurs jusqu'à la fin de la liste (pages de 2)."""
+        url = reverse('suppliers:vendors-ajax')
+        ids, sizes, cursor = [], [], None
+        with mock.patch.object(VendorsJsonListView, 'PAGE_SIZE', 2):
+            while True:
+                params = {'order': order}
+                if cursor:
+                    params['cursor'] = cursor
+                data = self.client.get(url, params).json()
+                ids += [vendor['id'] for vendor in data['data']]
+                sizes.append(data.get('vendors_size'))
+                cursor = data['next_cursor']
+                if data['max']:
+                    return ids, sizes
+
+    def test_recent_order_pages_through_all_vendors(self):
+        ids, sizes = self.walk('recent')
+        expected = list(Profile.objects.filter(status='vendor', admission=True)
+                        .order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        # Total seulement sur la première page
+        self.assertEqual(sizes, [5, None, None])
+
+    def test_popular_order_uses_product_count(self):
+        ids, _sizes = self.walk('popular')
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+        counts = [Product.objects.filter(product_vendor_id=i).count() for i in ids]
+        self.assertEqual(counts, sorted(counts, reverse=True))
 
-# Create your tests here.
+    def test_tampered_cursor_is_rejected(self):
+        response = self.client.get(reverse('suppliers:vendors-ajax'), {'cursor': 'abc'})
+        self.assertEqual(response.status_code, 400)
@@ -9,6 +9,7 @@ from django.views.generic import View
 from accounts.models import Profile
 from products.models import Product, ProductRating
 from categories.models import SuperCategory
+from project.cursor_pagination import CursorPaginator, InvalidCursor, cached_count
 
 logger = logging.getLogger(__name__)
 
@@ -65,11 +66,11 @@ def _serialize_vendor(v, rating_stats=None):
 
 
 class VendorsJsonListView(View):
-    """API JSON paginée pour la liste des vendeurs (scroll infini)."""
+    """API JSON paginée (curseur) pour la liste des vendeurs (scroll infini)."""
+    PAGE_SIZE = 12
 
     def get(self, *args, **kwargs):
-        upper = int(self.request.GET.get("num_vendors", 12))
-        lower = upper - 12
+        cursor = self.request.GET.get("cursor")
         search = (self.request.GET.get("q") or self.request.GET.get("search", "")).strip()
         city_filter = (self.request.GET.get("city") or "").strip()
         category_slug = (self.request.GET.get("category") or "").strip()
@@ -88,20 +89,23 @@ class VendorsJsonListView(View):
             vendors_queryset = vendors_queryset.filter(city__icontains=city_filter)
         if category_slug:
             vendors_queryset = vendors_queryset.filter(
-                product_set__product_supercategory__slug=category_slug,
-                product_set__PRDISDeleted=False,
-                product_set__PRDISactive=True,
+                product__product_supercategory__slug=category_slug,
+                product__PRDISDeleted=False,
+                product__PRDISactive=True,
             ).distinct()
 
         if order == "popular":
             vendors_queryset = vendors_queryset.annotate(
-                product_count=Count("product_set", distinct=True)
-            ).order_by("-product_count", "-date")
+                product_count=Count("product", distinct=True)
+            )
+            ordering = ["-product_count", "-date"]
         else:
-            vendors_queryset = vendors_queryset.order_by("-date")
+            ordering = ["-date"]
 
-        vendors_size = vendors_queryset.count()
-        page = list(vendors_queryset[lower:upper])
+        try:
+            page = CursorPaginator(vendors_queryset, ordering, self.PAGE_SIZE).page(cursor)
+        except InvalidCursor:
+            return JsonResponse({"error": "Curseur invalide."}, status=400)
         vendor_ids = [v.id for v in page]
         rating_stats = {}
         if vendor_ids:
@@ -112,13 +116,16 @@ class VendorsJsonListView(View):
             ):
                 rating_stats[row["vendor_id"]] = {"avg": row["avg"], "cnt": row["cnt"]}
         vendors = [_serialize_vendor(v, rating_stats) for v in page]
-        max_size = upper >= vendors_size
-        return JsonResponse({"data": vendors, "max": max_size, "vendors_size": vendors_size}, safe=False)
+        response = {"data": vendors, "max": not page.has_next, "next_cursor": page.next_cursor}
+        # Total seulement pour la première page (COUNT mis en cache)
+        if not cursor:
+            response["vendors_size"] = cached_count(vendors_queryset)
+        return JsonResponse(response, safe=False)
 
 
 def vendor_details(request, slug):
     """Page détail d'un vendeur avec ses produits, notes et publicités."""
-    from home.models import HomeAdDealTime, VendorDetailsAdImage, ShopAdSidebar
+    from home.ad_rotation import rotate
     
     vendor_detail = Profile.objects.filter(slug=slug, status="vendor", admission=True).first()
     
@@ -170,17 +177,17 @@ def vendor_details(request, slug):
     
     # Récupérer les publicités
     try:
-        home_ads_deal_time_obj = HomeAdDealTime.objects.filter(supplier=vendor_detail).order_by("?")[:4]
+        home_ads_deal_time_obj = rotate('deal_time', limit=4, supplier_id=vendor_detail.id)
     except Exception:
         home_ads_deal_time_obj = []
     
     try:
-        vendor_page_ad_image = VendorDetailsAdImage.objects.all().order_by("?")[:1]
+        vendor_page_ad_image = rotate('vendor_details', limit=1)
     except Exception:
         vendor_page_ad_image = []
     
     try:
-        shop_page_ad = ShopAdSidebar.objects.filter(supplier=vendor_detail).order_by("?")[:1]
+        shop_page_ad = rotate('shop_sidebar', limit=1, supplier_id=vendor_detail.id)
     except Exception:
         shop_page_ad = []
     
@@ -228,7 +235,6 @@ PAGE_SIZE_VENDOR = 12
 class VendorProductListHTMXView(View):
     """Liste des produits du vendeur en HTML (même rendu que la page Produits)."""
     def get(self, request, *args, **kwargs):
-        import json
         from categories.views import get_active_boosted_product_ids
 
         vendor_id = request.GET.get('vendor_id')
@@ -251,20 +257,11 @@ class VendorProductListHTMXView(View):
                 content_type='text/html; charset=utf-8'
             )
 
-        try:
-            qs = Product.objects.filter(
-                product_vendor=vendor,
-                PRDISDeleted=False,
-                PRDISactive=True
-            ).select_related('product_vendor').annotate(
-                like_count=Count('favorites')
-            ).order_by(order_by)
-        except Exception:
-            qs = Product.objects.filter(
-                product_vendor=vendor,
-                PRDISDeleted=False,
-                PRDISactive=True
-            ).select_related('product_vendor').order_by(order_by)
+        qs = Product.objects.filter(
+            product_vendor=vendor,
+            PRDISDeleted=False,
+            PRDISactive=True
+        ).select_related('product_vendor').order_by(order_by)
 
         total_count = qs.count()
         start = (page - 1) * PAGE_SIZE_VENDOR
@@ -276,26 +273,12 @@ class VendorProductListHTMXView(View):
         boosted_ids = get_active_boosted_product_ids()
         products_data = []
         for product in page_products:
-            product_images = []
-            if product.product_image:
-                img_path = str(product.product_image)
-                if not img_path.startswith('/media/'):
-                    img_path = '/media/' + img_path
-                product_images.append(img_path)
-            for attr in ('additional_image_1', 'additional_image_2', 'additional_image_3', 'additional_image_4'):
-                if getattr(product, attr, None):
-                    img_path = str(getattr(product, attr))
-                    if not img_path.startswith('/media/'):
-                        img_path = '/media/' + img_path
-                    product_images.append(img_path)
-            like_count = getattr(product, 'like_count', 0)
-            is_boosted = product.id in boosted_ids
             products_data.append({
                 'product': product,
-                'product_images': json.dumps(product_images),
-                'like_count': like_count,
+                'product_images': product.image_manifest,
+                'like_count': product.like_count,
                 'is_peer_to_peer': False,
-                'is_boosted': is_boosted,
+                'is_boosted': product.id in boosted_ids,
             })
 
         context = {